@@ -41,6 +41,7 @@ from core.history.supabase_profile_history import SupabaseProfileHistoryManager
 from core.metadata.manager import MetadataTaskManager
 from core.metadata.events import MetadataEventType, publish_metadata_event
 from core.utils.performance_optimizations import get_optimized_classes
+from core.utils.resource_governor import resource_governor
 from core.anomalies.routes import register_anomaly_routes
 from core.anomalies.scheduler_service import AnomalyDetectionSchedulerService
 from routes import notifications_bp
@@ -290,17 +291,18 @@ class ImprovedTaskManager:
         """Execute a single task based on its type"""
         logger.info(f"Executing task {task.id} of type {task.task_type}")
         try:
-            if task.task_type == "full_metadata_collection":
-                return self._execute_full_collection(task)
-            elif task.task_type == "table_metadata":
-                return self._execute_table_metadata(task)
-            elif task.task_type == "refresh_statistics":
-                return self._execute_refresh_statistics(task)
-            elif task.task_type == "update_usage":
-                return self._execute_update_usage(task)
-            else:
-                logger.warning(f"Unknown task type: {task.task_type}")
-                return {"status": "unknown_task_type"}
+            with resource_governor.slot(task.connection_id, subsystem="legacy_metadata"):
+                if task.task_type == "full_metadata_collection":
+                    return self._execute_full_collection(task)
+                elif task.task_type == "table_metadata":
+                    return self._execute_table_metadata(task)
+                elif task.task_type == "refresh_statistics":
+                    return self._execute_refresh_statistics(task)
+                elif task.task_type == "update_usage":
+                    return self._execute_update_usage(task)
+                else:
+                    logger.warning(f"Unknown task type: {task.task_type}")
+                    return {"status": "unknown_task_type"}
         except Exception as e:
             logger.error(f"Task execution error: {str(e)}")
             logger.error(traceback.format_exc())
@@ -1838,8 +1840,10 @@ def run_validation_rules_internal(user_id, organization_id, data):
         def execute_validation_rule(rule, connection_string):
             """Execute a single validation rule"""
             try:
-                # Use sparvi_run_validations but with a single rule for better performance
-                result = sparvi_run_validations(connection_string, [rule])
+                # Each concurrent rule holds one of the connection's query slots
+                with resource_governor.slot(connection_id, organization_id, "validation"):
+                    # Use sparvi_run_validations but with a single rule for better performance
+                    result = sparvi_run_validations(connection_string, [rule])
                 return result[0] if result else None
             except Exception as e:
                 logger.error(f"Error executing validation rule {rule['name']}: {str(e)}")
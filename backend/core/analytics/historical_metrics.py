@@ -93,6 +93,7 @@ class HistoricalMetricsTracker:
                 logger.error("Failed to insert historical metric")
                 return False
 
+            self._detect_online(organization_id, connection_id, response.data)
             return True
 
         except Exception as e:
@@ -156,12 +157,22 @@ class HistoricalMetricsTracker:
                     logger.error("Failed to insert batch of historical metrics")
                     return False
 
+                self._detect_online(organization_id, connection_id, response.data)
+
             return True
 
         except Exception as e:
             logger.error(f"Error tracking batch of historical metrics: {str(e)}")
             return False
 
+    def _detect_online(self, organization_id: str, connection_id: str, records: List[Dict[str, Any]]):
+        """Feed newly stored metrics to online anomaly detection without failing the insert"""
+        try:
+            from core.anomalies.online import OnlineAnomalyDetector
+            OnlineAnomalyDetector(self.supabase).observe(organization_id, connection_id, records)
+        except Exception as e:
+            logger.error(f"Error running online anomaly detection: {str(e)}")
+
     def get_metric_history(
             self,
             organization_id: str,
@@ -216,6 +227,63 @@ class HistoricalMetricsTracker:
             logger.error(f"Error getting metric history: {str(e)}")
             return []
 
+    def get_metric_histories(
+            self,
+            organization_id: str,
+            connection_id: str,
+            metric_names: List[str],
+            days: int = 30,
+            page_size: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Get historical values for many metrics of a connection with grouped queries
+
+        Rows for all requested metric names are fetched together and paged through in
+        timestamp order, so the number of requests depends on the data volume rather
+        than on the number of metrics.
+
+        Args:
+            organization_id: Organization ID
+            connection_id: Connection ID
+            metric_names: Metric names to fetch
+            days: Number of days to look back
+            page_size: Rows per request
+
+        Returns:
+            List of metric data points in timestamp order
+        """
+        if not metric_names:
+            return []
+
+        try:
+            start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            rows = []
+            offset = 0
+
+            while True:
+                response = self.supabase.table("historical_metrics") \
+                    .select("connection_id,metric_name,table_name,column_name,metric_value,metric_text,timestamp") \
+                    .eq("organization_id", organization_id) \
+                    .eq("connection_id", connection_id) \
+                    .in_("metric_name", sorted(set(metric_names))) \
+                    .gte("timestamp", start_date) \
+                    .order("timestamp") \
+                    .order("id") \
+                    .range(offset, offset + page_size - 1) \
+                    .execute()
+
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    break
+                offset += page_size
+
+            return rows
+
+        except Exception as e:
+            logger.error(f"Error getting metric histories: {str(e)}")
+            return []
+
     def get_recent_metrics(
             self,
             organization_id: str,
@@ -2,11 +2,341 @@
 
 import numpy as np
 import logging
+from datetime import datetime
 from typing import List, Tuple, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
 
+# Seasonal profiles supported by the seasonal method, with their number of buckets
+SEASONALITY_BUCKETS = {
+    'weekday': 7,
+    'hour': 24,
+    'weekday_hour': 168,
+}
+
+# Scale factor turning a median absolute deviation into a standard deviation estimate
+_MAD_SCALE = 1.4826
+
+# Upper bound on the number of window elements materialized at once when taking
+# rolling statistics over strided views
+_WINDOW_CHUNK_ELEMENTS = 4_000_000
+
+
+def _as_series_matrix(series) -> np.ndarray:
+    """Convert a list of values or a 2-D array of series into a float matrix"""
+    matrix = np.asarray(series, dtype=float)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 1-D or 2-D array of values, got {matrix.ndim} dimensions")
+    return matrix
+
+
+def _row_thresholds(base: float, sensitivity, n_series: int) -> np.ndarray:
+    """Per-series thresholds for a scalar or per-series sensitivity"""
+    sensitivity = np.broadcast_to(np.asarray(sensitivity, dtype=float), (n_series,))
+    return base / sensitivity
+
+
+def _window_stats(matrix: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and population standard deviation of every length-`window` slice of each row
+
+    Windows are copied into contiguous blocks and reduced with np.mean / np.std along
+    the window axis, which performs the same operations as np.mean / np.std of the
+    slice itself. Running sums would be cheaper but round differently, which flips
+    scores that sit exactly on a threshold. Blocks are processed in column chunks so
+    memory stays bounded for long series. Column j of the results describes
+    matrix[:, j:j + window]; windows containing NaN produce NaN.
+
+    Returns:
+        (means, stds), each of shape (n_series, n_points - window + 1)
+    """
+    n_series, n_points = matrix.shape
+    n_windows = n_points - window + 1
+    means = np.empty((n_series, n_windows))
+    stds = np.empty((n_series, n_windows))
+
+    views = np.lib.stride_tricks.sliding_window_view(matrix, window, axis=1)
+    chunk = max(1, _WINDOW_CHUNK_ELEMENTS // max(1, n_series * window))
+
+    for start in range(0, n_windows, chunk):
+        stop = min(n_windows, start + chunk)
+        block = np.ascontiguousarray(views[:, start:stop])
+        means[:, start:stop] = block.mean(axis=2)
+        stds[:, start:stop] = block.std(axis=2)
+
+    return means, stds
+
+
+def _rolling_stats(matrix: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of the `window` values preceding each point
+
+    Returns:
+        (means, stds) of the same shape as matrix; the first `window` columns are NaN
+    """
+    means = np.full(matrix.shape, np.nan)
+    stds = np.full(matrix.shape, np.nan)
+    n_points = matrix.shape[1]
+    if n_points > window:
+        window_means, window_stds = _window_stats(matrix[:, :-1], window)
+        means[:, window:] = window_means
+        stds[:, window:] = window_stds
+    return means, stds
+
+
+def _rolling_quantiles(matrix: np.ndarray, window: int, quantiles: List[float]) -> np.ndarray:
+    """
+    Percentiles of the `window` values preceding each point
+
+    Percentiles are taken over strided window views with a partial sort per window,
+    processed in column chunks so memory stays bounded for long series.
+
+    Returns:
+        Array of shape (len(quantiles), n_series, n_points); the first `window`
+        columns are NaN
+    """
+    n_series, n_points = matrix.shape
+    result = np.full((len(quantiles), n_series, n_points), np.nan)
+    if n_points <= window:
+        return result
+
+    views = np.lib.stride_tricks.sliding_window_view(matrix[:, :-1], window, axis=1)
+    n_windows = views.shape[1]
+    chunk = max(1, _WINDOW_CHUNK_ELEMENTS // max(1, n_series * window))
+
+    for start in range(0, n_windows, chunk):
+        stop = min(n_windows, start + chunk)
+        # NaN in a window (series padding) propagates to its percentiles
+        result[:, :, window + start:window + stop] = np.percentile(views[:, start:stop], quantiles, axis=2)
+
+    return result
+
+
+def _valid_counts(matrix: np.ndarray) -> np.ndarray:
+    """Number of non-NaN values in each row"""
+    return np.sum(~np.isnan(matrix), axis=1)
+
+
+def bulk_zscore_anomalies(series, sensitivity=1.0,
+                          window: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Z-score detection over many series at once.
+
+    Args:
+        series: 2-D array (n_series, n_points). Shorter series are left-padded with NaN.
+        sensitivity: Scalar or per-series sensitivity
+        window: Optional rolling window size (None = use all data)
+
+    Returns:
+        (scores, is_anomaly, thresholds): scores and flags of shape (n_series, n_points)
+        with NaN scores for points that were not evaluated, and one threshold per series
+    """
+    matrix = _as_series_matrix(series)
+    n_series, _ = matrix.shape
+    thresholds = _row_thresholds(3.0, sensitivity, n_series)  # Default threshold is 3 sigma
+    counts = _valid_counts(matrix)
+    scores = np.full(matrix.shape, np.nan)
+
+    # Series no longer than the window are scored against all of their data
+    whole = counts >= 2 if window is None or window < 1 else (counts >= 2) & (window >= counts)
+    rolling = np.zeros(n_series, dtype=bool) if window is None or window < 1 else (counts > window)
+
+    with np.errstate(all='ignore'):
+        if whole.any():
+            subset = matrix[whole]
+            means = np.nanmean(subset, axis=1, keepdims=True)
+            stds = np.nanstd(subset, axis=1, keepdims=True)
+            # Handle case where all values are the same
+            scores[whole] = np.where(stds == 0, 0.0, np.abs((subset - means) / stds))
+            scores[whole] = np.where(np.isnan(subset), np.nan, scores[whole])
+
+        if rolling.any():
+            subset = matrix[rolling]
+            means, stds = _rolling_stats(subset, window)
+            # Handle case where all values in the window are the same
+            scores[rolling] = np.where(stds == 0, 0.0, np.abs((subset - means) / stds))
+            scores[rolling] = np.where(np.isnan(subset) | np.isnan(stds), np.nan, scores[rolling])
+
+    with np.errstate(invalid='ignore'):
+        is_anomaly = scores > thresholds[:, None]
+    return scores, is_anomaly, thresholds
+
+
+def bulk_iqr_anomalies(series, sensitivity=1.0,
+                       window: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    IQR detection over many series at once.
+
+    Args:
+        series: 2-D array (n_series, n_points). Shorter series are left-padded with NaN.
+        sensitivity: Scalar or per-series sensitivity
+        window: Optional rolling window size (None = use all data)
+
+    Returns:
+        (scores, is_anomaly, thresholds) as for bulk_zscore_anomalies
+    """
+    matrix = _as_series_matrix(series)
+    n_series, n_points = matrix.shape
+    thresholds = _row_thresholds(1.5, sensitivity, n_series)  # Default threshold is 1.5 * IQR
+    counts = _valid_counts(matrix)
+
+    # Need at least 4 points for meaningful quartiles
+    enough = counts >= 4
+    whole = enough if window is None or window < 1 else enough & (window >= counts)
+    rolling = np.zeros(n_series, dtype=bool) if window is None or window < 1 else enough & (counts > window)
+
+    q1 = np.full(matrix.shape, np.nan)
+    q3 = np.full(matrix.shape, np.nan)
+    if whole.any():
+        quartiles = np.nanpercentile(matrix[whole], [25, 75], axis=1)
+        q1[whole] = quartiles[0][:, None]
+        q3[whole] = quartiles[1][:, None]
+    if rolling.any():
+        quartiles = _rolling_quantiles(matrix[rolling], window, [25, 75])
+        q1[rolling] = quartiles[0]
+        q3[rolling] = quartiles[1]
+
+    iqr = q3 - q1
+    lower_bound = q1 - iqr * thresholds[:, None]
+    upper_bound = q3 + iqr * thresholds[:, None]
+
+    with np.errstate(all='ignore'):
+        below = matrix < lower_bound
+        above = matrix > upper_bound
+        # Score is how many IQRs away from the nearest bound
+        distance = np.where(below, lower_bound - matrix, np.where(above, matrix - upper_bound, 0.0))
+        scores = np.where(iqr > 0, np.abs(distance / iqr), np.inf)
+        scores = np.where(below | above, scores, 0.0)
+
+    scores[np.isnan(matrix) | np.isnan(iqr)] = np.nan
+    is_anomaly = below | above
+    return scores, is_anomaly, thresholds
+
+
+def bulk_moving_average_anomalies(series, sensitivity=1.0, window: int = 7,
+                                  std_window: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Moving-average detection over many series at once.
+
+    Args:
+        series: 2-D array (n_series, n_points). Shorter series are left-padded with NaN.
+        sensitivity: Scalar or per-series sensitivity
+        window: Window size for moving average
+        std_window: Window for calculating standard deviation (default: same as window)
+
+    Returns:
+        (scores, is_anomaly, thresholds) as for bulk_zscore_anomalies
+    """
+    matrix = _as_series_matrix(series)
+    n_series, n_points = matrix.shape
+    thresholds = _row_thresholds(2.0, sensitivity, n_series)  # Default threshold is 2 stdevs
+    scores = np.full(matrix.shape, np.nan)
+
+    if std_window is None:
+        std_window = window
+
+    counts = _valid_counts(matrix)
+    evaluated = counts >= window + 1
+    if n_points < window + 1 or not evaluated.any():
+        return scores, np.zeros(matrix.shape, dtype=bool), thresholds
+
+    # Moving average of the `window` values preceding each point
+    moving_avgs, _ = _window_stats(matrix[:, :-1], window)
+    n_avgs = moving_avgs.shape[1]
+
+    # Rolling standard deviation of the moving averages. As before, position i uses
+    # the averages i..i+std_window-1 and the tail reuses the last full window.
+    stds = np.full(moving_avgs.shape, np.nan)
+    if n_avgs >= std_window:
+        _, window_stds = _window_stats(moving_avgs, std_window)
+        stds[:, :window_stds.shape[1]] = window_stds
+        stds[:, window_stds.shape[1]:] = window_stds[:, -1:]
+
+    # Series with too few averages for a rolling window use one overall std
+    short = evaluated & (counts - window < std_window)
+    if short.any():
+        with np.errstate(all='ignore'):
+            stds[short] = np.nanstd(moving_avgs[short], axis=1, keepdims=True)
+
+    values = matrix[:, window:]
+    with np.errstate(all='ignore'):
+        # Handle case where std is zero
+        window_scores = np.where(stds == 0, 0.0, np.abs((values - moving_avgs) / stds))
+    window_scores[np.isnan(values) | np.isnan(moving_avgs) | np.isnan(stds)] = np.nan
+    window_scores[~evaluated] = np.nan
+    scores[:, window:] = window_scores
+
+    with np.errstate(invalid='ignore'):
+        is_anomaly = (scores > thresholds[:, None]) & ~np.isnan(scores)
+    return scores, is_anomaly, thresholds
+
+
+def detect_anomalies_bulk(series, method: str = 'zscore', sensitivity=1.0,
+                          window: Optional[int] = None,
+                          std_window: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run one detection method over a 2-D array of many series at once.
+
+    Args:
+        series: 2-D array (n_series, n_points). Shorter series are left-padded with NaN.
+        method: 'zscore', 'iqr' or 'moving_average'
+        sensitivity: Scalar or per-series sensitivity
+        window: Rolling window size (moving_average defaults to 7)
+        std_window: Standard deviation window for moving_average
+
+    Returns:
+        (scores, is_anomaly, thresholds); see bulk_results_to_tuples to get the
+        per-series (index, score, is_anomaly, threshold) results
+    """
+    if method == 'zscore':
+        return bulk_zscore_anomalies(series, sensitivity, window)
+    elif method == 'iqr':
+        return bulk_iqr_anomalies(series, sensitivity, window)
+    elif method == 'moving_average':
+        return bulk_moving_average_anomalies(series, sensitivity, window or 7, std_window)
+    raise ValueError(f"Unknown detection method: {method}")
+
+
+def bulk_results_to_tuples(scores: np.ndarray,
+                           is_anomaly: np.ndarray,
+                           thresholds: np.ndarray,
+                           row: int,
+                           offset: int = 0) -> List[Tuple[int, float, bool, float]]:
+    """
+    Convert one row of bulk detection output to (index, score, is_anomaly, threshold) tuples
+
+    Args:
+        scores, is_anomaly, thresholds: Output of a bulk detection function
+        row: Series row to convert
+        offset: Number of leading padding columns in the row; indexes are relative
+            to the first real value of the series
+    """
+    row_scores = scores[row]
+    evaluated = np.flatnonzero(~np.isnan(row_scores))
+    threshold = float(thresholds[row])
+    return [(int(i) - offset, float(row_scores[i]), bool(is_anomaly[row, i]), threshold) for i in evaluated]
+
+
+def pad_series(series_list: List[List[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Align series of different lengths into one matrix by left-padding with NaN
+
+    Returns:
+        (matrix, offsets) where offsets[i] is the padding width of series i
+    """
+    length = max((len(values) for values in series_list), default=0)
+    matrix = np.full((len(series_list), length), np.nan)
+    offsets = np.zeros(len(series_list), dtype=int)
+    for i, values in enumerate(series_list):
+        offsets[i] = length - len(values)
+        if len(values):
+            matrix[i, offsets[i]:] = values
+    return matrix, offsets
+
+
 def detect_zscore_anomalies(values: List[float],
                             sensitivity: float = 1.0,
                             window: Optional[int] = None) -> List[Tuple[int, float, bool, float]]:
@@ -24,41 +354,7 @@ def detect_zscore_anomalies(values: List[float],
     if len(values) < 2:
         return []
 
-    results = []
-
-    # Use all data if window not specified
-    if window is None or window >= len(values):
-        mean = np.mean(values)
-        std = np.std(values)
-        threshold = 3.0 / sensitivity  # Default threshold is 3 sigma
-
-        for i, value in enumerate(values):
-            if std == 0:  # Handle case where all values are the same
-                score = 0
-            else:
-                score = abs((value - mean) / std)
-
-            is_anomaly = score > threshold
-            results.append((i, score, is_anomaly, threshold))
-
-    else:
-        # Rolling window approach
-        for i in range(window, len(values)):
-            window_values = values[i - window:i]
-            mean = np.mean(window_values)
-            std = np.std(window_values)
-            threshold = 3.0 / sensitivity
-
-            value = values[i]
-            if std == 0:  # Handle case where all values in window are the same
-                score = 0
-            else:
-                score = abs((value - mean) / std)
-
-            is_anomaly = score > threshold
-            results.append((i, score, is_anomaly, threshold))
-
-    return results
+    return bulk_results_to_tuples(*bulk_zscore_anomalies(values, sensitivity, window), row=0)
 
 
 def detect_iqr_anomalies(values: List[float],
@@ -78,58 +374,7 @@ def detect_iqr_anomalies(values: List[float],
     if len(values) < 4:  # Need at least 4 points for meaningful quartiles
         return []
 
-    results = []
-
-    # Use all data if window not specified
-    if window is None or window >= len(values):
-        q1 = np.percentile(values, 25)
-        q3 = np.percentile(values, 75)
-        iqr = q3 - q1
-        threshold = 1.5 / sensitivity  # Default threshold is 1.5 * IQR
-
-        lower_bound = q1 - (iqr * threshold)
-        upper_bound = q3 + (iqr * threshold)
-
-        for i, value in enumerate(values):
-            # Calculate how many IQRs away from the nearest bound
-            if value < lower_bound:
-                score = abs((lower_bound - value) / iqr) if iqr > 0 else float('inf')
-                is_anomaly = True
-            elif value > upper_bound:
-                score = abs((value - upper_bound) / iqr) if iqr > 0 else float('inf')
-                is_anomaly = True
-            else:
-                score = 0
-                is_anomaly = False
-
-            results.append((i, score, is_anomaly, threshold))
-
-    else:
-        # Rolling window approach
-        for i in range(window, len(values)):
-            window_values = values[i - window:i]
-            q1 = np.percentile(window_values, 25)
-            q3 = np.percentile(window_values, 75)
-            iqr = q3 - q1
-            threshold = 1.5 / sensitivity
-
-            lower_bound = q1 - (iqr * threshold)
-            upper_bound = q3 + (iqr * threshold)
-
-            value = values[i]
-            if value < lower_bound:
-                score = abs((lower_bound - value) / iqr) if iqr > 0 else float('inf')
-                is_anomaly = True
-            elif value > upper_bound:
-                score = abs((value - upper_bound) / iqr) if iqr > 0 else float('inf')
-                is_anomaly = True
-            else:
-                score = 0
-                is_anomaly = False
-
-            results.append((i, score, is_anomaly, threshold))
-
-    return results
+    return bulk_results_to_tuples(*bulk_iqr_anomalies(values, sensitivity, window), row=0)
 
 
 def detect_moving_average_anomalies(values: List[float],
@@ -151,51 +396,138 @@ def detect_moving_average_anomalies(values: List[float],
     if len(values) < window + 1:
         return []
 
-    if std_window is None:
-        std_window = window
+    return bulk_results_to_tuples(
+        *bulk_moving_average_anomalies(values, sensitivity, window, std_window), row=0
+    )
+
+
+def _seasonal_buckets(timestamps: List[str], seasonality: str) -> np.ndarray:
+    """Map timestamps to seasonal bucket indexes (-1 for unparseable timestamps)"""
+    buckets = np.full(len(timestamps), -1, dtype=int)
+    for i, timestamp in enumerate(timestamps):
+        try:
+            moment = timestamp if isinstance(timestamp, datetime) else \
+                datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        except ValueError:
+            continue
+
+        if seasonality == 'weekday':
+            buckets[i] = moment.weekday()
+        elif seasonality == 'hour':
+            buckets[i] = moment.hour
+        else:
+            buckets[i] = moment.weekday() * 24 + moment.hour
+    return buckets
 
-    results = []
 
-    # Calculate moving averages
-    moving_avgs = []
-    for i in range(window, len(values)):
-        window_values = values[i - window:i]
-        moving_avgs.append(np.mean(window_values))
+def fit_seasonal_baseline(values: List[float],
+                          timestamps: List[str],
+                          seasonality: str = 'weekday') -> Optional[Dict[str, Any]]:
+    """
+    Fit a median-by-period seasonal profile.
 
-    # Calculate standard deviation of moving averages
-    if len(moving_avgs) < std_window:
-        std = np.std(moving_avgs)
-        stds = [std] * len(moving_avgs)
-    else:
-        # Calculate rolling standard deviation
-        stds = []
-        for i in range(std_window, len(moving_avgs) + 1):
-            stds.append(np.std(moving_avgs[i - std_window:i]))
-
-    threshold = 2.0 / sensitivity  # Default threshold is 2 stdevs
-
-    # Detect anomalies
-    for i in range(len(moving_avgs)):
-        actual_idx = i + window
-        value = values[actual_idx]
-        moving_avg = moving_avgs[i]
-
-        # Get appropriate standard deviation
-        if i < len(stds):
-            current_std = stds[i]
-        else:
-            current_std = stds[-1]  # Use last calculated std
+    The expected value for a point is the median of all values in the same
+    weekday / hour bucket (the overall median for empty buckets), and the residual
+    scale is a robust standard deviation estimate of the differences.
 
-        if current_std == 0:  # Handle case where std is zero
-            score = 0
-            is_anomaly = False
-        else:
-            score = abs((value - moving_avg) / current_std)
-            is_anomaly = score > threshold
+    Args:
+        values: List of metric values
+        timestamps: ISO timestamps aligned with values
+        seasonality: 'weekday', 'hour' or 'weekday_hour'
+
+    Returns:
+        Baseline dictionary (JSON-serializable), or None if there is no usable data
+    """
+    if seasonality not in SEASONALITY_BUCKETS:
+        raise ValueError(f"Unknown seasonality: {seasonality}")
+
+    array = np.asarray(values, dtype=float)
+    buckets = _seasonal_buckets(timestamps, seasonality)
+    usable = buckets >= 0
+    if not usable.any():
+        return None
+
+    array, buckets = array[usable], buckets[usable]
+    level = float(np.median(array))
+
+    # Sort once by bucket and take each bucket's median from its contiguous slice
+    order = np.argsort(buckets, kind='stable')
+    sorted_buckets, sorted_values = buckets[order], array[order]
+    bucket_ids, starts = np.unique(sorted_buckets, return_index=True)
+    profile = np.full(SEASONALITY_BUCKETS[seasonality], level)
+    for bucket, bucket_values in zip(bucket_ids, np.split(sorted_values, starts[1:])):
+        profile[bucket] = np.median(bucket_values)
+
+    residuals = array - profile[buckets]
+    scale = _MAD_SCALE * float(np.median(np.abs(residuals - np.median(residuals))))
+    if scale == 0:
+        scale = float(np.std(residuals))
+
+    return {
+        "seasonality": seasonality,
+        "level": level,
+        "profile": profile.tolist(),
+        "scale": scale,
+        "fitted_points": int(len(array))
+    }
+
+
+def detect_seasonal_anomalies(values: List[float],
+                              timestamps: List[str],
+                              sensitivity: float = 1.0,
+                              seasonality: str = 'weekday',
+                              baseline: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float, bool, float]]:
+    """
+    Detect anomalies as deviations from a seasonal profile.
+
+    Args:
+        values: List of metric values
+        timestamps: ISO timestamps aligned with values
+        sensitivity: Multiplier for threshold (lower = more sensitive)
+        seasonality: 'weekday', 'hour' or 'weekday_hour'
+        baseline: Previously fitted baseline to reuse (fitted from values if None)
+
+    Returns:
+        List of (index, score, is_anomaly, threshold) tuples
+    """
+    if len(values) < 2:
+        return []
 
-        results.append((actual_idx, score, is_anomaly, threshold))
+    if baseline is None:
+        baseline = fit_seasonal_baseline(values, timestamps, seasonality)
+    if baseline is None:
+        return []
 
-    return results
+    scores, is_anomaly, threshold, evaluated = _seasonal_scores(values, timestamps, sensitivity, baseline)
+    return [(int(i), float(scores[i]), bool(is_anomaly[i]), threshold) for i in np.flatnonzero(evaluated)]
+
+
+def seasonal_expected_values(timestamps: List[str], baseline: Dict[str, Any]) -> List[Optional[float]]:
+    """Expected value of each timestamp under a fitted seasonal baseline"""
+    buckets = _seasonal_buckets(timestamps, baseline["seasonality"])
+    profile = np.asarray(baseline["profile"], dtype=float)
+    return [float(profile[bucket]) if bucket >= 0 else None for bucket in buckets]
+
+
+def _seasonal_scores(values: List[float],
+                     timestamps: List[str],
+                     sensitivity: float,
+                     baseline: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, float, np.ndarray]:
+    """Score values against a baseline; returns (scores, is_anomaly, threshold, evaluated)"""
+    array = np.asarray(values, dtype=float)
+    buckets = _seasonal_buckets(timestamps, baseline["seasonality"])
+    evaluated = buckets >= 0
+    threshold = 3.0 / sensitivity  # Default threshold is 3 robust sigma
+
+    expected = np.asarray(baseline["profile"], dtype=float)[np.where(evaluated, buckets, 0)]
+    scale = baseline["scale"]
+    if scale == 0:
+        # History matched its profile exactly, so any deviation is infinitely unusual
+        scores = np.where(array == expected, 0.0, np.inf)
+    else:
+        scores = np.abs(array - expected) / scale
+
+    return scores, (scores > threshold) & evaluated, threshold, evaluated
 
 
 def get_anomaly_severity(score: float, method: str = 'zscore') -> str:
@@ -223,6 +555,13 @@ def get_anomaly_severity(score: float, method: str = 'zscore') -> str:
             return 'medium'
         else:
             return 'low'
+    elif method == 'seasonal':
+        if score > 6.0:
+            return 'high'
+        elif score > 4.0:
+            return 'medium'
+        else:
+            return 'low'
     elif method == 'moving_average':
         if score > 4.0:
             return 'high'
@@ -243,7 +582,8 @@ def get_anomaly_severity(score: float, method: str = 'zscore') -> str:
 def format_anomaly_results(raw_results: List[Tuple[int, float, bool, float]],
                            values: List[float],
                            timestamps: List[str],
-                           method: str) -> List[Dict[str, Any]]:
+                           method: str,
+                           expected_values: Optional[List[Optional[float]]] = None) -> List[Dict[str, Any]]:
     """
     Format raw detection results into a standardized structure.
 
@@ -252,6 +592,7 @@ def format_anomaly_results(raw_results: List[Tuple[int, float, bool, float]],
         values: Original values list
         timestamps: List of timestamps
         method: Detection method used
+        expected_values: Optional baseline value for each point (seasonal method)
 
     Returns:
         List of formatted anomaly result dictionaries
@@ -264,7 +605,7 @@ def format_anomaly_results(raw_results: List[Tuple[int, float, bool, float]],
             if idx < len(values) and idx < len(timestamps):
                 severity = get_anomaly_severity(score, method)
 
-                formatted_results.append({
+                result = {
                     "timestamp": timestamps[idx],
                     "value": values[idx],
                     "score": float(score),  # Convert numpy types to Python native
@@ -272,7 +613,11 @@ def format_anomaly_results(raw_results: List[Tuple[int, float, bool, float]],
                     "threshold": float(threshold),
                     "method": method,
                     "severity": severity
-                })
+                }
+                if expected_values is not None and idx < len(expected_values):
+                    result["expected_value"] = expected_values[idx]
+
+                formatted_results.append(result)
             else:
                 logger.warning(
                     f"Index {idx} out of bounds for values/timestamps with lengths {len(values)}/{len(timestamps)}")
@@ -1,6 +1,8 @@
 # core/anomalies/api.py
 
 import logging
+import threading
+import time
 import uuid
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, timezone
@@ -8,10 +10,25 @@ from datetime import datetime, timedelta, timezone
 from core.anomalies.detector import AnomalyDetector
 from core.anomalies.scheduler import AnomalyDetectionScheduler
 from core.anomalies.events import AnomalyEventType, publish_anomaly_event
+from core.anomalies.online import invalidate_online_configs, reset_online_state
 from core.storage.supabase_manager import SupabaseManager
 
 logger = logging.getLogger(__name__)
 
+# How long dashboard aggregates are served from memory
+AGGREGATES_CACHE_TTL_SECONDS = 60
+
+_aggregates_cache = {}
+_aggregates_cache_lock = threading.Lock()
+
+
+def invalidate_dashboard_aggregates(organization_id: str, connection_id: Optional[str] = None):
+    """Drop cached dashboard aggregates after anomalies change"""
+    with _aggregates_cache_lock:
+        for key in list(_aggregates_cache.keys()):
+            if key[0] == organization_id and (connection_id is None or key[1] == connection_id):
+                del _aggregates_cache[key]
+
 
 class AnomalyAPI:
     """API for managing anomaly detection configurations and results"""
@@ -111,6 +128,8 @@ class AnomalyAPI:
             logger.error("Failed to create configuration")
             raise Exception("Failed to create configuration")
 
+        invalidate_online_configs(organization_id)
+
         # Publish event
         publish_anomaly_event(
             event_type=AnomalyEventType.CONFIG_CREATED,
@@ -161,6 +180,10 @@ class AnomalyAPI:
             logger.error("Failed to update configuration")
             raise Exception("Failed to update configuration")
 
+        # Online state is rebuilt from history so it matches the updated config
+        invalidate_online_configs(organization_id)
+        reset_online_state(self.supabase.supabase, config_id)
+
         # Publish event
         publish_anomaly_event(
             event_type=AnomalyEventType.CONFIG_UPDATED,
@@ -194,9 +217,12 @@ class AnomalyAPI:
             .execute()
 
         success = response.data is not None and len(response.data) > 0
+        invalidate_online_configs(organization_id)
 
         # Publish event if successful
         if success:
+            # The config's anomalies were deleted with it, and the counters with them
+            invalidate_dashboard_aggregates(organization_id, response.data[0].get("connection_id"))
             publish_anomaly_event(
                 event_type=AnomalyEventType.CONFIG_UPDATED,
                 data={"id": config_id, "deleted": True},
@@ -306,7 +332,7 @@ class AnomalyAPI:
             update_data["resolved_at"] = datetime.now(timezone.utc).isoformat()
             update_data["resolved_by"] = user_id
 
-        # Update in database
+        # Update in database; triggers move the anomaly between dashboard counters
         response = self.supabase.supabase.table("anomaly_results") \
             .update(update_data) \
             .eq("id", anomaly_id) \
@@ -317,6 +343,8 @@ class AnomalyAPI:
             logger.error("Failed to update anomaly status")
             raise Exception("Failed to update anomaly status")
 
+        invalidate_dashboard_aggregates(organization_id, response.data[0].get("connection_id"))
+
         # Publish event
         event_type = AnomalyEventType.ANOMALY_ACKNOWLEDGED
         if status == 'resolved':
@@ -347,12 +375,15 @@ class AnomalyAPI:
             Result dictionary
         """
         # Schedule a detection run
-        return self.scheduler.schedule_detection_run(
+        result = self.scheduler.schedule_detection_run(
             organization_id=organization_id,
             connection_id=connection_id,
             trigger_type='manual'
         )
 
+        invalidate_dashboard_aggregates(organization_id, connection_id)
+        return result
+
     def get_summary(self,
                     organization_id: str,
                     connection_id: str,
@@ -368,109 +399,11 @@ class AnomalyAPI:
         Returns:
             Summary dictionary
         """
-        # Calculate date range
-        start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-
-        # Get count by severity
-        severity_query = f"""
-        SELECT 
-            severity,
-            COUNT(*) as count
-        FROM 
-            anomaly_results
-        WHERE 
-            organization_id = '{organization_id}'
-            AND connection_id = '{connection_id}'
-            AND detected_at >= '{start_date}'
-        GROUP BY 
-            severity
-        """
-
-        # Get count by status
-        status_query = f"""
-        SELECT 
-            status,
-            COUNT(*) as count
-        FROM 
-            anomaly_results
-        WHERE 
-            organization_id = '{organization_id}'
-            AND connection_id = '{connection_id}'
-            AND detected_at >= '{start_date}'
-        GROUP BY 
-            status
-        """
-
-        # Get count by table
-        table_query = f"""
-        SELECT 
-            table_name,
-            COUNT(*) as count
-        FROM 
-            anomaly_results
-        WHERE 
-            organization_id = '{organization_id}'
-            AND connection_id = '{connection_id}'
-            AND detected_at >= '{start_date}'
-        GROUP BY 
-            table_name
-        ORDER BY
-            count DESC
-        LIMIT 10
-        """
-
-        # Get detected today
-        today_query = f"""
-        SELECT 
-            COUNT(*) as count
-        FROM 
-            anomaly_results
-        WHERE 
-            organization_id = '{organization_id}'
-            AND connection_id = '{connection_id}'
-            AND detected_at >= '{datetime.now(timezone.utc).date().isoformat()}'
-        """
-
-        # Execute queries
         try:
-            severity_results = self.supabase.supabase.rpc(
-                'execute_sql',
-                {'sql_query': severity_query}
-            ).execute()
-
-            status_results = self.supabase.supabase.rpc(
-                'execute_sql',
-                {'sql_query': status_query}
-            ).execute()
-
-            table_results = self.supabase.supabase.rpc(
-                'execute_sql',
-                {'sql_query': table_query}
-            ).execute()
-
-            today_results = self.supabase.supabase.rpc(
-                'execute_sql',
-                {'sql_query': today_query}
-            ).execute()
-
-            # Process results
-            severity_counts = {}
-            if severity_results.data:
-                for item in severity_results.data:
-                    severity_counts[item['severity']] = item['count']
-
-            status_counts = {}
-            if status_results.data:
-                for item in status_results.data:
-                    status_counts[item['status']] = item['count']
-
-            table_counts = []
-            if table_results.data:
-                table_counts = table_results.data
-
-            detected_today = 0
-            if today_results.data and len(today_results.data) > 0:
-                detected_today = today_results.data[0]['count']
+            aggregates = self._get_dashboard_aggregates(organization_id, connection_id, days)
+
+            severity_counts = aggregates.get("severity") or {}
+            status_counts = aggregates.get("status") or {}
 
             # Build summary
             return {
@@ -482,8 +415,8 @@ class AnomalyAPI:
                 "acknowledged": status_counts.get("acknowledged", 0),
                 "resolved": status_counts.get("resolved", 0),
                 "expected": status_counts.get("expected", 0),
-                "detected_today": detected_today,
-                "by_table": table_counts,
+                "detected_today": aggregates.get("detected_today") or 0,
+                "by_table": aggregates.get("by_table") or [],
                 "days": days
             }
 
@@ -505,6 +438,46 @@ class AnomalyAPI:
                 "error": str(e)
             }
 
+    def _get_dashboard_aggregates(self,
+                                  organization_id: str,
+                                  connection_id: str,
+                                  days: int = 30) -> Dict[str, Any]:
+        """
+        Get severity, status, table and daily-trend aggregates in one call
+
+        Uses the get_anomaly_dashboard_aggregates database function, which reads the
+        pre-aggregated anomaly_daily_counters rather than raw anomaly_results, and
+        caches the result for AGGREGATES_CACHE_TTL_SECONDS per (organization, connection, days).
+
+        Args:
+            organization_id: Organization ID
+            connection_id: Connection ID
+            days: Number of days to look back
+
+        Returns:
+            Dictionary with severity, status, by_table, detected_today and trends
+        """
+        key = (organization_id, connection_id, days)
+        now = time.time()
+        with _aggregates_cache_lock:
+            cached = _aggregates_cache.get(key)
+            if cached and now - cached[0] < AGGREGATES_CACHE_TTL_SECONDS:
+                return cached[1]
+
+        response = self.supabase.supabase.rpc(
+            'get_anomaly_dashboard_aggregates',
+            {
+                'p_organization_id': organization_id,
+                'p_connection_id': connection_id,
+                'p_days': days
+            }
+        ).execute()
+
+        aggregates = response.data or {}
+        with _aggregates_cache_lock:
+            _aggregates_cache[key] = (now, aggregates)
+        return aggregates
+
     def get_dashboard_data(self,
                            organization_id: str,
                            connection_id: str,
@@ -581,59 +554,9 @@ class AnomalyAPI:
         Returns:
             List of daily trend dictionaries
         """
-        # Calculate date range
-        start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-
-        # Query for daily counts
-        trends_query = f"""
-        WITH days AS (
-            SELECT generate_series(
-                date_trunc('day', (CURRENT_DATE - INTERVAL '{days} days')),
-                date_trunc('day', CURRENT_DATE),
-                '1 day'::interval
-            )::date as day
-        ),
-        daily_counts AS (
-            SELECT 
-                date_trunc('day', detected_at)::date as day,
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE severity = 'high') as high,
-                COUNT(*) FILTER (WHERE severity = 'medium') as medium,
-                COUNT(*) FILTER (WHERE severity = 'low') as low
-            FROM 
-                anomaly_results
-            WHERE 
-                organization_id = '{organization_id}'
-                AND connection_id = '{connection_id}'
-                AND detected_at >= '{start_date}'
-            GROUP BY 
-                day
-        )
-        SELECT 
-            days.day::text as date,
-            COALESCE(daily_counts.total, 0) as total,
-            COALESCE(daily_counts.high, 0) as high,
-            COALESCE(daily_counts.medium, 0) as medium,
-            COALESCE(daily_counts.low, 0) as low
-        FROM 
-            days
-        LEFT JOIN 
-            daily_counts ON days.day = daily_counts.day
-        ORDER BY 
-            days.day
-        """
-
         try:
-            trends_results = self.supabase.supabase.rpc(
-                'execute_sql',
-                {'sql_query': trends_query}
-            ).execute()
-
-            if trends_results.data:
-                return trends_results.data
-
-            return []
+            return self._get_dashboard_aggregates(organization_id, connection_id, days).get("trends") or []
 
         except Exception as e:
             logger.error(f"Error getting anomaly trends: {str(e)}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,367 @@
+# core/anomalies/benchmark.py
+"""
+Offline backtest and throughput benchmark for anomaly detection
+
+Generates (or loads) synthetic metric histories with seasonality and injected
+anomalies, runs every detection method through the 1-D algorithms, the bulk
+algorithms, AnomalyDetector and the online state, and reports runtime,
+points/sec, peak memory and precision/recall. No database is required.
+
+Usage (from the backend directory):
+    python -m core.anomalies.benchmark --series 200 --length 720
+    python -m core.anomalies.benchmark --json > baseline.json
+    python -m core.anomalies.benchmark --baseline baseline.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Callable, Set
+
+import numpy as np
+
+from core.anomalies.algorithms import (
+    detect_zscore_anomalies,
+    detect_iqr_anomalies,
+    detect_moving_average_anomalies,
+    detect_seasonal_anomalies,
+    detect_anomalies_bulk,
+    bulk_results_to_tuples,
+    pad_series
+)
+from core.anomalies.detector import AnomalyDetector
+from core.anomalies.online import OnlineMetricState
+
+METHODS = ["zscore", "iqr", "moving_average", "seasonal"]
+
+# Default window parameters used for every method
+DEFAULT_WINDOW = 24
+
+# Quality may drop by at most this much against a baseline report
+DEFAULT_QUALITY_TOLERANCE = 0.02
+
+
+def generate_series(length: int,
+                    seed: int = 0,
+                    seasonality: Optional[str] = "hour",
+                    anomaly_rate: float = 0.01,
+                    noise: float = 0.02) -> Dict[str, Any]:
+    """
+    Generate one synthetic metric history with injected anomalies
+
+    Args:
+        length: Number of points
+        seed: Random seed
+        seasonality: 'hour' (hourly points with a daily cycle), 'weekday' (daily
+            points with a weekly cycle) or None for a flat level
+        anomaly_rate: Fraction of points replaced by spikes or drops
+        noise: Relative standard deviation of the noise
+
+    Returns:
+        Dictionary with values, timestamps and the sorted anomaly indexes
+    """
+    rng = np.random.default_rng(seed)
+    level = float(rng.uniform(100, 10000))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=1) if seasonality == "weekday" else timedelta(hours=1)
+    positions = np.arange(length)
+
+    if seasonality == "hour":
+        pattern = 1 + 0.3 * np.sin(2 * np.pi * (positions % 24) / 24)
+    elif seasonality == "weekday":
+        pattern = np.where(positions % 7 >= 5, 0.6, 1.0)
+    else:
+        pattern = np.ones(length)
+
+    values = level * pattern * (1 + rng.normal(0, noise, length))
+
+    # Keep the first day or week clean so every method has a warm-up period
+    warmup = min(length, 7 * 24 if seasonality == "hour" else 28)
+    candidates = np.arange(warmup, length)
+    count = min(len(candidates), int(round(length * anomaly_rate)))
+    anomalies = np.sort(rng.choice(candidates, size=count, replace=False)) if count else np.array([], dtype=int)
+    magnitudes = rng.uniform(0.5, 1.5, count) * rng.choice([-1, 1], count)
+    values[anomalies] = values[anomalies] * (1 + np.clip(magnitudes, -0.9, None))
+
+    return {
+        "values": values.tolist(),
+        "timestamps": [(start + step * int(i)).isoformat() for i in positions],
+        "anomalies": anomalies.tolist()
+    }
+
+
+def generate_dataset(series: int, length: int, seed: int = 0, **kwargs) -> List[Dict[str, Any]]:
+    """Generate several synthetic histories with independent seeds"""
+    return [generate_series(length, seed=seed + i, **kwargs) for i in range(series)]
+
+
+def score_detections(flagged: List[Set[int]], dataset: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Precision and recall of flagged indexes against the injected anomalies
+
+    Args:
+        flagged: Flagged indexes per series
+        dataset: Series with their injected anomaly indexes
+
+    Returns:
+        Dictionary with true_positives, false_positives, false_negatives,
+        precision, recall and f1
+    """
+    true_positives = false_positives = false_negatives = 0
+    for detected, series in zip(flagged, dataset):
+        expected = set(series["anomalies"])
+        true_positives += len(detected & expected)
+        false_positives += len(detected - expected)
+        false_negatives += len(expected - detected)
+
+    precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 0.0
+    recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4)
+    }
+
+
+def _measure(run: Callable[[], List[Set[int]]], points: int) -> Dict[str, Any]:
+    """Time a run, then repeat it under tracemalloc to record peak memory"""
+    started = time.perf_counter()
+    flagged = run()
+    elapsed = time.perf_counter() - started
+
+    # Tracing slows Python code down, so memory is measured in a separate pass
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "flagged": flagged,
+        "seconds": round(elapsed, 6),
+        "points_per_second": round(points / elapsed, 1) if elapsed > 0 else None,
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def _flagged_indexes(raw_results) -> Set[int]:
+    return {int(index) for index, _, is_anomaly, _ in raw_results if is_anomaly}
+
+
+def _run_algorithm(method: str, dataset: List[Dict[str, Any]], sensitivity: float,
+                   window: int, seasonality: str) -> List[Set[int]]:
+    flagged = []
+    for series in dataset:
+        values = series["values"]
+        if method == "zscore":
+            raw = detect_zscore_anomalies(values, sensitivity, window)
+        elif method == "iqr":
+            raw = detect_iqr_anomalies(values, sensitivity, window)
+        elif method == "moving_average":
+            raw = detect_moving_average_anomalies(values, sensitivity, window)
+        else:
+            raw = detect_seasonal_anomalies(values, series["timestamps"], sensitivity, seasonality)
+        flagged.append(_flagged_indexes(raw))
+    return flagged
+
+
+def _run_bulk(method: str, dataset: List[Dict[str, Any]], sensitivity: float, window: int) -> List[Set[int]]:
+    matrix, offsets = pad_series([series["values"] for series in dataset])
+    scores, is_anomaly, thresholds = detect_anomalies_bulk(matrix, method, sensitivity, window)
+    return [
+        _flagged_indexes(bulk_results_to_tuples(scores, is_anomaly, thresholds, row=row, offset=int(offsets[row])))
+        for row in range(len(dataset))
+    ]
+
+
+def _run_detector(method: str, dataset: List[Dict[str, Any]], sensitivity: float,
+                  window: int, seasonality: str) -> List[Set[int]]:
+    detector = AnomalyDetector()
+    config = detector.validate_config({
+        "detection_method": method,
+        "sensitivity": sensitivity,
+        "config_params": {"window": window, "seasonality": seasonality}
+    })
+
+    flagged = []
+    for series in dataset:
+        metrics = [{"metric_value": v, "timestamp": t} for v, t in zip(series["values"], series["timestamps"])]
+        results = detector.detect_anomalies(config, metrics)
+        positions = {timestamp: i for i, timestamp in enumerate(series["timestamps"])}
+        flagged.append({positions[r["timestamp"]] for r in results if r.get("is_anomaly")})
+    return flagged
+
+
+def _run_online(method: str, dataset: List[Dict[str, Any]], sensitivity: float, window: int) -> List[Set[int]]:
+    config = {"detection_method": method, "sensitivity": sensitivity, "min_data_points": window,
+              "config_params": {"window": window}}
+    alpha = 2.0 / (window + 1)
+
+    flagged = []
+    for series in dataset:
+        state = OnlineMetricState()
+        detected = set()
+        for i, value in enumerate(series["values"]):
+            scored = state.score(config, value)
+            if scored is not None and scored[1]:
+                detected.add(i)
+            state.update(value, alpha)
+        flagged.append(detected)
+    return flagged
+
+
+def run_benchmark(dataset: List[Dict[str, Any]],
+                  methods: Optional[List[str]] = None,
+                  sensitivity: float = 1.0,
+                  window: int = DEFAULT_WINDOW,
+                  seasonality: str = "hour") -> Dict[str, Any]:
+    """
+    Run every method through each detection path over a dataset
+
+    Args:
+        dataset: Series from generate_dataset or a loaded file
+        methods: Detection methods to run (default: all)
+        sensitivity: Sensitivity passed to every method
+        window: Window size for rolling methods
+        seasonality: Seasonality used by the seasonal method
+
+    Returns:
+        Report with dataset size and one entry per (method, path)
+    """
+    points = sum(len(series["values"]) for series in dataset)
+    results = []
+
+    for method in methods or METHODS:
+        runners = {
+            "algorithm": lambda: _run_algorithm(method, dataset, sensitivity, window, seasonality),
+            "detector": lambda: _run_detector(method, dataset, sensitivity, window, seasonality),
+        }
+        if method != "seasonal":
+            runners["bulk"] = lambda: _run_bulk(method, dataset, sensitivity, window)
+        if method in ("zscore", "iqr", "moving_average"):
+            runners["online"] = lambda: _run_online(method, dataset, sensitivity, window)
+
+        for path, run in runners.items():
+            measured = _measure(run, points)
+            flagged = measured.pop("flagged")
+            results.append({"method": method, "path": path, **measured, **score_detections(flagged, dataset)})
+
+    return {
+        "series": len(dataset),
+        "points": points,
+        "sensitivity": sensitivity,
+        "window": window,
+        "seasonality": seasonality,
+        "results": results
+    }
+
+
+def check_regressions(report: Dict[str, Any],
+                      baseline: Dict[str, Any],
+                      tolerance: float = DEFAULT_QUALITY_TOLERANCE,
+                      min_throughput_ratio: Optional[float] = None) -> List[str]:
+    """
+    Compare a report with a baseline report from the same dataset
+
+    Args:
+        report: Current run_benchmark report
+        baseline: Earlier run_benchmark report
+        tolerance: Allowed drop in precision or recall
+        min_throughput_ratio: If set, minimum points/sec relative to the baseline
+
+    Returns:
+        Human-readable regressions (empty when there are none)
+    """
+    previous = {(r["method"], r["path"]): r for r in baseline.get("results", [])}
+    regressions = []
+
+    for result in report["results"]:
+        key = (result["method"], result["path"])
+        before = previous.get(key)
+        if not before:
+            continue
+
+        for metric in ("precision", "recall"):
+            if result[metric] < before[metric] - tolerance:
+                regressions.append(f"{key[0]}/{key[1]} {metric} {before[metric]:.4f} -> {result[metric]:.4f}")
+
+        if min_throughput_ratio and before.get("points_per_second") and result.get("points_per_second"):
+            ratio = result["points_per_second"] / before["points_per_second"]
+            if ratio < min_throughput_ratio:
+                regressions.append(f"{key[0]}/{key[1]} throughput at {ratio:.0%} of baseline")
+
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report as a text table"""
+    lines = [
+        f"{report['series']} series, {report['points']} points, sensitivity {report['sensitivity']}, "
+        f"window {report['window']}",
+        f"{'method':<16}{'path':<11}{'seconds':>10}{'points/s':>14}{'peak KB':>11}"
+        f"{'precision':>11}{'recall':>8}{'f1':>8}"
+    ]
+    for r in report["results"]:
+        lines.append(
+            f"{r['method']:<16}{r['path']:<11}{r['seconds']:>10.4f}{r['points_per_second'] or 0:>14,.0f}"
+            f"{r['peak_memory_kb']:>11,.1f}{r['precision']:>11.3f}{r['recall']:>8.3f}{r['f1']:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest and benchmark anomaly detection offline")
+    parser.add_argument("--series", type=int, default=50, help="Number of synthetic series")
+    parser.add_argument("--length", type=int, default=720, help="Points per synthetic series")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seasonality", choices=["hour", "weekday", "none"], default="hour")
+    parser.add_argument("--anomaly-rate", type=float, default=0.01)
+    parser.add_argument("--sensitivity", type=float, default=1.0)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, help="Methods to run (default: all)")
+    parser.add_argument("--input", help="Load series from a JSON file instead of generating them")
+    parser.add_argument("--save-dataset", help="Write the series used to a JSON file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--baseline", help="Fail if quality regressed against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_QUALITY_TOLERANCE)
+    parser.add_argument("--min-throughput-ratio", type=float,
+                        help="Also fail if points/sec drops below this fraction of the baseline")
+    args = parser.parse_args(argv)
+
+    seasonality = None if args.seasonality == "none" else args.seasonality
+    if args.input:
+        with open(args.input) as f:
+            dataset = json.load(f)
+    else:
+        dataset = generate_dataset(args.series, args.length, seed=args.seed, seasonality=seasonality,
+                                   anomaly_rate=args.anomaly_rate)
+
+    if args.save_dataset:
+        with open(args.save_dataset, "w") as f:
+            json.dump(dataset, f)
+
+    report = run_benchmark(dataset, args.methods, args.sensitivity, args.window, seasonality or "hour")
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = check_regressions(report, json.load(f), args.tolerance, args.min_throughput_ratio)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,213 @@
 # core/anomalies/detector.py
 
+import bisect
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from core.anomalies.algorithms import (
+    SEASONALITY_BUCKETS,
     detect_zscore_anomalies,
     detect_iqr_anomalies,
     detect_moving_average_anomalies,
+    detect_seasonal_anomalies,
+    fit_seasonal_baseline,
+    seasonal_expected_values,
+    detect_anomalies_bulk,
+    bulk_results_to_tuples,
+    pad_series,
     format_anomaly_results
 )
 
+# Methods that can be evaluated for many series at once
+BULK_METHODS = {"zscore", "iqr", "moving_average"}
+
+# New points after which a cached seasonal baseline is refit
+DEFAULT_SEASONAL_REFIT_POINTS = 24
+
+
+class SeasonalBaselineCache:
+    """
+    Fitted seasonal baselines per configuration
+
+    A baseline is reused until the configuration changes or refit_points new
+    values have arrived since it was fitted, so hourly runs do not refit every
+    profile from scratch. A baseline fitted on history without any spread
+    (scale 0) is refit as soon as a new value deviates from it.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_baseline(self,
+                     config: Dict[str, Any],
+                     values: List[float],
+                     timestamps: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Get the baseline for a config, fitting it if the cached one is missing or stale
+
+        Args:
+            config: Validated anomaly detection configuration
+            values: Chronological metric values
+            timestamps: Timestamps aligned with values
+
+        Returns:
+            Baseline dictionary, or None if no baseline could be fitted
+        """
+        config_params = config.get("config_params", {}) or {}
+        seasonality = config_params.get("seasonality", "weekday")
+        refit_points = config_params.get("refit_points", DEFAULT_SEASONAL_REFIT_POINTS)
+        config_id = config.get("id")
+
+        if config_id is None:
+            return fit_seasonal_baseline(values, timestamps, seasonality)
+
+        baseline = self.lookup(config, timestamps, values)
+        if baseline is not None:
+            return baseline
+
+        baseline = fit_seasonal_baseline(values, timestamps, seasonality)
+        self.store(config, timestamps, baseline)
+        return baseline
+
+    def lookup(self, config: Dict[str, Any], timestamps: List[str],
+               values: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached baseline for a config without fitting
+
+        Args:
+            config: Validated anomaly detection configuration
+            timestamps: Chronological timestamps of the series
+            values: Values aligned with timestamps, used to spot new values that
+                deviate from a zero-scale baseline
+
+        Returns:
+            The baseline if one is cached for this version of the config, fewer
+            than refit_points values arrived since it was fitted and none of them
+            invalidates it, otherwise None
+        """
+        config_params = config.get("config_params", {}) or {}
+        refit_points = config_params.get("refit_points", DEFAULT_SEASONAL_REFIT_POINTS)
+        config_id = config.get("id")
+        if config_id is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(config_id)
+            if entry and entry["fingerprint"] == self._fingerprint(config):
+                first_new = bisect.bisect_right(timestamps, entry["fitted_through"])
+                if len(timestamps) - first_new < refit_points:
+                    baseline = entry["baseline"]
+                    if baseline["scale"] == 0 and values is not None and \
+                            self._deviates(baseline, values[first_new:], timestamps[first_new:]):
+                        del self._entries[config_id]
+                        return None
+                    self._entries.move_to_end(config_id)
+                    return baseline
+        return None
+
+    @staticmethod
+    def _deviates(baseline: Dict[str, Any], values: List[float], timestamps: List[str]) -> bool:
+        """Whether any value differs from its expected value under the baseline"""
+        expected = seasonal_expected_values(list(timestamps), baseline)
+        return any(value_expected is not None and float(value) != value_expected
+                   for value, value_expected in zip(values, expected))
+
+    def store(self, config: Dict[str, Any], timestamps: List[str], baseline: Optional[Dict[str, Any]]):
+        """Cache a baseline fitted over timestamps (e.g. one returned by a worker process)"""
+        config_id = config.get("id")
+        if baseline is None or config_id is None or not len(timestamps):
+            return
+
+        with self._lock:
+            self._entries[config_id] = {
+                "fingerprint": self._fingerprint(config),
+                "fitted_through": timestamps[-1],
+                "baseline": baseline
+            }
+            self._entries.move_to_end(config_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, config_id: str):
+        """Drop the cached baseline for a config"""
+        with self._lock:
+            self._entries.pop(config_id, None)
+
+    @staticmethod
+    def _fingerprint(config: Dict[str, Any]) -> str:
+        """Identify the parts of a config that affect its baseline"""
+        return json.dumps([
+            config.get("metric_name"),
+            config.get("table_name"),
+            config.get("column_name"),
+            config.get("updated_at"),
+            config.get("config_params", {}) or {}
+        ], sort_keys=True, default=str)
+
+
+# Shared across detector instances so baselines survive between runs
+seasonal_baseline_cache = SeasonalBaselineCache()
+
 logger = logging.getLogger(__name__)
 
 
+def detect_series(config: Dict[str, Any], values: np.ndarray, timestamps: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Detect anomalies for one series in a worker process
+
+    Module-level so it can be dispatched to a ProcessPoolExecutor; the series
+    arrives as compact NumPy buffers instead of a list of metric dictionaries.
+
+    Args:
+        config: Anomaly detection configuration
+        values: float64 array of metric values
+        timestamps: String array of timestamps aligned with values
+
+    Returns:
+        List of anomaly results
+    """
+    return AnomalyDetector().detect_series_anomalies(config, values.tolist(), timestamps.tolist())
+
+
+def detect_seasonal_series(config: Dict[str, Any],
+                           values: np.ndarray,
+                           timestamps: np.ndarray,
+                           baseline: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]],
+                                                                               Optional[Dict[str, Any]]]:
+    """
+    Detect anomalies for one seasonal series in a worker process
+
+    Worker processes do not share seasonal_baseline_cache with the scheduler,
+    so the scheduler passes in its cached baseline and caches the one a worker
+    had to fit.
+
+    Args:
+        config: Anomaly detection configuration
+        values: float64 array of metric values
+        timestamps: String array of timestamps aligned with values
+        baseline: Cached baseline to reuse, or None to fit one
+
+    Returns:
+        (anomaly results, baseline used)
+    """
+    values, timestamps = values.tolist(), timestamps.tolist()
+    if len(values) < config.get("min_data_points", 7):
+        return [], baseline
+
+    if baseline is None:
+        seasonality = (config.get("config_params", {}) or {}).get("seasonality", "weekday")
+        baseline = fit_seasonal_baseline(values, timestamps, seasonality)
+    if baseline is None:
+        return [], None
+
+    return AnomalyDetector().detect_series_anomalies(config, values, timestamps, baseline=baseline), baseline
+
+
 class AnomalyDetector:
     """
     Class for detecting anomalies in time-series metrics
@@ -31,30 +227,26 @@ class AnomalyDetector:
         Returns:
             List of anomaly results
         """
-        # Sort metrics by timestamp to ensure chronological order
-        metrics.sort(key=lambda m: m.get("timestamp", ""))
-
-        # Extract values and timestamps from metrics
-        values = []
-        timestamps = []
+        values, timestamps = self.extract_series(metrics)
+        return self.detect_series_anomalies(config, values, timestamps)
 
-        for metric in metrics:
-            # Handle numeric and text metrics appropriately
-            if "metric_value" in metric and metric["metric_value"] is not None:
-                values.append(float(metric["metric_value"]))
-            elif "metric_text" in metric and metric["metric_text"] is not None:
-                try:
-                    # Try to convert text value to float
-                    values.append(float(metric["metric_text"]))
-                except (ValueError, TypeError):
-                    # Skip metrics with non-numeric values
-                    continue
-            else:
-                # Skip metrics with no value
-                continue
+    def detect_series_anomalies(self,
+                                config: Dict[str, Any],
+                                values: List[float],
+                                timestamps: List[str],
+                                baseline: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Detect anomalies for an already extracted series
 
-            timestamps.append(metric.get("timestamp", ""))
+        Args:
+            config: Anomaly detection configuration
+            values: Chronological metric values
+            timestamps: Timestamps aligned with values
+            baseline: Seasonal baseline to use instead of the cached one
 
+        Returns:
+            List of anomaly results
+        """
         # Check if we have enough data points
         min_data_points = config.get("min_data_points", 7)
         if len(values) < min_data_points:
@@ -77,6 +269,14 @@ class AnomalyDetector:
             window = config_params.get("window", 7)
             std_window = config_params.get("std_window")
             raw_results = detect_moving_average_anomalies(values, sensitivity, window, std_window)
+        elif method == "seasonal":
+            if baseline is None:
+                baseline = seasonal_baseline_cache.get_baseline(config, values, timestamps)
+            if baseline is None:
+                return []
+            raw_results = detect_seasonal_anomalies(values, timestamps, sensitivity, baseline=baseline)
+            return format_anomaly_results(raw_results, values, timestamps, method,
+                                          expected_values=seasonal_expected_values(timestamps, baseline))
         else:
             logger.error(f"Unknown detection method: {method}")
             return []
@@ -89,6 +289,97 @@ class AnomalyDetector:
 
         return formatted_results
 
+    def detect_anomalies_bulk(self,
+                              configs: List[Dict[str, Any]],
+                              metrics_by_config: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Detect anomalies for many configurations at once
+
+        Configs are grouped by method and window parameters, and each group is
+        evaluated as one 2-D array of series with per-config sensitivity.
+
+        Args:
+            configs: Anomaly detection configurations
+            metrics_by_config: Historical metrics keyed by config id
+
+        Returns:
+            Anomaly results keyed by config id (configs without enough data map to [])
+        """
+        results_by_config = {}
+        groups = {}
+
+        for config in configs:
+            config_id = config["id"]
+            results_by_config[config_id] = []
+
+            method = config.get("detection_method", "zscore")
+            if method not in BULK_METHODS:
+                # Fall back to single-series detection for anything not vectorized
+                results_by_config[config_id] = self.detect_anomalies(config, metrics_by_config.get(config_id, []))
+                continue
+
+            values, timestamps = self.extract_series(metrics_by_config.get(config_id, []))
+            min_data_points = config.get("min_data_points", 7)
+            if len(values) < min_data_points:
+                logger.info(f"Not enough data points for config {config_id}: {len(values)} < {min_data_points}")
+                continue
+
+            config_params = config.get("config_params", {}) or {}
+            if method == "moving_average":
+                key = (method, config_params.get("window", 7), config_params.get("std_window"))
+            else:
+                key = (method, config_params.get("window"), None)
+
+            groups.setdefault(key, []).append((config, values, timestamps))
+
+        for (method, window, std_window), members in groups.items():
+            matrix, offsets = pad_series([values for _, values, _ in members])
+            sensitivities = [config.get("sensitivity", 1.0) for config, _, _ in members]
+            bulk_results = detect_anomalies_bulk(matrix, method, sensitivities, window, std_window)
+
+            for row, (config, values, timestamps) in enumerate(members):
+                raw_results = bulk_results_to_tuples(*bulk_results, row=row, offset=int(offsets[row]))
+                results_by_config[config["id"]] = format_anomaly_results(raw_results, values, timestamps, method)
+
+        return results_by_config
+
+    @staticmethod
+    def extract_series(metrics: List[Dict[str, Any]]) -> Tuple[List[float], List[str]]:
+        """
+        Extract chronological numeric values and their timestamps from metric records
+
+        Args:
+            metrics: List of historical metrics (sorted in place by timestamp)
+
+        Returns:
+            (values, timestamps) for the metrics with a numeric value
+        """
+        # Sort metrics by timestamp to ensure chronological order
+        metrics.sort(key=lambda m: m.get("timestamp", ""))
+
+        # Extract values and timestamps from metrics
+        values = []
+        timestamps = []
+
+        for metric in metrics:
+            # Handle numeric and text metrics appropriately
+            if "metric_value" in metric and metric["metric_value"] is not None:
+                values.append(float(metric["metric_value"]))
+            elif "metric_text" in metric and metric["metric_text"] is not None:
+                try:
+                    # Try to convert text value to float
+                    values.append(float(metric["metric_text"]))
+                except (ValueError, TypeError):
+                    # Skip metrics with non-numeric values
+                    continue
+            else:
+                # Skip metrics with no value
+                continue
+
+            timestamps.append(metric.get("timestamp", ""))
+
+        return values, timestamps
+
     def validate_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate a configuration and set default values if needed
@@ -123,5 +414,18 @@ class AnomalyDetector:
         if method == "moving_average":
             if "window" not in validated["config_params"]:
                 validated["config_params"]["window"] = 7
+        elif method == "seasonal":
+            seasonality = validated["config_params"].get("seasonality", "weekday")
+            if seasonality not in SEASONALITY_BUCKETS:
+                logger.warning(f"Unknown seasonality {seasonality}, using weekday")
+                seasonality = "weekday"
+            validated["config_params"]["seasonality"] = seasonality
+
+            if "refit_points" not in validated["config_params"]:
+                validated["config_params"]["refit_points"] = DEFAULT_SEASONAL_REFIT_POINTS
+
+            # A weekly profile needs at least two weeks of history to be meaningful
+            if "min_data_points" not in config:
+                validated["min_data_points"] = 14
 
         return validated
\ No newline at end of file
@@ -71,6 +71,7 @@ class HistoricalMetricsTracker:
                 logger.error("Failed to insert metric")
                 return None
 
+            self._detect_online(organization_id, connection_id, response.data)
             return response.data[0]
 
         except Exception as e:
@@ -124,7 +125,8 @@ class HistoricalMetricsTracker:
             # Insert records in batches of 50
             for i in range(0, len(records), 50):
                 batch = records[i:i + 50]
-                self.supabase.supabase.table("historical_metrics").insert(batch).execute()
+                response = self.supabase.supabase.table("historical_metrics").insert(batch).execute()
+                self._detect_online(organization_id, connection_id, response.data or [])
 
             return True
 
@@ -132,6 +134,14 @@ class HistoricalMetricsTracker:
             logger.error(f"Error tracking metrics batch: {str(e)}")
             return False
 
+    def _detect_online(self, organization_id: str, connection_id: str, records: List[Dict[str, Any]]):
+        """Feed newly stored metrics to online anomaly detection without failing the insert"""
+        try:
+            from core.anomalies.online import OnlineAnomalyDetector
+            OnlineAnomalyDetector(self.supabase.supabase).observe(organization_id, connection_id, records)
+        except Exception as e:
+            logger.error(f"Error running online anomaly detection: {str(e)}")
+
     def get_metric_history(self,
                            organization_id: str,
                            connection_id: str,
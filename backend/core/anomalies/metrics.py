@@ -1,8 +1,11 @@
 # core/anomalies/metrics.py
 
 import logging
+from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional, Tuple
 
+from core.utils.resource_governor import resource_governor
+
 logger = logging.getLogger(__name__)
 
 
@@ -209,4 +212,185 @@ class MetricExtractor:
             return MetricExtractor.get_statistics_query(table_name, column_name)
 
         # Custom SQL metric - in this case, return None and let the caller use the custom SQL
-        return None
\ No newline at end of file
+        return None
+
+
+# Aggregate expressions for metrics that can share a single scan of a table.
+# "{column}" is replaced with the configured column name.
+AGGREGATE_EXPRESSIONS = {
+    "row_count": "COUNT(*)",
+    "null_percentage": "(COUNT(*) - COUNT({column})) * 100.0 / NULLIF(COUNT(*), 0)",
+    "distinct_count": "COUNT(DISTINCT {column})",
+    "distinct_percentage": "COUNT(DISTINCT {column}) * 100.0 / NULLIF(COUNT({column}), 0)",
+    "hours_since_update": "DATEDIFF('hour', MAX({column}), CURRENT_TIMESTAMP())",
+    "min_value": "MIN({column})",
+    "max_value": "MAX({column})",
+    "avg_value": "AVG({column})",
+    "std_dev": "STDDEV({column})",
+}
+
+# Ordered-set aggregates need a sort, so they are grouped into one separate query
+PERCENTILE_EXPRESSIONS = {
+    "median": "PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY {column})",
+}
+
+
+class MetricExtractionPlanner:
+    """
+    Plans metric collection so that each table is scanned once
+
+    All configured metrics of a table are folded into one aggregate query, plus at
+    most one extra query for percentile metrics, instead of one query per metric.
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]]):
+        """
+        Args:
+            configs: Anomaly detection configs (table_name, column_name, metric_name)
+        """
+        self.configs = configs
+
+    def plan(self) -> List[Dict[str, Any]]:
+        """
+        Group configured metrics by table and build the queries for each table
+
+        Returns:
+            List of table plans with aggregate/percentile queries and the
+            (alias, metric_name, column_name) selected by each query
+        """
+        tables: Dict[str, Dict[str, Any]] = {}
+
+        for config in self.configs:
+            table_name = config.get("table_name")
+            metric_name = config.get("metric_name")
+            column_name = config.get("column_name")
+
+            if metric_name == "row_count":
+                column_name = None
+            elif metric_name in AGGREGATE_EXPRESSIONS or metric_name in PERCENTILE_EXPRESSIONS:
+                if not column_name:
+                    logger.warning(f"Column name required for metric: {metric_name}")
+                    continue
+            else:
+                # Custom SQL metrics are collected by their own queries
+                continue
+
+            if not table_name:
+                continue
+
+            table = tables.setdefault(table_name, {"aggregate": {}, "percentile": {}})
+            group = "percentile" if metric_name in PERCENTILE_EXPRESSIONS else "aggregate"
+            table[group].setdefault((metric_name, column_name), None)
+
+        return [
+            {
+                "table_name": table_name,
+                **self._build_query(table_name, groups["aggregate"], AGGREGATE_EXPRESSIONS, "aggregate"),
+                **self._build_query(table_name, groups["percentile"], PERCENTILE_EXPRESSIONS, "percentile"),
+            }
+            for table_name, groups in tables.items()
+        ]
+
+    @staticmethod
+    def _build_query(
+            table_name: str,
+            metrics: Dict[Tuple[str, Optional[str]], None],
+            expressions: Dict[str, str],
+            prefix: str
+    ) -> Dict[str, Any]:
+        """Build one SELECT over a table for a set of (metric_name, column_name) pairs"""
+        selected = []
+        select_parts = []
+        for index, (metric_name, column_name) in enumerate(metrics):
+            alias = f"m{index}"
+            expression = expressions[metric_name].format(column=column_name)
+            select_parts.append(f"{expression} AS {alias}")
+            selected.append((alias, metric_name, column_name))
+
+        query = f"SELECT {', '.join(select_parts)} FROM {table_name}" if select_parts else None
+        return {f"{prefix}_query": query, f"{prefix}_metrics": selected}
+
+    @staticmethod
+    def _row_values(result: Any, aliases: List[str]) -> Optional[List[Any]]:
+        """Read the single result row, by alias for dict rows and positionally otherwise"""
+        if not result:
+            return None
+
+        row = result[0]
+        if isinstance(row, dict):
+            return [row.get(alias) for alias in aliases]
+        return list(row)[:len(aliases)]
+
+    def collect(self, connector) -> List[Dict[str, Any]]:
+        """
+        Run the planned queries and return metrics in the historical metrics format
+
+        Args:
+            connector: Connector exposing execute_query(query)
+
+        Returns:
+            List of metric dictionaries accepted by track_metrics_batch
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        metrics = []
+
+        for table_plan in self.plan():
+            for prefix in ("aggregate", "percentile"):
+                query = table_plan[f"{prefix}_query"]
+                if not query:
+                    continue
+
+                selected = table_plan[f"{prefix}_metrics"]
+                try:
+                    values = self._row_values(connector.execute_query(query), [alias for alias, _, _ in selected])
+                except Exception as e:
+                    logger.error(f"Error collecting metrics for table {table_plan['table_name']}: {str(e)}")
+                    continue
+
+                if not values:
+                    continue
+
+                for (_, metric_name, column_name), value in zip(selected, values):
+                    if value is None:
+                        continue
+                    try:
+                        value = float(value)
+                    except (ValueError, TypeError):
+                        logger.warning(f"Could not convert {metric_name} value to float: {value}")
+                        continue
+
+                    metrics.append({
+                        "name": metric_name,
+                        "value": value,
+                        "type": "anomaly_metric",
+                        "table_name": table_plan["table_name"],
+                        "column_name": column_name,
+                        "source": "anomaly_detection",
+                        "timestamp": timestamp
+                    })
+
+        return metrics
+
+    def collect_and_track(self, connector, tracker, organization_id: str, connection_id: str) -> int:
+        """
+        Collect all planned metrics and store them with one batch insert
+
+        Args:
+            connector: Connector exposing execute_query(query)
+            tracker: HistoricalMetricsTracker used to store the metrics
+            organization_id: Organization ID
+            connection_id: Connection ID
+
+        Returns:
+            Number of metrics tracked
+        """
+        with resource_governor.slot(connection_id, organization_id, "anomaly_extraction"):
+            metrics = self.collect(connector)
+        if not metrics:
+            return 0
+
+        if not tracker.track_metrics_batch(organization_id=organization_id, connection_id=connection_id,
+                                           metrics=metrics):
+            return 0
+
+        return len(metrics)
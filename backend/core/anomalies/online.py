@@ -0,0 +1,482 @@
+# core/anomalies/online.py
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.anomalies.algorithms import get_anomaly_severity
+
+logger = logging.getLogger(__name__)
+
+# How long the online configs of a connection are cached before re-reading them
+CONFIG_CACHE_TTL_SECONDS = 300
+
+# History folded into a new state so it does not start cold
+BOOTSTRAP_HISTORY_LIMIT = 1000
+
+# EWMA smoothing when the config does not specify a window
+DEFAULT_EWMA_ALPHA = 0.3
+
+# Times a batch is re-applied to states that another ingestion changed concurrently
+MAX_STATE_SAVE_ATTEMPTS = 3
+
+
+def is_online_config(config: Dict[str, Any]) -> bool:
+    """Whether a configuration is evaluated at ingestion time instead of by the sweep"""
+    return bool((config.get("config_params") or {}).get("online"))
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P-square algorithm
+
+    Keeps five markers regardless of how many values have been observed, so the
+    state is a handful of floats that can be persisted with the config.
+    """
+
+    def __init__(self, p: float, heights: Optional[List[float]] = None,
+                 positions: Optional[List[float]] = None, desired: Optional[List[float]] = None):
+        self.p = p
+        self.heights = list(heights or [])
+        self.positions = list(positions or [0, 1, 2, 3, 4])
+        self.desired = list(desired or [0, 2 * p, 4 * p, 2 + 2 * p, 4])
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value: float):
+        """Add an observation"""
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Find the cell the value falls in, extending the extremes if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+
+        for i in range(cell + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the middle markers towards their desired positions
+        positions = self.positions
+        for i in range(1, 4):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                candidate = self._parabolic(i, step)
+                if heights[i - 1] < candidate < heights[i + 1]:
+                    heights[i] = candidate
+                else:
+                    heights[i] += step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        heights, positions = self.heights, self.positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+            + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        """Current estimate (exact linear interpolation until five values are seen)"""
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            position = self.p * (len(self.heights) - 1)
+            lower = int(math.floor(position))
+            upper = min(lower + 1, len(self.heights) - 1)
+            return self.heights[lower] + (self.heights[upper] - self.heights[lower]) * (position - lower)
+        return self.heights[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "heights": self.heights, "positions": self.positions, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "P2Quantile":
+        return cls(data["p"], data.get("heights"), data.get("positions"), data.get("desired"))
+
+
+class OnlineMetricState:
+    """
+    Running statistics for one configuration's metric
+
+    Holds Welford mean/variance (zscore), an exponentially weighted mean and
+    variance (moving_average) and P-square quartile estimates (iqr). Each new
+    value is scored against the state before it is folded in, so detection is
+    O(1) per data point.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.count = data.get("count", 0)
+        self.mean = data.get("mean", 0.0)
+        self.m2 = data.get("m2", 0.0)
+        self.ewma = data.get("ewma")
+        self.ewm_var = data.get("ewm_var", 0.0)
+        self.q1 = P2Quantile.from_dict(data["q1"]) if data.get("q1") else P2Quantile(0.25)
+        self.q3 = P2Quantile.from_dict(data["q3"]) if data.get("q3") else P2Quantile(0.75)
+        self.last_timestamp = data.get("last_timestamp")
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of all observed values"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def update(self, value: float, alpha: float = DEFAULT_EWMA_ALPHA, timestamp: Optional[str] = None):
+        """Fold a value into the running statistics"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.ewma is None:
+            self.ewma = value
+            self.ewm_var = 0.0
+        else:
+            diff = value - self.ewma
+            increment = alpha * diff
+            self.ewma += increment
+            self.ewm_var = (1 - alpha) * (self.ewm_var + diff * increment)
+
+        self.q1.add(value)
+        self.q3.add(value)
+        if timestamp:
+            self.last_timestamp = timestamp
+
+    def score(self, config: Dict[str, Any], value: float) -> Optional[Tuple[float, bool, float]]:
+        """
+        Score a value against the current state without updating it
+
+        Returns:
+            (score, is_anomaly, threshold), or None until min_data_points values have been seen
+        """
+        if self.count < config.get("min_data_points", 7):
+            return None
+
+        method = config.get("detection_method", "zscore")
+        sensitivity = config.get("sensitivity", 1.0)
+
+        if method == "iqr":
+            q1, q3 = self.q1.value(), self.q3.value()
+            iqr = q3 - q1
+            threshold = 1.5 / sensitivity
+            lower_bound = q1 - iqr * threshold
+            upper_bound = q3 + iqr * threshold
+            if value < lower_bound:
+                return (abs((lower_bound - value) / iqr) if iqr > 0 else float('inf')), True, threshold
+            if value > upper_bound:
+                return (abs((value - upper_bound) / iqr) if iqr > 0 else float('inf')), True, threshold
+            return 0.0, False, threshold
+
+        if method == "moving_average":
+            threshold = 2.0 / sensitivity
+            std = math.sqrt(self.ewm_var)
+            if std == 0:
+                return 0.0, False, threshold
+            score = abs((value - self.ewma) / std)
+            return score, score > threshold, threshold
+
+        # zscore, and the fallback for methods without a streaming form
+        threshold = 3.0 / sensitivity
+        std = self.std
+        score = 0.0 if std == 0 else abs((value - self.mean) / std)
+        return score, score > threshold, threshold
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "ewma": self.ewma,
+            "ewm_var": self.ewm_var,
+            "q1": self.q1.to_dict(),
+            "q3": self.q3.to_dict(),
+            "last_timestamp": self.last_timestamp
+        }
+
+
+def _parse_point_time(timestamp: str) -> Optional[datetime]:
+    # Imported here because the scheduler imports this module
+    from core.anomalies.scheduler import _parse_timestamp
+    try:
+        return _parse_timestamp(timestamp)
+    except (ValueError, TypeError):
+        return None
+
+
+def _point_sort_key(point: Tuple[str, float]):
+    """Order points by parsed time, so mixed "Z"/"+00:00"/fractional formats sort correctly"""
+    parsed = _parse_point_time(point[0])
+    return (0, parsed, "") if parsed else (1, None, str(point[0]))
+
+
+def _is_after(timestamp: str, last_timestamp: str) -> bool:
+    """Whether a point is newer than the last one folded into a state"""
+    parsed, last = _parse_point_time(timestamp), _parse_point_time(last_timestamp)
+    if parsed and last:
+        return parsed > last
+    return str(timestamp) > str(last_timestamp)
+
+
+def ewma_alpha(config: Dict[str, Any]) -> float:
+    """EWMA smoothing for a config, matching the span of its moving-average window"""
+    window = (config.get("config_params") or {}).get("window")
+    return 2.0 / (window + 1) if window else DEFAULT_EWMA_ALPHA
+
+
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def invalidate_online_configs(organization_id: str, connection_id: Optional[str] = None):
+    """Drop cached online configs after a configuration changes"""
+    with _config_cache_lock:
+        for key in list(_config_cache.keys()):
+            if key[0] == organization_id and (connection_id is None or key[1] == connection_id):
+                del _config_cache[key]
+
+
+class OnlineAnomalyDetector:
+    """
+    Detects anomalies as metrics are ingested, using persisted per-config state
+
+    State lives in the anomaly_detection_state table (one compact row per config),
+    so each observation costs one state read and one write per batch instead of a
+    history download and full recomputation. States are written with a version
+    check; configs whose state changed underneath a batch are reloaded and the
+    batch is applied again, so concurrent ingestion for a config loses nothing.
+    """
+
+    def __init__(self, supabase_client):
+        """
+        Args:
+            supabase_client: Supabase client (not the SupabaseManager wrapper)
+        """
+        self.supabase = supabase_client
+
+    def observe(self,
+                organization_id: str,
+                connection_id: str,
+                metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Update the state of every online config matching the new metrics
+
+        Args:
+            organization_id: Organization ID
+            connection_id: Connection ID
+            metrics: Newly stored historical_metrics records
+
+        Returns:
+            List of anomaly records that were saved
+        """
+        # Imported here because the scheduler imports this module
+        from core.anomalies.scheduler import AnomalyDetectionScheduler
+
+        configs = self._get_online_configs(organization_id, connection_id)
+        if not configs:
+            return []
+
+        configs_by_key = {}
+        for config in configs:
+            key = (config["metric_name"], config.get("table_name"), config.get("column_name"))
+            configs_by_key.setdefault(key, []).append(config)
+
+        observations = {}
+        for metric in metrics:
+            value = metric.get("metric_value")
+            if value is None:
+                continue
+            key = (metric.get("metric_name"), metric.get("table_name"), metric.get("column_name"))
+            for config in configs_by_key.get(key, []):
+                observations.setdefault(config["id"], (config, []))[1].append(
+                    (metric.get("timestamp") or datetime.now(timezone.utc).isoformat(), float(value))
+                )
+
+        if not observations:
+            return []
+
+        anomaly_records = []
+        anomalies_by_config = {}
+        pending = list(observations.keys())
+
+        for _ in range(MAX_STATE_SAVE_ATTEMPTS):
+            states = self._load_states(pending)
+            folded = {}
+            for config_id in pending:
+                config, points = observations[config_id]
+                state, version = states.get(config_id, (None, None))
+                if state is None:
+                    state = self._bootstrap_state(config, before=min(points, key=_point_sort_key)[0])
+                folded[config_id] = (state, version, self._fold_points(config, points, state))
+
+            conflicts = self._save_states(organization_id, {
+                config_id: (state, version) for config_id, (state, version, _) in folded.items()})
+
+            for config_id, (_, _, results) in folded.items():
+                if config_id in conflicts or not results:
+                    continue
+                anomalies_by_config[config_id] = results
+                anomaly_records.extend(AnomalyDetectionScheduler.build_anomaly_records(
+                    organization_id, observations[config_id][0], results))
+
+            pending = [config_id for config_id in pending if config_id in conflicts]
+            if not pending:
+                break
+        else:
+            logger.warning(f"Online state of configs {pending} kept changing concurrently; "
+                           f"their points will be scored by the next batch or sweep")
+
+        if anomaly_records:
+            try:
+                self.supabase.table("anomaly_results") \
+                    .upsert(anomaly_records, on_conflict="config_id,metric_timestamp", ignore_duplicates=True) \
+                    .execute()
+            except Exception as e:
+                logger.error(f"Error inserting online anomaly results: {str(e)}")
+                return []
+
+            for config_id, results in anomalies_by_config.items():
+                AnomalyDetectionScheduler._publish_anomaly_events(organization_id, observations[config_id][0], results)
+
+        return anomaly_records
+
+    def _fold_points(self, config: Dict[str, Any], points: List[Tuple[str, float]],
+                     state: OnlineMetricState) -> List[Dict[str, Any]]:
+        """
+        Score and fold new points into a state in timestamp order
+
+        Returns:
+            Detection results for the points that were anomalous
+        """
+        alpha = ewma_alpha(config)
+        method = config.get("detection_method", "zscore")
+        results = []
+
+        for timestamp, value in sorted(points, key=_point_sort_key):
+            # Points at or before the last folded-in timestamp were already seen
+            if state.last_timestamp and not _is_after(timestamp, state.last_timestamp):
+                continue
+
+            scored = state.score(config, value)
+            state.update(value, alpha, timestamp)
+            if scored is None or not scored[1]:
+                continue
+
+            score, _, threshold = scored
+            results.append({
+                "timestamp": timestamp,
+                "value": value,
+                "score": float(score),
+                "is_anomaly": True,
+                "threshold": float(threshold),
+                "method": method,
+                "severity": get_anomaly_severity(score, method)
+            })
+
+        return results
+
+    def _get_online_configs(self, organization_id: str, connection_id: str) -> List[Dict[str, Any]]:
+        """Get active online configs for a connection, cached for CONFIG_CACHE_TTL_SECONDS"""
+        key = (organization_id, connection_id)
+        now = time.time()
+        with _config_cache_lock:
+            cached = _config_cache.get(key)
+            if cached and now - cached[0] < CONFIG_CACHE_TTL_SECONDS:
+                return cached[1]
+
+        response = self.supabase.table("anomaly_detection_configs") \
+            .select("*") \
+            .eq("organization_id", organization_id) \
+            .eq("connection_id", connection_id) \
+            .eq("is_active", True) \
+            .execute()
+
+        configs = [config for config in (response.data or []) if is_online_config(config)]
+        with _config_cache_lock:
+            _config_cache[key] = (now, configs)
+        return configs
+
+    def _load_states(self, config_ids: List[str]) -> Dict[str, Tuple[OnlineMetricState, Optional[int]]]:
+        """Load persisted states and their versions for configs with one query"""
+        response = self.supabase.table("anomaly_detection_state") \
+            .select("config_id,state,version") \
+            .in_("config_id", config_ids) \
+            .execute()
+
+        return {row["config_id"]: (OnlineMetricState(row.get("state")), row.get("version") or 0)
+                for row in (response.data or [])}
+
+    def _bootstrap_state(self, config: Dict[str, Any], before: str) -> OnlineMetricState:
+        """Build a new state from the stored history preceding the first new point"""
+        state = OnlineMetricState()
+        try:
+            query = self.supabase.table("historical_metrics") \
+                .select("metric_value,timestamp") \
+                .eq("organization_id", config["organization_id"]) \
+                .eq("connection_id", config["connection_id"]) \
+                .eq("metric_name", config["metric_name"]) \
+                .lt("timestamp", before) \
+                .order("timestamp", desc=True) \
+                .limit(BOOTSTRAP_HISTORY_LIMIT)
+
+            if config.get("table_name"):
+                query = query.eq("table_name", config["table_name"])
+            if config.get("column_name"):
+                query = query.eq("column_name", config["column_name"])
+
+            alpha = ewma_alpha(config)
+            for row in reversed(query.execute().data or []):
+                if row.get("metric_value") is not None:
+                    state.update(float(row["metric_value"]), alpha, row.get("timestamp"))
+
+        except Exception as e:
+            logger.error(f"Error bootstrapping online state for config {config.get('id')}: {str(e)}")
+
+        return state
+
+    def _save_states(self, organization_id: str,
+                     states: Dict[str, Tuple[OnlineMetricState, Optional[int]]]) -> set:
+        """
+        Persist states with one save_anomaly_detection_states call
+
+        Each state is written only if its row still has the version it was loaded
+        with (or still does not exist for new states).
+
+        Returns:
+            Config IDs whose state was changed concurrently and was not written
+        """
+        rows = [{
+            "config_id": config_id,
+            "organization_id": organization_id,
+            "state": state.to_dict(),
+            "last_timestamp": state.last_timestamp,
+            "version": version
+        } for config_id, (state, version) in states.items()]
+
+        try:
+            response = self.supabase.rpc("save_anomaly_detection_states", {"p_states": rows}).execute()
+        except Exception as e:
+            logger.error(f"Error saving online detection state: {str(e)}")
+            return set()
+
+        return {row if isinstance(row, str) else next(iter(row.values())) for row in (response.data or [])}
+
+
+def reset_online_state(supabase_client, config_id: str):
+    """Delete a config's persisted state so it is rebuilt from history on the next observation"""
+    try:
+        supabase_client.table("anomaly_detection_state").delete().eq("config_id", config_id).execute()
+    except Exception as e:
+        logger.error(f"Error resetting online state for config {config_id}: {str(e)}")
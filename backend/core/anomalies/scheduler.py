@@ -1,36 +1,120 @@
 import logging
+import multiprocessing
+import os
+import re
+import threading
 import uuid
 from datetime import datetime, timezone, timedelta
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Set, Tuple
 
-from .detector import AnomalyDetector
+import numpy as np
+
+from .detector import AnomalyDetector, detect_series, detect_seasonal_series, seasonal_baseline_cache
 from .events import AnomalyEventType, publish_anomaly_event
+from .online import is_online_config
 from core.storage.supabase_manager import SupabaseManager
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp from storage, treating naive values as UTC"""
+    text = str(value).replace('Z', '+00:00').replace(' ', 'T', 1)
+    # Normalize fractional seconds to microseconds for fromisoformat
+    match = re.match(r"^(.*T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(.*)$", text)
+    if match:
+        fraction = (match.group(2) or "")[:6].ljust(6, "0")
+        text = f"{match.group(1)}.{fraction}{match.group(3)}"
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def is_newer(timestamp: str, watermark: str) -> bool:
+    """Whether a metric timestamp is after a watermark"""
+    try:
+        return _parse_timestamp(timestamp) > _parse_timestamp(watermark)
+    except (ValueError, TypeError):
+        return str(timestamp) > str(watermark)
+
+
+def latest_timestamp(metrics: List[Dict[str, Any]]) -> Optional[str]:
+    """Latest timestamp among metric records"""
+    timestamps = [m.get("timestamp") for m in metrics if m.get("timestamp")]
+    if not timestamps:
+        return None
+    try:
+        return max(timestamps, key=_parse_timestamp)
+    except (ValueError, TypeError):
+        return max(timestamps)
+
+
+def filter_new_results(results: List[Dict[str, Any]], watermark: Optional[str]) -> List[Dict[str, Any]]:
+    """Keep only results for points after the watermark"""
+    if not watermark:
+        return results
+    return [r for r in results if r.get("timestamp") and is_newer(r["timestamp"], watermark)]
+
+
+_compute_pool = None
+_compute_pool_lock = threading.Lock()
+
+
+def get_compute_pool(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for detection, shared by all schedulers in this process
+
+    Args:
+        max_workers: Worker processes to start the pool with; 0 disables the pool
+
+    Returns:
+        The shared pool, or None when detection should run inline
+    """
+    global _compute_pool
+    if max_workers <= 0:
+        return None
+
+    with _compute_pool_lock:
+        if _compute_pool is None:
+            # Spawned workers do not inherit the server's threads and locks
+            _compute_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _compute_pool
+
+
+def shutdown_compute_pool():
+    """Stop the detection worker processes"""
+    global _compute_pool
+    with _compute_pool_lock:
+        if _compute_pool is not None:
+            _compute_pool.shutdown(wait=True)
+            _compute_pool = None
+
+
 class AnomalyDetectionScheduler:
     """
     Scheduler for running anomaly detection jobs
     """
 
-    def __init__(self, max_workers: int = 5):
+    def __init__(self, max_workers: int = 5, compute_workers: Optional[int] = None):
         """
         Initialize the scheduler
 
         Args:
-            max_workers: Maximum number of worker threads for parallel processing
+            max_workers: Maximum number of worker threads for I/O (history fetches, result writes)
+            compute_workers: Worker processes for detection; defaults to the CPU count,
+                and 0 runs detection in the calling thread
         """
         self.detector = AnomalyDetector()
         self.supabase = SupabaseManager()
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.compute_workers = (os.cpu_count() or 1) if compute_workers is None else compute_workers
 
     def schedule_detection_run(self,
                                organization_id: str,
                                connection_id: Optional[str] = None,
-                               trigger_type: str = 'scheduled') -> Dict[str, Any]:
+                               trigger_type: str = 'scheduled',
+                               batched: bool = False) -> Dict[str, Any]:
         """
         Schedule anomaly detection for all active configs
 
@@ -38,6 +122,8 @@ class AnomalyDetectionScheduler:
             organization_id: Organization ID
             connection_id: Optional connection ID to limit scope
             trigger_type: Type of trigger ('scheduled', 'manual', 'event')
+            batched: Evaluate all configs in one pass with grouped history
+                fetches and a single bulk insert instead of one task per config
 
         Returns:
             Result dictionary with status and statistics
@@ -50,29 +136,28 @@ class AnomalyDetectionScheduler:
             # Get active configs
             configs = self._get_active_configs(organization_id, connection_id)
 
+            # Online configs are evaluated as their metrics arrive
+            if trigger_type == 'scheduled':
+                configs = [config for config in configs if not is_online_config(config)]
+
             if not configs:
                 self._complete_run(run_id, 'completed', 0, 0)
                 return {"status": "success", "message": "No active configurations found"}
 
-            # Process configs in parallel
-            futures = []
-            for config in configs:
-                future = self.executor.submit(
-                    self._process_config,
-                    run_id,
-                    organization_id,
-                    config
-                )
-                futures.append(future)
+            # Last evaluated metric timestamp per config; only newer points are evaluated
+            watermarks = self._load_watermarks([config["id"] for config in configs])
+            new_watermarks = {}
 
-            # Wait for all futures to complete
-            metrics_processed = 0
-            anomalies_detected = 0
+            if batched:
+                metrics_processed, anomalies_detected, configs_skipped = self._process_configs_batched(
+                    organization_id, configs, watermarks, new_watermarks
+                )
+            else:
+                metrics_processed, anomalies_detected, configs_skipped = self._process_configs_staged(
+                    organization_id, configs, watermarks, new_watermarks
+                )
 
-            for future in futures:
-                result = future.result()
-                metrics_processed += result.get('metrics_processed', 0)
-                anomalies_detected += result.get('anomalies_detected', 0)
+            self._save_watermarks(organization_id, new_watermarks)
 
             # Mark run as completed
             self._complete_run(run_id, 'completed', metrics_processed, anomalies_detected)
@@ -81,7 +166,8 @@ class AnomalyDetectionScheduler:
                 "status": "success",
                 "run_id": run_id,
                 "metrics_processed": metrics_processed,
-                "anomalies_detected": anomalies_detected
+                "anomalies_detected": anomalies_detected,
+                "configs_skipped": configs_skipped
             }
 
         except Exception as e:
@@ -208,46 +294,415 @@ class AnomalyDetectionScheduler:
         response = query.execute()
         return response.data if response.data else []
 
-    def _process_config(self,
-                        run_id: str,
-                        organization_id: str,
-                        config: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_configs_staged(self,
+                                organization_id: str,
+                                configs: List[Dict[str, Any]],
+                                watermarks: Dict[str, str],
+                                new_watermarks: Dict[str, str]) -> Tuple[int, int, int]:
         """
-        Process a single anomaly detection configuration
+        Process configs one series at a time through separate I/O and compute stages
+
+        History fetches and result writes run on the I/O thread pool. Detection is
+        dispatched to a process pool as each fetch completes, with the series passed
+        as NumPy buffers, so CPU-bound work is not serialized on the GIL.
 
         Args:
-            run_id: Run ID
             organization_id: Organization ID
-            config: Configuration dictionary
+            configs: Active configuration dictionaries
+            watermarks: Last evaluated metric timestamp per config id
+            new_watermarks: Filled with the updated watermark of each config whose results were stored
 
         Returns:
-            Result dictionary
+            (metrics_processed, anomalies_detected, configs_skipped)
         """
+        metrics_processed = 0
+        anomalies_detected = 0
+        configs_skipped = 0
+
+        # I/O stage: fetch history for every config
+        fetches = {
+            self.executor.submit(self._fetch_config_series, config, watermarks.get(config["id"])): config
+            for config in configs
+        }
+
+        # Compute stage: detect as soon as each series is available
+        computations = {}
+        for future in as_completed(fetches):
+            config = fetches[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching metrics for config {config.get('id')}: {str(e)}")
+                continue
+
+            if fetched.get("skipped"):
+                configs_skipped += 1
+                continue
+            if "values" not in fetched:
+                continue
+
+            computations[self._submit_detection(config, fetched["values"], fetched["timestamps"])] = \
+                (config, fetched["watermark"])
+
+        # I/O stage: store results of each finished detection
+        saves = []
+        for future in as_completed(computations):
+            config, watermark = computations[future]
+            try:
+                results = filter_new_results(future.result(), watermarks.get(config["id"]))
+            except Exception as e:
+                logger.error(f"Error processing config {config.get('id')}: {str(e)}")
+                continue
+
+            metrics_processed += 1
+            saves.append((self.executor.submit(self._store_config_results, organization_id, config, results),
+                          config, watermark))
+
+        # A config whose results were not stored keeps its watermark and is evaluated again
+        for future, config, watermark in saves:
+            stored = future.result()
+            if stored is None:
+                continue
+            anomalies_detected += stored
+            new_watermarks[config["id"]] = watermark
+
+        return metrics_processed, anomalies_detected, configs_skipped
+
+    def _submit_detection(self, config: Dict[str, Any], values: np.ndarray, timestamps: np.ndarray):
+        """Run detection for one series in the process pool, or inline without one"""
+        if config.get("detection_method") != "seasonal":
+            return self._run_detection(detect_series, config, values, timestamps)
+
+        # Baselines are cached in this process: workers get the cached one and
+        # hand back the one they fit, whichever worker the config lands on
+        timestamp_list = timestamps.tolist()
+        cached = seasonal_baseline_cache.lookup(config, timestamp_list, values.tolist())
+        detection = self._run_detection(detect_seasonal_series, config, values, timestamps, cached)
+
+        future = Future()
+
+        def unwrap(done):
+            try:
+                results, baseline = done.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if cached is None:
+                seasonal_baseline_cache.store(config, timestamp_list, baseline)
+            future.set_result(results)
+
+        detection.add_done_callback(unwrap)
+        return future
+
+    def _run_detection(self, function, *args) -> Future:
+        executor = get_compute_pool(self.compute_workers)
+        if executor is not None:
+            return executor.submit(function, *args)
+
+        future = Future()
         try:
-            # Get historical metrics for this config
-            metrics = self._get_historical_metrics(config)
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
-            if not metrics or len(metrics) < config.get("min_data_points", 7):
-                logger.info(
-                    f"Not enough data points for config {config.get('id')}: found {len(metrics) if metrics else 0}")
-                return {"metrics_processed": 0, "anomalies_detected": 0}
+    def _fetch_config_series(self, config: Dict[str, Any], watermark: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch the history of one config as compact NumPy buffers
+
+        Args:
+            config: Configuration dictionary
+            watermark: Timestamp of the last metric evaluated for this config
 
-            # Run anomaly detection
-            results = self.detector.detect_anomalies(config, metrics)
+        Returns:
+            {"skipped": True} without new metrics, {} without enough data, otherwise
+            values (float64), timestamps (strings) and the new watermark
+        """
+        # Nothing to do if no metric arrived since the last evaluation
+        if watermark and not self._has_new_metrics(config, watermark):
+            return {"skipped": True}
+
+        metrics = self._get_historical_metrics(config)
+        values, timestamps = AnomalyDetector.extract_series(metrics)
+
+        if len(values) < config.get("min_data_points", 7):
+            logger.info(f"Not enough data points for config {config.get('id')}: found {len(values)}")
+            return {}
+
+        return {
+            "values": np.asarray(values, dtype=np.float64),
+            "timestamps": np.asarray(timestamps, dtype=str),
+            "watermark": latest_timestamp(metrics)
+        }
 
-            # Save results to database
+    def _store_config_results(self,
+                              organization_id: str,
+                              config: Dict[str, Any],
+                              results: List[Dict[str, Any]]) -> Optional[int]:
+        """Save the anomalies of one config and publish their events; None if they were not saved"""
+        try:
             anomalies_detected = self._save_detection_results(organization_id, config, results)
 
             # Publish events for detected anomalies
             if anomalies_detected > 0:
                 self._publish_anomaly_events(organization_id, config, results)
 
-            return {"metrics_processed": 1, "anomalies_detected": anomalies_detected}
+            return anomalies_detected
+
+        except Exception as e:
+            logger.error(f"Error saving results for config {config.get('id')}: {str(e)}")
+            return None
+
+    def _process_config(self,
+                        run_id: str,
+                        organization_id: str,
+                        config: Dict[str, Any],
+                        watermark: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a single anomaly detection configuration in the calling thread
+
+        Args:
+            run_id: Run ID
+            organization_id: Organization ID
+            config: Configuration dictionary
+            watermark: Timestamp of the last metric evaluated for this config
+
+        Returns:
+            Result dictionary (with the new watermark when results were stored)
+        """
+        try:
+            fetched = self._fetch_config_series(config, watermark)
+            if fetched.get("skipped"):
+                return {"metrics_processed": 0, "anomalies_detected": 0, "skipped": True}
+            if "values" not in fetched:
+                return {"metrics_processed": 0, "anomalies_detected": 0}
+
+            # Run anomaly detection, keeping only points newer than the watermark
+            results = filter_new_results(
+                detect_series(config, fetched["values"], fetched["timestamps"]), watermark
+            )
+
+            stored = self._store_config_results(organization_id, config, results)
+            if stored is None:
+                return {"metrics_processed": 1, "anomalies_detected": 0, "error": "Failed to save results"}
+
+            return {
+                "metrics_processed": 1,
+                "anomalies_detected": stored,
+                "watermark": fetched["watermark"]
+            }
 
         except Exception as e:
             logger.error(f"Error processing config {config.get('id')}: {str(e)}")
             return {"metrics_processed": 0, "anomalies_detected": 0, "error": str(e)}
 
+    def _process_configs_batched(self,
+                                 organization_id: str,
+                                 configs: List[Dict[str, Any]],
+                                 watermarks: Optional[Dict[str, str]] = None,
+                                 new_watermarks: Optional[Dict[str, str]] = None) -> Tuple[int, int, int]:
+        """
+        Process all configurations of a run in one pass
+
+        History is fetched with one grouped query per connection, detection runs on
+        all series together, and every anomaly is written with one bulk insert.
+        Configs without metrics newer than their watermark are skipped, and a
+        config's watermark only advances once its anomalies are stored.
+
+        Args:
+            organization_id: Organization ID
+            configs: Active configuration dictionaries
+            watermarks: Last evaluated metric timestamp per config id
+            new_watermarks: Filled with the updated watermark of each config whose results were stored
+
+        Returns:
+            (metrics_processed, anomalies_detected (rows actually inserted), configs_skipped)
+        """
+        watermarks = watermarks or {}
+        if new_watermarks is None:
+            new_watermarks = {}
+
+        metrics_by_config = self._get_historical_metrics_bulk(configs)
+
+        pending = []
+        for config in configs:
+            latest = latest_timestamp(metrics_by_config.get(config["id"], []))
+            watermark = watermarks.get(config["id"])
+            if latest is None or (watermark and not is_newer(latest, watermark)):
+                continue
+            pending.append(config)
+        configs_skipped = len(configs) - len(pending)
+
+        results_by_config = self.detector.detect_anomalies_bulk(pending, metrics_by_config)
+
+        records = []
+        anomalies_by_config = {}
+        evaluated = {}
+        metrics_processed = 0
+
+        for config in pending:
+            metrics = metrics_by_config.get(config["id"], [])
+            if len(metrics) < config.get("min_data_points", 7):
+                continue
+
+            metrics_processed += 1
+            evaluated[config["id"]] = latest_timestamp(metrics)
+            results = filter_new_results(results_by_config.get(config["id"], []), watermarks.get(config["id"]))
+            config_records = self.build_anomaly_records(organization_id, config, results)
+            if config_records:
+                records.extend(config_records)
+                anomalies_by_config[config["id"]] = results
+
+        failed_config_ids = set()
+        anomalies_detected = self._insert_anomaly_records(records, failed_config_ids=failed_config_ids)
+
+        # Configs whose records failed to insert keep their watermark and are evaluated again
+        for config_id, watermark in evaluated.items():
+            if config_id not in failed_config_ids:
+                new_watermarks[config_id] = watermark
+
+        # Publish events for detected anomalies
+        configs_by_id = {config["id"]: config for config in configs}
+        for config_id, results in anomalies_by_config.items():
+            if config_id not in failed_config_ids:
+                self._publish_anomaly_events(organization_id, configs_by_id[config_id], results)
+
+        logger.info(f"Batched detection processed {metrics_processed} of {len(configs)} configs "
+                    f"({configs_skipped} without new data), {anomalies_detected} anomalies detected")
+        return metrics_processed, anomalies_detected, configs_skipped
+
+    def _has_new_metrics(self, config: Dict[str, Any], watermark: str) -> bool:
+        """Check with a single-row query whether a config's metric has points after the watermark"""
+        try:
+            query = self.supabase.supabase.table("historical_metrics") \
+                .select("timestamp") \
+                .eq("organization_id", config["organization_id"]) \
+                .eq("connection_id", config["connection_id"]) \
+                .eq("metric_name", config["metric_name"]) \
+                .gt("timestamp", watermark)
+
+            if config.get("table_name"):
+                query = query.eq("table_name", config["table_name"])
+            if config.get("column_name"):
+                query = query.eq("column_name", config["column_name"])
+
+            return bool(query.limit(1).execute().data)
+
+        except Exception as e:
+            # Evaluate rather than silently skip when the check itself fails
+            logger.error(f"Error checking for new metrics for config {config.get('id')}: {str(e)}")
+            return True
+
+    def _load_watermarks(self, config_ids: List[str], chunk_size: int = 200) -> Dict[str, str]:
+        """
+        Load the last evaluated metric timestamp of each config
+
+        Args:
+            config_ids: Config IDs
+            chunk_size: Config IDs per query
+
+        Returns:
+            Watermark timestamps keyed by config id (configs never evaluated are absent)
+        """
+        watermarks = {}
+        try:
+            for i in range(0, len(config_ids), chunk_size):
+                response = self.supabase.supabase.table("anomaly_detection_watermarks") \
+                    .select("config_id,last_metric_at") \
+                    .in_("config_id", config_ids[i:i + chunk_size]) \
+                    .execute()
+
+                for row in response.data or []:
+                    if row.get("last_metric_at"):
+                        watermarks[row["config_id"]] = row["last_metric_at"]
+
+        except Exception as e:
+            # Without watermarks every config is evaluated, as before they existed
+            logger.error(f"Error loading detection watermarks: {str(e)}")
+
+        return watermarks
+
+    def _save_watermarks(self, organization_id: str, watermarks: Dict[str, str]):
+        """
+        Store updated watermarks with one upsert
+
+        Args:
+            organization_id: Organization ID
+            watermarks: Latest evaluated metric timestamp keyed by config id
+        """
+        if not watermarks:
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{
+            "config_id": config_id,
+            "organization_id": organization_id,
+            "last_metric_at": last_metric_at,
+            "updated_at": now
+        } for config_id, last_metric_at in watermarks.items()]
+
+        try:
+            self.supabase.supabase.table("anomaly_detection_watermarks") \
+                .upsert(rows, on_conflict="config_id") \
+                .execute()
+        except Exception as e:
+            logger.error(f"Error saving detection watermarks: {str(e)}")
+
+    def _get_historical_metrics_bulk(self, configs: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get historical metrics for many configs with one grouped query per connection
+
+        Args:
+            configs: Configuration dictionaries
+
+        Returns:
+            Metric lists keyed by config id (at most 1000 of the most recent points each)
+        """
+        metrics_by_config = {config["id"]: [] for config in configs}
+
+        try:
+            from core.analytics.historical_metrics import HistoricalMetricsTracker
+        except ImportError:
+            logger.error("Historical metrics tracker not available")
+            return metrics_by_config
+
+        tracker = HistoricalMetricsTracker(self.supabase)
+
+        configs_by_connection = {}
+        for config in configs:
+            configs_by_connection.setdefault((config["organization_id"], config["connection_id"]), []).append(config)
+
+        for (organization_id, connection_id), connection_configs in configs_by_connection.items():
+            try:
+                # At least 30 days, as for single-config detection
+                days = max(max(c.get("baseline_window_days", 14) for c in connection_configs), 30)
+                rows = tracker.get_metric_histories(
+                    organization_id=organization_id,
+                    connection_id=connection_id,
+                    metric_names=[c["metric_name"] for c in connection_configs],
+                    days=days
+                )
+
+                configs_by_key = {}
+                for config in connection_configs:
+                    key = (config["metric_name"], config["table_name"], config.get("column_name"))
+                    configs_by_key.setdefault(key, []).append(config)
+
+                for row in rows:
+                    key = (row.get("metric_name"), row.get("table_name"), row.get("column_name"))
+                    for config in configs_by_key.get(key, []):
+                        metrics_by_config[config["id"]].append(row)
+
+            except Exception as e:
+                logger.error(f"Error getting historical metrics for connection {connection_id}: {str(e)}")
+
+        # Keep the same per-config history cap as single-config detection
+        for config_id, metrics in metrics_by_config.items():
+            if len(metrics) > 1000:
+                metrics_by_config[config_id] = metrics[-1000:]
+
+        return metrics_by_config
+
     def _get_historical_metrics(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Get historical metrics data for a config
@@ -300,13 +755,39 @@ class AnomalyDetectionScheduler:
 
         Returns:
             Number of anomalies saved
+
+        Raises:
+            Exception: If any of the anomalies could not be inserted
+        """
+        records = self.build_anomaly_records(organization_id, config, results)
+        if not records:
+            return 0
+
+        failed_config_ids = set()
+        inserted = self._insert_anomaly_records(records, batch_size=50, failed_config_ids=failed_config_ids)
+        if failed_config_ids:
+            raise Exception(f"Failed to insert anomaly results for config {config.get('id')}")
+
+        return inserted
+
+    @staticmethod
+    def build_anomaly_records(organization_id: str,
+                              config: Dict[str, Any],
+                              results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert the anomalies in a set of detection results to database records
+
+        Args:
+            organization_id: Organization ID
+            config: Configuration dictionary
+            results: List of anomaly results
+
+        Returns:
+            List of anomaly_results records
         """
         # Only save anomalies, not all results
         anomalies = [r for r in results if r.get("is_anomaly", False)]
 
-        if not anomalies:
-            return 0
-
         # Convert to database records
         records = []
         for anomaly in anomalies:
@@ -325,23 +806,49 @@ class AnomalyDetectionScheduler:
                 "severity": severity,
                 "score": anomaly.get("score", 0),
                 "threshold": anomaly.get("threshold", 0),
+                "metric_timestamp": anomaly.get("timestamp") or None,
                 "detected_at": datetime.now(timezone.utc).isoformat(),
                 "status": "open"
             })
 
-        # Insert records in batches of 50
-        for i in range(0, len(records), 50):
-            batch = records[i:i + 50]
+        return records
+
+    def _insert_anomaly_records(self,
+                                records: List[Dict[str, Any]],
+                                batch_size: int = 1000,
+                                failed_config_ids: Optional[Set[str]] = None) -> int:
+        """
+        Insert anomaly records in batches
+
+        An anomaly already recorded for the same config and metric point is left
+        untouched rather than inserted again.
+
+        Args:
+            records: anomaly_results records
+            batch_size: Maximum records per insert request
+            failed_config_ids: Filled with the config id of every record in a failed batch
+
+        Returns:
+            Number of records actually inserted
+        """
+        inserted = []
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i + batch_size]
             try:
-                self.supabase.supabase.table("anomaly_results").insert(batch).execute()
+                response = self.supabase.supabase.table("anomaly_results") \
+                    .upsert(batch, on_conflict="config_id,metric_timestamp", ignore_duplicates=True) \
+                    .execute()
+                inserted.extend(response.data or [])
             except Exception as e:
                 logger.error(f"Error inserting anomaly results: {str(e)}")
                 # Continue with next batch even if this one fails
+                if failed_config_ids is not None:
+                    failed_config_ids.update(record["config_id"] for record in batch)
 
-        return len(anomalies)
+        return len(inserted)
 
-    def _publish_anomaly_events(self,
-                                organization_id: str,
+    @staticmethod
+    def _publish_anomaly_events(organization_id: str,
                                 config: Dict[str, Any],
                                 results: List[Dict[str, Any]]) -> None:
         """
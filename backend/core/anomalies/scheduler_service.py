@@ -5,7 +5,7 @@ import traceback
 import schedule
 from datetime import datetime, timedelta, timezone
 
-from .scheduler import AnomalyDetectionScheduler
+from .scheduler import AnomalyDetectionScheduler, shutdown_compute_pool
 from core.storage.supabase_manager import SupabaseManager
 
 logger = logging.getLogger(__name__)
@@ -51,6 +51,7 @@ class AnomalyDetectionSchedulerService:
         self.running = False
         if self.thread:
             self.thread.join(timeout=1)
+        shutdown_compute_pool()
         logger.info("Anomaly detection scheduler service stopped")
 
     def _run_scheduler(self):
@@ -72,23 +73,15 @@ class AnomalyDetectionSchedulerService:
             # Get all active organizations
             orgs = self._get_active_organizations()
 
-            # Run detection for each organization
+            # Run detection for each organization in one batched pass
             for org in orgs:
                 try:
-                    # Get all connections for this organization
-                    connections = self._get_connections(org["id"])
-
-                    # Run detection for each connection
-                    for conn in connections:
-                        try:
-                            logger.info(f"Running daily detection for org {org['id']}, connection {conn['id']}")
-                            self.scheduler.schedule_detection_run(
-                                organization_id=org["id"],
-                                connection_id=conn["id"],
-                                trigger_type="scheduled"
-                            )
-                        except Exception as conn_e:
-                            logger.error(f"Error running detection for connection {conn['id']}: {str(conn_e)}")
+                    logger.info(f"Running daily detection for org {org['id']}")
+                    self.scheduler.schedule_detection_run(
+                        organization_id=org["id"],
+                        trigger_type="scheduled",
+                        batched=True
+                    )
                 except Exception as org_e:
                     logger.error(f"Error processing organization {org['id']}: {str(org_e)}")
 
@@ -132,7 +125,8 @@ class AnomalyDetectionSchedulerService:
                         self.scheduler.schedule_detection_run(
                             organization_id=org_id,
                             connection_id=conn_id,
-                            trigger_type="scheduled"
+                            trigger_type="scheduled",
+                            batched=True
                         )
                     except Exception as conn_e:
                         logger.error(f"Error running detection for connection {conn_id}: {str(conn_e)}")
@@ -4,6 +4,8 @@ from typing import Dict, Any, Optional, List  # Added List import
 from datetime import datetime, timezone
 import traceback
 
+from .status_writer import automation_status_writer
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,8 +49,9 @@ def publish_automation_event(event_type: AutomationEventType,
         Success status
     """
     try:
-        # If organization_id is not provided but connection_id is, try to get it
-        if not organization_id and connection_id:
+        # If organization_id is not provided but connection_id is, try to get it.
+        # Buffered events have it filled in when their batch is written.
+        if not organization_id and connection_id and not automation_status_writer.running:
             try:
                 from core.storage.supabase_manager import SupabaseManager
                 supabase = SupabaseManager()
@@ -125,51 +128,24 @@ def publish_automation_event(event_type: AutomationEventType,
 
 
 def _store_automation_event(payload: Dict[str, Any]) -> bool:
-    """Store automation event in the database"""
+    """
+    Store automation event in the database
+
+    While the automation status writer is running the event is queued and
+    written with the next batch; otherwise it is inserted immediately.
+    """
     try:
-        from core.storage.supabase_manager import SupabaseManager
+        filtered_record = _build_event_record(payload)
+        event_type = filtered_record["event_type"]
 
-        supabase = SupabaseManager()
+        if automation_status_writer.running:
+            automation_status_writer.add_event(filtered_record)
+            logger.debug(f"Queued automation event for storage: {event_type}")
+            return True
 
-        # Extract automation_type from the event_type or data
-        automation_type = None
-        event_type = payload["type"]
-
-        # Map event types to automation types
-        if "metadata" in event_type.lower():
-            automation_type = "metadata_refresh"
-        elif "schema" in event_type.lower():
-            automation_type = "schema_detection"
-        elif "validation" in event_type.lower():
-            automation_type = "validation_run"
-        elif "job" in event_type.lower():
-            # Try to get from the event data
-            job_data = payload.get("data", {})
-            automation_type = job_data.get("automation_type", "general")
-        else:
-            automation_type = "general"
-
-        # Prepare event record for database matching your schema
-        event_record = {
-            "event_type": event_type,
-            "automation_type": automation_type,  # This was missing!
-            "connection_id": payload.get("connection_id"),
-            "organization_id": payload.get("organization_id"),
-            "user_id": payload.get("user_id"),
-            "created_by": payload.get("user_id"),  # Use user_id as created_by
-            "event_data": payload.get("data", {}),
-            "created_at": payload["timestamp"]
-        }
+        from core.storage.supabase_manager import SupabaseManager
 
-        # Remove None values except for nullable fields
-        filtered_record = {}
-        for k, v in event_record.items():
-            # Keep nullable fields even if None
-            if k in ["organization_id", "user_id", "created_by", "event_data", "created_at"]:
-                filtered_record[k] = v
-            # Only keep non-nullable fields if they have values
-            elif v is not None:
-                filtered_record[k] = v
+        supabase = SupabaseManager()
 
         # Insert into automation_events table
         response = supabase.supabase.table("automation_events").insert(filtered_record).execute()
@@ -187,6 +163,51 @@ def _store_automation_event(payload: Dict[str, Any]) -> bool:
         return False
 
 
+def _build_event_record(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the automation_events record for an event payload"""
+    # Extract automation_type from the event_type or data
+    automation_type = None
+    event_type = payload["type"]
+
+    # Map event types to automation types
+    if "metadata" in event_type.lower():
+        automation_type = "metadata_refresh"
+    elif "schema" in event_type.lower():
+        automation_type = "schema_detection"
+    elif "validation" in event_type.lower():
+        automation_type = "validation_run"
+    elif "job" in event_type.lower():
+        # Try to get from the event data
+        job_data = payload.get("data", {})
+        automation_type = job_data.get("automation_type", "general")
+    else:
+        automation_type = "general"
+
+    # Prepare event record for database matching your schema
+    event_record = {
+        "event_type": event_type,
+        "automation_type": automation_type,  # This was missing!
+        "connection_id": payload.get("connection_id"),
+        "organization_id": payload.get("organization_id"),
+        "user_id": payload.get("user_id"),
+        "created_by": payload.get("user_id"),  # Use user_id as created_by
+        "event_data": payload.get("data", {}),
+        "created_at": payload["timestamp"]
+    }
+
+    # Remove None values except for nullable fields
+    filtered_record = {}
+    for k, v in event_record.items():
+        # Keep nullable fields even if None
+        if k in ["organization_id", "user_id", "created_by", "event_data", "created_at"]:
+            filtered_record[k] = v
+        # Only keep non-nullable fields if they have values
+        elif v is not None:
+            filtered_record[k] = v
+
+    return filtered_record
+
+
 class AutomationEventHandler:
     """Handler for automation events that may trigger additional actions"""
 
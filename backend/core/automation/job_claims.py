@@ -0,0 +1,163 @@
+# backend/core/automation/job_claims.py
+"""
+Atomic claiming of due scheduled jobs across scheduler instances.
+
+Every scheduler instance claims due jobs with one call that also leases them
+until a deadline, so two instances can never pick up the same job and a
+crashed instance's jobs become claimable again when the lease expires.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLAIM_LIMIT = 50
+DEFAULT_LEASE_SECONDS = 300
+
+
+def default_worker_id() -> str:
+    """Identify this scheduler instance in claimed_by"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SupabaseJobClaimer:
+    """Claims due jobs through the claim_due_scheduled_jobs database function"""
+
+    def __init__(self, supabase_manager):
+        self.supabase = supabase_manager
+
+    def claim(self, worker_id: str, limit: int = DEFAULT_CLAIM_LIMIT,
+              lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Claim up to limit due jobs for this worker in one round trip
+
+        Rows locked by a concurrent claim are skipped (FOR UPDATE SKIP LOCKED), so
+        concurrent instances always receive disjoint batches.
+
+        Args:
+            worker_id: Identifier of the claiming instance
+            limit: Maximum number of jobs to claim
+            lease_seconds: How long the claim holds before others may take the job
+
+        Returns:
+            Claimed scheduled job rows
+        """
+        response = self.supabase.supabase.rpc('claim_due_scheduled_jobs', {
+            'p_worker_id': worker_id,
+            'p_limit': limit,
+            'p_lease_seconds': lease_seconds
+        }).execute()
+        return response.data or []
+
+
+class SQLiteJobClaimer:
+    """
+    SQLite stand-in for claim_due_scheduled_jobs, for tests and local runs
+
+    Uses the same rules as the database function: enabled, due, not leased and
+    no running automation job of the same type for the connection. A write
+    transaction (BEGIN IMMEDIATE) serializes concurrent claims.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS automation_scheduled_jobs (
+                id TEXT PRIMARY KEY,
+                connection_id TEXT NOT NULL,
+                automation_type TEXT NOT NULL,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                next_run_at TEXT,
+                claimed_by TEXT,
+                lease_until TEXT
+            );
+            CREATE TABLE IF NOT EXISTS automation_jobs (
+                id TEXT PRIMARY KEY,
+                connection_id TEXT NOT NULL,
+                job_type TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+        """)
+
+    def add_job(self, job: Dict[str, Any]):
+        """Insert or replace a scheduled job row"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO automation_scheduled_jobs "
+                "(id, connection_id, automation_type, enabled, next_run_at, claimed_by, lease_until) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["connection_id"], job["automation_type"], int(job.get("enabled", True)),
+                 _utc(job.get("next_run_at")), job.get("claimed_by"), _utc(job.get("lease_until")))
+            )
+
+    def add_running_job(self, job_id: str, connection_id: str, job_type: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO automation_jobs (id, connection_id, job_type, status) VALUES (?, ?, ?, 'running')",
+                (job_id, connection_id, job_type)
+            )
+
+    def claim(self, worker_id: str, limit: int = DEFAULT_CLAIM_LIMIT,
+              lease_seconds: int = DEFAULT_LEASE_SECONDS,
+              now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        now = now or datetime.now(timezone.utc)
+        now_iso = _utc(now)
+        lease_until = _utc(now + timedelta(seconds=lease_seconds))
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute("""
+                    SELECT s.* FROM automation_scheduled_jobs s
+                    WHERE s.enabled = 1
+                      AND s.next_run_at <= ?
+                      AND (s.lease_until IS NULL OR s.lease_until < ?)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM automation_jobs j
+                          WHERE j.connection_id = s.connection_id
+                            AND j.job_type = s.automation_type
+                            AND j.status = 'running'
+                      )
+                    ORDER BY s.next_run_at
+                    LIMIT ?
+                """, (now_iso, now_iso, limit)).fetchall()
+
+                self._connection.executemany(
+                    "UPDATE automation_scheduled_jobs SET claimed_by = ?, lease_until = ? WHERE id = ?",
+                    [(worker_id, lease_until, row["id"]) for row in rows]
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        return [{**dict(row), "claimed_by": worker_id, "lease_until": lease_until} for row in rows]
+
+    def release(self, job_id: str, next_run_at: Optional[Any]):
+        """Record the next run of an executed job and drop its lease, like mark_job_executed"""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE automation_scheduled_jobs SET next_run_at = ?, claimed_by = NULL, lease_until = NULL "
+                "WHERE id = ?",
+                (_utc(next_run_at), job_id)
+            )
+
+
+def _utc(value: Any) -> Optional[str]:
+    """Normalize a timestamp to a sortable UTC ISO string"""
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # Fixed-width so that string comparison matches time order
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
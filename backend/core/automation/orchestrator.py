@@ -14,7 +14,7 @@ import os
 
 from core.storage.supabase_manager import SupabaseManager
 from .events import AutomationEventType, publish_automation_event
-from .schedule_manager import ScheduleManager
+from .schedule_manager import ScheduleManager, RECONCILE_INTERVAL_SECONDS, due_job_heap
 from .task_executor import TaskExecutor
 from .task_status_tracker import TaskStatusTracker
 
@@ -82,6 +82,7 @@ class AutomationOrchestrator:
     def stop(self):
         """Stop the automation orchestrator"""
         self.running = False
+        due_job_heap.wake()
 
         # Shutdown executor
         self.executor.shutdown(wait=True)
@@ -93,20 +94,31 @@ class AutomationOrchestrator:
         logger.info("Automation orchestrator stopped")
 
     def _scheduler_loop(self):
-        """Main scheduler loop - clean and simple"""
+        """Main scheduler loop - sleeps until the next scheduled job is due"""
         logger.info("Automation scheduler loop started")
 
+        self.schedule_manager.reconcile_due_jobs()
+        last_reconcile = last_cleanup = time.time()
+
         while self.running:
             try:
-                # Check for due jobs every minute
+                # Woken early when a schedule change adds an earlier job
+                self.schedule_manager.wait_for_due_jobs(
+                    max(0.0, last_reconcile + RECONCILE_INTERVAL_SECONDS - time.time()))
+                if not self.running:
+                    break
+
+                # Pick up schedule edits made outside this process
+                if time.time() - last_reconcile >= RECONCILE_INTERVAL_SECONDS:
+                    self.schedule_manager.reconcile_due_jobs()
+                    last_reconcile = time.time()
+
                 self._process_due_jobs()
 
                 # Clean up old jobs every 10 minutes
-                if int(time.time()) % 600 == 0:
+                if time.time() - last_cleanup >= 600:
                     self._cleanup_old_jobs()
-
-                # Sleep for 1 minute
-                time.sleep(60)
+                    last_cleanup = time.time()
 
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {str(e)}")
@@ -115,19 +127,17 @@ class AutomationOrchestrator:
     def _process_due_jobs(self):
         """Process jobs that are due to run"""
         try:
-            # Get due jobs from schedule manager
-            due_jobs = self.schedule_manager.get_due_jobs(buffer_minutes=2)
+            # Get due jobs from the schedule manager's due heap
+            due_jobs = self.schedule_manager.take_due_jobs()
 
             if not due_jobs:
                 return
 
             logger.info(f"🔍 Processing {len(due_jobs)} due jobs")
 
-            # Filter out duplicates and recent jobs
-            executable_jobs = self._filter_executable_jobs(due_jobs)
-
-            if len(executable_jobs) < len(due_jobs):
-                logger.info(f"🚫 Filtered out {len(due_jobs) - len(executable_jobs)} duplicate/recent jobs")
+            # Claimed jobs are leased to this instance and have no running job of the
+            # same type, so they need no further duplicate checks
+            executable_jobs = due_jobs
 
             # Execute each job
             for i, scheduled_job in enumerate(executable_jobs):
@@ -141,36 +151,6 @@ class AutomationOrchestrator:
         except Exception as e:
             logger.error(f"Error processing due jobs: {str(e)}")
 
-    def _filter_executable_jobs(self, due_jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Filter out jobs that shouldn't run (duplicates, recent jobs, etc.)"""
-        executable_jobs = []
-        seen_job_types = set()
-
-        for job in due_jobs:
-            connection_id = job["connection_id"]
-            automation_type = job["automation_type"]
-            job_key = (connection_id, automation_type)
-
-            # Skip if we've already seen this job type for this connection
-            if job_key in seen_job_types:
-                logger.debug(f"Skipping duplicate {automation_type} for connection {connection_id}")
-                continue
-
-            # Skip if there's already a running job
-            if self.status_tracker.is_job_running(connection_id, automation_type):
-                logger.debug(f"Skipping {automation_type} - already running for connection {connection_id}")
-                continue
-
-            # Skip if there's a recent job (last 5 minutes)
-            if self.status_tracker.has_recent_job(connection_id, automation_type, minutes=5):
-                logger.debug(f"Skipping {automation_type} - recent job exists for connection {connection_id}")
-                continue
-
-            executable_jobs.append(job)
-            seen_job_types.add(job_key)
-
-        return executable_jobs
-
     def _execute_scheduled_job(self, scheduled_job: Dict[str, Any], job_num: int, total_jobs: int):
         """Execute a single scheduled job"""
         connection_id = scheduled_job["connection_id"]
@@ -0,0 +1,371 @@
+# backend/core/automation/pipeline.py
+"""
+Dependency-ordered automation pipeline for a single connection run.
+
+Metadata refresh, schema change detection and validation used to run as three
+independent jobs, each reading the warehouse schema and the stored metadata on
+its own. The connection pipeline runs them as steps of one DAG instead:
+
+    refresh_metadata -> detect_schema_changes -> run_validations
+
+The refresh step reads the warehouse once and shares the schema snapshot,
+table list and statistics with later steps through the run context. A step
+whose upstream steps all report "no change" is skipped, so an unchanged
+connection costs one schema pass and no detection work. Validations always
+run: an unchanged schema and unchanged row counts say nothing about in-place
+updates, or about tables beyond the ones whose statistics were collected.
+"""
+
+import logging
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+from core.utils.resource_governor import resource_governor
+
+logger = logging.getLogger(__name__)
+
+
+class StepResult:
+    """Outcome of a pipeline step"""
+
+    def __init__(self, changed: bool = True, summary: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            changed: Whether the step produced anything downstream steps should react to
+            summary: JSON-serializable details for the job result
+        """
+        self.changed = changed
+        self.summary = summary or {}
+
+
+class PipelineContext:
+    """State shared by the steps of one pipeline run"""
+
+    def __init__(self, connection_id: str, organization_id: Optional[str] = None,
+                 connection: Optional[Dict[str, Any]] = None):
+        self.connection_id = connection_id
+        self.organization_id = organization_id
+        self.connection = connection
+        # In-memory artifacts handed from one step to the next
+        self.artifacts: Dict[str, Any] = {}
+
+
+class PipelineStep:
+    """A named unit of work with the steps it depends on"""
+
+    def __init__(self, name: str, run: Callable[[PipelineContext], StepResult],
+                 depends_on: Iterable[str] = (),
+                 should_run: Optional[Callable[[PipelineContext], bool]] = None):
+        """
+        Args:
+            name: Unique step name
+            run: Called with the run context, returns a StepResult
+            depends_on: Names of steps that must finish first
+            should_run: Optional predicate replacing the default rule, which
+                runs the step only if at least one dependency reported a change
+        """
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.should_run = should_run
+
+
+class AutomationPipeline:
+    """Runs steps in dependency order, skipping those with nothing new to process"""
+
+    def __init__(self, steps: List[PipelineStep]):
+        self.steps = self._order_steps(steps)
+
+    @staticmethod
+    def _order_steps(steps: List[PipelineStep]) -> List[PipelineStep]:
+        """Topologically sort steps, keeping the given order between independent steps"""
+        by_name = {step.name: step for step in steps}
+        if len(by_name) != len(steps):
+            raise ValueError("Pipeline step names must be unique")
+
+        for step in steps:
+            for dependency in step.depends_on:
+                if dependency not in by_name:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dependency}")
+
+        ordered = []
+        placed = set()
+        while len(ordered) < len(steps):
+            ready = [step for step in steps
+                     if step.name not in placed and all(d in placed for d in step.depends_on)]
+            if not ready:
+                raise ValueError("Pipeline steps contain a dependency cycle")
+            for step in ready:
+                ordered.append(step)
+                placed.add(step.name)
+        return ordered
+
+    def run(self, context: PipelineContext) -> Dict[str, Any]:
+        """
+        Run every step once
+
+        Args:
+            context: Run context passed to each step
+
+        Returns:
+            Dictionary with per-step status ("completed", "skipped" or "failed")
+            and counts of steps by status
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+
+        for step in self.steps:
+            upstream = [results[name] for name in step.depends_on]
+
+            if any(result["status"] == "failed" for result in upstream):
+                results[step.name] = {"status": "skipped", "reason": "upstream_failed", "changed": False}
+                continue
+
+            if step.should_run is not None:
+                run_step = step.should_run(context)
+            else:
+                run_step = not upstream or any(result["changed"] for result in upstream)
+
+            if not run_step:
+                logger.info(f"Skipping pipeline step {step.name} for connection {context.connection_id}: "
+                            f"no upstream changes")
+                results[step.name] = {"status": "skipped", "reason": "no_upstream_changes", "changed": False}
+                continue
+
+            start = time.monotonic()
+            try:
+                outcome = step.run(context)
+                results[step.name] = {
+                    "status": "completed",
+                    "changed": outcome.changed,
+                    "summary": outcome.summary,
+                    "duration_seconds": round(time.monotonic() - start, 3)
+                }
+            except Exception as e:
+                logger.error(f"Pipeline step {step.name} failed for connection {context.connection_id}: {str(e)}")
+                logger.error(traceback.format_exc())
+                results[step.name] = {
+                    "status": "failed",
+                    "changed": False,
+                    "error": str(e),
+                    "duration_seconds": round(time.monotonic() - start, 3)
+                }
+
+        statuses = [result["status"] for result in results.values()]
+        return {
+            "steps": results,
+            "completed": statuses.count("completed"),
+            "skipped": statuses.count("skipped"),
+            "failed": statuses.count("failed")
+        }
+
+
+class ConnectionPipelineSteps:
+    """The refresh, schema detection and validation steps for one connection"""
+
+    def __init__(self, storage_service, connector_factory, supabase_manager, validation_integrator=None,
+                 table_limit: int = 50, stats_table_limit: int = 10):
+        """
+        Args:
+            storage_service: MetadataStorageService for previous and refreshed metadata
+            connector_factory: ConnectorFactory for warehouse connectors
+            supabase_manager: SupabaseManager for storing schema changes
+            validation_integrator: Optional ValidationAutomationIntegrator (created on first use)
+            table_limit: Tables whose columns are collected
+            stats_table_limit: Tables whose statistics are collected
+        """
+        from core.metadata.schema_change_detector import SchemaChangeDetector
+
+        self.storage_service = storage_service
+        self.connector_factory = connector_factory
+        self.supabase = supabase_manager
+        self.validation_integrator = validation_integrator
+        self.table_limit = table_limit
+        self.stats_table_limit = stats_table_limit
+        self.schema_detector = SchemaChangeDetector(storage_service)
+
+    def build(self) -> AutomationPipeline:
+        """Create the pipeline DAG"""
+        return AutomationPipeline([
+            PipelineStep("refresh_metadata", self.refresh_metadata),
+            PipelineStep("detect_schema_changes", self.detect_schema_changes,
+                         depends_on=["refresh_metadata"],
+                         should_run=lambda context: context.artifacts.get("schema_changed", False)),
+            PipelineStep("run_validations", self.run_validations,
+                         depends_on=["refresh_metadata", "detect_schema_changes"],
+                         should_run=lambda context: True)
+        ])
+
+    def _previous_row_counts(self, connection_id: str) -> Dict[str, Any]:
+        previous = self.storage_service.get_metadata(connection_id, "statistics")
+        if not previous or "metadata" not in previous:
+            return {}
+        stats_by_table = previous["metadata"].get("statistics_by_table", {})
+        return {table: stats.get("row_count") for table, stats in stats_by_table.items() if isinstance(stats, dict)}
+
+    def refresh_metadata(self, context: PipelineContext) -> StepResult:
+        """
+        Collect tables, columns and statistics in one warehouse pass and store them
+
+        The previously stored schema is read first, because storing the refresh
+        replaces it and schema detection compares against it.
+        """
+        from core.metadata.collector import MetadataCollector
+
+        connection_id = context.connection_id
+        previous_schema = self.schema_detector.get_previous_schema(connection_id)
+        previous_row_counts = self._previous_row_counts(connection_id)
+
+        connector = self.connector_factory.create_connector(context.connection)
+        collector = MetadataCollector(connection_id, connector)
+
+        schema_snapshot = {}
+        statistics_by_table = {}
+
+        with resource_governor.slot(connection_id, context.organization_id, "pipeline"):
+            tables = collector.collect_table_list()
+
+            for table_name in tables[:self.table_limit]:
+                columns = collector.collect_columns(table_name)
+                if not columns:
+                    continue
+
+                try:
+                    primary_keys = connector.get_primary_keys(table_name)
+                except Exception as e:
+                    logger.warning(f"Could not get primary keys for {table_name}: {str(e)}")
+                    primary_keys = []
+
+                # Stored columns carry the primary key flag the previous schema is rebuilt from
+                for column in columns:
+                    column["primary_key"] = column["name"] in primary_keys
+
+                schema_snapshot[table_name] = {
+                    "columns": columns,
+                    "primary_keys": primary_keys,
+                    "column_count": len(columns),
+                    "foreign_keys": [],
+                    "indexes": []
+                }
+
+            for table_name in list(schema_snapshot)[:self.stats_table_limit]:
+                table = schema_snapshot[table_name]
+                table_stats = collector.collect_table_statistics(table_name, columns=table["columns"],
+                                                                 primary_keys=table["primary_keys"])
+                if table_stats and not table_stats.get("error"):
+                    statistics_by_table[table_name] = table_stats
+
+        if not tables:
+            raise Exception(f"No tables found for connection {connection_id}")
+
+        table_metadata = []
+        for table_name in tables:
+            table_info = {"name": table_name}
+            if table_name in schema_snapshot:
+                table_info["column_count"] = schema_snapshot[table_name]["column_count"]
+                table_info["primary_key"] = schema_snapshot[table_name]["primary_keys"]
+            table_metadata.append(table_info)
+
+        tables_stored = self.storage_service.store_tables_metadata(connection_id, table_metadata,
+                                                                   verify_storage=False)
+        columns_stored = bool(schema_snapshot) and self.storage_service.store_columns_metadata(
+            connection_id, {name: table["columns"] for name, table in schema_snapshot.items()},
+            verify_storage=False)
+        statistics_stored = bool(statistics_by_table) and self.storage_service.store_statistics_metadata(
+            connection_id, statistics_by_table, verify_storage=False)
+
+        schema_changed = not previous_schema or bool(
+            self.schema_detector.compare_schemas(schema_snapshot, previous_schema))
+        statistics_changed = self._row_counts_changed(previous_row_counts, statistics_by_table)
+
+        context.artifacts.update({
+            "table_list": tables,
+            "schema_snapshot": schema_snapshot,
+            "previous_schema": previous_schema,
+            "statistics": statistics_by_table,
+            "schema_changed": schema_changed,
+            "statistics_changed": statistics_changed
+        })
+
+        return StepResult(changed=schema_changed or statistics_changed, summary={
+            "tables_count": len(tables),
+            "columns_tables_count": len(schema_snapshot),
+            "statistics_tables_count": len(statistics_by_table),
+            "tables_collected": bool(tables_stored),
+            "columns_collected": bool(columns_stored),
+            "statistics_collected": bool(statistics_stored),
+            "schema_changed": schema_changed,
+            "statistics_changed": statistics_changed
+        })
+
+    @staticmethod
+    def _row_counts_changed(previous_row_counts: Dict[str, Any], statistics_by_table: Dict[str, Dict]) -> bool:
+        if set(previous_row_counts) != set(statistics_by_table):
+            return True
+
+        for table_name, stats in statistics_by_table.items():
+            current = stats.get("row_count")
+            previous = previous_row_counts.get(table_name)
+            if current is None or previous is None:
+                if current != previous:
+                    return True
+            elif float(current) != float(previous):
+                return True
+        return False
+
+    def detect_schema_changes(self, context: PipelineContext) -> StepResult:
+        """Compare the refreshed snapshot with the previous schema, without querying the warehouse"""
+        changes, important_changes = self.schema_detector.detect_changes_from_snapshot(
+            context.connection_id,
+            context.artifacts["schema_snapshot"],
+            context.artifacts.get("previous_schema"),
+            self.supabase
+        )
+        context.artifacts["schema_changes"] = changes
+
+        return StepResult(changed=bool(changes) or not context.artifacts.get("previous_schema"), summary={
+            "changes_detected": len(changes),
+            "important_changes": important_changes,
+            "baseline_created": not context.artifacts.get("previous_schema")
+        })
+
+    def run_validations(self, context: PipelineContext) -> StepResult:
+        """Run the connection's validation rules against the refreshed data"""
+        if not context.organization_id:
+            raise Exception(f"No organization ID found for connection {context.connection_id}")
+
+        if self.validation_integrator is None:
+            from core.utils.validation_automation_integration import create_validation_automation_integrator
+            self.validation_integrator = create_validation_automation_integrator()
+
+        results = self.validation_integrator.run_automated_validations(context.connection_id,
+                                                                        context.organization_id)
+        return StepResult(changed=results.get("failed_rules", 0) > 0, summary=results)
+
+
+def run_connection_pipeline(connection: Dict[str, Any], storage_service, connector_factory, supabase_manager,
+                            validation_integrator=None, **kwargs) -> Dict[str, Any]:
+    """
+    Run refresh, schema detection and validation for one connection as a pipeline
+
+    Args:
+        connection: Connection record (must include id and organization_id)
+        storage_service: MetadataStorageService
+        connector_factory: ConnectorFactory
+        supabase_manager: SupabaseManager
+        validation_integrator: Optional ValidationAutomationIntegrator
+        **kwargs: table_limit / stats_table_limit for ConnectionPipelineSteps
+
+    Returns:
+        The pipeline result with the run's start and completion times
+    """
+    started_at = datetime.now(timezone.utc).isoformat()
+    context = PipelineContext(connection["id"], connection.get("organization_id"), connection)
+    steps = ConnectionPipelineSteps(storage_service, connector_factory, supabase_manager,
+                                    validation_integrator, **kwargs)
+
+    results = steps.build().run(context)
+    results["started_at"] = started_at
+    results["completed_at"] = datetime.now(timezone.utc).isoformat()
+    return results
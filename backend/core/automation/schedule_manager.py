@@ -1,18 +1,172 @@
+import heapq
 import json
 import logging
+import threading
 import pytz
 from datetime import datetime, timezone, timedelta, time
 from typing import Dict, List, Any, Optional
 import uuid
 
+from .job_claims import SupabaseJobClaimer, DEFAULT_CLAIM_LIMIT, DEFAULT_LEASE_SECONDS, default_worker_id
+from .status_writer import automation_status_writer
+
 logger = logging.getLogger(__name__)
 
+# How often the in-memory due heap is reloaded to pick up edits made elsewhere
+RECONCILE_INTERVAL_SECONDS = 600
+
+# Automation types that run as steps of the connection pipeline when it is enabled
+PIPELINE_AUTOMATION_TYPES = ("metadata_refresh", "schema_change_detection", "validation_automation")
+
+
+def _parse_run_time(value: Any) -> Optional[float]:
+    """Epoch seconds of a next_run_at value (ISO string or datetime)"""
+    if not value:
+        return None
+    try:
+        if isinstance(value, datetime):
+            moment = value
+        else:
+            moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+    except ValueError:
+        return None
+
+
+class DueJobHeap:
+    """
+    Min-heap of scheduled jobs ordered by next run time
+
+    Entries are replaced lazily: updating or removing a job only changes the
+    job index, and stale heap entries are discarded when they reach the top.
+    Waiters sleep until the earliest job is due and are woken early whenever
+    an earlier job is added.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._jobs = {}  # job_id -> (next_run_ts, job)
+        self._condition = threading.Condition()
+        self._wakeups = 0
+        self.loaded = False
+
+    def load(self, jobs: List[Dict[str, Any]]):
+        """Replace the heap contents with a full set of enabled jobs"""
+        with self._condition:
+            self._jobs = {}
+            for job in jobs:
+                next_run = _parse_run_time(job.get("next_run_at"))
+                if job.get("enabled", True) and next_run is not None:
+                    self._jobs[job["id"]] = (next_run, job)
+            self._heap = [(next_run, job_id) for job_id, (next_run, _) in self._jobs.items()]
+            heapq.heapify(self._heap)
+            self.loaded = True
+            self._condition.notify_all()
+
+    def upsert(self, job: Dict[str, Any]):
+        """Add a job or move it to its new next run time"""
+        next_run = _parse_run_time(job.get("next_run_at"))
+        if not job.get("enabled", True) or next_run is None:
+            self.remove(job["id"])
+            return
+
+        with self._condition:
+            self._jobs[job["id"]] = (next_run, job)
+            heapq.heappush(self._heap, (next_run, job["id"]))
+            if self._heap[0][1] == job["id"]:
+                self._condition.notify_all()
+
+    def remove(self, job_id: str):
+        with self._condition:
+            self._jobs.pop(job_id, None)
+
+    def remove_connection(self, connection_id: str):
+        with self._condition:
+            for job_id in [job_id for job_id, (_, job) in self._jobs.items()
+                           if job.get("connection_id") == connection_id]:
+                del self._jobs[job_id]
+
+    def _peek(self) -> Optional[float]:
+        """Earliest live next run time; caller holds the lock"""
+        while self._heap:
+            next_run, job_id = self._heap[0]
+            current = self._jobs.get(job_id)
+            if current and current[0] == next_run:
+                return next_run
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Remove and return every job whose next run time has passed
+
+        A popped job re-enters the heap when its next run is recorded
+        (mark_job_executed) or at the next reconcile.
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        due = []
+        with self._condition:
+            while True:
+                next_run = self._peek()
+                if next_run is None or next_run > now:
+                    break
+                _, job_id = heapq.heappop(self._heap)
+                due.append(self._jobs.pop(job_id)[1])
+        return due
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        with self._condition:
+            next_run = self._peek()
+        return None if next_run is None else max(0.0, next_run - now)
+
+    def wait(self, max_seconds: float) -> bool:
+        """
+        Sleep until the earliest job is due, wake() is called or max_seconds pass
+
+        Adding an earlier job shortens the sleep.
+
+        Returns:
+            True if a job is due
+        """
+        deadline = datetime.now(timezone.utc).timestamp() + max_seconds
+        with self._condition:
+            wakeups = self._wakeups
+            while True:
+                now = datetime.now(timezone.utc).timestamp()
+                next_run = self._peek()
+                if next_run is not None and next_run <= now:
+                    return True
+                if now >= deadline or self._wakeups != wakeups:
+                    return False
+
+                self._condition.wait(timeout=min(deadline, next_run or deadline) - now)
+
+    def wake(self):
+        """Release every waiter, e.g. when the scheduler stops"""
+        with self._condition:
+            self._wakeups += 1
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._jobs)
+
+
+# Shared by every ScheduleManager in the process, so schedule edits made through
+# the API reach the scheduler loop without a database poll
+due_job_heap = DueJobHeap()
+
 
 class ScheduleManager:
     """Manages user-defined automation schedules"""
 
-    def __init__(self, supabase_manager):
+    def __init__(self, supabase_manager, claimer=None, worker_id: Optional[str] = None):
         self.supabase = supabase_manager
+        self.claimer = claimer or SupabaseJobClaimer(supabase_manager)
+        self.worker_id = worker_id or default_worker_id()
 
     def update_connection_schedule(self, connection_id: str, schedule_config: Dict[str, Any], user_id: str) -> Dict[
         str, Any]:
@@ -145,19 +299,105 @@ class ScheduleManager:
             logger.error(f"Error getting due jobs: {str(e)}")
             return []
 
-    def mark_job_executed(self, scheduled_job_id: str) -> bool:
-        """Mark a scheduled job as executed and calculate next run time"""
+    def reconcile_due_jobs(self) -> int:
+        """
+        Reload the due heap from automation_scheduled_jobs
+
+        Catches edits made outside this process; schedule changes made here are
+        applied to the heap directly.
+
+        Returns:
+            Number of enabled jobs loaded
+        """
         try:
-            # Get the job details
             response = self.supabase.supabase.table("automation_scheduled_jobs") \
                 .select("*") \
-                .eq("id", scheduled_job_id) \
+                .eq("enabled", True) \
                 .execute()
 
-            if not response.data:
-                return False
+            jobs = response.data or []
+            due_job_heap.load(jobs)
+            logger.debug(f"Reconciled {len(jobs)} scheduled jobs")
+            return len(jobs)
+
+        except Exception as e:
+            logger.error(f"Error reconciling scheduled jobs: {str(e)}")
+            return 0
+
+    def take_due_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Claim the jobs that are due once the due heap says any are
+
+        The heap only decides when to look; the jobs themselves come from one
+        atomic claim, so concurrent scheduler instances get disjoint batches and
+        never start the same job twice. Jobs missed while the service was down
+        are claimed once instead of being skipped for falling outside a window.
+
+        Returns:
+            List of scheduled jobs this instance now owns
+        """
+        if not due_job_heap.loaded:
+            self.reconcile_due_jobs()
+
+        due = due_job_heap.pop_due()
+        if not due:
+            return []
+
+        try:
+            return self.claim_due_jobs(limit=max(DEFAULT_CLAIM_LIMIT, len(due)))
+        except Exception as e:
+            # Without the claim function fall back to the per-job running check
+            logger.error(f"Error claiming due jobs, checking them individually: {str(e)}")
+            return [job for job in due if self._is_job_ready_to_run(job)]
+
+    def claim_due_jobs(self, limit: int = DEFAULT_CLAIM_LIMIT,
+                       lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to limit due jobs with a lease
+
+        Jobs with a running automation job of the same type are not claimed, and a
+        claimed job stays leased until mark_job_executed or lease expiry.
+
+        Args:
+            limit: Maximum number of jobs to claim
+            lease_seconds: Lease duration
+
+        Returns:
+            Claimed scheduled job rows
+        """
+        jobs = self.claimer.claim(self.worker_id, limit, lease_seconds)
+        if jobs:
+            logger.info(f"Claimed {len(jobs)} due jobs as {self.worker_id}")
+        return jobs
+
+    def wait_for_due_jobs(self, max_seconds: float) -> bool:
+        """Sleep until a scheduled job is due (or max_seconds pass); True if one is due"""
+        return due_job_heap.wait(max_seconds)
+
+    def mark_job_executed(self, scheduled_job_id: str, job: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Mark a scheduled job as executed and calculate next run time
+
+        While the automation status writer is running, the new run times are
+        written with the job's other bookkeeping instead of on their own.
+
+        Args:
+            scheduled_job_id: Scheduled job ID
+            job: The scheduled job row if already loaded (e.g. as claimed), saving a lookup
+        """
+        try:
+            if job is None:
+                # Get the job details
+                response = self.supabase.supabase.table("automation_scheduled_jobs") \
+                    .select("*") \
+                    .eq("id", scheduled_job_id) \
+                    .execute()
+
+                if not response.data:
+                    return False
+
+                job = response.data[0]
 
-            job = response.data[0]
             now = datetime.now(timezone.utc)
 
             # Calculate next run time
@@ -170,15 +410,22 @@ class ScheduleManager:
             )
 
             # Update the job
-            self.supabase.supabase.table("automation_scheduled_jobs") \
-                .update({
+            update_data = {
                 "last_run_at": now.isoformat(),
                 "next_run_at": next_run.isoformat() if next_run else None,
-                "updated_at": now.isoformat()
-            }) \
-                .eq("id", scheduled_job_id) \
-                .execute()
+                "updated_at": now.isoformat(),
+                "claimed_by": None,
+                "lease_until": None
+            }
+            if automation_status_writer.running:
+                automation_status_writer.update_scheduled_job(scheduled_job_id, update_data)
+            else:
+                self.supabase.supabase.table("automation_scheduled_jobs") \
+                    .update(update_data) \
+                    .eq("id", scheduled_job_id) \
+                    .execute()
 
+            due_job_heap.upsert({**job, **update_data})
             return True
 
         except Exception as e:
@@ -188,7 +435,8 @@ class ScheduleManager:
     def _validate_schedule_config(self, schedule_config: Dict[str, Any]) -> Dict[str, Any]:
         """Validate schedule configuration format"""
         try:
-            valid_automation_types = ["metadata_refresh", "schema_change_detection", "validation_automation"]
+            valid_automation_types = ["metadata_refresh", "schema_change_detection", "validation_automation",
+                                      "connection_pipeline"]
             valid_schedule_types = ["daily", "weekly"]
             valid_days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
 
@@ -278,9 +526,17 @@ class ScheduleManager:
                 .delete() \
                 .eq("connection_id", connection_id) \
                 .execute()
+            due_job_heap.remove_connection(connection_id)
+
+            # The connection pipeline runs refresh, schema detection and validation as
+            # its own steps, so those are not scheduled separately while it is enabled
+            pipeline_enabled = schedule_config.get("connection_pipeline", {}).get("enabled", False)
 
             # Create new scheduled jobs
             for automation_type, config in schedule_config.items():
+                if pipeline_enabled and automation_type in PIPELINE_AUTOMATION_TYPES:
+                    continue
+
                 if config.get("enabled", False):
                     scheduled_job = {
                         "id": str(uuid.uuid4()),
@@ -309,6 +565,7 @@ class ScheduleManager:
                     self.supabase.supabase.table("automation_scheduled_jobs") \
                         .insert(scheduled_job) \
                         .execute()
+                    due_job_heap.upsert(scheduled_job)
 
             logger.info(f"Updated scheduled jobs for connection {connection_id}")
 
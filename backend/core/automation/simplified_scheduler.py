@@ -7,12 +7,13 @@ import time
 import uuid
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
 import os
 
 from core.storage.supabase_manager import SupabaseManager
 from .events import AutomationEventType, publish_automation_event
-from .schedule_manager import ScheduleManager
+from .schedule_manager import ScheduleManager, RECONCILE_INTERVAL_SECONDS, due_job_heap
+from .status_writer import automation_status_writer
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +79,12 @@ class SimplifiedAutomationScheduler:
             self.running = True
             logger.info("Starting simplified automation scheduler...")
 
+            # Job status, runs and events are buffered and written in batches from here on
+            automation_status_writer.start(self.supabase)
+
+            # Pick up metadata refreshes whose tasks survived a restart in the durable queue
+            self._resume_metadata_refreshes()
+
             # Start scheduler thread
             self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.scheduler_thread.start()
@@ -91,9 +98,10 @@ class SimplifiedAutomationScheduler:
     def stop(self):
         """Stop the automation scheduler"""
         self.running = False
+        due_job_heap.wake()
 
         # Cancel all active jobs
-        for job_id, future in self.active_jobs.items():
+        for job_id, future in list(self.active_jobs.items()):
             future.cancel()
 
         # Shutdown executor
@@ -103,26 +111,41 @@ class SimplifiedAutomationScheduler:
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5)
 
+        # Write the bookkeeping of the jobs that just finished
+        if not automation_status_writer.stop():
+            logger.warning(f"{automation_status_writer.pending_count()} automation status writes could not be flushed")
+
         logger.info("Simplified automation scheduler stopped")
 
     def _run_scheduler(self):
-        """Main scheduler loop"""
+        """Main scheduler loop: sleep until the next scheduled job is due"""
         logger.info("Scheduler loop started")
 
+        self.schedule_manager.reconcile_due_jobs()
+        last_reconcile = last_cleanup = time.time()
+
         while self.running:
             try:
+                # Woken early when a schedule change adds an earlier job
+                self.schedule_manager.wait_for_due_jobs(
+                    max(0.0, last_reconcile + RECONCILE_INTERVAL_SECONDS - time.time()))
+                if not self.running:
+                    break
+
+                # Pick up schedule edits made outside this process
+                if time.time() - last_reconcile >= RECONCILE_INTERVAL_SECONDS:
+                    self.schedule_manager.reconcile_due_jobs()
+                    last_reconcile = time.time()
+
                 # PREVENTION: Clear the cycle tracker at start of each cycle
                 self.jobs_created_this_cycle.clear()
 
-                # Check for due jobs every minute
                 self._check_and_execute_due_jobs()
 
                 # Clean up completed jobs every 10 minutes
-                if int(time.time()) % 600 == 0:  # Every 10 minutes
+                if time.time() - last_cleanup >= 600:
                     self._cleanup_completed_jobs()
-
-                # Sleep for 1 minute
-                time.sleep(60)
+                    last_cleanup = time.time()
 
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {str(e)}")
@@ -131,19 +154,16 @@ class SimplifiedAutomationScheduler:
     def _check_and_execute_due_jobs(self):
         """Check for due jobs and execute them with duplicate prevention"""
         try:
-            # PREVENTION: Use smaller buffer to reduce overlap window
-            due_jobs = self.schedule_manager.get_due_jobs(buffer_minutes=1)
+            due_jobs = self.schedule_manager.take_due_jobs()
 
             if not due_jobs:
                 return  # No jobs due, nothing to log
 
             logger.info(f"🔍 Found {len(due_jobs)} jobs due to run")
 
-            # PREVENTION: Filter out jobs that would be duplicates
-            filtered_jobs = self._filter_duplicate_jobs(due_jobs)
-
-            if len(filtered_jobs) < len(due_jobs):
-                logger.info(f"🚫 Filtered out {len(due_jobs) - len(filtered_jobs)} duplicate jobs")
+            # PREVENTION: Claimed jobs are leased to this instance and have no running
+            # job of the same type, so no further duplicate checks are needed
+            filtered_jobs = due_jobs
 
             successful_jobs = 0
             failed_jobs = 0
@@ -181,7 +201,7 @@ class SimplifiedAutomationScheduler:
 
                         # Try to mark as executed, but don't fail if it doesn't work
                         try:
-                            self.schedule_manager.mark_job_executed(scheduled_job_id)
+                            self.schedule_manager.mark_job_executed(scheduled_job_id, job=scheduled_job)
                             logger.info(
                                 f"✅ [{i + 1}/{len(filtered_jobs)}] Marked scheduled job {scheduled_job_id} as executed")
                         except Exception as mark_error:
@@ -217,50 +237,6 @@ class SimplifiedAutomationScheduler:
             logger.error(f"❌ Error in _check_and_execute_due_jobs: {str(e)}")
             logger.error("❌ Exception details:", exc_info=True)
 
-    def _filter_duplicate_jobs(self, due_jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        PREVENTION: Filter out jobs that would create duplicates
-
-        Check for:
-        1. Jobs already running
-        2. Jobs scheduled recently (last 5 minutes)
-        3. Multiple jobs of same type for same connection in this batch
-        """
-        try:
-            filtered_jobs = []
-            seen_job_types = set()  # Track (connection_id, automation_type) in this batch
-
-            for job in due_jobs:
-                connection_id = job["connection_id"]
-                automation_type = job["automation_type"]
-                job_key = (connection_id, automation_type)
-
-                # PREVENTION 1: Skip if we've already seen this job type for this connection in this batch
-                if job_key in seen_job_types:
-                    logger.info(f"🚫 Skipping duplicate {automation_type} for connection {connection_id} in this batch")
-                    continue
-
-                # PREVENTION 2: Check if there's already a running job of this type
-                if self._is_job_already_running(connection_id, automation_type):
-                    logger.info(f"🚫 Skipping {automation_type} for connection {connection_id} - already running")
-                    continue
-
-                # PREVENTION 3: Check if there's a recent job (last 5 minutes)
-                if self._has_recent_job(connection_id, automation_type, minutes=5):
-                    logger.info(f"🚫 Skipping {automation_type} for connection {connection_id} - recent job exists")
-                    continue
-
-                # Job passes all checks
-                filtered_jobs.append(job)
-                seen_job_types.add(job_key)
-                logger.debug(f"✅ Approved {automation_type} for connection {connection_id}")
-
-            return filtered_jobs
-
-        except Exception as e:
-            logger.error(f"Error filtering duplicate jobs: {str(e)}")
-            return due_jobs  # Return original list if filtering fails
-
     def _is_job_already_running(self, connection_id: str, automation_type: str) -> bool:
         """PREVENTION: Check if a job of this type is already running"""
         try:
@@ -354,6 +330,13 @@ class SimplifiedAutomationScheduler:
                         job_id, connection_id, {"scheduled": True},
                         timeout_minutes=60
                     )
+                elif automation_type == "connection_pipeline":
+                    future = self.executor.submit(
+                        self._execute_job_with_timeout,
+                        self._execute_connection_pipeline,
+                        job_id, connection_id, {"scheduled": True},
+                        timeout_minutes=180
+                    )
                 else:
                     logger.error(f"❌ Unknown automation type: {automation_type}")
                     self._update_job_status(job_id, "failed",
@@ -380,9 +363,17 @@ class SimplifiedAutomationScheduler:
     def _execute_job_with_timeout(self, job_function, job_id: str, connection_id: str, config: Dict[str, Any],
                                   timeout_minutes: int = 60):
         """Execute a job function with timeout protection"""
+        follow_up = None
         try:
             logger.info(f"🚀 Starting execution of job {job_id}")
             result = job_function(job_id, connection_id, config)
+
+            # Jobs that chain follow-up steps hand back a future: track it until it resolves
+            if isinstance(result, Future):
+                follow_up = result
+                self.active_jobs[job_id] = follow_up
+                follow_up.add_done_callback(lambda _: self.active_jobs.pop(job_id, None))
+
             return result
 
         except Exception as e:
@@ -395,13 +386,23 @@ class SimplifiedAutomationScheduler:
                 error_message=str(e)
             )
         finally:
-            if job_id in self.active_jobs:
+            if follow_up is None and job_id in self.active_jobs:
                 del self.active_jobs[job_id]
                 logger.info(f"🧹 Cleaned up job {job_id} from active jobs list")
 
     # Keep all the execution methods from the working version
-    def _execute_metadata_refresh(self, job_id: str, connection_id: str, config: Dict[str, Any]):
-        """Execute metadata refresh job with statistics collection"""
+    def _execute_metadata_refresh(self, job_id: str, connection_id: str, config: Dict[str, Any]) -> Optional[Future]:
+        """
+        Start a metadata refresh job with statistics collection
+
+        Returns as soon as the metadata task is submitted. Statistics verification,
+        job status updates and events are chained on the task's completion, so no
+        executor thread is held while the metadata workers collect.
+
+        Returns:
+            A future resolved once the follow-up steps have run, or None if the
+            job failed before the metadata task was submitted
+        """
         run_id = None
         metadata_task_id = None
 
@@ -431,6 +432,7 @@ class SimplifiedAutomationScheduler:
                 "table_limit": 50,
                 "automation_trigger": True,
                 "automation_job_id": job_id,
+                "automation_run_id": run_id,
                 "refresh_types": ["tables", "columns", "statistics"],
                 "timeout_minutes": 45,
                 "collect_statistics": True,
@@ -445,45 +447,117 @@ class SimplifiedAutomationScheduler:
 
             logger.info(f"Submitted metadata task {metadata_task_id}")
 
-            # Wait for completion
-            task_completed = self._wait_for_task_completion(metadata_task_id, timeout_minutes=45)
+            return self._chain_metadata_refresh(job_id, run_id, connection_id, metadata_task_id, timeout_minutes=45)
+
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Metadata refresh job {job_id} failed: {error_msg}")
+            self._handle_job_failure(job_id, run_id, connection_id, error_msg)
+            return None
+
+    def _chain_metadata_refresh(self, job_id: str, run_id: Optional[str], connection_id: str,
+                                metadata_task_id: str, timeout_minutes: Optional[int] = None) -> Future:
+        """Run _complete_metadata_refresh when the metadata task finishes; the returned future tracks it"""
+        follow_up = Future()
 
-            if task_completed:
-                task_status = self.metadata_task_manager.get_task_status(metadata_task_id)
-                task_result = task_status.get("result", {})
+        def on_complete(completion):
+            try:
+                self._complete_metadata_refresh(job_id, run_id, connection_id, metadata_task_id, completion)
+            finally:
+                try:
+                    follow_up.set_result(None)
+                except InvalidStateError:
+                    # Cancelled by stop()
+                    pass
 
-                # Verify that statistics were collected
-                stats_collected = self._verify_statistics_collection(connection_id, task_result)
+        self.metadata_task_manager.on_task_complete(metadata_task_id, on_complete, timeout_minutes=timeout_minutes)
+        return follow_up
 
-                results = {
-                    "metadata_task_id": metadata_task_id,
-                    "task_result": task_result,
-                    "statistics_collected": stats_collected,
-                    "success": True,
-                    "trigger": "user_schedule"
-                }
+    def _resume_metadata_refreshes(self) -> int:
+        """
+        Re-chain follow-up steps for metadata refresh jobs whose tasks are still queued
 
-                self._update_job_status(
-                    job_id, "completed",
-                    completed_at=datetime.now(timezone.utc).isoformat(),
-                    result_summary=results
-                )
+        Jobs started before a restart keep their metadata task in the durable
+        queue; the worker runs it again and the job completes as usual instead
+        of being rediscovered and re-collected by a later scheduling cycle.
 
-                if run_id:
-                    self._update_automation_run(run_id, "completed", results)
+        Returns:
+            Number of jobs resumed
+        """
+        if not self.metadata_task_manager:
+            return 0
 
-                # Publish event
-                publish_automation_event(
-                    event_type=AutomationEventType.METADATA_REFRESHED,
-                    data=results,
-                    connection_id=connection_id
+        resumed = 0
+        try:
+            for task in self.metadata_task_manager.get_pending_tasks():
+                job_id = task.params.get("automation_job_id")
+                if not job_id or job_id in self.active_jobs:
+                    continue
+
+                # No timeout: the task may be delivered again only after its lease expires
+                follow_up = self._chain_metadata_refresh(
+                    job_id, task.params.get("automation_run_id"), task.connection_id, task.id
                 )
+                self.active_jobs[job_id] = follow_up
+                follow_up.add_done_callback(lambda _, job_id=job_id: self.active_jobs.pop(job_id, None))
+                resumed += 1
+
+            if resumed:
+                logger.info(f"Resumed {resumed} metadata refresh jobs from the durable task queue")
+
+        except Exception as e:
+            logger.error(f"Error resuming metadata refresh jobs: {str(e)}")
 
-                logger.info(f"Completed metadata refresh job {job_id} - Statistics collected: {stats_collected}")
+        return resumed
 
-            else:
-                error_msg = f"Metadata task {metadata_task_id} timed out"
-                self._handle_job_failure(job_id, run_id, connection_id, error_msg)
+    def _complete_metadata_refresh(self, job_id: str, run_id: str, connection_id: str, metadata_task_id: str,
+                                   completion: Dict[str, Any]):
+        """Finish a metadata refresh job once its metadata task has completed, failed or timed out"""
+        try:
+            elapsed = completion.get("elapsed_seconds", 0)
+
+            if not completion.get("completed"):
+                logger.error(f"❌ Task {metadata_task_id} did not finish after {elapsed}s: {completion.get('error')}")
+                self._handle_job_failure(job_id, run_id, connection_id, f"Metadata task {metadata_task_id} timed out")
+                return
+
+            if not completion.get("success"):
+                error = completion.get("error", "Unknown error")
+                logger.error(f"❌ Task {metadata_task_id} failed after {elapsed}s: {error}")
+                self._handle_job_failure(job_id, run_id, connection_id, f"Metadata task {metadata_task_id} failed: {error}")
+                return
+
+            logger.info(f"✅ Task {metadata_task_id} completed successfully after {elapsed}s")
+            task_result = completion.get("result") or {}
+
+            # Verify that statistics were collected
+            stats_collected = self._verify_statistics_collection(connection_id, task_result)
+
+            results = {
+                "metadata_task_id": metadata_task_id,
+                "task_result": task_result,
+                "statistics_collected": stats_collected,
+                "success": True,
+                "trigger": "user_schedule"
+            }
+
+            self._update_job_status(
+                job_id, "completed",
+                completed_at=datetime.now(timezone.utc).isoformat(),
+                result_summary=results
+            )
+
+            if run_id:
+                self._update_automation_run(run_id, "completed", results)
+
+            # Publish event
+            publish_automation_event(
+                event_type=AutomationEventType.METADATA_REFRESHED,
+                data=results,
+                connection_id=connection_id
+            )
+
+            logger.info(f"Completed metadata refresh job {job_id} - Statistics collected: {stats_collected}")
 
         except Exception as e:
             error_msg = str(e)
@@ -633,6 +707,83 @@ class SimplifiedAutomationScheduler:
             logger.error(f"Validation job {job_id} failed: {error_msg}")
             self._handle_job_failure(job_id, run_id, connection_id, error_msg)
 
+    def _execute_connection_pipeline(self, job_id: str, connection_id: str, config: Dict[str, Any]):
+        """
+        Execute refresh, schema detection and validation as one pipeline run
+
+        The steps share the schema snapshot read during the refresh, and schema
+        detection and validation are skipped when the refresh found nothing new.
+        """
+        run_id = None
+        try:
+            logger.info(f"Starting connection pipeline job {job_id}")
+
+            self._update_job_status(job_id, "running", started_at=datetime.now(timezone.utc).isoformat())
+            run_id = self._create_automation_run(job_id, connection_id, "connection_pipeline")
+
+            if not self.metadata_task_manager:
+                raise Exception("Metadata task manager not available")
+
+            connection = self.supabase.get_connection(connection_id)
+            if not connection:
+                raise Exception(f"Connection {connection_id} not found")
+
+            from .pipeline import run_connection_pipeline
+
+            logger.info(f"Running connection pipeline for: {connection.get('name')}")
+
+            results = run_connection_pipeline(
+                connection,
+                self.metadata_task_manager.storage_service,
+                self.metadata_task_manager.connector_factory,
+                self.supabase
+            )
+            results["trigger"] = "manual_trigger" if config.get("manual") else "user_schedule"
+
+            steps = results["steps"]
+            if steps["refresh_metadata"]["status"] == "failed":
+                raise Exception(f"Metadata refresh failed: {steps['refresh_metadata'].get('error')}")
+
+            status = "failed" if results["failed"] else "completed"
+            self._update_job_status(
+                job_id, status,
+                completed_at=datetime.now(timezone.utc).isoformat(),
+                result_summary=results
+            )
+
+            if run_id:
+                self._update_automation_run(run_id, status, results)
+
+            publish_automation_event(
+                event_type=AutomationEventType.METADATA_REFRESHED,
+                data=steps["refresh_metadata"].get("summary", {}),
+                connection_id=connection_id
+            )
+
+            schema_summary = steps["detect_schema_changes"].get("summary", {})
+            if schema_summary.get("changes_detected", 0) > 0:
+                publish_automation_event(
+                    event_type=AutomationEventType.SCHEMA_CHANGES_DETECTED,
+                    data=schema_summary,
+                    connection_id=connection_id
+                )
+
+            validation_summary = steps["run_validations"].get("summary", {})
+            if validation_summary.get("failed_rules", 0) > 0:
+                publish_automation_event(
+                    event_type=AutomationEventType.VALIDATION_FAILURES_DETECTED,
+                    data=validation_summary,
+                    connection_id=connection_id
+                )
+
+            logger.info(f"Completed connection pipeline job {job_id}: {results['completed']} steps run, "
+                        f"{results['skipped']} skipped")
+
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Connection pipeline job {job_id} failed: {error_msg}")
+            self._handle_job_failure(job_id, run_id, connection_id, error_msg)
+
     def _handle_job_failure(self, job_id: str, run_id: str, connection_id: str, error_msg: str):
         """Handle job failure consistently"""
         self._update_job_status(
@@ -651,42 +802,8 @@ class SimplifiedAutomationScheduler:
             connection_id=connection_id
         )
 
-    def _wait_for_task_completion(self, task_id: str, timeout_minutes: int = 30) -> bool:
-        """
-        SIMPLIFIED: Wait for task completion and return simple boolean
-        This fixes the issue where successful tasks were marked as failed
-        """
-        try:
-            if not self.metadata_task_manager:
-                logger.error(f"❌ No metadata task manager available for task {task_id}")
-                return False
-
-            logger.info(f"⏳ Waiting for task {task_id} to complete (timeout: {timeout_minutes}min)")
-
-            # Use the task manager's built-in method but simplify the result
-            completion_result = self.metadata_task_manager.wait_for_task_completion_sync(
-                task_id, timeout_minutes
-            )
-
-            # FIXED: Properly extract the success status
-            completed = completion_result.get("completed", False)
-            success = completion_result.get("success", False)
-            elapsed = completion_result.get("elapsed_seconds", 0)
-
-            if completed and success:
-                logger.info(f"✅ Task {task_id} completed successfully after {elapsed}s")
-                return True
-            else:
-                error = completion_result.get("error", "Unknown error")
-                logger.error(f"❌ Task {task_id} failed after {elapsed}s: {error}")
-                return False
-
-        except Exception as e:
-            logger.error(f"❌ Error waiting for task {task_id}: {str(e)}")
-            return False
-
     def _create_automation_run(self, job_id: str, connection_id: str, run_type: str) -> str:
-        """Create automation run record"""
+        """Create automation run record (written by the status writer with the job's next batch)"""
         try:
             run_id = str(uuid.uuid4())
 
@@ -699,13 +816,8 @@ class SimplifiedAutomationScheduler:
                 "started_at": datetime.now(timezone.utc).isoformat()
             }
 
-            response = self.supabase.supabase.table("automation_runs").insert(run_data).execute()
-
-            if response.data:
-                return run_id
-            else:
-                logger.warning("Failed to create automation run")
-                return None
+            automation_status_writer.create_run(run_data)
+            return run_id
 
         except Exception as e:
             logger.error(f"Error creating automation run: {str(e)}")
@@ -725,10 +837,7 @@ class SimplifiedAutomationScheduler:
             if results:
                 update_data["results"] = results
 
-            self.supabase.supabase.table("automation_runs") \
-                .update(update_data) \
-                .eq("id", run_id) \
-                .execute()
+            automation_status_writer.update_run(run_id, update_data)
 
         except Exception as e:
             logger.error(f"Error updating automation run {run_id}: {str(e)}")
@@ -742,10 +851,7 @@ class SimplifiedAutomationScheduler:
             if status in ["completed", "failed"] and "completed_at" not in update_data:
                 update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
 
-            response = self.supabase.supabase.table("automation_jobs") \
-                .update(update_data) \
-                .eq("id", job_id) \
-                .execute()
+            automation_status_writer.update_job(job_id, update_data)
 
             if status == "completed":
                 logger.info(f"Job {job_id} completed")
@@ -791,6 +897,8 @@ class SimplifiedAutomationScheduler:
                 automation_types.append("schema_change_detection")
             if automation_type == "validation_automation" or automation_type is None:
                 automation_types.append("validation_automation")
+            if automation_type == "connection_pipeline":
+                automation_types.append("connection_pipeline")
 
             for auto_type in automation_types:
                 # PREVENTION: Check if job is already running or recent
@@ -848,6 +956,13 @@ class SimplifiedAutomationScheduler:
                             job_id, connection_id, {"manual": True},
                             timeout_minutes=60
                         )
+                    elif auto_type == "connection_pipeline":
+                        future = self.executor.submit(
+                            self._execute_job_with_timeout,
+                            self._execute_connection_pipeline,
+                            job_id, connection_id, {"manual": True},
+                            timeout_minutes=180
+                        )
 
                     self.active_jobs[job_id] = future
                     jobs_created.append(job_id)
@@ -896,6 +1011,7 @@ class SimplifiedAutomationScheduler:
                 "active_job_ids": list(self.active_jobs.keys()),
                 "scheduled_jobs_count": scheduled_response.count or 0,
                 "metadata_task_manager_available": self.metadata_task_manager is not None,
+                "status_writer": automation_status_writer.get_stats(),
                 "version": "simplified_user_schedule_with_prevention",
                 "prevention_stats": {
                     "jobs_created_this_cycle": len(self.jobs_created_this_cycle),
@@ -0,0 +1,454 @@
+# backend/core/automation/status_writer.py
+"""
+Buffered writes of automation job bookkeeping.
+
+A single scheduled job used to make eight to ten separate Supabase requests
+for its own bookkeeping: job status updates, the automation_runs insert and
+update, the scheduled job's next run, events and the organization lookups
+behind them. The scheduler now hands these writes to the status writer,
+which merges them per row and applies everything buffered in one
+apply_automation_status_batch call every flush interval, so a job costs its
+job insert plus one or two flushes.
+
+Writes to the same job, run or scheduled job are merged in the order they
+were made and only one flush runs at a time, so a later status never lands
+before an earlier one. A failed flush puts its rows back underneath anything
+written since; a row that fails max_attempts flushes in a row is logged and
+dropped. Without the RPC (scripts/automation_status_batch.sql), or when a
+batch call fails, the writer falls back to per-table requests and retries
+only the rows that failed. When the writer is not started, every write is
+applied immediately.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Dict, List, Any, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 2.0
+
+# Flush early once this many rows are waiting
+DEFAULT_MAX_PENDING = 200
+
+# Failed flushes after which a row is dropped instead of retried
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Buffers keyed by row id, in the order they are written
+KEYED_BUFFERS = ("jobs", "runs", "scheduled_jobs")
+
+
+class AutomationStatusWriter:
+    """Coalesces automation job, run, scheduled job and event writes into batched flushes"""
+
+    def __init__(self, supabase_manager=None, flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = DEFAULT_MAX_PENDING, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            supabase_manager: SupabaseManager used for writes (created on first flush if omitted)
+            flush_interval: Seconds between background flushes
+            max_pending: Number of buffered rows that triggers an early flush
+            max_attempts: Failed flushes after which a row is dropped
+        """
+        self.supabase = supabase_manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._scheduled_jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: List[Dict[str, Any]] = []
+        self._new_runs = set()  # run ids created here and not yet written
+
+        # Failed flushes per buffered row: (buffer name, row id) for keyed rows, a parallel list for events
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._event_attempts: List[int] = []
+
+        self._thread = None
+        self._exit_hook_registered = False
+        self._use_rpc = True
+        self.running = False
+
+        self.stats = {
+            "writes": 0,
+            "writes_coalesced": 0,
+            "flushes": 0,
+            "requests": 0,
+            "rows_written": 0,
+            "rows_dropped": 0,
+            "flush_errors": 0
+        }
+
+    @classmethod
+    def from_env(cls, supabase_manager=None) -> "AutomationStatusWriter":
+        """Create a writer flushing every AUTOMATION_STATUS_FLUSH_SECONDS"""
+        return cls(
+            supabase_manager,
+            flush_interval=float(os.getenv("AUTOMATION_STATUS_FLUSH_SECONDS", DEFAULT_FLUSH_INTERVAL_SECONDS))
+        )
+
+    def start(self, supabase_manager=None):
+        """Start the background flusher"""
+        if supabase_manager is not None:
+            self.supabase = supabase_manager
+
+        with self._condition:
+            if self.running:
+                return
+            self.running = True
+
+        self._thread = threading.Thread(target=self._run, name="automation-status-writer", daemon=True)
+        self._thread.start()
+
+        # Last-resort flush when the process exits without stopping the scheduler
+        if not self._exit_hook_registered:
+            atexit.register(self.flush)
+            self._exit_hook_registered = True
+
+        logger.info(f"Automation status writer started (flush every {self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """
+        Stop the background flusher and write everything still buffered
+
+        Returns:
+            True if nothing is left unwritten
+        """
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        flushed = self.flush()
+        logger.info("Automation status writer stopped")
+        return flushed
+
+    def update_job(self, job_id: str, fields: Dict[str, Any]):
+        """Queue a patch of an automation_jobs row"""
+        self._merge(self._jobs, job_id, fields)
+
+    def create_run(self, run: Dict[str, Any]):
+        """Queue a new automation_runs row; later updates are merged into it"""
+        with self._condition:
+            self._new_runs.add(run["id"])
+        self._merge(self._runs, run["id"], run)
+
+    def update_run(self, run_id: str, fields: Dict[str, Any]):
+        """Queue a patch of an automation_runs row"""
+        self._merge(self._runs, run_id, fields)
+
+    def update_scheduled_job(self, scheduled_job_id: str, fields: Dict[str, Any]):
+        """Queue a patch of an automation_scheduled_jobs row"""
+        self._merge(self._scheduled_jobs, scheduled_job_id, fields)
+
+    def add_event(self, record: Dict[str, Any]):
+        """Queue an automation_events record"""
+        with self._condition:
+            self._events.append(dict(record))
+            self._event_attempts.append(0)
+            self.stats["writes"] += 1
+        self._after_write()
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._jobs) + len(self._runs) + len(self._scheduled_jobs) + len(self._events)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {**self.stats, "pending": len(self._jobs) + len(self._runs) + len(self._scheduled_jobs)
+                    + len(self._events), "running": self.running, "batched_rpc": self._use_rpc}
+
+    def _merge(self, buffer: Dict[str, Dict[str, Any]], row_id: str, fields: Dict[str, Any]):
+        with self._condition:
+            if row_id in buffer:
+                buffer[row_id].update(fields)
+                self.stats["writes_coalesced"] += 1
+            else:
+                buffer[row_id] = {"id": row_id, **fields}
+            self.stats["writes"] += 1
+        self._after_write()
+
+    def _after_write(self):
+        if not self.running:
+            self.flush()
+            return
+
+        with self._condition:
+            if len(self._jobs) + len(self._runs) + len(self._scheduled_jobs) + len(self._events) >= self.max_pending:
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self.running:
+                    return
+                self._condition.wait(self.flush_interval)
+                if not self.running:
+                    return
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write everything buffered so far
+
+        Returns:
+            True if the buffered rows were written (or there were none)
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch = {
+                    "jobs": self._jobs,
+                    "runs": self._runs,
+                    "scheduled_jobs": self._scheduled_jobs,
+                    "events": self._events,
+                    "event_attempts": self._event_attempts,
+                    "new_runs": self._new_runs & set(self._runs)
+                }
+                self._jobs, self._runs, self._scheduled_jobs, self._events = {}, {}, {}, []
+                self._event_attempts = []
+
+            rows = len(batch["jobs"]) + len(batch["runs"]) + len(batch["scheduled_jobs"]) + len(batch["events"])
+            if not rows:
+                return True
+
+            keys = _row_keys(batch)
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Error flushing automation status writes, will retry: {str(e)}")
+                with self._condition:
+                    for key in keys - _row_keys(batch):
+                        self._attempts.pop(key, None)
+                self._requeue(batch)
+                with self._condition:
+                    self.stats["flush_errors"] += 1
+                return False
+
+            with self._condition:
+                for key in keys:
+                    self._attempts.pop(key, None)
+                self._new_runs -= batch["new_runs"]
+                self.stats["flushes"] += 1
+                self.stats["rows_written"] += rows
+            return True
+
+    def _requeue(self, batch: Dict[str, Any]):
+        """
+        Put the unwritten rows of a failed batch back underneath the writes made
+        while it was in flight, dropping rows that have failed max_attempts times
+        """
+        dropped = 0
+        with self._condition:
+            for name in KEYED_BUFFERS:
+                buffer = getattr(self, f"_{name}")
+                for row_id, fields in batch[name].items():
+                    attempts = self._attempts.get((name, row_id), 0) + 1
+                    if attempts >= self.max_attempts:
+                        logger.error(f"Dropping automation status write to {name} {row_id} "
+                                     f"after {attempts} failed attempts: {fields}")
+                        self._attempts.pop((name, row_id), None)
+                        if name == "runs" and row_id not in buffer:
+                            self._new_runs.discard(row_id)
+                        dropped += 1
+                        continue
+                    self._attempts[(name, row_id)] = attempts
+                    buffer[row_id] = {**fields, **buffer.get(row_id, {})}
+
+            events, event_attempts = [], []
+            for event, attempts in zip(batch["events"], batch["event_attempts"]):
+                if attempts + 1 >= self.max_attempts:
+                    logger.error(f"Dropping automation event after {attempts + 1} failed attempts: {event}")
+                    dropped += 1
+                    continue
+                events.append(event)
+                event_attempts.append(attempts + 1)
+            self._events = events + self._events
+            self._event_attempts = event_attempts + self._event_attempts
+
+            self.stats["rows_dropped"] += dropped
+
+    def _client(self):
+        if self.supabase is None:
+            from core.storage.supabase_manager import SupabaseManager
+            self.supabase = SupabaseManager()
+        return self.supabase.supabase
+
+    def _execute(self, request):
+        with self._condition:
+            self.stats["requests"] += 1
+        return request.execute()
+
+    def _write(self, batch: Dict[str, Any]):
+        client = self._client()
+
+        if self._use_rpc:
+            try:
+                self._execute(client.rpc("apply_automation_status_batch", {
+                    "p_jobs": list(batch["jobs"].values()),
+                    "p_runs": list(batch["runs"].values()),
+                    "p_scheduled_jobs": list(batch["scheduled_jobs"].values()),
+                    "p_events": batch["events"]
+                }))
+                return
+            except Exception as e:
+                if _is_missing_function(e):
+                    logger.warning(f"apply_automation_status_batch is not installed, using table writes: {str(e)}")
+                    self._use_rpc = False
+                else:
+                    # One bad row fails the whole call; table writes isolate it
+                    logger.warning(f"Batched status write failed, retrying with table writes: {str(e)}")
+
+        self._write_tables(client, batch)
+
+    def _write_tables(self, client, batch: Dict[str, Any]):
+        """
+        Per-table writes, used without apply_automation_status_batch or when a batch call fails
+
+        Each row that is written is removed from the batch, so a retry after a
+        failure repeats only the rows that failed, and neither inserts a run
+        twice nor duplicates events.
+
+        Raises:
+            Exception: If any row could not be written
+        """
+        failed: List[str] = []
+
+        for job_id in self._update_rows(client, "automation_jobs", batch["jobs"], failed):
+            del batch["jobs"][job_id]
+
+        new_runs = [fields for run_id, fields in batch["runs"].items() if run_id in batch["new_runs"]]
+        for rows in _group_by_keys(new_runs):
+            try:
+                self._execute(client.table("automation_runs").insert(rows))
+                inserted = rows
+            except Exception as e:
+                logger.warning(f"Inserting {len(rows)} automation runs failed, inserting them one by one: {str(e)}")
+                inserted = [row for row in rows if self._insert_run(client, row, failed)]
+            self._mark_runs_written(batch, {row["id"] for row in inserted})
+
+        run_updates = {run_id: fields for run_id, fields in batch["runs"].items() if run_id not in batch["new_runs"]}
+        for run_id in self._update_rows(client, "automation_runs", run_updates, failed):
+            del batch["runs"][run_id]
+
+        for scheduled_job_id in self._update_rows(client, "automation_scheduled_jobs", batch["scheduled_jobs"], failed):
+            del batch["scheduled_jobs"][scheduled_job_id]
+
+        events = self._resolve_organizations(client, batch["events"])
+        groups: Dict[tuple, List[int]] = {}
+        for index, event in enumerate(events):
+            groups.setdefault(tuple(sorted(event)), []).append(index)
+
+        written = set()
+        for indexes in groups.values():
+            try:
+                self._execute(client.table("automation_events").insert([events[i] for i in indexes]))
+                written.update(indexes)
+                continue
+            except Exception as e:
+                logger.warning(f"Inserting {len(indexes)} automation events failed, inserting them one by one: "
+                               f"{str(e)}")
+            for i in indexes:
+                try:
+                    self._execute(client.table("automation_events").insert(events[i]))
+                    written.add(i)
+                except Exception as e:
+                    failed.append(f"automation_events {events[i].get('event_type')}: {str(e)}")
+        batch["events"] = [event for i, event in enumerate(batch["events"]) if i not in written]
+        batch["event_attempts"] = [count for i, count in enumerate(batch["event_attempts"]) if i not in written]
+
+        if failed:
+            raise Exception(f"{len(failed)} automation status rows could not be written, first: {failed[0]}")
+
+    def _update_rows(self, client, table: str, rows: Dict[str, Dict[str, Any]], failed: List[str]) -> List[str]:
+        """Apply each patch on its own; returns the ids written and records failures in failed"""
+        written = []
+        for row_id, fields in rows.items():
+            try:
+                self._execute(client.table(table).update(_without_id(fields)).eq("id", row_id))
+                written.append(row_id)
+            except Exception as e:
+                failed.append(f"{table} {row_id}: {str(e)}")
+        return written
+
+    def _insert_run(self, client, row: Dict[str, Any], failed: List[str]) -> bool:
+        """Insert one run; a run that already exists is updated instead"""
+        try:
+            self._execute(client.table("automation_runs").insert(row))
+            return True
+        except Exception as e:
+            if not _is_duplicate_key(e):
+                failed.append(f"automation_runs {row['id']}: {str(e)}")
+                return False
+
+        # Already inserted, e.g. by a batch call that committed before its response was lost
+        try:
+            self._execute(client.table("automation_runs").update(_without_id(row)).eq("id", row["id"]))
+            return True
+        except Exception as e:
+            failed.append(f"automation_runs {row['id']}: {str(e)}")
+            return False
+
+    def _mark_runs_written(self, batch: Dict[str, Any], run_ids: Set[str]):
+        for run_id in run_ids:
+            batch["runs"].pop(run_id, None)
+        batch["new_runs"] -= run_ids
+        with self._condition:
+            self._new_runs -= run_ids
+
+    def _resolve_organizations(self, client, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill in missing organization ids with one lookup for all connections in the batch"""
+        connection_ids = sorted({event["connection_id"] for event in events
+                                 if not event.get("organization_id") and event.get("connection_id")})
+        if not connection_ids:
+            return events
+
+        try:
+            response = self._execute(client.table("database_connections")
+                                     .select("id, organization_id").in_("id", connection_ids))
+            organizations = {row["id"]: row.get("organization_id") for row in response.data or []}
+        except Exception as e:
+            logger.warning(f"Could not look up organizations for automation events: {str(e)}")
+            return events
+
+        return [{**event, "organization_id": organizations.get(event.get("connection_id"))}
+                if not event.get("organization_id") else event for event in events]
+
+
+def _without_id(fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in fields.items() if key != "id"}
+
+
+def _row_keys(batch: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    return {(name, row_id) for name in KEYED_BUFFERS for row_id in batch[name]}
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """Whether a failed RPC call means the database function is not installed"""
+    message = str(error)
+    return "PGRST202" in message or "Could not find the function" in message or (
+        "function" in message and "does not exist" in message)
+
+
+def _is_duplicate_key(error: Exception) -> bool:
+    message = str(error)
+    return "23505" in message or "duplicate key" in message
+
+
+def _group_by_keys(rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Split rows into groups with identical keys, as bulk inserts require"""
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return list(groups.values())
+
+
+# Shared by the scheduler, the schedule manager and event publishing
+automation_status_writer = AutomationStatusWriter.from_env()
@@ -0,0 +1,170 @@
+# backend/core/metadata/adaptive_refresh.py
+"""
+Per-table refresh intervals learned from change history.
+
+In adaptive mode (METADATA_REFRESH_MODE=adaptive) the scheduled refresh loop
+stops refreshing whole connections on fixed 24h/72h thresholds. Each table
+instead gets its own interval, recomputed every time the table is checked
+from the change analytics recorded by earlier checks. Tables that keep
+changing move toward min_interval_hours (hourly by default), tables that
+never change move toward max_interval_hours (weekly), and tables without
+enough history stay at the default 24 hours. Table statistics keep their
+72 hour maximum age, which the refresh_tables task enforces per table.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL_HOURS = 1
+DEFAULT_MAX_INTERVAL_HOURS = 168
+DEFAULT_INTERVAL_HOURS = 24
+
+# Object type under which per-table checks are recorded in metadata_change_analytics
+TABLE_OBJECT_TYPE = "table_metadata"
+
+
+class AdaptiveRefreshPlanner:
+    """Tracks when each table is next due and how often it should be checked"""
+
+    def __init__(self, analytics, min_interval_hours: int = DEFAULT_MIN_INTERVAL_HOURS,
+                 max_interval_hours: int = DEFAULT_MAX_INTERVAL_HOURS,
+                 default_interval_hours: int = DEFAULT_INTERVAL_HOURS):
+        """
+        Args:
+            analytics: MetadataChangeAnalytics used to compute intervals
+            min_interval_hours: Shortest interval any table gets
+            max_interval_hours: Longest interval any table gets
+            default_interval_hours: Interval for tables without change history
+        """
+        self.analytics = analytics
+        self.min_interval_hours = min_interval_hours
+        self.max_interval_hours = max_interval_hours
+        self.default_interval_hours = max(min_interval_hours, min(max_interval_hours, default_interval_hours))
+
+        # (connection_id, table_name) -> {"interval_hours", "next_due", "frequency"}
+        self._tables: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, analytics) -> "AdaptiveRefreshPlanner":
+        """Create a planner bounded by ADAPTIVE_REFRESH_MIN_HOURS and ADAPTIVE_REFRESH_MAX_HOURS"""
+        return cls(
+            analytics,
+            min_interval_hours=int(os.getenv("ADAPTIVE_REFRESH_MIN_HOURS", DEFAULT_MIN_INTERVAL_HOURS)),
+            max_interval_hours=int(os.getenv("ADAPTIVE_REFRESH_MAX_HOURS", DEFAULT_MAX_INTERVAL_HOURS))
+        )
+
+    def sync_tables(self, connection_id: str, tables: List[str], last_refreshed: Optional[float] = None):
+        """
+        Track a connection's current tables
+
+        New tables are first due one default interval after last_refreshed
+        (immediately if unknown); tables that no longer exist are forgotten.
+
+        Args:
+            connection_id: Connection ID
+            tables: Table names currently known for the connection
+            last_refreshed: Epoch seconds of the connection's last metadata refresh
+        """
+        first_due = time.time() if last_refreshed is None else last_refreshed + self.default_interval_hours * 3600
+
+        with self._lock:
+            current = set(tables)
+            for key in [key for key in self._tables if key[0] == connection_id and key[1] not in current]:
+                del self._tables[key]
+
+            for table_name in tables:
+                self._tables.setdefault((connection_id, table_name), {
+                    "interval_hours": None,
+                    "next_due": first_due,
+                    "frequency": "unknown"
+                })
+
+    def due_tables(self, connection_id: str, now: Optional[float] = None) -> List[str]:
+        """Tables of a connection whose next check is due, most overdue first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [(entry["next_due"], key[1]) for key, entry in self._tables.items()
+                   if key[0] == connection_id and entry["next_due"] <= now]
+        return [table_name for _, table_name in sorted(due)]
+
+    def recompute_interval(self, connection_id: str, table_name: str) -> int:
+        """
+        Recompute a table's interval from its change history
+
+        Starts from the table's current interval, or the interval recorded with
+        its latest check (so intervals survive restarts), and applies
+        suggest_refresh_interval within the planner's bounds.
+
+        Returns:
+            The new interval in hours
+        """
+        with self._lock:
+            entry = self._tables.get((connection_id, table_name), {})
+            current = entry.get("interval_hours")
+
+        frequency_data = self.analytics.get_change_frequency(connection_id, TABLE_OBJECT_TYPE, table_name)
+        if current is None:
+            current = frequency_data.get("last_interval_hours") or self.default_interval_hours
+        current = max(self.min_interval_hours, min(self.max_interval_hours, int(current)))
+
+        suggestion = self.analytics.suggest_refresh_interval(
+            connection_id, TABLE_OBJECT_TYPE, table_name,
+            current_interval_hours=current,
+            min_interval_hours=self.min_interval_hours,
+            max_interval_hours=self.max_interval_hours,
+            frequency_data=frequency_data
+        )
+        interval = suggestion.get("suggested_interval_hours", current)
+
+        if interval != current:
+            logger.info(f"Refresh interval for {table_name} on connection {connection_id}: "
+                        f"{current}h -> {interval}h ({suggestion.get('reason')})")
+
+        with self._lock:
+            if (connection_id, table_name) in self._tables:
+                self._tables[(connection_id, table_name)].update({
+                    "interval_hours": interval,
+                    "frequency": suggestion.get("frequency", "unknown")
+                })
+        return interval
+
+    def mark_scheduled(self, connection_id: str, tables: List[str], now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Recompute the intervals of tables about to be refreshed and push back their next check
+
+        Returns:
+            Mapping of table name to the interval (hours) the refresh is recorded with
+        """
+        now = time.time() if now is None else now
+        intervals = {}
+        for table_name in tables:
+            try:
+                interval = self.recompute_interval(connection_id, table_name)
+            except Exception as e:
+                logger.warning(f"Could not recompute refresh interval for {table_name}: {str(e)}")
+                interval = self.get_interval(connection_id, table_name)
+
+            intervals[table_name] = interval
+            with self._lock:
+                entry = self._tables.get((connection_id, table_name))
+                if entry is not None:
+                    entry["next_due"] = now + interval * 3600
+        return intervals
+
+    def get_interval(self, connection_id: str, table_name: str) -> int:
+        """Current interval of a table in hours"""
+        with self._lock:
+            entry = self._tables.get((connection_id, table_name), {})
+            return entry.get("interval_hours") or self.default_interval_hours
+
+    def get_schedule(self, connection_id: str) -> Dict[str, Dict[str, Any]]:
+        """Interval, change frequency and next due time of each tracked table"""
+        with self._lock:
+            return {key[1]: {**entry, "interval_hours": entry["interval_hours"] or self.default_interval_hours}
+                    for key, entry in self._tables.items() if key[0] == connection_id}
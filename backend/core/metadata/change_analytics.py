@@ -169,6 +169,7 @@ class MetadataChangeAnalytics:
                 "changes_detected": changes_detected,
                 "avg_hours_between_changes": avg_hours_between_changes,
                 "most_recent_change": most_recent_change,
+                "last_interval_hours": records[-1].get("refresh_interval_hours"),
                 "data_points": total_checks
             }
 
@@ -183,7 +184,8 @@ class MetadataChangeAnalytics:
             object_name: str,
             current_interval_hours: int = 24,
             min_interval_hours: int = 1,
-            max_interval_hours: int = 168  # 7 days
+            max_interval_hours: int = 168,  # 7 days
+            frequency_data: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Suggest an optimal refresh interval based on change analytics
@@ -195,13 +197,15 @@ class MetadataChangeAnalytics:
             current_interval_hours: Current refresh interval in hours
             min_interval_hours: Minimum allowed interval in hours
             max_interval_hours: Maximum allowed interval in hours
+            frequency_data: Result of get_change_frequency, if the caller already has it
 
         Returns:
             Dictionary with suggested interval and reasoning
         """
         try:
             # Get change frequency data
-            frequency_data = self.get_change_frequency(connection_id, object_type, object_name)
+            if frequency_data is None:
+                frequency_data = self.get_change_frequency(connection_id, object_type, object_name)
 
             # Default response
             result = {
@@ -555,12 +555,17 @@ class MetadataCollector:
                 "collected_at": datetime.now(timezone.utc).isoformat()
             }
 
-    def collect_table_statistics(self, table_name):
+    def collect_table_statistics(self, table_name, columns=None, primary_keys=None):
         """
         Collect detailed statistics for a specific table (Tier 5)
 
         This method was missing from the original collector but is called by automation.
         It collects row counts, column statistics, and other table-level metrics.
+
+        Args:
+            table_name: Table to collect statistics for
+            columns: Columns already collected with collect_columns (re-read if None)
+            primary_keys: Primary key columns already read (re-read if None)
         """
         logger.info(f"Collecting statistics for table {table_name}")
 
@@ -586,7 +591,8 @@ class MetadataCollector:
 
             # Primary keys
             try:
-                primary_keys = self.connector.get_primary_keys(table_name)
+                if primary_keys is None:
+                    primary_keys = self.connector.get_primary_keys(table_name)
                 statistics["primary_keys"] = primary_keys
                 statistics["has_primary_key"] = len(primary_keys) > 0
             except Exception as e:
@@ -596,7 +602,8 @@ class MetadataCollector:
 
             # Column count and basic column statistics
             try:
-                columns = self.collect_columns(table_name)
+                if columns is None:
+                    columns = self.collect_columns(table_name)
                 statistics["column_count"] = len(columns)
 
                 # Count nullable vs non-nullable columns
@@ -633,7 +640,8 @@ class MetadataCollector:
             # Sample some column-level statistics for key columns
             try:
                 # Limit to first 5 columns to avoid performance issues
-                columns = self.collect_columns(table_name)
+                if columns is None:
+                    columns = self.collect_columns(table_name)
                 column_stats = {}
 
                 for column in columns[:5]:
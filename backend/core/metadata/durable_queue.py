@@ -0,0 +1,538 @@
+# backend/core/metadata/durable_queue.py
+"""
+Durable work queues for metadata tasks.
+
+Tasks are stored before they are acknowledged, so queued and in-flight work
+survives deploys and crashes. A consumer leases a task for a visibility
+timeout; if it neither acknowledges nor fails the task in time (for example
+because the process died), the task becomes visible again. Failed tasks are
+retried with exponential backoff and moved to a dead-letter state after
+max_attempts deliveries. Priority lanes are served high, then medium, then
+low, FIFO within a lane.
+
+The queues keep the PriorityTaskQueue interface (put, get, task_done,
+get_stats, empty, raise_priority) and add ack/nack, which MetadataWorker
+calls when a task finishes, and extend_lease, which it calls periodically
+while a task runs so long collections are not redelivered mid-run.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from .worker import MetadataTask, PriorityTaskQueue
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LANES = {"high": 0, "medium": 1, "low": 2}
+
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = 3600
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_BASE_SECONDS = 30
+DEFAULT_BACKOFF_MAX_SECONDS = 3600
+DEFAULT_QUEUE_PATH = "metadata_task_queue.db"
+
+
+def _lane(priority: str) -> int:
+    return PRIORITY_LANES.get(priority, PRIORITY_LANES["medium"])
+
+
+def _task_from_row(row: Dict[str, Any]) -> MetadataTask:
+    params = row.get("params") or {}
+    if isinstance(params, str):
+        params = json.loads(params)
+
+    task = MetadataTask(row["task_type"], row["connection_id"], params, row.get("priority") or "medium")
+    task.id = row["id"]
+    task.created_at = row.get("created_at") or task.created_at
+    task.attempts = row.get("attempts") or 0
+    return task
+
+
+class DurableTaskQueue:
+    """Blocking get, retry policy and stats shared by the durable queue backends"""
+
+    def __init__(self, visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+                 poll_interval: float = 2.0,
+                 worker_id: Optional[str] = None):
+        """
+        Args:
+            visibility_timeout: Seconds a delivered task stays invisible to other consumers
+            max_attempts: Deliveries before a task is dead-lettered
+            backoff_base: Retry delay after the first failure, doubled per attempt
+            backoff_max: Upper bound for the retry delay
+            poll_interval: Longest a blocked get waits before re-checking storage
+                (picks up tasks enqueued by other processes)
+            worker_id: Identifies this process's leases
+        """
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        # Wakes blocked consumers when this process enqueues or requeues work
+        self._condition = threading.Condition()
+        self._version = 0
+
+    def _notify(self):
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter, so retries after an outage are spread out"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def get(self, block=True, timeout=None):
+        """
+        Lease the next visible task
+
+        Args:
+            block: Whether to wait for a task
+            timeout: How long to wait if blocking (forever if None)
+
+        Returns:
+            The next MetadataTask or None if timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                version = self._version
+
+            try:
+                task, next_visible_in = self._claim()
+            except Exception as e:
+                logger.error(f"Error getting task from durable queue: {str(e)}")
+                task, next_visible_in = None, None
+
+            if task or not block:
+                return task
+
+            wait = self.poll_interval
+            if next_visible_in is not None:
+                wait = min(wait, max(next_visible_in, 0.0))
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+
+            with self._condition:
+                if self._version == version:
+                    self._condition.wait(wait)
+
+    def task_done(self, priority="medium"):
+        """Kept for PriorityTaskQueue compatibility; completion is recorded by ack/nack"""
+        pass
+
+    def nack(self, task, error: str) -> bool:
+        """
+        Record a failed delivery: retry later with backoff, or dead-letter
+
+        Args:
+            task: The delivered MetadataTask
+            error: Failure message
+
+        Returns:
+            True if the task will be retried, False if it was dead-lettered
+        """
+        attempts = getattr(task, "attempts", 0)
+        if attempts >= self.max_attempts:
+            self._dead_letter(task.id, error)
+            logger.error(f"Task {task.id} dead-lettered after {attempts} attempts: {error}")
+            return False
+
+        delay = self.retry_delay(attempts)
+        self._requeue(task.id, error, delay)
+        logger.warning(f"Task {task.id} failed (attempt {attempts}/{self.max_attempts}), retrying in {delay:.0f}s")
+        self._notify()
+        return True
+
+    def empty(self):
+        """Check if no tasks are waiting to be delivered"""
+        return self.get_stats()["total"] == 0
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """Seconds between lease extensions while a task runs, so a lease cannot expire mid-task"""
+        return self.visibility_timeout / 3
+
+    # Backend operations
+    def put(self, task):
+        """Persist a task in its priority lane - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement put()")
+
+    def raise_priority(self, task_id: str, priority: str) -> bool:
+        """Move a queued (not leased) task to a higher priority lane; True if it moved"""
+        raise NotImplementedError("Subclasses must implement raise_priority()")
+
+    def ack(self, task):
+        """Remove a successfully processed task - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement ack()")
+
+    def extend_lease(self, task) -> bool:
+        """Push a leased task's visibility timeout out again; False if this consumer no longer holds it"""
+        raise NotImplementedError("Subclasses must implement extend_lease()")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get queued, in-flight and dead-lettered counts - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement get_stats()")
+
+    def pending_tasks(self) -> List[MetadataTask]:
+        """Queued and in-flight tasks - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement pending_tasks()")
+
+    def _claim(self) -> Tuple[Optional[MetadataTask], Optional[float]]:
+        """Lease one visible task; also return seconds until the next task becomes visible"""
+        raise NotImplementedError("Subclasses must implement _claim()")
+
+    def _requeue(self, task_id: str, error: str, delay: float):
+        """Make a failed task visible again after delay seconds - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement _requeue()")
+
+    def _dead_letter(self, task_id: str, error: str):
+        """Stop delivering a task that ran out of attempts - to be implemented by subclasses"""
+        raise NotImplementedError("Subclasses must implement _dead_letter()")
+
+
+class SQLiteTaskQueue(DurableTaskQueue):
+    """
+    Durable queue in a local SQLite database in WAL mode
+
+    Several processes on the same host can share the file; claims run in a
+    write transaction (BEGIN IMMEDIATE) so each task is leased to one consumer.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata_task_queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                task_type TEXT NOT NULL,
+                connection_id TEXT NOT NULL,
+                params TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                lane INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                leased_by TEXT,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_metadata_task_queue_ready
+                ON metadata_task_queue(status, lane, seq);
+        """)
+
+    def put(self, task):
+        """
+        Persist a task in its priority lane
+
+        Args:
+            task: The MetadataTask to add
+        """
+        created_at = task.created_at if isinstance(task.created_at, str) else task.created_at.isoformat()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO metadata_task_queue "
+                "(id, task_type, connection_id, params, priority, lane, created_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (task.id, task.task_type, task.connection_id, json.dumps(task.params, default=str),
+                 task.priority, _lane(task.priority), created_at, time.time())
+            )
+        self._notify()
+
+    def raise_priority(self, task_id, priority):
+        if priority not in PRIORITY_LANES:
+            return False
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE metadata_task_queue SET priority = ?, lane = ? "
+                "WHERE id = ? AND status = 'queued' AND lane > ?",
+                (priority, _lane(priority), task_id, _lane(priority))
+            )
+        return cursor.rowcount > 0
+
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._connection.execute("""
+                        SELECT * FROM metadata_task_queue
+                        WHERE (status = 'queued' AND available_at <= ?)
+                           OR (status = 'leased' AND lease_until <= ?)
+                        ORDER BY lane, seq
+                        LIMIT 1
+                    """, (now, now)).fetchone()
+
+                    # A lease that expired on its last attempt means the consumer kept dying on it
+                    if row and row["status"] == "leased" and row["attempts"] >= self.max_attempts:
+                        self._connection.execute(
+                            "UPDATE metadata_task_queue SET status = 'dead', lease_until = NULL, "
+                            "last_error = ? WHERE seq = ?",
+                            ("Lease expired on final attempt", row["seq"])
+                        )
+                        continue
+                    break
+
+                if row:
+                    self._connection.execute(
+                        "UPDATE metadata_task_queue SET status = 'leased', attempts = attempts + 1, "
+                        "lease_until = ?, leased_by = ? WHERE seq = ?",
+                        (now + self.visibility_timeout, self.worker_id, row["seq"])
+                    )
+                    next_visible_in = None
+                else:
+                    upcoming = self._connection.execute("""
+                        SELECT MIN(CASE WHEN status = 'queued' THEN available_at ELSE lease_until END)
+                        FROM metadata_task_queue
+                        WHERE status IN ('queued', 'leased')
+                    """).fetchone()[0]
+                    next_visible_in = upcoming - now if upcoming is not None else None
+
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        if not row:
+            return None, next_visible_in
+
+        task = _task_from_row(dict(row))
+        task.attempts = row["attempts"] + 1
+        return task, None
+
+    def ack(self, task):
+        """Remove a successfully processed task"""
+        with self._lock:
+            self._connection.execute("DELETE FROM metadata_task_queue WHERE id = ?", (task.id,))
+
+    def extend_lease(self, task):
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE metadata_task_queue SET lease_until = ? "
+                "WHERE id = ? AND status = 'leased' AND leased_by = ?",
+                (time.time() + self.visibility_timeout, task.id, self.worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def _requeue(self, task_id, error, delay):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE metadata_task_queue SET status = 'queued', available_at = ?, lease_until = NULL, "
+                "leased_by = NULL, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, task_id)
+            )
+
+    def _dead_letter(self, task_id, error):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE metadata_task_queue SET status = 'dead', lease_until = NULL, leased_by = NULL, "
+                "last_error = ? WHERE id = ?",
+                (error, task_id)
+            )
+
+    def get_stats(self):
+        """Get queued task counts by priority, plus in-flight and dead-lettered counts"""
+        stats = {"high": 0, "medium": 0, "low": 0, "total": 0, "in_flight": 0, "dead": 0}
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, priority, COUNT(*) AS n FROM metadata_task_queue GROUP BY status, priority"
+            ).fetchall()
+
+        for row in rows:
+            if row["status"] == "queued":
+                priority = row["priority"] if row["priority"] in PRIORITY_LANES else "medium"
+                stats[priority] += row["n"]
+                stats["total"] += row["n"]
+            elif row["status"] == "leased":
+                stats["in_flight"] += row["n"]
+            elif row["status"] == "dead":
+                stats["dead"] += row["n"]
+        return stats
+
+    def pending_tasks(self):
+        """Queued and in-flight tasks, e.g. to resume tracking them after a restart"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT * FROM metadata_task_queue WHERE status IN ('queued', 'leased') ORDER BY lane, seq"
+            ).fetchall()
+        return [_task_from_row(dict(row)) for row in rows]
+
+    def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Dead-lettered tasks, newest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, task_type, connection_id, priority, attempts, last_error, created_at "
+                "FROM metadata_task_queue WHERE status = 'dead' ORDER BY seq DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_dead(self, task_id: str) -> bool:
+        """Give a dead-lettered task a fresh set of attempts"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE metadata_task_queue SET status = 'queued', attempts = 0, available_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (time.time(), task_id)
+            )
+        if cursor.rowcount:
+            self._notify()
+        return cursor.rowcount > 0
+
+
+class SupabaseTaskQueue(DurableTaskQueue):
+    """
+    Durable queue in the Postgres metadata_task_queue table
+
+    Claims go through the claim_metadata_task database function, which skips
+    rows locked by concurrent claims, so any number of instances can consume.
+    """
+
+    def __init__(self, supabase_manager, **kwargs):
+        super().__init__(**kwargs)
+        self.supabase = supabase_manager
+
+    def _table(self):
+        return self.supabase.supabase.table("metadata_task_queue")
+
+    def put(self, task):
+        created_at = task.created_at if isinstance(task.created_at, str) else task.created_at.isoformat()
+        self._table().insert({
+            "id": task.id,
+            "task_type": task.task_type,
+            "connection_id": task.connection_id,
+            "params": task.params,
+            "priority": task.priority,
+            "lane": _lane(task.priority),
+            "created_at": created_at,
+            "available_at": datetime.now(timezone.utc).isoformat()
+        }).execute()
+        self._notify()
+
+    def raise_priority(self, task_id, priority):
+        if priority not in PRIORITY_LANES:
+            return False
+        response = self._table().update({"priority": priority, "lane": _lane(priority)}) \
+            .eq("id", task_id) \
+            .eq("status", "queued") \
+            .gt("lane", _lane(priority)) \
+            .execute()
+        return bool(response.data)
+
+    def _claim(self):
+        response = self.supabase.supabase.rpc('claim_metadata_task', {
+            'p_worker_id': self.worker_id,
+            'p_lease_seconds': self.visibility_timeout,
+            'p_max_attempts': self.max_attempts
+        }).execute()
+
+        if not response.data:
+            return None, None
+        return _task_from_row(response.data[0]), None
+
+    def ack(self, task):
+        self._table().delete().eq("id", task.id).execute()
+
+    def extend_lease(self, task):
+        lease_until = datetime.fromtimestamp(time.time() + self.visibility_timeout, tz=timezone.utc).isoformat()
+        response = self._table().update({"lease_until": lease_until}) \
+            .eq("id", task.id) \
+            .eq("status", "leased") \
+            .eq("leased_by", self.worker_id) \
+            .execute()
+        return bool(response.data)
+
+    def _requeue(self, task_id, error, delay):
+        available_at = datetime.fromtimestamp(time.time() + delay, tz=timezone.utc).isoformat()
+        self._table().update({
+            "status": "queued",
+            "available_at": available_at,
+            "lease_until": None,
+            "leased_by": None,
+            "last_error": error
+        }).eq("id", task_id).execute()
+
+    def _dead_letter(self, task_id, error):
+        self._table().update({
+            "status": "dead",
+            "lease_until": None,
+            "leased_by": None,
+            "last_error": error
+        }).eq("id", task_id).execute()
+
+    def get_stats(self):
+        stats = {"high": 0, "medium": 0, "low": 0, "total": 0, "in_flight": 0, "dead": 0}
+        try:
+            response = self._table().select("status, priority").execute()
+            for row in response.data or []:
+                if row["status"] == "queued":
+                    priority = row["priority"] if row["priority"] in PRIORITY_LANES else "medium"
+                    stats[priority] += 1
+                    stats["total"] += 1
+                elif row["status"] == "leased":
+                    stats["in_flight"] += 1
+                elif row["status"] == "dead":
+                    stats["dead"] += 1
+        except Exception as e:
+            logger.error(f"Error getting durable queue stats: {str(e)}")
+        return stats
+
+    def pending_tasks(self):
+        response = self._table().select("*").in_("status", ["queued", "leased"]).order("lane").execute()
+        return [_task_from_row(row) for row in response.data or []]
+
+
+def create_task_queue(supabase_manager=None):
+    """
+    Create the metadata task queue selected by METADATA_QUEUE_BACKEND
+
+    sqlite (default) persists to METADATA_QUEUE_PATH, postgres uses the
+    metadata_task_queue table and memory keeps the non-durable PriorityTaskQueue.
+
+    Args:
+        supabase_manager: Required for the postgres backend
+
+    Returns:
+        A task queue for MetadataWorker
+    """
+    backend = os.getenv("METADATA_QUEUE_BACKEND", "sqlite").lower()
+
+    if backend == "memory":
+        return PriorityTaskQueue()
+
+    if backend == "postgres":
+        if not supabase_manager:
+            raise ValueError("supabase_manager is required for the postgres metadata queue")
+        return SupabaseTaskQueue(supabase_manager)
+
+    path = os.getenv("METADATA_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+    logger.info(f"Using durable metadata task queue at {path}")
+    return SQLiteTaskQueue(path)
@@ -1,3 +1,5 @@
+import heapq
+import itertools
 import logging
 import os
 import sys
@@ -5,13 +7,45 @@ import threading
 import time
 import traceback
 import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+class _DeadlineTimer:
+    """A single daemon thread that fires the timeouts of all pending completion callbacks"""
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay_seconds: float, fn: Callable[[], None]):
+        """Call fn once delay_seconds have passed"""
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay_seconds, next(self._sequence), fn))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="MetadataTaskDeadlines", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, fn = heapq.heappop(self._heap)
+
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Error firing task deadline: {str(e)}")
+
+
 class MetadataTaskManager:
     """Enhanced metadata task manager with automation integration"""
 
@@ -67,7 +101,8 @@ class MetadataTaskManager:
 
     def __init__(self, storage_service, supabase_manager=None):
         """Initialize the task manager"""
-        from .worker import PriorityTaskQueue, MetadataWorker
+        from .worker import MetadataWorker
+        from .durable_queue import create_task_queue
         from .connector_factory import ConnectorFactory
 
         self.storage_service = storage_service
@@ -76,8 +111,8 @@ class MetadataTaskManager:
         # Create connector factory
         self.connector_factory = ConnectorFactory(supabase_manager)
 
-        # Create task queue
-        self.task_queue = PriorityTaskQueue()
+        # Create task queue (durable unless METADATA_QUEUE_BACKEND=memory)
+        self.task_queue = create_task_queue(supabase_manager)
 
         # Create worker
         self.worker = MetadataWorker(
@@ -90,6 +125,17 @@ class MetadataTaskManager:
         # Override worker methods that need external dependencies
         self.worker._get_connection_details = self._get_connection_details
 
+        # Timeouts for on_task_complete callbacks
+        self.deadlines = _DeadlineTimer()
+
+        # "adaptive" refreshes each table on an interval learned from its change history
+        self.refresh_mode = os.getenv("METADATA_REFRESH_MODE", "fixed").lower()
+        self.adaptive_planner = None
+        if self.refresh_mode == "adaptive":
+            from .adaptive_refresh import AdaptiveRefreshPlanner
+            from .change_analytics import MetadataChangeAnalytics
+            self.adaptive_planner = AdaptiveRefreshPlanner.from_env(MetadataChangeAnalytics(supabase_manager))
+
         # Tasks by status (for lookup)
         self.pending_tasks = {}
         self.recent_tasks = {}
@@ -236,9 +282,73 @@ class MetadataTaskManager:
                 "error": str(e)
             }
 
+    def get_task_future(self, task_id: str):
+        """
+        Get a future that resolves when a task completes or fails
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            A concurrent.futures.Future resolved with the task's history entry,
+            or None if the task is unknown
+        """
+        return self.worker.get_completion_future(task_id)
+
+    def on_task_complete(self, task_id: str, callback: Callable[[Dict[str, Any]], None],
+                         timeout_minutes: Optional[float] = None) -> bool:
+        """
+        Call back once a task completes, fails or times out, without blocking a thread
+
+        The callback receives the same dictionary wait_for_task_completion_sync
+        returns and is called exactly once. It runs on the metadata worker thread
+        that finished the task, on the calling thread if the task already
+        finished, or on the shared deadline thread when the timeout passes first.
+
+        Args:
+            task_id: Task ID to follow
+            callback: Function called with the completion status
+            timeout_minutes: Give up waiting after this long (no timeout if None)
+
+        Returns:
+            True if the callback was registered, False if the task is unknown
+            (the callback is still called, with an error)
+        """
+        started = time.monotonic()
+        future = self.get_task_future(task_id)
+        if future is None:
+            self._invoke_completion_callback(task_id, callback, self._task_not_found())
+            return False
+
+        lock = threading.Lock()
+        state = {"fired": False}
+
+        def fire(completion):
+            # Whichever of completion and timeout comes first wins
+            with lock:
+                if state["fired"]:
+                    return
+                state["fired"] = True
+            self._invoke_completion_callback(task_id, callback, completion)
+
+        future.add_done_callback(
+            lambda done: fire(self._completion_from_entry(done.result(), time.monotonic() - started))
+        )
+
+        if timeout_minutes is not None and not state["fired"]:
+            self.deadlines.schedule(
+                timeout_minutes * 60,
+                lambda: fire(self._task_timed_out(task_id, timeout_minutes, time.monotonic() - started))
+            )
+
+        return True
+
     def wait_for_task_completion_sync(self, task_id: str, timeout_minutes: int = 30) -> Dict[str, Any]:
         """
-        Synchronously wait for a task to complete (for automation use)
+        Synchronously wait for a task to complete
+
+        Blocks the calling thread on the task's completion future. Automation
+        jobs should prefer on_task_complete, which does not hold a thread.
 
         Args:
             task_id: Task ID to wait for
@@ -247,67 +357,20 @@ class MetadataTaskManager:
         Returns:
             Task completion status and results
         """
+        started = time.monotonic()
         try:
-            timeout_seconds = timeout_minutes * 60
-            poll_interval = 2  # Check every 2 seconds
-            elapsed = 0
+            future = self.get_task_future(task_id)
+            if future is None:
+                return self._task_not_found()
 
             logger.info(f"Waiting for task {task_id} to complete (timeout: {timeout_minutes}m)")
 
-            while elapsed < timeout_seconds:
-                task_status = self.get_task_status(task_id)
-
-                if "error" in task_status:
-                    # Check if error is "Task not found" - might still be processing
-                    if "Task not found" in str(task_status.get("error", "")):
-                        logger.debug(f"Task {task_id} not yet in history, continuing to wait...")
-                    else:
-                        return {
-                            "completed": False,
-                            "success": False,
-                            "error": task_status.get("error"),
-                            "elapsed_seconds": elapsed
-                        }
+            try:
+                entry = future.result(timeout=timeout_minutes * 60)
+            except FutureTimeoutError:
+                return self._task_timed_out(task_id, timeout_minutes, time.monotonic() - started)
 
-                else:
-                    task_info = task_status.get("task", {})
-                    status = task_info.get("status", "unknown")
-
-                    if status == "completed":
-                        return {
-                            "completed": True,
-                            "success": True,
-                            "result": task_status.get("result"),
-                            "elapsed_seconds": elapsed,
-                            "task_info": task_info
-                        }
-                    elif status == "failed":
-                        return {
-                            "completed": True,
-                            "success": False,
-                            "error": task_info.get("error", "Task failed"),
-                            "elapsed_seconds": elapsed,
-                            "task_info": task_info
-                        }
-
-                # Task still running or not found yet, wait
-                time.sleep(poll_interval)
-                elapsed += poll_interval
-
-                # Log progress every 30 seconds
-                if elapsed % 30 == 0:
-                    logger.info(
-                        f"Task {task_id} still waiting after {elapsed}s (status: {status if 'status' in locals() else 'unknown'})")
-
-            # Timeout reached
-            logger.warning(f"Task {task_id} did not complete within {timeout_minutes} minutes")
-            return {
-                "completed": False,
-                "success": False,
-                "error": f"Task timeout after {timeout_minutes} minutes",
-                "elapsed_seconds": elapsed,
-                "final_status": status if 'status' in locals() else "unknown"
-            }
+            return self._completion_from_entry(entry, time.monotonic() - started)
 
         except Exception as e:
             logger.error(f"Error waiting for task completion: {str(e)}")
@@ -315,12 +378,66 @@ class MetadataTaskManager:
                 "completed": False,
                 "success": False,
                 "error": str(e),
-                "elapsed_seconds": elapsed if 'elapsed' in locals() else 0
+                "elapsed_seconds": int(time.monotonic() - started)
             }
 
+    @staticmethod
+    def _completion_from_entry(entry: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        """Build the completion status for a finished task's history entry"""
+        task_info = entry.get("task", {})
+
+        if task_info.get("status") == "completed":
+            return {
+                "completed": True,
+                "success": True,
+                "result": entry.get("result"),
+                "elapsed_seconds": int(elapsed),
+                "task_info": task_info
+            }
+
+        return {
+            "completed": True,
+            "success": False,
+            "error": entry.get("error") or "Task failed",
+            "elapsed_seconds": int(elapsed),
+            "task_info": task_info
+        }
+
+    @staticmethod
+    def _task_timed_out(task_id: str, timeout_minutes: float, elapsed: float) -> Dict[str, Any]:
+        logger.warning(f"Task {task_id} did not complete within {timeout_minutes} minutes")
+        return {
+            "completed": False,
+            "success": False,
+            "error": f"Task timeout after {timeout_minutes} minutes",
+            "elapsed_seconds": int(elapsed),
+            "final_status": "unknown"
+        }
+
+    @staticmethod
+    def _task_not_found() -> Dict[str, Any]:
+        return {
+            "completed": False,
+            "success": False,
+            "error": "Task not found",
+            "elapsed_seconds": 0
+        }
+
+    @staticmethod
+    def _invoke_completion_callback(task_id: str, callback, completion: Dict[str, Any]):
+        try:
+            callback(completion)
+        except Exception as e:
+            logger.error(f"Error in completion callback for task {task_id}: {str(e)}")
+
     # Keep all existing methods and add automation enhancements
     def submit_collection_task(self, connection_id, params=None, priority="medium"):
-        """Submit a comprehensive metadata collection task"""
+        """
+        Submit a comprehensive metadata collection task
+
+        Like the other submit_* methods this is single-flight: a request whose
+        work is already queued or running returns the existing task ID.
+        """
         return self.worker.submit_task("full_collection", connection_id, params or {}, priority)
 
     def submit_table_metadata_task(self, connection_id, table_name, priority="medium"):
@@ -333,6 +450,19 @@ class MetadataTaskManager:
         params = {"table_name": table_name}
         return self.worker.submit_task("refresh_statistics", connection_id, params, priority)
 
+    def submit_tables_refresh_task(self, connection_id, table_names, refresh_interval_hours=None, priority="low"):
+        """
+        Submit a task that re-checks specific tables and merges them into stored metadata
+
+        Args:
+            connection_id: Connection ID
+            table_names: Tables to re-check
+            refresh_interval_hours: Interval each table was scheduled with, recorded in change analytics
+            priority: Task priority
+        """
+        params = {"table_names": list(table_names), "refresh_interval_hours": refresh_interval_hours or {}}
+        return self.worker.submit_task("refresh_tables", connection_id, params, priority)
+
     def submit_usage_update_task(self, connection_id, table_name, priority="low"):
         """Submit a task to update usage patterns for a specific table"""
         params = {"table_name": table_name}
@@ -346,6 +476,10 @@ class MetadataTaskManager:
         """Get worker statistics"""
         return self.worker.get_stats()
 
+    def get_pending_tasks(self):
+        """Tasks queued or in flight, including those recovered after a restart"""
+        return self.task_queue.pending_tasks()
+
     def get_recent_tasks(self, limit=10):
         """Get recent tasks"""
         return self.worker.get_task_history(limit)
@@ -516,6 +650,41 @@ class MetadataTaskManager:
 
         return None
 
+    def schedule_adaptive_refresh(self, connection_id):
+        """
+        Submit a refresh for the connection's tables that are due on their adaptive intervals
+
+        Connections without stored metadata get a full collection first.
+
+        Returns:
+            The submitted task ID, or None if nothing is due
+        """
+        stored_tables = self.storage_service.get_metadata(connection_id, "tables")
+        if not stored_tables or not stored_tables.get("metadata", {}).get("tables"):
+            return self.schedule_refresh_if_needed(connection_id, "tables", 24)
+
+        tables = [table["name"] if isinstance(table, dict) else table
+                  for table in stored_tables["metadata"]["tables"]]
+
+        last_refreshed = None
+        if stored_tables.get("collected_at"):
+            last_refreshed = datetime.fromisoformat(stored_tables["collected_at"].replace('Z', '+00:00')).timestamp()
+
+        self.adaptive_planner.sync_tables(connection_id, tables, last_refreshed)
+        due = self.adaptive_planner.due_tables(connection_id)
+        if not due:
+            return None
+
+        intervals = self.adaptive_planner.mark_scheduled(connection_id, due)
+        logger.info(f"Adaptive refresh of {len(due)} of {len(tables)} tables for connection {connection_id}")
+        return self.submit_tables_refresh_task(connection_id, due, intervals)
+
+    def get_adaptive_refresh_schedule(self, connection_id: str) -> Dict[str, Dict[str, Any]]:
+        """Per-table intervals and next due times (empty unless METADATA_REFRESH_MODE=adaptive)"""
+        if not self.adaptive_planner:
+            return {}
+        return self.adaptive_planner.get_schedule(connection_id)
+
     def get_metadata_collection_status(self, connection_id: str) -> Dict[str, Any]:
         """Get status of metadata collection for automation system"""
         try:
@@ -605,11 +774,15 @@ class MetadataTaskManager:
                     for connection in connections:
                         connection_id = connection.get("id")
                         try:
-                            # Check tables metadata (refresh if older than 1 day)
-                            self.schedule_refresh_if_needed(connection_id, "tables", 24)
+                            if self.adaptive_planner:
+                                # Refresh the tables that are due on their own intervals
+                                self.schedule_adaptive_refresh(connection_id)
+                            else:
+                                # Check tables metadata (refresh if older than 1 day)
+                                self.schedule_refresh_if_needed(connection_id, "tables", 24)
 
-                            # Check statistics metadata (refresh if older than 3 days)
-                            self.schedule_refresh_if_needed(connection_id, "statistics", 72)
+                                # Check statistics metadata (refresh if older than 3 days)
+                                self.schedule_refresh_if_needed(connection_id, "statistics", 72)
 
                             # Run schema change detection if it's time and detector is available
                             if (schema_detector and
@@ -654,8 +827,11 @@ class MetadataTaskManager:
                 # Reset error counter on success
                 consecutive_errors = 0
 
-                # Sleep for a while before next check (1 hour)
-                time.sleep(3600)
+                # Sleep for a while before next check (1 hour, or the shortest adaptive interval)
+                if self.adaptive_planner:
+                    time.sleep(min(3600, self.adaptive_planner.min_interval_hours * 3600))
+                else:
+                    time.sleep(3600)
 
             except Exception as e:
                 consecutive_errors += 1
@@ -4,6 +4,8 @@ import traceback
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Tuple, Optional
 
+from ..utils.resource_governor import resource_governor
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +39,34 @@ class SchemaChangeDetector:
                 return [], False
 
             # Get previous schema from metadata storage
-            previous_schema = self._get_previous_schema(connection_id)
+            previous_schema = self.get_previous_schema(connection_id)
+
+            return self.detect_changes_from_snapshot(connection_id, current_schema, previous_schema,
+                                                     supabase_manager)
+
+        except Exception as e:
+            logger.error(f"Error in schema change detection for connection {connection_id}: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return [], False
+
+    def detect_changes_from_snapshot(self, connection_id: str, current_schema: Dict,
+                                     previous_schema: Optional[Dict], supabase_manager) -> Tuple[List[Dict], bool]:
+        """
+        Compare an already collected schema with the previous one and store the changes
+
+        Lets a caller that has just read the warehouse schema (such as the
+        connection pipeline) detect changes without querying the warehouse again.
+
+        Args:
+            connection_id: Connection the schemas belong to
+            current_schema: Schema in the format returned by _get_current_schema
+            previous_schema: Schema from get_previous_schema, or None for a first run
+            supabase_manager: Used to store the changes or the baseline
+
+        Returns:
+            Tuple of (changes_list, important_changes_detected)
+        """
+        try:
             if not previous_schema:
                 logger.info(f"No previous schema found for connection {connection_id}, treating as baseline")
                 # Store current schema as baseline
@@ -77,50 +106,51 @@ class SchemaChangeDetector:
                 logger.error(f"Connection {connection_id} not found")
                 return None
 
-            # Create connector
-            connector = connector_factory.create_connector(connection)
+            with resource_governor.slot(connection_id, connection.get("organization_id"), "schema_detection"):
+                # Create connector
+                connector = connector_factory.create_connector(connection)
 
-            # Get current schema
-            current_schema = {}
+                # Get current schema
+                current_schema = {}
 
-            # Get tables
-            tables = connector.get_tables()
-            logger.info(f"Found {len(tables)} tables in current schema")
+                # Get tables
+                tables = connector.get_tables()
+                logger.info(f"Found {len(tables)} tables in current schema")
 
-            for table_name in tables:
-                try:
-                    # Get columns
-                    columns = connector.get_columns(table_name)
-
-                    # Get primary keys
-                    primary_keys = connector.get_primary_keys(table_name)
+                for table_name in tables:
+                    try:
+                        # Get columns
+                        columns = connector.get_columns(table_name)
 
-                    # Store table info
-                    current_schema[table_name] = {
-                        "columns": columns,
-                        "primary_keys": primary_keys,
-                        "column_count": len(columns)
-                    }
+                        # Get primary keys
+                        primary_keys = connector.get_primary_keys(table_name)
 
-                    # Try to get foreign keys (if supported)
-                    try:
-                        if hasattr(connector.inspector, 'get_foreign_keys'):
-                            foreign_keys = connector.inspector.get_foreign_keys(table_name)
-                            current_schema[table_name]["foreign_keys"] = foreign_keys
-                    except Exception:
-                        current_schema[table_name]["foreign_keys"] = []
+                        # Store table info
+                        current_schema[table_name] = {
+                            "columns": columns,
+                            "primary_keys": primary_keys,
+                            "column_count": len(columns)
+                        }
 
-                    # Try to get indexes (if supported)
-                    try:
-                        if hasattr(connector.inspector, 'get_indexes'):
-                            indexes = connector.inspector.get_indexes(table_name)
-                            current_schema[table_name]["indexes"] = indexes
-                    except Exception:
-                        current_schema[table_name]["indexes"] = []
-
-                except Exception as e:
-                    logger.warning(f"Error getting details for table {table_name}: {str(e)}")
-                    continue
+                        # Try to get foreign keys (if supported)
+                        try:
+                            if hasattr(connector.inspector, 'get_foreign_keys'):
+                                foreign_keys = connector.inspector.get_foreign_keys(table_name)
+                                current_schema[table_name]["foreign_keys"] = foreign_keys
+                        except Exception:
+                            current_schema[table_name]["foreign_keys"] = []
+
+                        # Try to get indexes (if supported)
+                        try:
+                            if hasattr(connector.inspector, 'get_indexes'):
+                                indexes = connector.inspector.get_indexes(table_name)
+                                current_schema[table_name]["indexes"] = indexes
+                        except Exception:
+                            current_schema[table_name]["indexes"] = []
+
+                    except Exception as e:
+                        logger.warning(f"Error getting details for table {table_name}: {str(e)}")
+                        continue
 
             logger.info(f"Successfully retrieved current schema with {len(current_schema)} tables")
             return current_schema
@@ -129,7 +159,7 @@ class SchemaChangeDetector:
             logger.error(f"Error getting current schema: {str(e)}")
             return None
 
-    def _get_previous_schema(self, connection_id: str) -> Optional[Dict]:
+    def get_previous_schema(self, connection_id: str) -> Optional[Dict]:
         """Get previous schema from metadata storage"""
         try:
             if not self.storage_service:
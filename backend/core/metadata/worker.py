@@ -1,14 +1,36 @@
+import heapq
+import itertools
 import logging
 import time
 import threading
 import queue
 import uuid
+from concurrent.futures import Future
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
 
+from ..utils.resource_governor import resource_governor
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Table statistics older than this are re-collected by refresh_tables even if the table did not change
+STATISTICS_MAX_AGE_HOURS = 72
+
+
+def _statistics_stale(table_stats, now, max_age_hours=STATISTICS_MAX_AGE_HOURS):
+    """Whether stored table statistics are missing a timestamp or older than max_age_hours"""
+    collected_at = table_stats.get("collected_at") if isinstance(table_stats, dict) else None
+    if not collected_at:
+        return True
+    try:
+        collected = datetime.fromisoformat(collected_at.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return True
+    if collected.tzinfo is None:
+        collected = collected.replace(tzinfo=timezone.utc)
+    return now - collected > timedelta(hours=max_age_hours)
+
 
 class MetadataTask:
     """Represents a metadata collection task"""
@@ -32,6 +54,7 @@ class MetadataTask:
         self.status = "pending"
         self.result = None
         self.error = None
+        self.attempts = 0
 
     def to_dict(self):
         """Convert task to dictionary"""
@@ -62,14 +85,40 @@ class MetadataTask:
 
 
 class PriorityTaskQueue:
-    """Queue for metadata tasks with priority handling"""
+    """
+    Queue for metadata tasks with priority handling
+
+    Tasks are ordered by priority, then by arrival (FIFO within a priority).
+    Waiting tasks age: every aging_seconds spent in the queue is worth one
+    priority level, so low-priority work cannot starve behind a steady stream
+    of high-priority tasks. Connections that already have
+    max_in_flight_per_connection tasks running are passed over while tasks of
+    other connections are waiting, so one connection cannot occupy every worker.
+    Idle consumers block on a condition variable and wake as soon as a task is put.
+    """
+
+    PRIORITY_RANKS = {"high": 0, "medium": 1, "low": 2}
 
-    def __init__(self):
-        """Initialize the priority queue"""
-        # Use three separate queues for different priorities
-        self.high_priority = queue.Queue()
-        self.medium_priority = queue.Queue()
-        self.low_priority = queue.Queue()
+    def __init__(self, aging_seconds=300, max_in_flight_per_connection=1):
+        """
+        Initialize the priority queue
+
+        Args:
+            aging_seconds: Waiting time that promotes a task by one priority level
+            max_in_flight_per_connection: Running tasks per connection before its
+                other tasks yield to those of other connections
+        """
+        self.aging_seconds = aging_seconds
+        self.max_in_flight_per_connection = max_in_flight_per_connection
+
+        # connection_id -> heap of (key, seq, task); key = rank * aging_seconds + enqueue time
+        self._tasks = {}
+        # Heap of (key, seq, connection_id) for the head task of each connection below its cap;
+        # entries whose task is no longer the connection's head are skipped when popped
+        self._ready = []
+        # Connections with queued tasks that are at their in-flight cap
+        self._saturated = set()
+        self._sequence = itertools.count()
 
         # Task counts
         self.counts = {
@@ -77,9 +126,31 @@ class PriorityTaskQueue:
             "medium": 0,
             "low": 0
         }
+        self.in_flight = {}  # connection_id -> tasks handed out and not yet acked
 
         # Lock for thread safety
         self.lock = threading.RLock()
+        self.not_empty = threading.Condition(self.lock)
+
+    def _priority(self, task):
+        return task.priority if task.priority in self.PRIORITY_RANKS else "medium"
+
+    def _is_saturated(self, connection_id):
+        return self.in_flight.get(connection_id, 0) >= self.max_in_flight_per_connection
+
+    def _schedule_head(self, connection_id):
+        """Make a connection's head task selectable, or park the connection if it is at its cap"""
+        heap = self._tasks.get(connection_id)
+        if not heap:
+            self._saturated.discard(connection_id)
+            return
+
+        if self._is_saturated(connection_id):
+            self._saturated.add(connection_id)
+        else:
+            self._saturated.discard(connection_id)
+            key, seq, _ = heap[0]
+            heapq.heappush(self._ready, (key, seq, connection_id))
 
     def put(self, task):
         """
@@ -88,16 +159,45 @@ class PriorityTaskQueue:
         Args:
             task: The MetadataTask to add
         """
-        with self.lock:
-            if task.priority == "high":
-                self.high_priority.put(task)
-                self.counts["high"] += 1
-            elif task.priority == "low":
-                self.low_priority.put(task)
-                self.counts["low"] += 1
-            else:  # Default to medium
-                self.medium_priority.put(task)
-                self.counts["medium"] += 1
+        priority = self._priority(task)
+        key = self.PRIORITY_RANKS[priority] * self.aging_seconds + time.monotonic()
+
+        with self.not_empty:
+            heap = self._tasks.setdefault(task.connection_id, [])
+            entry = (key, next(self._sequence), task)
+            heapq.heappush(heap, entry)
+            self.counts[priority] += 1
+
+            if heap[0] is entry:
+                self._schedule_head(task.connection_id)
+
+            self.not_empty.notify()
+
+    def _pop(self):
+        """Take the best task, preferring connections below their in-flight cap"""
+        connection_id = None
+
+        while self._ready:
+            _, seq, candidate = heapq.heappop(self._ready)
+            heap = self._tasks.get(candidate)
+            if heap and heap[0][1] == seq and not self._is_saturated(candidate):
+                connection_id = candidate
+                break
+
+        if connection_id is None:
+            if not self._saturated:
+                return None
+            # Only capped connections have work: run it rather than leave a worker idle
+            connection_id = min(self._saturated, key=lambda c: self._tasks[c][0][:2])
+
+        _, _, task = heapq.heappop(self._tasks[connection_id])
+        if not self._tasks[connection_id]:
+            del self._tasks[connection_id]
+
+        self.counts[self._priority(task)] -= 1
+        self.in_flight[connection_id] = self.in_flight.get(connection_id, 0) + 1
+        self._schedule_head(connection_id)
+        return task
 
     def get(self, block=True, timeout=None):
         """
@@ -111,117 +211,110 @@ class PriorityTaskQueue:
             The next MetadataTask or None if timeout
         """
         try:
-            with self.lock:
-                # Try high priority first
-                if not self.high_priority.empty():
-                    task = self.high_priority.get(False)
-                    self.counts["high"] -= 1
-                    return task
-
-                # Then medium priority
-                if not self.medium_priority.empty():
-                    task = self.medium_priority.get(False)
-                    self.counts["medium"] -= 1
-                    return task
-
-                # Finally low priority
-                if not self.low_priority.empty():
-                    task = self.low_priority.get(False)
-                    self.counts["low"] -= 1
-                    return task
-
-            # If all queues are empty and we should block
-            if block:
-                # Wait for any queue to have an item
-                if timeout:
-                    end_time = time.time() + timeout
-                    while time.time() < end_time:
-                        # Check each queue
-                        with self.lock:
-                            if not self.high_priority.empty():
-                                task = self.high_priority.get(False)
-                                self.counts["high"] -= 1
-                                return task
-                            if not self.medium_priority.empty():
-                                task = self.medium_priority.get(False)
-                                self.counts["medium"] -= 1
-                                return task
-                            if not self.low_priority.empty():
-                                task = self.low_priority.get(False)
-                                self.counts["low"] -= 1
-                                return task
-                        # Sleep a bit before checking again
-                        time.sleep(0.1)
-                    # Timeout reached
-                    return None
-                else:
-                    # Wait indefinitely
-                    while True:
-                        with self.lock:
-                            if not self.high_priority.empty():
-                                task = self.high_priority.get(False)
-                                self.counts["high"] -= 1
-                                return task
-                            if not self.medium_priority.empty():
-                                task = self.medium_priority.get(False)
-                                self.counts["medium"] -= 1
-                                return task
-                            if not self.low_priority.empty():
-                                task = self.low_priority.get(False)
-                                self.counts["low"] -= 1
-                                return task
-                        time.sleep(0.1)
-
-            # If we shouldn't block, return None
-            return None
+            with self.not_empty:
+                if not block:
+                    return self._pop()
+
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while True:
+                    task = self._pop()
+                    if task:
+                        return task
+
+                    if deadline is None:
+                        self.not_empty.wait()
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return None
+                        self.not_empty.wait(remaining)
         except Exception as e:
             logger.error(f"Error getting task from queue: {str(e)}")
             return None
 
-    def task_done(self, priority="medium"):
-        """Mark a task as done"""
-        if priority == "high":
-            self.high_priority.task_done()
-        elif priority == "low":
-            self.low_priority.task_done()
-        else:
-            self.medium_priority.task_done()
+    def raise_priority(self, task_id, priority):
+        """
+        Move a queued task up to a higher priority, keeping the time it has already waited
 
-    def get_stats(self):
-        """Get worker statistics"""
+        Args:
+            task_id: ID of the queued task
+            priority: New priority; ignored unless higher than the current one
+
+        Returns:
+            True if the task was promoted
+        """
+        if priority not in self.PRIORITY_RANKS:
+            return False
+
+        with self.not_empty:
+            for connection_id, heap in self._tasks.items():
+                for index, (key, _, task) in enumerate(heap):
+                    if task.id != task_id:
+                        continue
+
+                    current = self._priority(task)
+                    if self.PRIORITY_RANKS[priority] >= self.PRIORITY_RANKS[current]:
+                        return False
+
+                    enqueued_at = key - self.PRIORITY_RANKS[current] * self.aging_seconds
+                    # A fresh sequence number invalidates the connection's stale _ready entry
+                    heap[index] = (self.PRIORITY_RANKS[priority] * self.aging_seconds + enqueued_at,
+                                   next(self._sequence), task)
+                    heapq.heapify(heap)
+
+                    self.counts[current] -= 1
+                    self.counts[priority] += 1
+                    task.priority = priority
+
+                    self._schedule_head(connection_id)
+                    self.not_empty.notify()
+                    return True
+
+        return False
+
+    def _release(self, task):
+        """A handed-out task finished: free its connection's slot"""
         with self.lock:
-            stats = self.stats.copy()
+            remaining = self.in_flight.get(task.connection_id, 0) - 1
+            if remaining > 0:
+                self.in_flight[task.connection_id] = remaining
+            else:
+                self.in_flight.pop(task.connection_id, None)
 
-            # Add queue stats
-            stats["queue"] = self.task_queue.get_stats()
+            if task.connection_id in self._saturated:
+                self._schedule_head(task.connection_id)
 
-            # Calculate uptime - FIX: Check if start_time is string or datetime
-            if stats["start_time"]:
-                try:
-                    # Parse start_time if it's a string
-                    if isinstance(stats["start_time"], str):
-                        start_time = datetime.fromisoformat(stats["start_time"].replace('Z', '+00:00'))
-                    else:
-                        start_time = stats["start_time"]
+    def task_done(self, priority="medium"):
+        """Kept for compatibility; connection slots are released by ack/nack"""
+        pass
 
-                    # Calculate uptime
-                    uptime = datetime.now(timezone.utc) - start_time
-                    stats["uptime_seconds"] = uptime.total_seconds()
-                except Exception as e:
-                    logger.warning(f"Could not calculate uptime: {str(e)}")
-                    stats["uptime_seconds"] = 0
+    def ack(self, task):
+        """Acknowledge a processed task (nothing to persist for the in-memory queue)"""
+        self._release(task)
 
-            # Add active workers
-            stats["active_workers"] = len(self.workers)
+    def nack(self, task, error):
+        """Record a failed task; the in-memory queue does not retry"""
+        self._release(task)
+        return False
+
+    def pending_tasks(self):
+        """Tasks still waiting in the queue"""
+        with self.lock:
+            entries = [entry for heap in self._tasks.values() for entry in heap]
+            return [task for _, _, task in sorted(entries, key=lambda entry: entry[:2])]
 
+    def get_stats(self):
+        """Get queued task counts by priority"""
+        with self.lock:
+            stats = self.counts.copy()
+            stats["total"] = sum(self.counts.values())
+            stats["in_flight"] = sum(self.in_flight.values())
             return stats
 
     def empty(self):
-        """Check if all queues are empty"""
+        """Check if no tasks are queued"""
         with self.lock:
-            return (self.high_priority.empty() and
-                    self.medium_priority.empty() and
-                    self.low_priority.empty())
+            return not self._tasks
 
 
 class MetadataWorker:
@@ -245,12 +338,17 @@ class MetadataWorker:
         self.active = False
         self.task_history = {}  # Store recent task results
         self.max_history = 100  # Maximum number of tasks to keep in history
+        self.completion_futures = {}  # task_id -> Future resolved with the history entry
+        # (task_type, connection_id, table_name) -> queued or running tasks, for single-flight submits
+        self.in_flight = {}
 
         # Stats
         self.stats = {
             "tasks_processed": 0,
             "tasks_succeeded": 0,
             "tasks_failed": 0,
+            "tasks_retried": 0,
+            "tasks_coalesced": 0,
             "start_time": None
         }
 
@@ -267,6 +365,13 @@ class MetadataWorker:
             self.active = True
             self.stats["start_time"] = datetime.now(timezone.utc).isoformat()
 
+            # Tasks recovered from a durable queue can be followed (and joined) like newly submitted ones
+            for task in self.task_queue.pending_tasks():
+                self.completion_futures.setdefault(task.id, Future())
+                key = self._flight_key(task)
+                if all(t.id != task.id for t in self.in_flight.get(key, [])):
+                    self.in_flight.setdefault(key, []).append(task)
+
             # Start worker threads
             for i in range(self.max_workers):
                 worker = threading.Thread(
@@ -311,12 +416,17 @@ class MetadataWorker:
                     task.status = "processing"
 
                     try:
-                        # Process the task
-                        result = self._process_task(task)
+                        # Process the task, keeping a durable queue's lease alive while it runs
+                        stop_heartbeat = self._start_lease_heartbeat(task)
+                        try:
+                            result = self._process_task(task)
+                        finally:
+                            stop_heartbeat()
 
                         # Update task with result
                         task.status = "completed"
                         task.result = result
+                        self.task_queue.ack(task)
 
                         # Add to history
                         self._add_to_history(task)
@@ -329,6 +439,15 @@ class MetadataWorker:
                         logger.info(f"Task {task.id} completed successfully")
 
                     except Exception as e:
+                        logger.error(f"Error processing task {task.id}: {str(e)}")
+
+                        # Durable queues redeliver the task later; it only fails once retries run out
+                        if self.task_queue.nack(task, str(e)):
+                            task.status = "pending"
+                            with self.lock:
+                                self.stats["tasks_retried"] += 1
+                            continue
+
                         # Update task with error
                         task.status = "failed"
                         task.error = str(e)
@@ -341,8 +460,6 @@ class MetadataWorker:
                             self.stats["tasks_processed"] += 1
                             self.stats["tasks_failed"] += 1
 
-                        logger.error(f"Error processing task {task.id}: {str(e)}")
-
                     finally:
                         # Mark task as done
                         self.task_queue.task_done(task.priority)
@@ -357,6 +474,37 @@ class MetadataWorker:
 
         logger.info(f"Stopping metadata worker thread: {threading.current_thread().name}")
 
+    def _start_lease_heartbeat(self, task):
+        """
+        Periodically extend the task's lease on queues that have one
+
+        Returns:
+            A function that stops the heartbeat
+        """
+        interval = getattr(self.task_queue, "heartbeat_interval", None)
+        if not interval:
+            return lambda: None
+
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(interval):
+                try:
+                    if not self.task_queue.extend_lease(task):
+                        logger.warning(f"Lease on task {task.id} was lost; it may be redelivered")
+                        return
+                except Exception as e:
+                    logger.error(f"Error extending lease on task {task.id}: {str(e)}")
+
+        thread = threading.Thread(target=heartbeat, name=f"lease-{task.id}", daemon=True)
+        thread.start()
+
+        def stop():
+            stopped.set()
+            thread.join(timeout=5)
+
+        return stop
+
     def _process_task(self, task):
         """
         Process a metadata task
@@ -369,7 +517,14 @@ class MetadataWorker:
         """
         # Get connection details
         connection = self._get_connection_details(task.connection_id)
+        organization_id = connection.get("organization_id") if isinstance(connection, dict) else None
+
+        # Hold one of the connection's query slots while collecting
+        with resource_governor.slot(task.connection_id, organization_id, "metadata"):
+            return self._collect_for_task(task, connection)
 
+    def _collect_for_task(self, task, connection):
+        """Run a metadata task against its connection"""
         # Create connector
         connector = self.connector_factory.create_connector(connection)
 
@@ -426,6 +581,11 @@ class MetadataWorker:
                 "columns_analyzed": len(stats)
             }
 
+        elif task.task_type == "refresh_tables":
+            # Re-check specific tables on their adaptive intervals
+            organization_id = connection.get("organization_id") if isinstance(connection, dict) else None
+            return self._refresh_tables(task, collector, organization_id)
+
         elif task.task_type == "update_usage":
             # Update usage patterns
             table_name = task.params.get("table_name")
@@ -541,6 +701,130 @@ class MetadataWorker:
             # Store new statistics
             self.storage_service.store_statistics_metadata(connection_id, stats_by_table)
 
+    def _refresh_tables(self, task, collector, organization_id=None):
+        """
+        Re-collect a set of tables, record whether each changed, and merge them into stored metadata
+
+        The stored snapshot keeps every other table as it was, except tables
+        that no longer exist in the warehouse. Statistics are re-collected for
+        tables that changed and for any stored table whose statistics are older
+        than STATISTICS_MAX_AGE_HOURS, since in-place updates change values
+        without changing columns or row counts.
+
+        Args:
+            task: refresh_tables task; params carry table_names and the
+                refresh_interval_hours each table was scheduled with
+            collector: MetadataCollector for the task's connection
+            organization_id: Owner of the connection, for change analytics
+
+        Returns:
+            Counts of refreshed, changed and removed tables
+        """
+        connection_id = task.connection_id
+        table_names = task.params.get("table_names") or []
+        intervals = task.params.get("refresh_interval_hours") or {}
+
+        stored_tables = self.storage_service.get_metadata(connection_id, "tables")
+        stored_columns = self.storage_service.get_metadata(connection_id, "columns")
+        stored_statistics = self.storage_service.get_metadata(connection_id, "statistics")
+
+        tables_by_name = {}
+        for table in (stored_tables or {}).get("metadata", {}).get("tables", []):
+            table = {"name": table} if isinstance(table, str) else table
+            tables_by_name[table["name"]] = table
+        columns_by_table = dict((stored_columns or {}).get("metadata", {}).get("columns_by_table", {}))
+        statistics_by_table = dict((stored_statistics or {}).get("metadata", {}).get("statistics_by_table", {}))
+
+        # The table list is one cheap query and keeps the snapshot's table set current
+        warehouse_tables = collector.collect_table_list()
+        removed = [name for name in tables_by_name if warehouse_tables and name not in warehouse_tables]
+        statistics_removed = False
+        for name in removed:
+            tables_by_name.pop(name, None)
+            columns_by_table.pop(name, None)
+            statistics_removed = statistics_by_table.pop(name, None) is not None or statistics_removed
+
+        refreshed, changed, statistics_refreshed = 0, [], []
+        for table_name in table_names:
+            if warehouse_tables and table_name not in warehouse_tables:
+                continue
+
+            metadata = collector.collect_table_metadata_sync(table_name)
+            if metadata.get("error"):
+                logger.warning(f"Skipping {table_name}: {metadata['error']}")
+                continue
+            refreshed += 1
+
+            previous = None
+            if table_name in columns_by_table:
+                stored = tables_by_name.get(table_name, {})
+                previous = {
+                    "columns": columns_by_table[table_name],
+                    "column_count": len(columns_by_table[table_name]),
+                    # Snapshots from full collections carry no row count; unknown is not a change
+                    "row_count": stored.get("row_count", metadata.get("row_count"))
+                }
+            changes = self._compare_metadata(metadata, previous)
+
+            self._record_changes(connection_id, "table_metadata", table_name, changes,
+                                 refresh_interval_hours=intervals.get(table_name, 24),
+                                 organization_id=organization_id)
+
+            primary_keys = metadata.get("primary_keys", [])
+            columns = [{**column, "primary_key": column["name"] in primary_keys} for column in metadata["columns"]]
+            tables_by_name[table_name] = {
+                **tables_by_name.get(table_name, {}),
+                "name": table_name,
+                "column_count": metadata["column_count"],
+                "row_count": metadata.get("row_count"),
+                "primary_key": primary_keys
+            }
+            columns_by_table[table_name] = columns
+
+            if changes:
+                changed.append(table_name)
+                if self._collect_statistics(collector, table_name, metadata["columns"], primary_keys,
+                                            statistics_by_table):
+                    statistics_refreshed.append(table_name)
+
+        now = datetime.now(timezone.utc)
+        stale = [name for name, table_stats in statistics_by_table.items()
+                 if name not in statistics_refreshed and name in columns_by_table
+                 and (not warehouse_tables or name in warehouse_tables) and _statistics_stale(table_stats, now)]
+        for table_name in stale:
+            if self._collect_statistics(collector, table_name, columns_by_table[table_name],
+                                        tables_by_name.get(table_name, {}).get("primary_key"), statistics_by_table):
+                statistics_refreshed.append(table_name)
+
+        for name in warehouse_tables:
+            tables_by_name.setdefault(name, {"name": name})
+
+        if refreshed or removed:
+            self.storage_service.store_tables_metadata(connection_id, list(tables_by_name.values()))
+            if columns_by_table:
+                self.storage_service.store_columns_metadata(connection_id, columns_by_table)
+
+        # Removed tables must also leave the stored statistics, even if nothing was re-collected
+        if statistics_refreshed or statistics_removed:
+            self.storage_service.store_statistics_metadata(connection_id, statistics_by_table)
+
+        return {
+            "tables_refreshed": refreshed,
+            "tables_changed": len(changed),
+            "changed_tables": changed,
+            "statistics_refreshed": len(statistics_refreshed),
+            "tables_removed": len(removed)
+        }
+
+    @staticmethod
+    def _collect_statistics(collector, table_name, columns, primary_keys, statistics_by_table):
+        """Re-collect one table's statistics into statistics_by_table; True if they were collected"""
+        table_stats = collector.collect_table_statistics(table_name, columns=columns, primary_keys=primary_keys)
+        if table_stats and not table_stats.get("error"):
+            statistics_by_table[table_name] = table_stats
+            return True
+        return False
+
     def _store_usage_patterns(self, connection_id, table_name, usage):
         """Store usage patterns in database"""
         # This would need to be implemented based on your storage system
@@ -565,6 +849,7 @@ class MetadataWorker:
                 "error": task.error,
                 "completed_at": datetime.now(timezone.utc).isoformat()
             }
+            entry = self.task_history[task.id]
 
             # Trim history if needed
             if len(self.task_history) > self.max_history:
@@ -577,6 +862,13 @@ class MetadataWorker:
                 for key in oldest_keys:
                     del self.task_history[key]
 
+            future = self.completion_futures.pop(task.id, None)
+            self._forget_in_flight(task)
+
+        # Resolve outside the lock: done callbacks run on this thread and may query the worker
+        if future is not None and not future.done():
+            future.set_result(entry)
+
     def get_task_history(self, limit=10):
         """Get recent task history"""
         with self.lock:
@@ -605,27 +897,96 @@ class MetadataWorker:
 
             # Add active workers
             stats["active_workers"] = len(self.workers)
+            stats["resource_governor"] = resource_governor.get_stats()
 
             return stats
 
-    def submit_task(self, task_type, connection_id, params=None, priority="medium"):
+    @staticmethod
+    def _flight_key(task):
+        return task.task_type, task.connection_id, task.params.get("table_name")
+
+    def _forget_in_flight(self, task):
+        """Drop a finished task from the single-flight index; caller holds the lock"""
+        key = self._flight_key(task)
+        remaining = [t for t in self.in_flight.get(key, []) if t.id != task.id]
+        if remaining:
+            self.in_flight[key] = remaining
+        else:
+            self.in_flight.pop(key, None)
+
+    @staticmethod
+    def _covers(existing_params, requested_params):
+        """Whether a task with existing_params does all the work requested_params asks for"""
+        if "table_names" in requested_params:
+            return set(requested_params["table_names"]) <= set(existing_params.get("table_names", []))
+
+        all_types = ["tables", "columns", "statistics"]
+        if not set(requested_params.get("refresh_types", all_types)) <= set(
+                existing_params.get("refresh_types", all_types)):
+            return False
+
+        if requested_params.get("collect_statistics", True) and not existing_params.get("collect_statistics", True):
+            return False
+
+        return (requested_params.get("table_limit") or 50) <= (existing_params.get("table_limit") or 50)
+
+    def submit_task(self, task_type, connection_id, params=None, priority="medium", coalesce=True):
         """
         Submit a new task to the queue
 
+        Requests are single-flight: if a queued or running task for the same
+        task type, connection and table already covers the requested work, its
+        ID is returned instead of enqueueing a duplicate, and a queued task is
+        promoted when the new request has a higher priority.
+
         Args:
             task_type: Type of task
             connection_id: Connection ID
             params: Task parameters
             priority: Task priority
+            coalesce: Set to False to always enqueue a new task
 
         Returns:
-            The task ID
+            The task ID (of the existing task when the request was coalesced)
         """
         # Create task
         task = MetadataTask(task_type, connection_id, params, priority)
+        key = self._flight_key(task)
+
+        with self.lock:
+            existing = None
+            if coalesce:
+                existing = next((t for t in self.in_flight.get(key, []) if self._covers(t.params, task.params)),
+                                None)
+
+            if existing is None:
+                # Register the completion future before the task can be picked up
+                self.completion_futures[task.id] = Future()
+                self.in_flight.setdefault(key, []).append(task)
+            else:
+                self.stats["tasks_coalesced"] += 1
+
+        if existing is not None:
+            ranks = PriorityTaskQueue.PRIORITY_RANKS
+            if ranks.get(priority, 1) < ranks.get(existing.priority, 1):
+                try:
+                    if self.task_queue.raise_priority(existing.id, priority):
+                        existing.priority = priority
+                        logger.info(f"Raised priority of task {existing.id} to {priority}")
+                except Exception as e:
+                    logger.warning(f"Could not raise priority of task {existing.id}: {str(e)}")
+
+            logger.info(f"Coalesced {task_type} request for connection {connection_id} into task {existing.id}")
+            return existing.id
 
         # Add to queue
-        self.task_queue.put(task)
+        try:
+            self.task_queue.put(task)
+        except Exception:
+            with self.lock:
+                self.completion_futures.pop(task.id, None)
+                self._forget_in_flight(task)
+            raise
 
         logger.info(f"Submitted task {task.id}: {task_type} for connection {connection_id}")
 
@@ -641,8 +1002,34 @@ class MetadataWorker:
             # Task not found
             return {"error": "Task not found"}
 
+    def get_completion_future(self, task_id):
+        """
+        Get a future that resolves when a task completes or fails
+
+        The future's result is the task's history entry (the same dict that
+        get_task_status returns once the task is finished). Tasks that already
+        finished get an already-resolved future.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            A concurrent.futures.Future, or None if the task is unknown
+        """
+        with self.lock:
+            if task_id in self.completion_futures:
+                return self.completion_futures[task_id]
+
+            if task_id in self.task_history:
+                future = Future()
+                future.set_result(self.task_history[task_id])
+                return future
+
+            return None
+
 
-    def _record_changes(self, connection_id, object_type, object_name, changes, refresh_interval_hours=24):
+    def _record_changes(self, connection_id, object_type, object_name, changes, refresh_interval_hours=24,
+                        organization_id=None):
         """
         Record changes for analytics purposes
 
@@ -652,6 +1039,7 @@ class MetadataWorker:
             object_name: Name of the object
             changes: Changes detected (or None if no changes)
             refresh_interval_hours: Interval used for this refresh
+            organization_id: Owner of the connection (looked up if None)
         """
         try:
             # Import dynamically to avoid circular imports
@@ -660,8 +1048,7 @@ class MetadataWorker:
                 analytics = MetadataChangeAnalytics(self.connector_factory.supabase_manager)
 
                 # Get organization ID if possible
-                organization_id = None
-                if self.connector_factory and self.connector_factory.supabase_manager:
+                if organization_id is None and self.connector_factory and self.connector_factory.supabase_manager:
                     try:
                         connection = self.connector_factory.supabase_manager.get_connection(connection_id)
                         if connection and 'organization_id' in connection:
@@ -381,6 +381,11 @@ class SupabaseManager:
                 "expected_value": expected_value
             }
 
+            # Keep the template the rule was generated from, if any
+            if rule.get("query_template"):
+                data["query_template"] = rule["query_template"]
+                data["template_params"] = rule.get("template_params")
+
             # Debug log to verify the connection_id is being included
             logger.debug(f"Inserting validation rule with connection_id: {connection_id}")
 
@@ -609,6 +614,12 @@ class SupabaseManager:
             # Remove None values from data
             data = {k: v for k, v in data.items() if v is not None}
 
+            # An edited query no longer matches the template it was generated from
+            if "query" in rule:
+                from core.validations.query_templates import template_update_fields
+                data.update(template_update_fields(
+                    rule, self.get_validation_rule_template(organization_id, rule_id)))
+
             query = self.supabase.table("validation_rules") \
                 .update(data) \
                 .eq("id", rule_id) \
@@ -626,6 +637,21 @@ class SupabaseManager:
             logger.error(f"Error updating validation rule: {str(e)}")
             return False
 
+    def get_validation_rule_template(self, organization_id: str, rule_id: str) -> Optional[Dict]:
+        """Get the query template columns of a validation rule"""
+        try:
+            response = self.supabase.table("validation_rules") \
+                .select("query_template, template_params") \
+                .eq("id", rule_id) \
+                .eq("organization_id", organization_id) \
+                .execute()
+
+            return response.data[0] if response.data else None
+
+        except Exception as e:
+            logger.error(f"Error getting validation rule template: {str(e)}")
+            return None
+
     def get_user_role(self, user_id: str) -> str:
         """Get the role of a user"""
         try:
@@ -0,0 +1,255 @@
+# backend/core/utils/resource_governor.py
+"""
+Global per-connection concurrency limits for background work.
+
+Metadata collection, validation runs, schema detection and anomaly metric
+extraction run in different thread pools but query the same customer
+warehouses. Each of them takes a slot from the shared resource_governor
+before querying a connection, so no warehouse receives more than
+max_per_connection of our queries at once and the total stays under
+max_total.
+
+When slots are contended, waiters are served by start-time fair queuing
+across organizations: each organization advances a virtual clock by
+1/weight per granted slot, so a tenant that submits hundreds of tasks
+cannot starve one that submits a few.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PER_CONNECTION = 4
+DEFAULT_MAX_TOTAL = 32
+
+
+class _Waiter:
+    __slots__ = ("connection_id", "organization", "subsystem", "start_tag", "sequence", "granted", "enqueued_at")
+
+    def __init__(self, connection_id, organization, subsystem, start_tag, sequence):
+        self.connection_id = connection_id
+        self.organization = organization
+        self.subsystem = subsystem
+        self.start_tag = start_tag
+        self.sequence = sequence
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class ResourceGovernor:
+    """Hands out per-connection query slots with weighted fair queuing across organizations"""
+
+    def __init__(self, max_per_connection: int = DEFAULT_MAX_PER_CONNECTION, max_total: int = DEFAULT_MAX_TOTAL):
+        """
+        Args:
+            max_per_connection: Concurrent queries allowed against one connection
+            max_total: Concurrent queries allowed across all connections
+        """
+        self.max_per_connection = max_per_connection
+        self.max_total = max_total
+
+        self._condition = threading.Condition()
+        self._in_use: Dict[str, int] = {}
+        self._total_in_use = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+        # Start-time fair queuing state
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+        self._connection_limits: Dict[str, int] = {}
+
+        # Slots held by the current thread, so nested acquisitions do not deadlock
+        self._held = threading.local()
+
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResourceGovernor":
+        """Create a governor configured by GOVERNOR_MAX_QUERIES_PER_CONNECTION and GOVERNOR_MAX_QUERIES"""
+        return cls(
+            max_per_connection=int(os.getenv("GOVERNOR_MAX_QUERIES_PER_CONNECTION", DEFAULT_MAX_PER_CONNECTION)),
+            max_total=int(os.getenv("GOVERNOR_MAX_QUERIES", DEFAULT_MAX_TOTAL))
+        )
+
+    def set_organization_weight(self, organization_id: str, weight: float):
+        """Give an organization a larger (or smaller) share of contended slots; the default weight is 1"""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._condition:
+            self._weights[organization_id] = weight
+
+    def set_connection_limit(self, connection_id: str, limit: int):
+        """Override max_per_connection for one connection"""
+        with self._condition:
+            self._connection_limits[connection_id] = limit
+            self._dispatch()
+
+    def _limit(self, connection_id: str) -> int:
+        return self._connection_limits.get(connection_id, self.max_per_connection)
+
+    def _held_counts(self) -> Dict[str, int]:
+        if not hasattr(self._held, "counts"):
+            self._held.counts = {}
+        return self._held.counts
+
+    def _dispatch(self):
+        """Grant slots to waiters in start-tag order while capacity remains; caller holds the condition"""
+        granted = False
+        for waiter in sorted(self._waiters, key=lambda w: (w.start_tag, w.sequence)):
+            if self._total_in_use >= self.max_total:
+                break
+            if self._in_use.get(waiter.connection_id, 0) >= self._limit(waiter.connection_id):
+                continue
+
+            self._grant(waiter.connection_id)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            waiter.granted = True
+            self._waiters.remove(waiter)
+            granted = True
+
+        if granted:
+            self._condition.notify_all()
+
+    def _grant(self, connection_id: str):
+        self._in_use[connection_id] = self._in_use.get(connection_id, 0) + 1
+        self._total_in_use += 1
+
+    def _record_wait(self, subsystem: str, organization: str, waited: float):
+        for key in (f"subsystem:{subsystem}", f"organization:{organization}"):
+            metric = self._metrics.setdefault(key, {"acquired": 0, "total_wait_seconds": 0.0,
+                                                    "max_wait_seconds": 0.0, "timeouts": 0})
+            metric["acquired"] += 1
+            metric["total_wait_seconds"] += waited
+            metric["max_wait_seconds"] = max(metric["max_wait_seconds"], waited)
+
+    def acquire(self, connection_id: str, organization_id: Optional[str] = None,
+                subsystem: str = "unknown", timeout: Optional[float] = None) -> bool:
+        """
+        Take a query slot for a connection, waiting for one if necessary
+
+        A thread that already holds a slot for the connection gets the nested
+        acquisition for free.
+
+        Args:
+            connection_id: Connection about to be queried
+            organization_id: Owner of the connection, for fair queuing (the
+                connection is its own bucket when unknown)
+            subsystem: Name used in the wait-time metrics
+            timeout: Seconds to wait before giving up (forever if None)
+
+        Returns:
+            True if the slot was acquired, False on timeout
+        """
+        held = self._held_counts()
+        if held.get(connection_id):
+            held[connection_id] += 1
+            return True
+
+        organization = organization_id or f"connection:{connection_id}"
+
+        with self._condition:
+            weight = self._weights.get(organization, 1.0)
+            start_tag = max(self._virtual_time, self._finish_tags.get(organization, 0.0))
+            self._finish_tags[organization] = start_tag + 1.0 / weight
+
+            waiter = _Waiter(connection_id, organization, subsystem, start_tag, next(self._sequence))
+            self._waiters.append(waiter)
+            self._dispatch()
+
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not waiter.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(waiter)
+                    # Give back the fair-queuing share this request reserved
+                    self._finish_tags[organization] = max(self._virtual_time,
+                                                          self._finish_tags[organization] - 1.0 / weight)
+                    metric = self._metrics.setdefault(f"subsystem:{subsystem}", {
+                        "acquired": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0, "timeouts": 0})
+                    metric["timeouts"] += 1
+                    logger.warning(f"Timed out waiting for a query slot on connection {connection_id} ({subsystem})")
+                    return False
+                self._condition.wait(remaining)
+
+            waited = time.monotonic() - waiter.enqueued_at
+            self._record_wait(subsystem, organization, waited)
+
+        if waited > 1:
+            logger.info(f"{subsystem} waited {waited:.1f}s for a query slot on connection {connection_id}")
+
+        held[connection_id] = 1
+        return True
+
+    def release(self, connection_id: str):
+        """Return a slot taken with acquire"""
+        held = self._held_counts()
+        if held.get(connection_id, 0) > 1:
+            held[connection_id] -= 1
+            return
+        held.pop(connection_id, None)
+
+        with self._condition:
+            remaining = self._in_use.get(connection_id, 0) - 1
+            if remaining > 0:
+                self._in_use[connection_id] = remaining
+            else:
+                self._in_use.pop(connection_id, None)
+            self._total_in_use = max(0, self._total_in_use - 1)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, connection_id: str, organization_id: Optional[str] = None,
+             subsystem: str = "unknown", timeout: Optional[float] = None):
+        """
+        Hold a query slot for the duration of a with block
+
+        Raises:
+            TimeoutError: If no slot became free within timeout
+        """
+        if not connection_id:
+            # Nothing to govern without a connection
+            yield
+            return
+
+        if not self.acquire(connection_id, organization_id, subsystem, timeout):
+            raise TimeoutError(f"No query slot available for connection {connection_id}")
+        try:
+            yield
+        finally:
+            self.release(connection_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Slot usage, queue lengths and wait-time metrics"""
+        with self._condition:
+            waiting: Dict[str, int] = {}
+            for waiter in self._waiters:
+                waiting[waiter.organization] = waiting.get(waiter.organization, 0) + 1
+
+            wait_metrics = {}
+            for key, metric in self._metrics.items():
+                wait_metrics[key] = {
+                    **metric,
+                    "avg_wait_seconds": metric["total_wait_seconds"] / metric["acquired"] if metric["acquired"] else 0.0
+                }
+
+            return {
+                "max_per_connection": self.max_per_connection,
+                "max_total": self.max_total,
+                "in_use": dict(self._in_use),
+                "total_in_use": self._total_in_use,
+                "waiting": waiting,
+                "total_waiting": len(self._waiters),
+                "wait_metrics": wait_metrics
+            }
+
+
+# Global governor shared by every subsystem in the process
+resource_governor = ResourceGovernor.from_env()
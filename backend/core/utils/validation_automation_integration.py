@@ -66,62 +66,46 @@ class ValidationAutomationIntegrator:
                 tables_with_rules = self._get_tables_with_validation_rules(connection_id, organization_id)
                 logger.info(f"After creating defaults, found {len(tables_with_rules)} tables with rules")
 
-            for table_name in tables_with_rules:
-                try:
-                    logger.info(f"Running validations for table: {table_name}")
+            # Execute every table's rules as one pipeline: one rule query, a shared
+            # connection pool and a single bulk write of the results
+            results_by_table = self.validation_manager.execute_rules_for_connection(
+                organization_id=organization_id,
+                connection_string=connection_string,
+                connection_id=connection_id
+            )
 
-                    # FIXED: Execute validation rules for this table
-                    validation_results = self.validation_manager.execute_rules(
-                        organization_id=organization_id,
-                        connection_string=connection_string,
-                        table_name=table_name,
-                        connection_id=connection_id
-                    )
+            for table_name, validation_results in results_by_table.items():
+                # Process results
+                results_summary["tables_processed"] += 1
+                results_summary["total_rules"] += len(validation_results)
 
-                    # Process results
-                    results_summary["tables_processed"] += 1
-                    results_summary["total_rules"] += len(validation_results)
+                passed = sum(1 for r in validation_results if r.get("is_valid", False))
+                failed = len(validation_results) - passed
 
-                    passed = sum(1 for r in validation_results if r.get("is_valid", False))
-                    failed = len(validation_results) - passed
+                results_summary["passed_rules"] += passed
+                results_summary["failed_rules"] += failed
 
-                    results_summary["passed_rules"] += passed
-                    results_summary["failed_rules"] += failed
+                execution_detail = {
+                    "table_name": table_name,
+                    "rules_executed": len(validation_results),
+                    "passed": passed,
+                    "failed": failed,
+                    "success": True
+                }
 
-                    execution_detail = {
+                if failed > 0:
+                    failure_details = {
                         "table_name": table_name,
-                        "rules_executed": len(validation_results),
-                        "passed": passed,
-                        "failed": failed,
-                        "success": True
+                        "failed_rules": failed,
+                        "total_rules": len(validation_results),
+                        "failures": [r for r in validation_results if not r.get("is_valid", False)]
                     }
+                    results_summary["tables_with_failures"].append(failure_details)
+                    execution_detail["failure_details"] = failure_details
 
-                    if failed > 0:
-                        failure_details = {
-                            "table_name": table_name,
-                            "failed_rules": failed,
-                            "total_rules": len(validation_results),
-                            "failures": [r for r in validation_results if not r.get("is_valid", False)]
-                        }
-                        results_summary["tables_with_failures"].append(failure_details)
-                        execution_detail["failure_details"] = failure_details
+                results_summary["execution_details"].append(execution_detail)
 
-                    results_summary["execution_details"].append(execution_detail)
-
-                    logger.info(f"Completed validations for {table_name}: {passed} passed, {failed} failed")
-
-                except Exception as table_error:
-                    logger.error(f"Error validating table {table_name}: {str(table_error)}")
-                    error_detail = {
-                        "table_name": table_name,
-                        "error": str(table_error)
-                    }
-                    results_summary["errors"].append(error_detail)
-                    results_summary["execution_details"].append({
-                        "table_name": table_name,
-                        "success": False,
-                        "error": str(table_error)
-                    })
+                logger.info(f"Completed validations for {table_name}: {passed} passed, {failed} failed")
 
             # Publish automation events if there were failures
             if results_summary["failed_rules"] > 0:
@@ -178,35 +162,36 @@ class ValidationAutomationIntegrator:
         try:
             logger.info("Creating default validations for tables without rules")
 
-            # Get some tables from the connection to create validations for
-            from core.metadata.connector_factory import ConnectorFactory
+            from core.metadata.storage_service import MetadataStorageService
+            from core.validations.default_validations import add_default_validations_bulk
 
-            connector_factory = ConnectorFactory(self.supabase_manager)
-            connector = connector_factory.create_connector(connection_id)
+            # Prefer the stored table list over asking the warehouse
+            storage_service = MetadataStorageService()
+            tables = [table["name"] for table in (storage_service.get_tables_metadata(connection_id) or [])]
 
-            if connector:
-                # Get first few tables
-                tables = connector.get_tables()
-                limited_tables = tables[:3]  # Just do first 3 tables
+            if not tables:
+                from core.metadata.connector_factory import ConnectorFactory
 
-                logger.info(f"Creating default validations for tables: {limited_tables}")
+                connector_factory = ConnectorFactory(self.supabase_manager)
+                connector = connector_factory.create_connector(connection_id)
+                tables = connector.get_tables() if connector else []
 
-                for table_name in limited_tables:
-                    try:
-                        # Import and use the default validation generator
-                        from core.validations.default_validations import add_default_validations
+            limited_tables = tables[:3]  # Just do first 3 tables
+            if not limited_tables:
+                return
 
-                        result = add_default_validations(
-                            validation_manager=self.validation_manager,
-                            connection_string=connection_string,
-                            table_name=table_name,
-                            connection_id=connection_id
-                        )
+            logger.info(f"Creating default validations for tables: {limited_tables}")
 
-                        logger.info(f"Created {result.get('added', 0)} default validations for {table_name}")
+            result = add_default_validations_bulk(
+                validation_manager=self.validation_manager,
+                organization_id=organization_id,
+                connection_id=connection_id,
+                table_names=limited_tables,
+                connection_string=connection_string,
+                storage_service=storage_service
+            )
 
-                    except Exception as table_error:
-                        logger.warning(f"Could not create defaults for {table_name}: {str(table_error)}")
+            logger.info(f"Created {result.get('added', 0)} default validations for {len(limited_tables)} tables")
 
         except Exception as e:
             logger.warning(f"Could not create default validations: {str(e)}")
@@ -294,14 +279,15 @@ class ValidationAutomationIntegrator:
             connection_string = self._build_connection_string(connection)
 
             # Import and use the default validation generator
-            from core.validations.default_validations import add_default_validations
+            from core.validations.default_validations import add_default_validations_bulk
 
-            # Generate default validations
-            result = add_default_validations(
+            # Generate default validations, from stored metadata when it is fresh
+            result = add_default_validations_bulk(
                 validation_manager=self.validation_manager,
-                connection_string=connection_string,
-                table_name=table_name,
-                connection_id=connection_id
+                organization_id=organization_id,
+                connection_id=connection_id,
+                table_names=[table_name],
+                connection_string=connection_string
             )
 
             logger.info(f"Generated {result.get('added', 0)} default validations for table {table_name}")
@@ -1,9 +1,15 @@
 import logging
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional
 import sqlalchemy as sa
 from sqlalchemy import inspect
 import os
 
+from .query_templates import templated_query
+
+# Stored column metadata older than this is re-inspected instead of trusted
+DEFAULT_METADATA_MAX_AGE_HOURS = 24
+
 
 def get_default_validations(connection_string: str, table_name: str) -> List[Dict[str, Any]]:
     """
@@ -18,19 +24,42 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
     """
     # Connect to database and get table metadata
     engine = sa.create_engine(connection_string)
-    inspector = inspect(engine)
-
-    # Get column information
-    columns = inspector.get_columns(table_name)
-    primary_keys = inspector.get_pk_constraint(table_name).get('constrained_columns', [])
-    foreign_keys = []
     try:
-        for fk in inspector.get_foreign_keys(table_name):
-            if 'constrained_columns' in fk and fk['constrained_columns']:
-                foreign_keys.extend(fk['constrained_columns'])
-    except Exception:
-        # Some databases might not support foreign key inspection
-        pass
+        inspector = inspect(engine)
+
+        # Get column information
+        columns = inspector.get_columns(table_name)
+        primary_keys = inspector.get_pk_constraint(table_name).get('constrained_columns', [])
+        foreign_keys = []
+        try:
+            for fk in inspector.get_foreign_keys(table_name):
+                if 'constrained_columns' in fk and fk['constrained_columns']:
+                    foreign_keys.extend(fk['constrained_columns'])
+        except Exception:
+            # Some databases might not support foreign key inspection
+            pass
+    finally:
+        engine.dispose()
+
+    return build_default_validations(table_name, columns, primary_keys, foreign_keys)
+
+
+def build_default_validations(table_name: str, columns: List[Dict[str, Any]], primary_keys: List[str],
+                              foreign_keys: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Generate default validation rules from already known table metadata
+
+    Args:
+        table_name: Name of the table to generate validations for
+        columns: Column dictionaries with "name", "type" and "nullable". The type may be
+            a SQLAlchemy type (live inspection) or its string form (stored metadata)
+        primary_keys: Primary key column names
+        foreign_keys: Foreign key column names, if known
+
+    Returns:
+        List of validation rule dictionaries
+    """
+    foreign_keys = foreign_keys or []
 
     # Initialize validation rules list
     validations = []
@@ -43,7 +72,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
     validations.append({
         "name": f"check_{table_name}_not_empty",
         "description": f"Ensure {table_name} table has at least one row",
-        "query": f"SELECT COUNT(*) FROM {table_name}",
+        **templated_query("row_count", table=table_name),
         "operator": "greater_than",
         "expected_value": 0
     })
@@ -132,7 +161,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
             validations.append({
                 "name": f"check_{column['name']}_not_null",
                 "description": f"Ensure {column['name']} has no NULL values",
-                "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} IS NULL",
+                **templated_query("not_null", table=table_name, column=column['name']),
                 "operator": "equals",
                 "expected_value": 0
             })
@@ -152,7 +181,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_positive",
                     "description": f"Ensure {column['name']} has no negative values",
-                    "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} < 0",
+                    **templated_query("not_negative", table=table_name, column=column['name']),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -171,7 +200,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_not_zero",
                     "description": f"Ensure {column['name']} has no zero values",
-                    "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} = 0",
+                    **templated_query("not_zero", table=table_name, column=column['name']),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -189,7 +218,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_not_future",
                     "description": f"Ensure {column['name']} contains no future dates",
-                    "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} > CURRENT_DATE",
+                    **templated_query("not_future", table=table_name, column=column['name']),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -198,7 +227,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
             validations.append({
                 "name": f"check_{column['name']}_reasonable_past",
                 "description": f"Ensure {column['name']} contains no unreasonably old dates",
-                "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} < '1970-01-01'",
+                **templated_query("reasonable_past", table=table_name, column=column['name']),
                 "operator": "equals",
                 "expected_value": 0
             })
@@ -224,11 +253,13 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
         col_type = str(column['type']).lower()
         if 'varchar' in col_type or 'char' in col_type or 'text' in col_type:
             # If it's a defined length VARCHAR
-            if hasattr(column['type'], 'length') and column['type'].length is not None:
+            max_length = _column_type_length(column['type'])
+            if max_length is not None:
                 validations.append({
                     "name": f"check_{column['name']}_max_length",
-                    "description": f"Ensure {column['name']} does not exceed max length ({column['type'].length})",
-                    "query": f"SELECT COUNT(*) FROM {table_name} WHERE LENGTH({column['name']}) > {column['type'].length}",
+                    "description": f"Ensure {column['name']} does not exceed max length ({max_length})",
+                    **templated_query("max_length", table=table_name, column=column['name'],
+                                      max_length=max_length),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -238,7 +269,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_not_empty_string",
                     "description": f"Ensure {column['name']} has no empty strings",
-                    "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column['name']} = ''",
+                    **templated_query("not_empty_string", table=table_name, column=column['name']),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -248,11 +279,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_valid_email",
                     "description": f"Ensure {column['name']} contains valid email format",
-                    "query": f"""
-                        SELECT COUNT(*) FROM {table_name} 
-                        WHERE {column['name']} IS NOT NULL 
-                        AND {column['name']} NOT LIKE '%@%.%'
-                    """,
+                    **templated_query("valid_email", table=table_name, column=column['name']),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -274,11 +301,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
                 validations.append({
                     "name": f"check_{column['name']}_valid_postal",
                     "description": f"Ensure {column['name']} follows postal/zip code patterns",
-                    "query": f"""
-                        SELECT COUNT(*) FROM {table_name} 
-                        WHERE {column['name']} IS NOT NULL 
-                        AND LENGTH(TRIM({column['name']})) < 3
-                    """,
+                    **templated_query("min_length", table=table_name, column=column['name'], min_length=3),
                     "operator": "equals",
                     "expected_value": 0
                 })
@@ -313,7 +336,7 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
         validations.append({
             "name": f"check_{table_name}_ref_table_size",
             "description": f"Ensure reference table {table_name} has a reasonable number of rows",
-            "query": f"SELECT COUNT(*) FROM {table_name}",
+            **templated_query("row_count", table=table_name),
             "operator": "less_than",
             "expected_value": 1000  # Arbitrary limit for reference tables
         })
@@ -388,6 +411,15 @@ def get_default_validations(connection_string: str, table_name: str) -> List[Dic
     return validations
 
 
+def _column_type_length(column_type) -> Optional[int]:
+    """Get the declared length of a character type from a SQLAlchemy type or its string form"""
+    if hasattr(column_type, 'length'):
+        return column_type.length
+
+    match = re.search(r'char\s*\(\s*(\d+)\s*\)', str(column_type), re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
 def guess_start_date_column(end_date_column, columns):
     """
     Try to guess the corresponding start date column for an end date
@@ -484,4 +516,120 @@ def add_default_validations(validation_manager, connection_string: str, table_na
         "added": count_added,
         "skipped": count_skipped,
         "total": count_added + count_skipped
-    }
\ No newline at end of file
+    }
+
+
+def load_table_schemas_from_metadata(storage_service, connection_id: str, table_names: List[str] = None,
+                                     max_age_hours: float = DEFAULT_METADATA_MAX_AGE_HOURS) -> Dict[str, Dict[str, Any]]:
+    """
+    Load column and primary key information for tables from stored metadata
+
+    Args:
+        storage_service: Instance of MetadataStorageService
+        connection_id: Connection ID the metadata belongs to
+        table_names: Tables to load (all tables in the metadata if None)
+        max_age_hours: Stored column metadata older than this is not used
+
+    Returns:
+        Dictionary mapping table name to {"columns": [...], "primary_keys": [...]}.
+        Tables without fresh stored metadata are left out.
+    """
+    columns_metadata = storage_service.get_metadata(connection_id, "columns")
+    if not columns_metadata or "metadata" not in columns_metadata:
+        return {}
+
+    age_seconds = (columns_metadata.get("freshness") or {}).get("age_seconds")
+    if age_seconds is None or age_seconds > max_age_hours * 3600:
+        logging.info(f"Stored column metadata for connection {connection_id} is not fresh enough for rule generation")
+        return {}
+
+    columns_by_table = columns_metadata["metadata"].get("columns_by_table", {})
+
+    # Primary keys live on the tables metadata; fall back to column flags
+    primary_keys_by_table = {}
+    tables_metadata = storage_service.get_metadata(connection_id, "tables")
+    if tables_metadata and "metadata" in tables_metadata:
+        for table in tables_metadata["metadata"].get("tables", []):
+            if table.get("primary_key"):
+                primary_keys_by_table[table["name"]] = list(table["primary_key"])
+
+    schemas = {}
+    for table_name in (table_names if table_names is not None else columns_by_table.keys()):
+        columns = columns_by_table.get(table_name)
+        if not columns:
+            continue
+
+        primary_keys = primary_keys_by_table.get(table_name) or \
+            [column["name"] for column in columns if column.get("primary_key")]
+        schemas[table_name] = {"columns": columns, "primary_keys": primary_keys}
+
+    return schemas
+
+
+def add_default_validations_bulk(validation_manager, organization_id: str, connection_id: str,
+                                 table_names: List[str] = None, connection_string: str = None,
+                                 storage_service=None,
+                                 max_age_hours: float = DEFAULT_METADATA_MAX_AGE_HOURS) -> dict:
+    """
+    Add default validations for many tables with one existence check and bulk inserts
+
+    Rules are generated from stored metadata when it is fresh. Tables missing from the
+    stored metadata are inspected live, but only if a connection string is given.
+
+    Args:
+        validation_manager: Instance of SupabaseValidationManager
+        organization_id: Organization ID
+        connection_id: Connection ID to associate with rules
+        table_names: Tables to generate rules for (all tables in stored metadata if None)
+        connection_string: Optional database connection string for live inspection fallback
+        storage_service: Optional MetadataStorageService instance
+        max_age_hours: Maximum age of stored metadata to generate from
+
+    Returns:
+        Dictionary with counts of rules added and skipped, overall and per table
+    """
+    if storage_service is None:
+        from core.metadata.storage_service import MetadataStorageService
+        storage_service = MetadataStorageService()
+
+    schemas = load_table_schemas_from_metadata(storage_service, connection_id, table_names, max_age_hours)
+    requested_tables = table_names if table_names is not None else list(schemas.keys())
+
+    validations_by_table = {}
+    live_tables = []
+    for table_name in requested_tables:
+        if table_name in schemas:
+            validations_by_table[table_name] = build_default_validations(
+                table_name, schemas[table_name]["columns"], schemas[table_name]["primary_keys"]
+            )
+        elif connection_string:
+            try:
+                validations_by_table[table_name] = get_default_validations(connection_string, table_name)
+                live_tables.append(table_name)
+            except Exception as e:
+                logging.warning(f"Could not inspect table {table_name} for default validations: {str(e)}")
+        else:
+            logging.warning(f"No fresh metadata for table {table_name} and no connection string to inspect it")
+
+    # One existence check for every table, then insert only the new rules
+    existing_rule_names = validation_manager.get_existing_rule_names(organization_id, connection_id)
+
+    new_rules_by_table = {}
+    by_table = {}
+    for table_name, validations in validations_by_table.items():
+        existing = existing_rule_names.get(table_name, set())
+        new_rules = [v for v in validations if v["name"] not in existing]
+        new_rules_by_table[table_name] = new_rules
+        by_table[table_name] = {"added": len(new_rules), "skipped": len(validations) - len(new_rules)}
+
+    count_added = validation_manager.add_rules_bulk(organization_id, connection_id, new_rules_by_table)
+    count_skipped = sum(counts["skipped"] for counts in by_table.values())
+
+    return {
+        "added": count_added,
+        "skipped": count_skipped,
+        "total": count_added + count_skipped,
+        "tables": by_table,
+        "metadata_tables": len(validations_by_table) - len(live_tables),
+        "live_tables": len(live_tables)
+    }
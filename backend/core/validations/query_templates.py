@@ -0,0 +1,373 @@
+"""
+Query templates, statement caching and batch planning for validation rules.
+
+Default rules are generated from a small set of named templates that differ only in
+table and column names. Identifiers cannot be bound parameters, so a template is
+rendered once per rule and the rendered statement is cached per engine. Rules that
+are plain ``SELECT COUNT(*) FROM <table> [WHERE <condition>]`` checks on the same
+table are planned into one aggregate query so the table is scanned once, and rules
+whose SQL is identical up to formatting and aliasing are executed only once.
+"""
+
+import json
+import logging
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.util import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Named rule templates. Placeholders are identifiers ({table}, {column}, ...) or
+# literal thresholds ({max_length}); they are filled in by render_query.
+QUERY_TEMPLATES = {
+    "row_count": "SELECT COUNT(*) FROM {table}",
+    "not_null": "SELECT COUNT(*) FROM {table} WHERE {column} IS NULL",
+    "not_negative": "SELECT COUNT(*) FROM {table} WHERE {column} < 0",
+    "not_zero": "SELECT COUNT(*) FROM {table} WHERE {column} = 0",
+    "not_future": "SELECT COUNT(*) FROM {table} WHERE {column} > CURRENT_DATE",
+    "reasonable_past": "SELECT COUNT(*) FROM {table} WHERE {column} < '1970-01-01'",
+    "not_empty_string": "SELECT COUNT(*) FROM {table} WHERE {column} = ''",
+    "max_length": "SELECT COUNT(*) FROM {table} WHERE LENGTH({column}) > {max_length}",
+    "valid_email": "SELECT COUNT(*) FROM {table} WHERE {column} IS NOT NULL AND {column} NOT LIKE '%@%.%'",
+    "min_length": "SELECT COUNT(*) FROM {table} WHERE {column} IS NOT NULL AND LENGTH(TRIM({column})) < {min_length}",
+}
+
+# SELECT COUNT(*) FROM <table> [WHERE <condition>] [;]
+_COUNT_QUERY_PATTERN = re.compile(
+    r"^\s*SELECT\s+COUNT\s*\(\s*\*\s*\)\s+FROM\s+([\w.\"`\[\]]+)\s*(?:WHERE\s+(.+?))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Conditions containing these cannot be folded into a single-scan aggregate
+_UNBATCHABLE_CONDITION_PATTERN = re.compile(
+    r"\b(SELECT|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|UNION|JOIN|OFFSET|FETCH)\b",
+    re.IGNORECASE
+)
+
+
+def render_query(template_name: str, params: Dict[str, Any]) -> str:
+    """
+    Render a named query template
+
+    Args:
+        template_name: Key in QUERY_TEMPLATES
+        params: Values for the template placeholders
+
+    Returns:
+        The rendered SQL string
+    """
+    if template_name not in QUERY_TEMPLATES:
+        raise ValueError(f"Unknown query template: {template_name}")
+    return QUERY_TEMPLATES[template_name].format(**params)
+
+
+def templated_query(template_name: str, **params) -> Dict[str, Any]:
+    """
+    Build the query fields for a rule generated from a named template
+
+    The rendered SQL is kept in "query" so the rule runs anywhere; the template name
+    and parameters let the executor share cached statements across rules.
+    """
+    return {
+        "query": render_query(template_name, params),
+        "query_template": template_name,
+        "template_params": params
+    }
+
+
+def resolve_rule_query(rule: Dict[str, Any]) -> str:
+    """Return the SQL for a rule, rendering it from its template when one is stored"""
+    template_name = rule.get("query_template")
+    template_params = rule.get("template_params")
+
+    if template_name and template_params:
+        if isinstance(template_params, str):
+            try:
+                template_params = json.loads(template_params)
+            except (json.JSONDecodeError, TypeError):
+                return rule["query"]
+        try:
+            return render_query(template_name, template_params)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Could not render template {template_name} for rule {rule.get('rule_name')}: {str(e)}")
+
+    return rule["query"]
+
+
+def template_update_fields(update: Dict[str, Any], stored: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Template columns to write when a rule is updated
+
+    The template is cleared only when the update carries a query that differs
+    from what the stored template renders, so an edited query is what runs
+    everywhere. Otherwise the columns are left out of the update and untouched.
+
+    Args:
+        update: Rule fields sent with the update
+        stored: The rule's current query_template and template_params, if known
+
+    Returns:
+        An empty dict, or query_template and template_params set to None
+    """
+    if "query" not in update or not stored or not stored.get("query_template"):
+        return {}
+
+    rendered = resolve_rule_query({**stored, "query": None})
+    if rendered is not None and (update["query"] or "").strip() == rendered.strip():
+        return {}
+
+    return {"query_template": None, "template_params": None}
+
+
+def parse_count_query(query: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Recognize a simple count query that can be folded into a batch
+
+    Returns:
+        (table, condition) where condition is None for a plain row count,
+        or None if the query is not a simple count query
+    """
+    match = _COUNT_QUERY_PATTERN.match(query or "")
+    if not match:
+        return None
+
+    table, condition = match.group(1), match.group(2)
+    if condition is not None:
+        condition = condition.strip()
+        if not condition or _UNBATCHABLE_CONDITION_PATTERN.search(condition):
+            return None
+
+    return table, condition
+
+
+def plan_rule_batches(rules: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split rules into single-scan count batches and rules that must run individually
+
+    Args:
+        rules: Rules to plan (must have "query" or a query template)
+
+    Returns:
+        (batches, singles). Each batch is a dict with the combined "query" and the
+        "rules" it answers, in column order. Batches with only one rule are
+        returned as singles since there is nothing to combine.
+    """
+    batches_by_table = OrderedDict()
+    singles = []
+
+    for rule in rules:
+        parsed = parse_count_query(resolve_rule_query(rule))
+        if parsed is None:
+            singles.append(rule)
+            continue
+
+        table, condition = parsed
+        batches_by_table.setdefault(table.lower(), (table, []))[1].append((rule, condition))
+
+    batches = []
+    for table, members in batches_by_table.values():
+        if len(members) == 1:
+            singles.append(members[0][0])
+            continue
+
+        select_list = []
+        for _, condition in members:
+            if condition is None:
+                select_list.append("COUNT(*)")
+            else:
+                select_list.append(f"COALESCE(SUM(CASE WHEN {condition} THEN 1 ELSE 0 END), 0)")
+
+        batches.append({
+            "table": table,
+            "query": f"SELECT {', '.join(select_list)} FROM {table}",
+            "rules": [rule for rule, _ in members]
+        })
+
+    return batches, singles
+
+
+# Tokens of a SQL statement: comments, string literals, quoted identifiers, words,
+# numbers, multi-character operators and single punctuation characters
+_SQL_TOKEN_PATTERN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<string>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_$]*)"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<operator><>|!=|<=|>=|\|\||::)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.DOTALL
+)
+
+# Words that can follow a closing parenthesis without being a derived-table alias
+_NON_ALIAS_KEYWORDS = {
+    "as", "where", "group", "order", "having", "limit", "offset", "union", "intersect", "except",
+    "join", "inner", "left", "right", "full", "outer", "cross", "on", "using", "and", "or", "not",
+    "then", "else", "end", "when", "from", "select", "is", "in", "like", "between", "over",
+    "filter", "within", "fetch", "window", "qualify", "desc", "asc", "nulls"
+}
+
+# Tokens that can end a derived-table alias. A word after ")" is only treated as an
+# implicit alias when one of these (or the end of the query) follows it, so operators
+# such as ILIKE, RLIKE, REGEXP, COLLATE, DIV or MOD are never renamed.
+_ALIAS_TERMINATORS = {
+    ",", ")", "from", "where", "group", "order", "having", "limit", "union", "join",
+    "inner", "left", "right", "full", "cross", "on"
+}
+
+# Functions whose "AS <type>" argument is a type name, not an alias
+_CAST_FUNCTIONS = {"cast", "try_cast", "safe_cast", "convert"}
+
+
+def canonicalize_query(query: str) -> str:
+    """
+    Reduce a SQL statement to a canonical form for detecting semantically identical rules
+
+    Comments, whitespace differences, keyword/identifier case and a trailing semicolon
+    are ignored, and aliases that are declared but never referenced are renamed
+    positionally so "(...) AS duplicates" and "(...) dups" compare equal. A word after
+    ")" only counts as an alias when the query ends or a clause boundary follows it,
+    so operators like ILIKE or MOD are kept. The type in CAST(x AS type) is not an
+    alias and is kept. String literals and quoted
+    identifiers are kept exactly as written.
+    """
+    tokens = []
+    for match in _SQL_TOKEN_PATTERN.finditer(query or ""):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            continue
+        value = match.group()
+        tokens.append((kind, value.lower() if kind == "word" else value))
+
+    while tokens and tokens[-1][1] == ";":
+        tokens.pop()
+
+    # Identifier references (function names are followed by "(" and do not count)
+    references = {}
+    for i, (kind, value) in enumerate(tokens):
+        if kind == "word" and not (i + 1 < len(tokens) and tokens[i + 1][1] == "("):
+            references[value] = references.get(value, 0) + 1
+
+    canonical = []
+    alias_count = 0
+    in_cast = []  # one entry per open parenthesis: whether it belongs to a CAST-like call
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        next_kind, next_value = tokens[i + 1] if i + 1 < len(tokens) else (None, None)
+
+        if value == "(":
+            in_cast.append(i > 0 and tokens[i - 1][1] in _CAST_FUNCTIONS)
+        elif value == ")" and in_cast:
+            in_cast.pop()
+
+        explicit_alias = value == "as" and next_kind == "word" and not (in_cast and in_cast[-1])
+        after_next = tokens[i + 2][1] if i + 2 < len(tokens) else None
+        implicit_alias = (value == ")" and next_kind == "word" and next_value not in _NON_ALIAS_KEYWORDS
+                          and (after_next is None or after_next in _ALIAS_TERMINATORS))
+
+        if (explicit_alias or implicit_alias) and references.get(next_value) == 1:
+            alias_count += 1
+            if implicit_alias:
+                canonical.append(")")
+            canonical.extend(["as", f"_alias{alias_count}"])
+            i += 2
+            continue
+
+        canonical.append(value)
+        i += 1
+
+    text_form = " ".join(canonical)
+    # Tighten spacing around punctuation so "COUNT( * )" and "COUNT(*)" match
+    text_form = re.sub(r"\s*([(),.])\s*", r"\1", text_form)
+    return text_form
+
+
+def group_duplicate_rules(rules: List[Dict[str, Any]]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """Group rules by canonical query; rules in the same group return the same value"""
+    groups = OrderedDict()
+    for rule in rules:
+        groups.setdefault(canonicalize_query(resolve_rule_query(rule)), []).append(rule)
+    return groups
+
+
+def find_overlapping_rules(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Describe sets of rules that run the same query
+
+    Returns:
+        One entry per duplicated query with the ids, names and tables of its rules
+    """
+    overlaps = []
+    for canonical_query, group in group_duplicate_rules(rules).items():
+        if len(group) < 2:
+            continue
+        overlaps.append({
+            "canonical_query": canonical_query,
+            "rule_ids": [rule.get("id") for rule in group],
+            "rule_names": [rule.get("rule_name") for rule in group],
+            "tables": sorted({rule.get("table_name") for rule in group if rule.get("table_name")})
+        })
+    return overlaps
+
+
+class StatementCache:
+    """Thread-safe LRU of text() constructs plus a compiled-statement cache for one engine"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+        # Passed as the compiled_cache execution option so compiled forms are reused
+        self.compiled_cache = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str):
+        """Get the text() construct for a query, creating it on first use"""
+        with self._lock:
+            statement = self._statements.get(query)
+            if statement is not None:
+                self._statements.move_to_end(query)
+                self.hits += 1
+                return statement
+
+            self.misses += 1
+            statement = text(query)
+            self._statements[query] = statement
+            if len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+            return statement
+
+    def execute(self, conn, query: str):
+        """Execute a query on a connection through the cache"""
+        return conn.execution_options(compiled_cache=self.compiled_cache).execute(self.get(query))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "size": len(self._statements),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_engine_caches = weakref.WeakKeyDictionary()
+_engine_caches_lock = threading.Lock()
+
+
+def get_statement_cache(engine) -> StatementCache:
+    """Get the statement cache attached to an engine, creating it if needed"""
+    with _engine_caches_lock:
+        cache = _engine_caches.get(engine)
+        if cache is None:
+            cache = StatementCache()
+            _engine_caches[engine] = cache
+        return cache
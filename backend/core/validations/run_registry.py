@@ -0,0 +1,169 @@
+"""
+In-process registry of validation runs.
+
+A run collects rule results as they complete so they can be streamed to the client
+while the run is in progress and polled by run id once it has finished. Runs execute
+on a bounded thread pool; once max_workers runs are executing and max_queued more
+are waiting, new runs are refused.
+
+Run state lives in the memory of the process that started the run. With several
+server worker processes, polling a run id only works when the poll reaches that
+same process, and no run survives a restart. Each rule result is still stored in
+validation_results as it completes, so results of a run whose id is no longer
+known can be read from the validation history.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_QUEUED = 50
+
+
+class ValidationRun:
+    """A single validation run whose results arrive incrementally"""
+
+    def __init__(self, organization_id: str, connection_id: str, table_name: str):
+        self.id = str(uuid.uuid4())
+        self.organization_id = organization_id
+        self.connection_id = connection_id
+        self.table_name = table_name
+        self.status = "running"
+        self.results = []
+        self.summary = None
+        self.error = None
+        self.started_at = time.time()
+        self.completed_at = None
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def add_result(self, result: Dict[str, Any]):
+        """Record a completed rule result and wake up any waiting readers"""
+        with self._condition:
+            self.results.append(result)
+            self._condition.notify_all()
+
+    def finish(self, summary: Dict[str, Any] = None, error: str = None):
+        """Mark the run as finished with its summary or error"""
+        with self._condition:
+            self.status = "failed" if error else "completed"
+            self.summary = summary
+            self.error = error
+            self.completed_at = time.time()
+            self._condition.notify_all()
+
+    def wait_for_results(self, start_index: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """
+        Block until there are results past start_index or the run finishes
+
+        Returns:
+            Results from start_index onwards (empty if the wait timed out)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(self.results) > start_index or self.finished, timeout=timeout)
+            return self.results[start_index:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the pollable state of the run"""
+        with self._condition:
+            return {
+                "run_id": self.id,
+                "status": self.status,
+                "connection_id": self.connection_id,
+                "table_name": self.table_name,
+                "results": list(self.results),
+                "completed_count": len(self.results),
+                "summary": self.summary,
+                "error": self.error,
+                "started_at": self.started_at,
+                "completed_at": self.completed_at
+            }
+
+
+class ValidationRunRegistry:
+    """Thread-safe registry of recent validation runs"""
+
+    def __init__(self, retention_seconds: int = 3600, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_queued: int = DEFAULT_MAX_QUEUED):
+        """
+        Args:
+            retention_seconds: How long finished runs stay pollable
+            max_workers: Runs executing at once
+            max_queued: Runs allowed to wait for a worker before new runs are refused
+        """
+        self.retention_seconds = retention_seconds
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._runs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def from_env(cls) -> "ValidationRunRegistry":
+        """Create a registry sized by VALIDATION_RUN_WORKERS and VALIDATION_RUN_MAX_QUEUED"""
+        return cls(
+            max_workers=int(os.getenv("VALIDATION_RUN_WORKERS", DEFAULT_MAX_WORKERS)),
+            max_queued=int(os.getenv("VALIDATION_RUN_MAX_QUEUED", DEFAULT_MAX_QUEUED))
+        )
+
+    def create_run(self, organization_id: str, connection_id: str, table_name: str) -> ValidationRun:
+        """Create and register a new run"""
+        run = ValidationRun(organization_id, connection_id, table_name)
+        with self._lock:
+            self._prune()
+            self._runs[run.id] = run
+        return run
+
+    def start_run(self, organization_id: str, connection_id: str, table_name: str,
+                  target: Callable[..., Any], *args) -> Optional[ValidationRun]:
+        """
+        Create a run and execute target(run, *args) on the registry's thread pool
+
+        Returns:
+            The new run, or None if too many runs are already executing or waiting
+        """
+        run = ValidationRun(organization_id, connection_id, table_name)
+        with self._lock:
+            self._prune()
+            active = sum(1 for existing in self._runs.values() if not existing.finished)
+            if active >= self.max_workers + self.max_queued:
+                logger.warning(f"Refusing validation run for {table_name}: {active} runs already active")
+                return None
+            self._runs[run.id] = run
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="validation-run")
+            self._executor.submit(target, run, *args)
+        return run
+
+    def get_run(self, run_id: str, organization_id: str = None) -> Optional[ValidationRun]:
+        """Get a run by id, optionally restricted to an organization"""
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run and organization_id and run.organization_id != organization_id:
+            return None
+        return run
+
+    def _prune(self):
+        """Drop finished runs older than the retention window (lock must be held)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [run_id for run_id, run in self._runs.items()
+                   if run.finished and run.completed_at < cutoff]
+        for run_id in expired:
+            del self._runs[run_id]
+        if expired:
+            logger.debug(f"Pruned {len(expired)} expired validation runs")
+
+
+# Global registry shared by the validation routes
+validation_run_registry = ValidationRunRegistry.from_env()
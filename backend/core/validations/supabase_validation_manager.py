@@ -1,13 +1,18 @@
 import json
 import logging
+import threading
 import traceback
 import uuid
 import datetime
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional
-from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import create_engine, event
 import os
 import sys
 
+from ..utils.resource_governor import resource_governor
+
 # Add the correct path to the core directory
 core_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../core'))
 if core_path not in sys.path:
@@ -33,6 +38,10 @@ except ImportError as e:
     SupabaseManager = supabase_manager.SupabaseManager
     logging.info("Successfully imported SupabaseManager using importlib")
 
+from .query_templates import (
+    get_statement_cache, group_duplicate_rules, plan_rule_batches, resolve_rule_query, template_update_fields
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,6 +50,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger('supabase_validation_manager')
 
+# Engines are kept across runs so the statement cache attached to each one (and the
+# compiled forms, which are tied to the engine's dialect) is reused by the next run
+MAX_CACHED_ENGINES = 32
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
 
 class SupabaseValidationManager:
     """Manages validation rules and executes them against database tables using Supabase storage"""
@@ -152,6 +167,80 @@ class SupabaseValidationManager:
             logger.error(f"Error adding validation rule: {str(e)}")
             return None
 
+    def get_existing_rule_names(self, organization_id: str, connection_id: str,
+                                page_size: int = 1000) -> Dict[str, set]:
+        """Get the names of every rule for a connection grouped by table, paging past the API's row limit"""
+        try:
+            rule_names = {}
+            offset = 0
+
+            while True:
+                response = self.supabase.supabase.table("validation_rules") \
+                    .select("table_name, rule_name") \
+                    .eq("organization_id", organization_id) \
+                    .eq("connection_id", connection_id) \
+                    .order("id") \
+                    .range(offset, offset + page_size - 1) \
+                    .execute()
+
+                page = response.data or []
+                for rule in page:
+                    rule_names.setdefault(rule["table_name"], set()).add(rule["rule_name"])
+                if len(page) < page_size:
+                    break
+                offset += page_size
+
+            return rule_names
+
+        except Exception as e:
+            logger.error(f"Error getting existing rule names: {str(e)}")
+            return {}
+
+    def add_rules_bulk(self, organization_id: str, connection_id: str,
+                       rules_by_table: Dict[str, List[Dict[str, Any]]], chunk_size: int = 500) -> int:
+        """
+        Add many validation rules with as few inserts as possible
+
+        Args:
+            organization_id: Organization ID
+            connection_id: Connection ID to associate with the rules
+            rules_by_table: Rule definitions (name, description, query, ...) grouped by table
+            chunk_size: Maximum number of records per insert request
+
+        Returns:
+            Number of rules inserted
+        """
+        records = []
+        for table_name, rules in rules_by_table.items():
+            for rule in rules:
+                record = {
+                    "organization_id": organization_id,
+                    "table_name": table_name,
+                    "connection_id": connection_id,
+                    "rule_name": rule.get("name", ""),
+                    "description": rule.get("description", ""),
+                    "query": rule.get("query", ""),
+                    "operator": rule.get("operator", "equals"),
+                    "expected_value": json.dumps(rule.get("expected_value", "")),
+                    # Bulk inserts need the same keys on every record
+                    "query_template": rule.get("query_template"),
+                    "template_params": rule.get("template_params")
+                }
+                records.append(record)
+
+        inserted = 0
+        for i in range(0, len(records), chunk_size):
+            chunk = records[i:i + chunk_size]
+            try:
+                response = self.supabase.supabase.table("validation_rules").insert(chunk).execute()
+                inserted += len(response.data) if response.data else 0
+            except Exception as e:
+                logger.error(f"Error adding validation rules batch: {str(e)}")
+                logger.error(traceback.format_exc())
+
+        logger.info(f"Added {inserted} validation rules for connection {connection_id}")
+        return inserted
+
     def delete_rule(self, organization_id: str, table_name: str, rule_name: str, connection_id: str = None) -> bool:
         """
         Delete a validation rule
@@ -237,99 +326,59 @@ class SupabaseValidationManager:
         try:
             # Create database engine - do this once for all rules
             logger.info(f"Creating database engine with connection string: {connection_string}")
-            engine = create_engine(connection_string, pool_recycle=600, pool_pre_ping=True)
+            engine = self._create_engine(connection_string)
 
             # Track how many results we store
             stored_results_count = 0
 
-            # Process rules in smaller batches to reduce memory pressure
-            batch_size = 5
-            for i in range(0, len(rules), batch_size):
-                batch_rules = rules[i:i + batch_size]
-                logger.info(f"Processing batch {i // batch_size + 1} with {len(batch_rules)} rules")
+            # Count checks on the table are folded into one scan; the rest run individually
+            with resource_governor.slot(connection_id, organization_id, "validation"):
+                results = self._execute_rule_group(engine, rules)
+            rules_by_id = {rule.get('id'): rule for rule in rules}
 
-                for rule in batch_rules:
-                    try:
-                        logger.info(f"Executing rule: {rule['rule_name']}")
-
-                        with engine.connect() as conn:
-                            # Set a query timeout to prevent long-running queries
-                            if 'snowflake' in connection_string.lower():
-                                conn.execute(text("ALTER SESSION SET STATEMENT_TIMEOUT_IN_SECONDS = 60"))
-
-                            # Execute the query with a timeout context if possible
-                            query = rule['query']
-                            logger.debug(f"Executing query: {query}")
-                            result = conn.execute(text(query)).fetchone()
-                            actual_value = result[0] if result else None
-                            logger.debug(f"Query result: {actual_value}")
-
-                            # Compare with expected value based on operator
-                            is_valid = self._evaluate_rule(rule['operator'], actual_value, rule['expected_value'])
-                            logger.info(
-                                f"Rule evaluation: {is_valid} (expected: {rule['expected_value']}, actual: {actual_value})")
-
-                            # Create result object
-                            validation_result = {
-                                'rule_name': rule['rule_name'],
-                                'description': rule['description'] or '',
-                                'is_valid': is_valid,
-                                'actual_value': actual_value,
-                                'expected_value': rule['expected_value'],
-                                'operator': rule['operator']
-                            }
-
-                            results.append(validation_result)
-
-                            # Store result in Supabase using the fixed store method
-                            try:
-                                logger.info(f"Storing result in Supabase for rule: {rule['rule_name']}")
-                                result_id = self.store_validation_result(
-                                    organization_id=organization_id,
-                                    rule_id=rule['id'],
-                                    is_valid=is_valid,
-                                    actual_value=actual_value,
-                                    connection_id=connection_id
-                                )
-                                if result_id:
-                                    stored_results_count += 1
-                                    logger.info(f"Result stored successfully with ID: {result_id}")
-                                else:
-                                    logger.error(f"Failed to store validation result for rule {rule['rule_name']}")
-                            except Exception as storage_error:
-                                logger.error(f"Error storing validation result: {str(storage_error)}")
-                                logger.error(traceback.format_exc())
-                                # Continue execution even if storage fails
-
-                            # Publish automation event for validation failures
-                            if not is_valid:
-                                try:
-                                    self._publish_validation_failure_event(
-                                        organization_id=organization_id,
-                                        connection_id=connection_id,
-                                        table_name=table_name,
-                                        rule_name=rule['rule_name'],
-                                        actual_value=actual_value,
-                                        expected_value=rule['expected_value']
-                                    )
-                                except Exception as event_error:
-                                    logger.error(f"Error publishing validation failure event: {str(event_error)}")
+            for validation_result in results:
+                if "error" in validation_result:
+                    continue
 
-                    except Exception as e:
-                        logger.error(f"Error executing validation rule {rule['rule_name']}: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        results.append({
-                            'rule_name': rule['rule_name'],
-                            'description': rule.get('description', ''),
-                            'is_valid': False,
-                            'error': str(e),
-                            'expected_value': rule.get('expected_value'),
-                            'operator': rule.get('operator')
-                        })
-
-                # Release memory between batches
-                import gc
-                gc.collect()
+                rule = rules_by_id[validation_result['rule_id']]
+                is_valid = validation_result["is_valid"]
+                actual_value = validation_result["actual_value"]
+
+                # Store result in Supabase using the fixed store method
+                try:
+                    logger.info(f"Storing result in Supabase for rule: {rule['rule_name']}")
+                    result_id = self.store_validation_result(
+                        organization_id=organization_id,
+                        rule_id=rule['id'],
+                        is_valid=is_valid,
+                        actual_value=actual_value,
+                        connection_id=connection_id
+                    )
+                    if result_id:
+                        stored_results_count += 1
+                        logger.info(f"Result stored successfully with ID: {result_id}")
+                    else:
+                        logger.error(f"Failed to store validation result for rule {rule['rule_name']}")
+                except Exception as storage_error:
+                    logger.error(f"Error storing validation result: {str(storage_error)}")
+                    logger.error(traceback.format_exc())
+                    # Continue execution even if storage fails
+
+                # Publish automation event for validation failures
+                if not is_valid:
+                    try:
+                        self._publish_validation_failure_event(
+                            organization_id=organization_id,
+                            connection_id=connection_id,
+                            table_name=table_name,
+                            rule_name=rule['rule_name'],
+                            actual_value=actual_value,
+                            expected_value=rule['expected_value']
+                        )
+                    except Exception as event_error:
+                        logger.error(f"Error publishing validation failure event: {str(event_error)}")
+
+            engine.dispose()
 
             logger.info(f"Validation execution complete. Stored {stored_results_count} results out of {len(results)} total results.")
             return results
@@ -339,6 +388,314 @@ class SupabaseValidationManager:
             logger.error(traceback.format_exc())
             return results  # Return whatever results we have instead of raising
 
+    def get_rules_for_connection(self, organization_id: str, connection_id: str,
+                                 page_size: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Get all active validation rules for a connection, paging past the API's row limit
+
+        Args:
+            organization_id: Organization ID
+            connection_id: Connection ID
+            page_size: Rules per request
+
+        Returns:
+            List of active rules
+        """
+        try:
+            rules = []
+            offset = 0
+
+            while True:
+                response = self.supabase.supabase.table("validation_rules") \
+                    .select("*") \
+                    .eq("organization_id", organization_id) \
+                    .eq("connection_id", connection_id) \
+                    .eq("is_active", True) \
+                    .order("id") \
+                    .range(offset, offset + page_size - 1) \
+                    .execute()
+
+                page = response.data or []
+                rules.extend(page)
+                if len(page) < page_size:
+                    break
+                offset += page_size
+
+            logger.info(f"Found {len(rules)} active validation rules for connection {connection_id}")
+            return rules
+
+        except Exception as e:
+            logger.error(f"Error getting validation rules for connection: {str(e)}")
+            logger.error(traceback.format_exc())
+            return []
+
+    @staticmethod
+    def group_rules_by_table(rules: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Group a flat list of rules by their table name, preserving rule order"""
+        rules_by_table = {}
+        for rule in rules:
+            rules_by_table.setdefault(rule.get("table_name"), []).append(rule)
+        return rules_by_table
+
+    def execute_rules_for_connection(self, organization_id: str, connection_string: str, connection_id: str,
+                                     max_workers: int = 4, profile_history_id: str = None) -> \
+            Dict[str, List[Dict[str, Any]]]:
+        """
+        Execute every active validation rule for a connection as a single pipeline.
+
+        Rules are loaded with one storage query and grouped by table. Rules whose SQL is
+        semantically identical, even on different tables, are executed once and the value
+        is evaluated for every rule that references it. The table groups run concurrently
+        on one engine whose pool is sized to the worker count, and all results are written
+        back with a single bulk insert at the end.
+
+        Args:
+            organization_id: Organization ID
+            connection_string: Database connection string
+            connection_id: Connection ID the rules belong to
+            max_workers: Maximum number of tables validated concurrently
+            profile_history_id: Optional profile history ID to attach to the results
+
+        Returns:
+            Dictionary mapping table name to the list of rule results for that table
+        """
+        rules = self.get_rules_for_connection(organization_id, connection_id)
+        if not rules:
+            logger.info(f"No active validation rules for connection {connection_id}")
+            return {}
+
+        # Identical queries run once per run, even when the rules are on different tables
+        duplicate_groups = group_duplicate_rules(rules)
+        rules_by_table = self.group_rules_by_table([group[0] for group in duplicate_groups.values()])
+        if len(duplicate_groups) < len(rules):
+            logger.info(f"Deduplicated {len(rules)} rules to {len(duplicate_groups)} distinct queries")
+
+        worker_count = max(1, min(max_workers, len(rules_by_table)))
+        logger.info(f"Executing validation rules for {len(rules_by_table)} tables with {worker_count} workers")
+
+        engine = self._create_engine(connection_string, pool_size=worker_count)
+        representative_results = {}
+
+        def execute_group(table_rules):
+            # Each concurrently validated table holds one of the connection's query slots
+            with resource_governor.slot(connection_id, organization_id, "validation"):
+                return self._execute_rule_group(engine, table_rules)
+
+        try:
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                future_to_table = {
+                    executor.submit(execute_group, table_rules): table_name
+                    for table_name, table_rules in rules_by_table.items()
+                }
+
+                for future in as_completed(future_to_table):
+                    table_name = future_to_table[future]
+                    try:
+                        table_results = future.result()
+                    except Exception as e:
+                        logger.error(f"Error executing validation rules for table {table_name}: {str(e)}")
+                        table_results = [self._error_result(rule, e) for rule in rules_by_table[table_name]]
+
+                    for rule, result in zip(rules_by_table[table_name], table_results):
+                        representative_results[id(rule)] = result
+        finally:
+            engine.dispose()
+
+        results_by_rule = self._fan_out_duplicates(duplicate_groups, representative_results)
+        results_by_table = {}
+        for rule in rules:
+            results_by_table.setdefault(rule.get("table_name"), []).append(results_by_rule[id(rule)])
+
+        # Flush every successful result in one write
+        stored = self.store_validation_results_bulk(
+            organization_id,
+            [result for table_results in results_by_table.values() for result in table_results
+             if "error" not in result],
+            connection_id=connection_id,
+            profile_history_id=profile_history_id
+        )
+        logger.info(f"Connection validation run complete. Stored {stored} results for {len(results_by_table)} tables.")
+
+        # Publish automation events for validation failures, as execute_rules does
+        for table_name, table_results in results_by_table.items():
+            for result in table_results:
+                if "error" in result or result.get("is_valid"):
+                    continue
+                self._publish_validation_failure_event(
+                    organization_id=organization_id,
+                    connection_id=connection_id,
+                    table_name=table_name,
+                    rule_name=result["rule_name"],
+                    actual_value=result.get("actual_value"),
+                    expected_value=result.get("expected_value")
+                )
+
+        return results_by_table
+
+    def _execute_rule_group(self, engine, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute a group of rules (usually one table) on a shared engine.
+
+        Rules with semantically identical SQL are executed once. Simple COUNT(*) checks
+        against the same table are answered by one aggregate query. If a combined query
+        fails, its rules fall back to individual execution so one bad rule cannot fail
+        its neighbours. Results keep the input rule order.
+        """
+        duplicate_groups = group_duplicate_rules(rules)
+        batches, singles = plan_rule_batches([group[0] for group in duplicate_groups.values()])
+        representative_results = {}
+
+        for batch in batches:
+            batch_results = self._execute_rule_batch(engine, batch)
+            if batch_results is None:
+                singles.extend(batch["rules"])
+                continue
+            for rule, result in zip(batch["rules"], batch_results):
+                representative_results[id(rule)] = result
+
+        for rule in singles:
+            representative_results[id(rule)] = self._execute_rule(engine, rule)
+
+        results_by_rule = self._fan_out_duplicates(duplicate_groups, representative_results)
+        return [results_by_rule[id(rule)] for rule in rules]
+
+    def _fan_out_duplicates(self, duplicate_groups, representative_results: Dict[int, Dict[str, Any]]) -> \
+            Dict[int, Dict[str, Any]]:
+        """Evaluate every rule in a duplicate group against the value its representative returned"""
+        results_by_rule = {}
+        for group in duplicate_groups.values():
+            source = representative_results[id(group[0])]
+            results_by_rule[id(group[0])] = source
+
+            for rule in group[1:]:
+                if "error" in source:
+                    results_by_rule[id(rule)] = self._error_result(rule, source["error"])
+                else:
+                    results_by_rule[id(rule)] = self._build_result(rule, source["actual_value"])
+
+        return results_by_rule
+
+    def _execute_rule_batch(self, engine, batch: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Execute a combined count query and fan the values out to its rules; None on failure"""
+        try:
+            logger.info(f"Executing {len(batch['rules'])} count rules on {batch['table']} in one query")
+            statement_cache = get_statement_cache(engine)
+
+            with engine.connect() as conn:
+                row = statement_cache.execute(conn, batch["query"]).fetchone()
+
+            return [
+                self._build_result(rule, row[i] if row else None)
+                for i, rule in enumerate(batch["rules"])
+            ]
+
+        except Exception as e:
+            logger.warning(f"Combined query for {batch['table']} failed, running rules individually: {str(e)}")
+            return None
+
+    def _execute_rule(self, engine, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a single rule and evaluate it, returning an error result instead of raising"""
+        try:
+            logger.info(f"Executing rule: {rule['rule_name']}")
+            statement_cache = get_statement_cache(engine)
+
+            with engine.connect() as conn:
+                query = resolve_rule_query(rule)
+                logger.debug(f"Executing query: {query}")
+                result = statement_cache.execute(conn, query).fetchone()
+                actual_value = result[0] if result else None
+                logger.debug(f"Query result: {actual_value}")
+
+            return self._build_result(rule, actual_value)
+
+        except Exception as e:
+            logger.error(f"Error executing validation rule {rule['rule_name']}: {str(e)}")
+            logger.error(traceback.format_exc())
+            return self._error_result(rule, e)
+
+    def _build_result(self, rule: Dict[str, Any], actual_value: Any) -> Dict[str, Any]:
+        """Evaluate a rule against its actual value and build the result entry"""
+        # Compare with expected value based on operator
+        is_valid = self._evaluate_rule(rule['operator'], actual_value, rule['expected_value'])
+        logger.info(
+            f"Rule evaluation: {is_valid} (expected: {rule['expected_value']}, actual: {actual_value})")
+
+        return {
+            'rule_id': rule.get('id'),
+            'rule_name': rule['rule_name'],
+            'description': rule['description'] or '',
+            'is_valid': is_valid,
+            'actual_value': actual_value,
+            'expected_value': rule['expected_value'],
+            'operator': rule['operator']
+        }
+
+    @staticmethod
+    def _error_result(rule: Dict[str, Any], error) -> Dict[str, Any]:
+        """Build the result entry for a rule that could not be executed"""
+        return {
+            'rule_id': rule.get('id'),
+            'rule_name': rule['rule_name'],
+            'description': rule.get('description', ''),
+            'is_valid': False,
+            'error': str(error),
+            'expected_value': rule.get('expected_value'),
+            'operator': rule.get('operator')
+        }
+
+    @staticmethod
+    def _create_engine(connection_string: str, pool_size: int = None):
+        """
+        Get the engine for rule execution, optionally with a pool sized for concurrent workers
+
+        Engines are reused per connection string and pool size, so cached statements
+        survive from one run to the next. Runs still call engine.dispose() when they
+        finish, which closes the pooled connections but keeps the engine usable.
+        """
+        key = (connection_string, pool_size)
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is not None:
+                _engines.move_to_end(key)
+                return engine
+
+        engine = SupabaseValidationManager._build_engine(connection_string, pool_size)
+        with _engines_lock:
+            if key in _engines:
+                engine.dispose()
+                return _engines[key]
+            _engines[key] = engine
+            if len(_engines) > MAX_CACHED_ENGINES:
+                _, evicted = _engines.popitem(last=False)
+                evicted.dispose()
+        return engine
+
+    @staticmethod
+    def _build_engine(connection_string: str, pool_size: int = None):
+        engine_kwargs = {"pool_recycle": 600, "pool_pre_ping": True}
+        if pool_size:
+            engine_kwargs.update(pool_size=pool_size, max_overflow=0)
+
+        try:
+            engine = create_engine(connection_string, **engine_kwargs)
+        except TypeError:
+            # Dialects with a non-queue pool (e.g. SQLite) reject pool sizing arguments
+            engine_kwargs.pop("pool_size", None)
+            engine_kwargs.pop("max_overflow", None)
+            engine = create_engine(connection_string, **engine_kwargs)
+
+        if 'snowflake' in connection_string.lower():
+            # Set a query timeout once per pooled connection to prevent long-running queries
+            @event.listens_for(engine, "connect")
+            def _set_statement_timeout(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute("ALTER SESSION SET STATEMENT_TIMEOUT_IN_SECONDS = 60")
+                finally:
+                    cursor.close()
+
+        return engine
+
     def _evaluate_rule(self, operator: str, actual_value: Any, expected_value: Any) -> bool:
         """Evaluate whether the actual value meets the expected value based on the operator"""
         if actual_value is None:
@@ -417,6 +774,11 @@ class SupabaseValidationManager:
                 "expected_value": expected_value
             }
 
+            # An edited query no longer matches the template it was generated from
+            if "query" in rule:
+                data.update(template_update_fields(
+                    rule, self.supabase.get_validation_rule_template(organization_id, rule_id)))
+
             # Only include connection_id in the update if provided
             if connection_id:
                 data["connection_id"] = connection_id
@@ -481,6 +843,62 @@ class SupabaseValidationManager:
             logger.error(traceback.format_exc())
             return None
 
+    def store_validation_results_bulk(self, organization_id: str, results: List[Dict[str, Any]],
+                                      connection_id: str = None, profile_history_id: str = None,
+                                      chunk_size: int = 500) -> int:
+        """
+        Store many validation results with as few inserts as possible
+
+        Args:
+            organization_id: Organization ID
+            results: Rule results as returned by the executor (must include rule_id)
+            connection_id: Connection ID to attach to every record
+            profile_history_id: Optional profile history ID to attach to every record
+            chunk_size: Maximum number of records per insert request
+
+        Returns:
+            Number of records stored
+        """
+        run_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        records = []
+        for result in results:
+            if not result.get("rule_id"):
+                continue
+            try:
+                actual_value = result.get("actual_value")
+                records.append({
+                    "id": str(uuid.uuid4()),
+                    "organization_id": organization_id,
+                    "rule_id": result["rule_id"],
+                    "is_valid": result["is_valid"],
+                    "run_at": run_at,
+                    # Decimal and date values from SUM/AVG/MIN/MAX are stored as strings
+                    "actual_value": json.dumps(actual_value, default=str) if actual_value is not None else None,
+                    "connection_id": connection_id,
+                    "profile_history_id": profile_history_id
+                })
+            except Exception as e:
+                logger.error(f"Error preparing validation result for rule {result.get('rule_id')}: {str(e)}")
+
+        stored = 0
+        for i in range(0, len(records), chunk_size):
+            chunk = records[i:i + chunk_size]
+            try:
+                response = self.supabase.supabase.table("validation_results").insert(chunk).execute()
+                stored += len(response.data) if response.data else 0
+            except Exception as e:
+                # One bad record fails the whole insert, so store the chunk record by record
+                logger.error(f"Error storing validation results batch, storing individually: {str(e)}")
+                for record in chunk:
+                    try:
+                        response = self.supabase.supabase.table("validation_results").insert(record).execute()
+                        stored += len(response.data) if response.data else 0
+                    except Exception as record_error:
+                        logger.error(f"Error storing validation result for rule {record['rule_id']}: "
+                                     f"{str(record_error)}")
+
+        return stored
+
     def get_validation_summary(self, organization_id: str, connection_id: str) -> Dict[str, Any]:
         """Get validation summary for automation dashboard"""
         try:
@@ -6,7 +6,7 @@ import logging
 import traceback
 import concurrent.futures
 import psutil
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 
 from core.auth.decorators import token_required
 from core.connections.utils import connection_access_check
@@ -14,6 +14,10 @@ from core.storage.supabase_manager import SupabaseManager
 from core.metadata.storage_service import MetadataStorageService
 from core.metadata.collector import MetadataCollector
 from core.validations.supabase_validation_manager import SupabaseValidationManager
+from core.validations.run_registry import validation_run_registry
+from core.validations.query_templates import templated_query, find_overlapping_rules
+from core.validations.default_validations import load_table_schemas_from_metadata
+from core.utils.resource_governor import resource_governor
 from sparvi.validations.validator import run_validations as sparvi_run_validations
 
 logger = logging.getLogger(__name__)
@@ -41,12 +45,37 @@ def register_validation_routes(app):
             rules = validation_manager.get_rules(organization_id, table_name, connection_id)
             logger.info(f"Retrieved {len(rules)} validation rules")
             logger.debug(f"Rules content: {rules}")
-            return jsonify({"rules": rules})
+            return jsonify({"rules": rules, "overlaps": find_overlapping_rules(rules)})
         except Exception as e:
             logger.error(f"Error getting validation rules: {str(e)}")
             traceback.print_exc()
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/validations/overlaps", methods=["GET"])
+    @token_required
+    def get_validation_overlaps(current_user, organization_id):
+        """Get sets of validation rules on a connection that run the same query"""
+        connection_id = request.args.get("connection_id")
+        if not connection_id:
+            return jsonify({"error": "Connection ID is required"}), 400
+
+        try:
+            connection = connection_access_check(connection_id, organization_id)
+            if not connection:
+                return jsonify({"error": "Connection not found or access denied"}), 404
+
+            rules = validation_manager.get_rules_for_connection(organization_id, connection_id)
+            overlaps = find_overlapping_rules(rules)
+            return jsonify({
+                "overlaps": overlaps,
+                "total_rules": len(rules),
+                "distinct_queries": len(rules) - sum(len(o["rule_ids"]) - 1 for o in overlaps)
+            })
+        except Exception as e:
+            logger.error(f"Error getting validation overlaps: {str(e)}")
+            traceback.print_exc()
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/validations/summary", methods=["GET"])
     @token_required
     def get_validations_summary(current_user, organization_id):
@@ -389,6 +418,54 @@ def register_validation_routes(app):
 
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/run-validations/stream", methods=["POST"])
+    @token_required
+    def stream_validation_rules(current_user, organization_id):
+        """Run all validation rules for a table, streaming each result as NDJSON as soon as it completes"""
+        data = request.get_json()
+        logger.info(f"Streaming run validations request: {data}")
+
+        if not data or "table" not in data:
+            return jsonify({"error": "Table name is required"}), 400
+
+        connection_id = data.get("connection_id")
+        if not connection_id:
+            return jsonify({"error": "Connection ID is required"}), 400
+
+        # The run executes on the registry's bounded pool so it completes (and stays
+        # pollable by this worker process) even if the client disconnects from the stream
+        run = validation_run_registry.start_run(organization_id, connection_id, data["table"],
+                                                execute_validation_run, current_user, organization_id, data)
+        if not run:
+            return jsonify({"error": "Too many validation runs in progress, try again later"}), 429
+
+        # Detached runs return immediately; the client polls the run id instead
+        if data.get("detach"):
+            return jsonify({"run_id": run.id, "status": run.status}), 202
+
+        return Response(
+            stream_with_context(stream_validation_run(run)),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @app.route("/api/run-validations/<run_id>", methods=["GET"])
+    @token_required
+    def get_validation_run(current_user, organization_id, run_id):
+        """
+        Get the progress or final results of a validation run
+
+        Runs are tracked in the memory of the worker process that started them, so a
+        poll answered by another process (or after a restart) finds no run; the
+        rule results themselves are in the validation history.
+        """
+        run = validation_run_registry.get_run(run_id, organization_id)
+        if not run:
+            return jsonify({"error": "Validation run not found; its results are available in the "
+                                     "validation history"}), 404
+
+        return jsonify(json.loads(json.dumps(run.to_dict(), default=str)))
+
     @app.route("/api/generate-default-validations", methods=["POST"])
     @token_required
     def generate_default_validations(current_user, organization_id):
@@ -396,14 +473,15 @@ def register_validation_routes(app):
 
         logger.info(f"Received default validations request: {data}")
 
-        if not data or "table" not in data:
+        if not data or not (data.get("table") or data.get("tables")):
             return jsonify({"error": "Table name is required"}), 400
 
         if not data.get("connection_id"):
             return jsonify({"error": "Connection ID is required"}), 400
 
-        # Extract values
-        table_name = data["table"]
+        # Extract values - accept a single table or a list of tables
+        table_names = data.get("tables") or [data["table"]]
+        single_table = len(table_names) == 1
         connection_id = data.get("connection_id")
 
         try:
@@ -412,139 +490,68 @@ def register_validation_routes(app):
             if not connection:
                 return jsonify({"error": "Connection not found or access denied"}), 404
 
-            # Build proper connection string
-            from app import get_connection_string  # Import from app.py to avoid circular import
-            connection_string = get_connection_string(connection)
-            if not connection_string:
-                return jsonify({"error": "Failed to build connection string"}), 400
-
-            # Get existing rules
-            existing_rules = validation_manager.get_rules(organization_id, table_name, connection_id)
-            existing_rule_names = {rule['rule_name'] for rule in existing_rules}
-
-            logger.info(f"Found {len(existing_rules)} existing rules for table {table_name}")
+            # Get existing rule names for every table in one query
+            existing_rule_names = validation_manager.get_existing_rule_names(organization_id, connection_id)
 
-            # Try to verify table first
-            try:
-                # Create a temporary connection to verify table
-                from app import get_connector_for_connection  # Import from app.py to avoid circular import
-                connector = get_connector_for_connection(connection)
-                connector.connect()
+            # Use stored column metadata when it is fresh - no warehouse queries needed
+            schemas = load_table_schemas_from_metadata(MetadataStorageService(), connection_id, table_names)
+            live_tables = [table_name for table_name in table_names if table_name not in schemas]
+            logger.info(f"Generating defaults for {len(table_names)} tables: "
+                        f"{len(schemas)} from stored metadata, {len(live_tables)} by live inspection")
 
-                # Try a simple count query to verify access
+            errors = []
+            if live_tables:
                 try:
-                    result = connector.execute_query(f"SELECT COUNT(*) FROM {table_name}")
-                    row_count = result[0][0] if result and len(result) > 0 else 0
-                    logger.info(f"Table {table_name} exists with {row_count} rows")
-                except Exception as query_error:
-                    logger.error(f"Error querying table: {str(query_error)}")
-                    return jsonify({"error": f"Error accessing table {table_name}: {str(query_error)}"}), 400
-
-            except Exception as conn_error:
-                logger.error(f"Error connecting to database: {str(conn_error)}")
-                return jsonify({"error": f"Error connecting to database: {str(conn_error)}"}), 500
-
-            # Generate validations through connector to ensure consistent schema access
-            try:
-                # Get columns first
-                columns = connector.get_columns(table_name)
-                logger.info(f"Found {len(columns)} columns for table {table_name}")
-
-                # Get primary keys
-                primary_keys = connector.get_primary_keys(table_name)
-                logger.info(f"Found primary keys: {primary_keys}")
-
-                # Now generate validations manually instead of using get_default_validations
-                validations = []
-
-                # 1. Basic row count validation
-                validations.append({
-                    "name": f"check_{table_name}_not_empty",
-                    "description": f"Ensure {table_name} table has at least one row",
-                    "query": f"SELECT COUNT(*) FROM {table_name}",
-                    "operator": "greater_than",
-                    "expected_value": 0
-                })
-
-                # 2. Add validations for each column
-                for column in columns:
-                    column_name = column.get("name")
-                    column_type = str(column.get("type", "")).lower()
-                    is_nullable = column.get("nullable", True)
-
-                    # Not null check for non-nullable columns
-                    if not is_nullable and column_name not in primary_keys:
-                        validations.append({
-                            "name": f"check_{column_name}_not_null",
-                            "description": f"Ensure {column_name} has no NULL values",
-                            "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} IS NULL",
-                            "operator": "equals",
-                            "expected_value": 0
-                        })
-
-                    # Type-specific checks
-                    if "int" in column_type or "float" in column_type or "numeric" in column_type:
-                        # Check for negative values in numeric columns
-                        validations.append({
-                            "name": f"check_{column_name}_not_negative",
-                            "description": f"Ensure {column_name} has no negative values",
-                            "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} < 0",
-                            "operator": "equals",
-                            "expected_value": 0
-                        })
-
-                    elif "char" in column_type or "text" in column_type or "string" in column_type:
-                        # Check for empty strings
-                        validations.append({
-                            "name": f"check_{column_name}_not_empty_string",
-                            "description": f"Ensure {column_name} has no empty strings",
-                            "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} = ''",
-                            "operator": "equals",
-                            "expected_value": 0
-                        })
-
-                        # Email pattern check if column name suggests email
-                        if "email" in column_name.lower():
-                            validations.append({
-                                "name": f"check_{column_name}_valid_email",
-                                "description": f"Ensure {column_name} contains valid email format",
-                                "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} IS NOT NULL AND {column_name} NOT LIKE '%@%.%'",
-                                "operator": "equals",
-                                "expected_value": 0
-                            })
-
-                    elif "date" in column_type or "time" in column_type:
-                        # Check for future dates
-                        validations.append({
-                            "name": f"check_{column_name}_not_future",
-                            "description": f"Ensure {column_name} contains no future dates",
-                            "query": f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} > CURRENT_DATE",
-                            "operator": "equals",
-                            "expected_value": 0
-                        })
-
-                logger.info(f"Generated {len(validations)} validation rules")
-
-            except Exception as gen_error:
-                logger.error(f"Error generating validations: {str(gen_error)}")
-                return jsonify({"error": f"Error generating validations: {str(gen_error)}"}), 500
+                    # Create a temporary connection to inspect tables without fresh metadata
+                    from app import get_connector_for_connection  # Import from app.py to avoid circular import
+                    connector = get_connector_for_connection(connection)
+                    connector.connect()
+                except Exception as conn_error:
+                    logger.error(f"Error connecting to database: {str(conn_error)}")
+                    return jsonify({"error": f"Error connecting to database: {str(conn_error)}"}), 500
+
+                for table_name in live_tables:
+                    # Try a simple count query to verify access
+                    try:
+                        result = connector.execute_query(f"SELECT COUNT(*) FROM {table_name}")
+                        row_count = result[0][0] if result and len(result) > 0 else 0
+                        logger.info(f"Table {table_name} exists with {row_count} rows")
+                    except Exception as query_error:
+                        logger.error(f"Error querying table: {str(query_error)}")
+                        if single_table:
+                            return jsonify({"error": f"Error accessing table {table_name}: {str(query_error)}"}), 400
+                        errors.append({"table_name": table_name, "error": str(query_error)})
+                        continue
 
-            # Add the validations
-            count_added = 0
+                    try:
+                        schemas[table_name] = {
+                            "columns": connector.get_columns(table_name),
+                            "primary_keys": connector.get_primary_keys(table_name)
+                        }
+                    except Exception as gen_error:
+                        logger.error(f"Error generating validations: {str(gen_error)}")
+                        if single_table:
+                            return jsonify({"error": f"Error generating validations: {str(gen_error)}"}), 500
+                        errors.append({"table_name": table_name, "error": str(gen_error)})
+
+            # Generate validations and keep only rules that do not exist yet
+            new_rules_by_table = {}
             count_skipped = 0
+            for table_name in table_names:
+                if table_name not in schemas:
+                    continue
 
-            for validation in validations:
-                try:
-                    # Skip if rule with same name already exists
-                    if validation['name'] in existing_rule_names:
-                        count_skipped += 1
-                        continue
+                validations = build_basic_validations(
+                    table_name, schemas[table_name]["columns"], schemas[table_name]["primary_keys"]
+                )
+                logger.info(f"Generated {len(validations)} validation rules for table {table_name}")
+
+                existing = existing_rule_names.get(table_name, set())
+                new_rules_by_table[table_name] = [v for v in validations if v["name"] not in existing]
+                count_skipped += len(validations) - len(new_rules_by_table[table_name])
 
-                    # Add the rule through the validation manager
-                    validation_manager.add_rule(organization_id, table_name, connection_id, validation)
-                    count_added += 1
-                except Exception as add_error:
-                    logger.error(f"Failed to add validation rule {validation['name']}: {str(add_error)}")
+            # Add the validations in bulk
+            count_added = validation_manager.add_rules_bulk(organization_id, connection_id, new_rules_by_table)
 
             result = {
                 "added": count_added,
@@ -553,13 +560,18 @@ def register_validation_routes(app):
             }
 
             logger.info(f"Added {result['added']} default validation rules ({result['skipped']} skipped as duplicates)")
-            return jsonify({
+            response = {
                 "success": True,
                 "message": f"Added {result['added']} default validation rules ({result['skipped']} skipped as duplicates)",
                 "count": result['added'],
                 "skipped": result['skipped'],
-                "total": result['total']
-            })
+                "total": result['total'],
+                "tables_processed": len(new_rules_by_table),
+                "live_inspected_tables": len(live_tables)
+            }
+            if errors:
+                response["errors"] = errors
+            return jsonify(response)
         except Exception as e:
             logger.error(f"Error generating default validations: {str(e)}")
             traceback.print_exc()
@@ -693,8 +705,12 @@ def register_validation_routes(app):
             return jsonify({"error": str(e)}), 500
 
 
-def run_validation_rules_internal(user_id, organization_id, data):
-    """Internal version of run_validation_rules that can be called from other functions"""
+def run_validation_rules_internal(user_id, organization_id, data, on_result=None):
+    """
+    Internal version of run_validation_rules that can be called from other functions
+
+    If on_result is given it is called with each rule result as soon as it completes.
+    """
     if not data or "table" not in data:
         return {"error": "Table name is required"}
 
@@ -770,8 +786,10 @@ def run_validation_rules_internal(user_id, organization_id, data):
         def execute_validation_rule(rule, connection_string):
             """Execute a single validation rule"""
             try:
-                # Use sparvi_run_validations but with a single rule for better performance
-                result = sparvi_run_validations(connection_string, [rule])
+                # Each concurrent rule holds one of the connection's query slots
+                with resource_governor.slot(connection_id, organization_id, "validation"):
+                    # Use sparvi_run_validations but with a single rule for better performance
+                    result = sparvi_run_validations(connection_string, [rule])
                 return result[0] if result else None
             except Exception as e:
                 logger.error(f"Error executing validation rule {rule['name']}: {str(e)}")
@@ -801,6 +819,9 @@ def run_validation_rules_internal(user_id, organization_id, data):
                     if result:
                         results.append(result)
 
+                        if on_result:
+                            on_result(result)
+
                         # Store result in Supabase
                         actual_value = result.get("actual_value", None)
                         validation_manager.store_validation_result(
@@ -856,6 +877,130 @@ def run_validation_rules_internal(user_id, organization_id, data):
         return {"error": str(e)}
 
 
+def build_basic_validations(table_name, columns, primary_keys):
+    """Generate the basic default validation rules for a table from its columns and primary keys"""
+    # 1. Basic row count validation
+    validations = [{
+        "name": f"check_{table_name}_not_empty",
+        "description": f"Ensure {table_name} table has at least one row",
+        **templated_query("row_count", table=table_name),
+        "operator": "greater_than",
+        "expected_value": 0
+    }]
+
+    # 2. Add validations for each column
+    for column in columns:
+        column_name = column.get("name")
+        column_type = str(column.get("type", "")).lower()
+        is_nullable = column.get("nullable", True)
+
+        # Not null check for non-nullable columns
+        if not is_nullable and column_name not in primary_keys:
+            validations.append({
+                "name": f"check_{column_name}_not_null",
+                "description": f"Ensure {column_name} has no NULL values",
+                **templated_query("not_null", table=table_name, column=column_name),
+                "operator": "equals",
+                "expected_value": 0
+            })
+
+        # Type-specific checks
+        if "int" in column_type or "float" in column_type or "numeric" in column_type:
+            # Check for negative values in numeric columns
+            validations.append({
+                "name": f"check_{column_name}_not_negative",
+                "description": f"Ensure {column_name} has no negative values",
+                **templated_query("not_negative", table=table_name, column=column_name),
+                "operator": "equals",
+                "expected_value": 0
+            })
+
+        elif "char" in column_type or "text" in column_type or "string" in column_type:
+            # Check for empty strings
+            validations.append({
+                "name": f"check_{column_name}_not_empty_string",
+                "description": f"Ensure {column_name} has no empty strings",
+                **templated_query("not_empty_string", table=table_name, column=column_name),
+                "operator": "equals",
+                "expected_value": 0
+            })
+
+            # Email pattern check if column name suggests email
+            if "email" in column_name.lower():
+                validations.append({
+                    "name": f"check_{column_name}_valid_email",
+                    "description": f"Ensure {column_name} contains valid email format",
+                    **templated_query("valid_email", table=table_name, column=column_name),
+                    "operator": "equals",
+                    "expected_value": 0
+                })
+
+        elif "date" in column_type or "time" in column_type:
+            # Check for future dates
+            validations.append({
+                "name": f"check_{column_name}_not_future",
+                "description": f"Ensure {column_name} contains no future dates",
+                **templated_query("not_future", table=table_name, column=column_name),
+                "operator": "equals",
+                "expected_value": 0
+            })
+
+    return validations
+
+
+def execute_validation_run(run, user_id, organization_id, data):
+    """Execute a registered validation run, recording results on the run as they complete"""
+    try:
+        result = run_validation_rules_internal(user_id, organization_id, data, on_result=run.add_result)
+
+        if "error" in result:
+            run.finish(error=result["error"])
+            return
+
+        results = result.get("results", [])
+        run.finish(summary={
+            "total": len(results),
+            "passed": sum(1 for r in results if r.get("is_valid")),
+            "failed": sum(1 for r in results if not r.get("is_valid") and "error" not in r),
+            "errors": sum(1 for r in results if "error" in r)
+        })
+    except Exception as e:
+        logger.error(f"Error executing validation run {run.id}: {str(e)}")
+        logger.error(traceback.format_exc())
+        run.finish(error=str(e))
+
+
+def stream_validation_run(run, heartbeat_seconds=15.0):
+    """Yield NDJSON events for a run: started, one result per rule, then a summary"""
+
+    def event(payload):
+        return json.dumps(payload, default=str) + "\n"
+
+    yield event({"event": "started", "run_id": run.id, "table": run.table_name})
+
+    index = 0
+    while True:
+        new_results = run.wait_for_results(index, timeout=heartbeat_seconds)
+        for result in new_results:
+            yield event({"event": "result", "run_id": run.id, "index": index, "result": result})
+            index += 1
+
+        if run.finished and index >= len(run.results):
+            break
+
+        if not new_results:
+            # Keep proxies from closing an idle stream while a slow rule runs
+            yield event({"event": "heartbeat", "run_id": run.id})
+
+    yield event({
+        "event": "summary",
+        "run_id": run.id,
+        "status": run.status,
+        "summary": run.summary,
+        "error": run.error
+    })
+
+
 def log_memory_usage(label=""):
     """Log current memory usage"""
     try:
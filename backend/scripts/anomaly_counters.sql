@@ -0,0 +1,173 @@
+-- Pre-aggregated anomaly counts, maintained by triggers on anomaly_results, so
+-- dashboards never scan anomaly_results. Counting in the database keeps the
+-- counters exact under concurrent status changes and when anomalies are
+-- deleted, including deletes cascaded from their config.
+CREATE TABLE IF NOT EXISTS anomaly_daily_counters (
+    organization_id UUID NOT NULL,
+    connection_id UUID NOT NULL,
+    day DATE NOT NULL,
+    table_name TEXT NOT NULL DEFAULT '',
+    severity TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, connection_id, day, table_name, severity, status)
+);
+
+-- Counters used to be incremented by the application
+DROP FUNCTION IF EXISTS increment_anomaly_counters(JSONB);
+
+-- Move counts from the removed rows' counters to the added rows' counters.
+-- Rows whose counted columns did not change cancel out and are not written.
+CREATE OR REPLACE FUNCTION shift_anomaly_counters(p_removed anomaly_results[], p_added anomaly_results[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO anomaly_daily_counters AS c
+        (organization_id, connection_id, day, table_name, severity, status, count)
+    SELECT
+        organization_id,
+        connection_id,
+        (detected_at AT TIME ZONE 'UTC')::date,
+        COALESCE(table_name, ''),
+        COALESCE(severity, 'medium'),
+        COALESCE(status, 'open'),
+        SUM(delta)
+    FROM (
+        SELECT organization_id, connection_id, detected_at, table_name, severity, status, -1 AS delta
+        FROM unnest(p_removed)
+        UNION ALL
+        SELECT organization_id, connection_id, detected_at, table_name, severity, status, 1 AS delta
+        FROM unnest(p_added)
+    ) changes
+    GROUP BY 1, 2, 3, 4, 5, 6
+    HAVING SUM(delta) <> 0
+    ON CONFLICT (organization_id, connection_id, day, table_name, severity, status)
+    DO UPDATE SET count = GREATEST(c.count + EXCLUDED.count, 0);
+$$;
+
+-- Statement-level, so a bulk insert updates each counter row once
+CREATE OR REPLACE FUNCTION maintain_anomaly_counters()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM shift_anomaly_counters('{}', ARRAY(SELECT n FROM new_rows n));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM shift_anomaly_counters(ARRAY(SELECT o FROM old_rows o), '{}');
+    ELSE
+        PERFORM shift_anomaly_counters(ARRAY(SELECT o FROM old_rows o), ARRAY(SELECT n FROM new_rows n));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS anomaly_counters_insert ON anomaly_results;
+CREATE TRIGGER anomaly_counters_insert
+    AFTER INSERT ON anomaly_results
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_anomaly_counters();
+
+DROP TRIGGER IF EXISTS anomaly_counters_update ON anomaly_results;
+CREATE TRIGGER anomaly_counters_update
+    AFTER UPDATE ON anomaly_results
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_anomaly_counters();
+
+DROP TRIGGER IF EXISTS anomaly_counters_delete ON anomaly_results;
+CREATE TRIGGER anomaly_counters_delete
+    AFTER DELETE ON anomaly_results
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_anomaly_counters();
+
+-- Rebuild from existing results. Writes are blocked while counting so no change
+-- is missed, and counts that drifted under application-side maintenance are reset.
+BEGIN;
+LOCK TABLE anomaly_results IN SHARE MODE;
+DELETE FROM anomaly_daily_counters;
+INSERT INTO anomaly_daily_counters (organization_id, connection_id, day, table_name, severity, status, count)
+SELECT
+    organization_id,
+    connection_id,
+    (detected_at AT TIME ZONE 'UTC')::date,
+    COALESCE(table_name, ''),
+    COALESCE(severity, 'medium'),
+    COALESCE(status, 'open'),
+    COUNT(*)
+FROM anomaly_results
+GROUP BY 1, 2, 3, 4, 5, 6;
+COMMIT;
+
+-- Dashboard aggregates now read the counters; the result shape is unchanged.
+CREATE OR REPLACE FUNCTION get_anomaly_dashboard_aggregates(
+    p_organization_id UUID,
+    p_connection_id UUID,
+    p_days INTEGER DEFAULT 30
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH window_counts AS (
+        SELECT day, table_name, severity, status, count
+        FROM anomaly_daily_counters
+        WHERE organization_id = p_organization_id
+          AND connection_id = p_connection_id
+          AND day >= (NOW() AT TIME ZONE 'UTC')::date - p_days
+          AND count > 0
+    ),
+    days AS (
+        SELECT generate_series(
+            (NOW() AT TIME ZONE 'UTC')::date - p_days,
+            (NOW() AT TIME ZONE 'UTC')::date,
+            '1 day'::interval
+        )::date AS day
+    ),
+    daily_counts AS (
+        SELECT
+            day,
+            SUM(count) AS total,
+            SUM(count) FILTER (WHERE severity = 'high') AS high,
+            SUM(count) FILTER (WHERE severity = 'medium') AS medium,
+            SUM(count) FILTER (WHERE severity = 'low') AS low
+        FROM window_counts
+        GROUP BY day
+    )
+    SELECT jsonb_build_object(
+        'severity', COALESCE((
+            SELECT jsonb_object_agg(severity, count)
+            FROM (SELECT severity, SUM(count) AS count FROM window_counts GROUP BY severity) s
+        ), '{}'::jsonb),
+        'status', COALESCE((
+            SELECT jsonb_object_agg(status, count)
+            FROM (SELECT status, SUM(count) AS count FROM window_counts GROUP BY status) s
+        ), '{}'::jsonb),
+        'by_table', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('table_name', table_name, 'count', count) ORDER BY count DESC)
+            FROM (
+                SELECT NULLIF(table_name, '') AS table_name, SUM(count) AS count
+                FROM window_counts
+                GROUP BY table_name
+                ORDER BY count DESC
+                LIMIT 10
+            ) t
+        ), '[]'::jsonb),
+        'detected_today', (
+            SELECT COALESCE(SUM(count), 0)
+            FROM window_counts
+            WHERE day = (NOW() AT TIME ZONE 'UTC')::date
+        ),
+        'trends', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'date', days.day::text,
+                'total', COALESCE(daily_counts.total, 0),
+                'high', COALESCE(daily_counts.high, 0),
+                'medium', COALESCE(daily_counts.medium, 0),
+                'low', COALESCE(daily_counts.low, 0)
+            ) ORDER BY days.day)
+            FROM days
+            LEFT JOIN daily_counts ON days.day = daily_counts.day
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,78 @@
+-- Anomaly dashboard aggregates in one parameterized call.
+-- Replaces the string-built execute_sql queries in AnomalyAPI.get_summary and
+-- _get_anomaly_trends; as a SQL function the plan is prepared once and reused.
+CREATE OR REPLACE FUNCTION get_anomaly_dashboard_aggregates(
+    p_organization_id UUID,
+    p_connection_id UUID,
+    p_days INTEGER DEFAULT 30
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH window_results AS (
+        SELECT severity, status, table_name, detected_at
+        FROM anomaly_results
+        WHERE organization_id = p_organization_id
+          AND connection_id = p_connection_id
+          AND detected_at >= NOW() - make_interval(days => p_days)
+    ),
+    days AS (
+        SELECT generate_series(
+            date_trunc('day', CURRENT_DATE - make_interval(days => p_days)),
+            date_trunc('day', CURRENT_DATE),
+            '1 day'::interval
+        )::date AS day
+    ),
+    daily_counts AS (
+        SELECT
+            date_trunc('day', detected_at)::date AS day,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE severity = 'high') AS high,
+            COUNT(*) FILTER (WHERE severity = 'medium') AS medium,
+            COUNT(*) FILTER (WHERE severity = 'low') AS low
+        FROM window_results
+        GROUP BY 1
+    )
+    SELECT jsonb_build_object(
+        'severity', COALESCE((
+            SELECT jsonb_object_agg(severity, count)
+            FROM (SELECT severity, COUNT(*) AS count FROM window_results GROUP BY severity) s
+        ), '{}'::jsonb),
+        'status', COALESCE((
+            SELECT jsonb_object_agg(status, count)
+            FROM (SELECT status, COUNT(*) AS count FROM window_results GROUP BY status) s
+        ), '{}'::jsonb),
+        'by_table', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('table_name', table_name, 'count', count) ORDER BY count DESC)
+            FROM (
+                SELECT table_name, COUNT(*) AS count
+                FROM window_results
+                GROUP BY table_name
+                ORDER BY count DESC
+                LIMIT 10
+            ) t
+        ), '[]'::jsonb),
+        'detected_today', (
+            SELECT COUNT(*)
+            FROM anomaly_results
+            WHERE organization_id = p_organization_id
+              AND connection_id = p_connection_id
+              AND detected_at >= date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        ),
+        'trends', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'date', days.day::text,
+                'total', COALESCE(daily_counts.total, 0),
+                'high', COALESCE(daily_counts.high, 0),
+                'medium', COALESCE(daily_counts.medium, 0),
+                'low', COALESCE(daily_counts.low, 0)
+            ) ORDER BY days.day)
+            FROM days
+            LEFT JOIN daily_counts ON days.day = daily_counts.day
+        ), '[]'::jsonb)
+    );
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_anomaly_results_org_conn_detected
+    ON anomaly_results(organization_id, connection_id, detected_at);
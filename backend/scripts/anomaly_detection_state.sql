@@ -0,0 +1,56 @@
+-- Running statistics for anomaly configs evaluated at ingestion time
+-- (config_params.online = true). One compact row per config.
+CREATE TABLE IF NOT EXISTS anomaly_detection_state (
+    config_id UUID PRIMARY KEY REFERENCES anomaly_detection_configs(id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL,
+    state JSONB NOT NULL,
+    last_timestamp TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_anomaly_detection_state_org ON anomaly_detection_state(organization_id);
+
+-- Version counter so concurrent ingestion for one config cannot overwrite
+-- each other's state updates.
+ALTER TABLE anomaly_detection_state ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+-- Save a batch of online states with a version check.
+-- p_states: [{"config_id", "organization_id", "state", "last_timestamp", "version"}]
+-- A state with a null version is inserted only if the config has no row yet;
+-- otherwise it is written only if the row still has that version. Returns the
+-- config ids that were not written because another writer got there first.
+CREATE OR REPLACE FUNCTION save_anomaly_detection_states(p_states JSONB)
+RETURNS SETOF UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    item JSONB;
+BEGIN
+    FOR item IN SELECT * FROM jsonb_array_elements(p_states) LOOP
+        IF jsonb_typeof(item->'version') IS DISTINCT FROM 'number' THEN
+            INSERT INTO anomaly_detection_state (config_id, organization_id, state, last_timestamp, updated_at, version)
+            VALUES (
+                (item->>'config_id')::uuid,
+                (item->>'organization_id')::uuid,
+                item->'state',
+                (item->>'last_timestamp')::timestamptz,
+                NOW(),
+                1
+            )
+            ON CONFLICT (config_id) DO NOTHING;
+        ELSE
+            UPDATE anomaly_detection_state
+            SET state = item->'state',
+                last_timestamp = (item->>'last_timestamp')::timestamptz,
+                updated_at = NOW(),
+                version = version + 1
+            WHERE config_id = (item->>'config_id')::uuid
+              AND version = (item->>'version')::integer;
+        END IF;
+
+        IF NOT FOUND THEN
+            RETURN NEXT (item->>'config_id')::uuid;
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- Last evaluated metric timestamp per anomaly config. Scheduled runs skip configs
+-- with no newer metrics and only evaluate points after the watermark.
+CREATE TABLE IF NOT EXISTS anomaly_detection_watermarks (
+    config_id UUID PRIMARY KEY REFERENCES anomaly_detection_configs(id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL,
+    last_metric_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Timestamp of the metric point an anomaly was detected on
+ALTER TABLE anomaly_results ADD COLUMN IF NOT EXISTS metric_timestamp TIMESTAMPTZ;
+
+-- Remove duplicates recorded before the unique index existed (keeps the earliest)
+DELETE FROM anomaly_results a
+USING anomaly_results b
+WHERE a.config_id = b.config_id
+  AND a.metric_timestamp = b.metric_timestamp
+  AND a.detected_at > b.detected_at;
+
+-- One anomaly per config and metric point
+CREATE UNIQUE INDEX IF NOT EXISTS idx_anomaly_results_config_point
+    ON anomaly_results(config_id, metric_timestamp);
@@ -0,0 +1,42 @@
+-- Lease columns for atomically claiming due scheduled jobs across instances
+ALTER TABLE automation_scheduled_jobs ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE automation_scheduled_jobs ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_automation_scheduled_jobs_due
+    ON automation_scheduled_jobs(next_run_at)
+    WHERE enabled = TRUE;
+
+-- Claim up to p_limit due jobs for one scheduler instance and lease them.
+-- Rows being claimed by a concurrent call are skipped, so instances receive
+-- disjoint batches; jobs with a running automation job are left alone.
+CREATE OR REPLACE FUNCTION claim_due_scheduled_jobs(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 50,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF automation_scheduled_jobs
+LANGUAGE sql
+AS $$
+    WITH due AS (
+        SELECT s.id
+        FROM automation_scheduled_jobs s
+        WHERE s.enabled = TRUE
+          AND s.next_run_at <= NOW()
+          AND (s.lease_until IS NULL OR s.lease_until < NOW())
+          AND NOT EXISTS (
+              SELECT 1 FROM automation_jobs j
+              WHERE j.connection_id = s.connection_id
+                AND j.job_type = s.automation_type
+                AND j.status = 'running'
+          )
+        ORDER BY s.next_run_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE automation_scheduled_jobs s
+    SET claimed_by = p_worker_id,
+        lease_until = NOW() + make_interval(secs => p_lease_seconds)
+    FROM due
+    WHERE s.id = due.id
+    RETURNING s.*;
+$$;
@@ -0,0 +1,70 @@
+-- Apply a batch of buffered automation status writes in one call.
+-- Each array holds patches keyed by "id"; only the keys present in a patch are
+-- changed. Runs that do not exist yet are inserted, and events without an
+-- organization_id take the one of their connection.
+-- p_jobs:           [{"id", "status", "started_at", "completed_at", "error_message", "result_summary"}]
+-- p_runs:           [{"id", "job_id", "connection_id", "run_type", "status", "started_at", "completed_at", "results"}]
+-- p_scheduled_jobs: [{"id", "last_run_at", "next_run_at", "updated_at", "claimed_by", "lease_until"}]
+-- p_events:         automation_events records
+CREATE OR REPLACE FUNCTION apply_automation_status_batch(
+    p_jobs JSONB DEFAULT '[]'::jsonb,
+    p_runs JSONB DEFAULT '[]'::jsonb,
+    p_scheduled_jobs JSONB DEFAULT '[]'::jsonb,
+    p_events JSONB DEFAULT '[]'::jsonb
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    item JSONB;
+BEGIN
+    FOR item IN SELECT * FROM jsonb_array_elements(p_jobs) LOOP
+        UPDATE automation_jobs t
+        SET (status, started_at, completed_at, error_message, result_summary) = (
+            SELECT r.status, r.started_at, r.completed_at, r.error_message, r.result_summary
+            FROM jsonb_populate_record(t, item) r
+        )
+        WHERE t.id = (item->>'id')::uuid;
+    END LOOP;
+
+    FOR item IN SELECT * FROM jsonb_array_elements(p_runs) LOOP
+        UPDATE automation_runs t
+        SET (status, started_at, completed_at, results) = (
+            SELECT r.status, r.started_at, r.completed_at, r.results
+            FROM jsonb_populate_record(t, item) r
+        )
+        WHERE t.id = (item->>'id')::uuid;
+
+        IF NOT FOUND THEN
+            INSERT INTO automation_runs (id, job_id, connection_id, run_type, status, started_at, completed_at, results)
+            SELECT r.id, r.job_id, r.connection_id, r.run_type, r.status, r.started_at, r.completed_at, r.results
+            FROM jsonb_populate_record(NULL::automation_runs, item) r;
+        END IF;
+    END LOOP;
+
+    FOR item IN SELECT * FROM jsonb_array_elements(p_scheduled_jobs) LOOP
+        UPDATE automation_scheduled_jobs t
+        SET (last_run_at, next_run_at, updated_at, claimed_by, lease_until) = (
+            SELECT r.last_run_at, r.next_run_at, r.updated_at, r.claimed_by, r.lease_until
+            FROM jsonb_populate_record(t, item) r
+        )
+        WHERE t.id = (item->>'id')::uuid;
+    END LOOP;
+
+    INSERT INTO automation_events
+        (event_type, automation_type, connection_id, organization_id, user_id, created_by, event_data, created_at)
+    SELECT
+        e->>'event_type',
+        e->>'automation_type',
+        (e->>'connection_id')::uuid,
+        COALESCE(
+            (e->>'organization_id')::uuid,
+            (SELECT c.organization_id FROM database_connections c WHERE c.id = (e->>'connection_id')::uuid)
+        ),
+        (e->>'user_id')::uuid,
+        (e->>'created_by')::uuid,
+        COALESCE(e->'event_data', '{}'::jsonb),
+        COALESCE((e->>'created_at')::timestamptz, NOW())
+    FROM jsonb_array_elements(p_events) AS e;
+END;
+$$;
@@ -0,0 +1,63 @@
+-- Durable queue for metadata tasks (METADATA_QUEUE_BACKEND=postgres)
+CREATE TABLE IF NOT EXISTS metadata_task_queue (
+    seq BIGSERIAL PRIMARY KEY,
+    id UUID NOT NULL UNIQUE,
+    task_type TEXT NOT NULL,
+    connection_id UUID NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}'::jsonb,
+    priority TEXT NOT NULL DEFAULT 'medium',
+    lane SMALLINT NOT NULL DEFAULT 1,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'leased', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    lease_until TIMESTAMPTZ,
+    leased_by TEXT,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_metadata_task_queue_ready
+    ON metadata_task_queue(lane, seq)
+    WHERE status IN ('queued', 'leased');
+
+-- Lease the next visible task for one consumer. Queued tasks are visible once
+-- available_at has passed (retry backoff); leased tasks once their lease has
+-- expired. Expired leases on the final attempt are dead-lettered instead of
+-- redelivered. Rows locked by a concurrent claim are skipped.
+CREATE OR REPLACE FUNCTION claim_metadata_task(
+    p_worker_id TEXT,
+    p_lease_seconds INTEGER DEFAULT 3600,
+    p_max_attempts INTEGER DEFAULT 5
+)
+RETURNS SETOF metadata_task_queue
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE metadata_task_queue
+    SET status = 'dead',
+        lease_until = NULL,
+        last_error = 'Lease expired on final attempt'
+    WHERE status = 'leased'
+      AND lease_until <= NOW()
+      AND attempts >= p_max_attempts;
+
+    RETURN QUERY
+    WITH next_task AS (
+        SELECT q.seq
+        FROM metadata_task_queue q
+        WHERE (q.status = 'queued' AND q.available_at <= NOW())
+           OR (q.status = 'leased' AND q.lease_until <= NOW())
+        ORDER BY q.lane, q.seq
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE metadata_task_queue q
+    SET status = 'leased',
+        attempts = q.attempts + 1,
+        lease_until = NOW() + make_interval(secs => p_lease_seconds),
+        leased_by = p_worker_id
+    FROM next_task
+    WHERE q.seq = next_task.seq
+    RETURNING q.*;
+END;
+$$;
@@ -0,0 +1,7 @@
+-- Store the template a validation rule was generated from so rules that share a
+-- template can reuse cached statements. The rendered SQL stays in "query".
+ALTER TABLE validation_rules ADD COLUMN IF NOT EXISTS query_template TEXT;
+ALTER TABLE validation_rules ADD COLUMN IF NOT EXISTS template_params JSONB;
+
+-- Create index for grouping rules by template
+CREATE INDEX IF NOT EXISTS idx_validation_rules_template ON validation_rules(connection_id, query_template);
@@ -0,0 +1,147 @@
+# test_algorithms.py
+import unittest
+import numpy as np
+from backend.core.anomalies.algorithms import (
+    detect_zscore_anomalies, detect_iqr_anomalies, detect_moving_average_anomalies,
+    detect_anomalies_bulk, bulk_results_to_tuples, pad_series
+)
+
+
+def reference_rolling_zscore(values, sensitivity, window):
+    results = []
+    for i in range(window, len(values)):
+        mean = np.mean(values[i - window:i])
+        std = np.std(values[i - window:i])
+        score = 0 if std == 0 else abs((values[i] - mean) / std)
+        results.append((i, score, score > 3.0 / sensitivity))
+    return results
+
+
+def reference_rolling_iqr(values, sensitivity, window):
+    results = []
+    threshold = 1.5 / sensitivity
+    for i in range(window, len(values)):
+        q1, q3 = np.percentile(values[i - window:i], [25, 75])
+        iqr = q3 - q1
+        lower, upper = q1 - iqr * threshold, q3 + iqr * threshold
+        if values[i] < lower:
+            results.append((i, (lower - values[i]) / iqr if iqr > 0 else float('inf'), True))
+        elif values[i] > upper:
+            results.append((i, (values[i] - upper) / iqr if iqr > 0 else float('inf'), True))
+        else:
+            results.append((i, 0, False))
+    return results
+
+
+def reference_moving_average(values, sensitivity, window, std_window=None):
+    std_window = std_window or window
+    moving_avgs = [np.mean(values[i - window:i]) for i in range(window, len(values))]
+    if len(moving_avgs) < std_window:
+        stds = [np.std(moving_avgs)] * len(moving_avgs)
+    else:
+        stds = [np.std(moving_avgs[i - std_window:i]) for i in range(std_window, len(moving_avgs) + 1)]
+
+    results = []
+    for i, moving_avg in enumerate(moving_avgs):
+        std = stds[i] if i < len(stds) else stds[-1]
+        score = 0 if std == 0 else abs((values[i + window] - moving_avg) / std)
+        results.append((i + window, score, std != 0 and score > 2.0 / sensitivity))
+    return results
+
+
+class TestAnomalyAlgorithms(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.values = list(rng.normal(100, 5, 200))
+        self.values[150] = 200.0
+        self.values[60] = 20.0
+
+    def assertResultsMatch(self, actual, expected):
+        self.assertEqual([r[0] for r in actual], [r[0] for r in expected])
+        for (_, score, is_anomaly, _), (_, expected_score, expected_anomaly) in zip(actual, expected):
+            self.assertAlmostEqual(score, expected_score, places=6)
+            self.assertEqual(is_anomaly, expected_anomaly)
+
+    def test_rolling_zscore_matches_reference(self):
+        for window in (3, 14, 30):
+            self.assertResultsMatch(detect_zscore_anomalies(self.values, 1.0, window),
+                                    reference_rolling_zscore(self.values, 1.0, window))
+
+        flagged = [r[0] for r in detect_zscore_anomalies(self.values, 1.0, 30) if r[2]]
+        self.assertIn(150, flagged)
+        self.assertIn(60, flagged)
+
+    def test_rolling_iqr_matches_reference(self):
+        for window in (4, 14, 30):
+            self.assertResultsMatch(detect_iqr_anomalies(self.values, 1.0, window),
+                                    reference_rolling_iqr(self.values, 1.0, window))
+
+    def test_rolling_statistics_match_loop_exactly(self):
+        # Small integer series put many scores exactly on the threshold, where any
+        # rounding difference from the loop implementation would flip is_anomaly
+        rng = np.random.default_rng(0)
+        for case in range(1500):
+            length = int(rng.integers(5, 60))
+            window = int(rng.integers(2, min(length, 20)))
+            values = [float(v) for v in rng.integers(0, 5, length)]
+            if case % 5 == 0:
+                values = [1e9 + v * float(rng.integers(1, 1000)) for v in values]
+            std_window = int(rng.integers(2, 10)) if case % 2 else None
+
+            for actual, expected in ((detect_zscore_anomalies(values, 1.0, window),
+                                      reference_rolling_zscore(values, 1.0, window)),
+                                     (detect_moving_average_anomalies(values, 1.0, window, std_window),
+                                      reference_moving_average(values, 1.0, window, std_window))):
+                self.assertEqual([(r[0], float(r[1]), bool(r[2])) for r in actual],
+                                 [(r[0], float(r[1]), bool(r[2])) for r in expected])
+
+    def test_constant_windows(self):
+        values = [5.0] * 10 + [6.0]
+        self.assertTrue(all(score == 0 and not flag for _, score, flag, _ in detect_zscore_anomalies(values, 1.0, 3)))
+        self.assertTrue(all(score == 0 for _, score, _, _ in detect_zscore_anomalies([5.0] * 10)))
+
+        # Zero IQR makes any deviation infinitely far outside the bounds
+        iqr_results = detect_iqr_anomalies(values, 1.0, 4)
+        self.assertEqual(iqr_results[-1][1], float('inf'))
+        self.assertTrue(iqr_results[-1][2])
+
+        # Runs of identical moving averages have zero spread, so those points score 0
+        moving = {r[0]: r for r in detect_moving_average_anomalies([0.0] * 7 + [1000.0] + [0.0] * 12, 1.0, 7, 5)}
+        for index in (8, 9, 10):
+            self.assertEqual(moving[index][1], 0)
+            self.assertFalse(moving[index][2])
+
+    def test_minimum_lengths(self):
+        self.assertEqual(detect_zscore_anomalies([1.0]), [])
+        self.assertEqual(detect_iqr_anomalies([1.0, 2.0, 3.0]), [])
+        self.assertEqual(detect_moving_average_anomalies([1.0] * 7, window=7), [])
+
+    def test_bulk_matches_single_series(self):
+        rng = np.random.default_rng(7)
+        series = [list(rng.normal(50, 3, length)) for length in (5, 40, 90, 120)]
+        matrix, offsets = pad_series(series)
+
+        for method, window, single in (("zscore", None, detect_zscore_anomalies),
+                                       ("zscore", 10, detect_zscore_anomalies),
+                                       ("iqr", 12, detect_iqr_anomalies),
+                                       ("moving_average", 7, detect_moving_average_anomalies)):
+            bulk = detect_anomalies_bulk(matrix, method, 1.0, window)
+            for row, values in enumerate(series):
+                expected = single(values, 1.0, window) if window else single(values, 1.0)
+                actual = bulk_results_to_tuples(*bulk, row=row, offset=int(offsets[row]))
+                self.assertEqual([r[0] for r in actual], [r[0] for r in expected])
+                self.assertTrue(np.allclose([r[1] for r in actual], [r[1] for r in expected]))
+
+    def test_bulk_per_series_sensitivity(self):
+        matrix = np.array([self.values, self.values])
+        _, is_anomaly, thresholds = detect_anomalies_bulk(matrix, "zscore", np.array([1.0, 0.5]), 30)
+
+        self.assertEqual(list(thresholds), [3.0, 6.0])
+        self.assertGreaterEqual(is_anomaly[0].sum(), is_anomaly[1].sum())
+
+        with self.assertRaises(ValueError):
+            detect_anomalies_bulk(matrix, "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
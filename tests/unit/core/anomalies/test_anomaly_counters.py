@@ -0,0 +1,73 @@
+# test_anomaly_counters.py
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies import api as api_module
+from core.anomalies.api import AnomalyAPI
+from core.anomalies.scheduler import AnomalyDetectionScheduler
+
+
+def make_record(**overrides):
+    record = {"organization_id": "org-1", "connection_id": "conn-1", "config_id": "c1", "table_name": "orders",
+              "severity": "high", "status": "open", "detected_at": "2024-01-02T23:30:00-02:00"}
+    record.update(overrides)
+    return record
+
+
+class TestAnomalyCounters(unittest.TestCase):
+    """Counters are maintained by triggers on anomaly_results, never by the application"""
+
+    def setUp(self):
+        api_module._aggregates_cache.clear()
+
+    @patch('core.anomalies.scheduler.SupabaseManager')
+    def test_inserts_leave_counters_to_the_database(self, mock_manager):
+        client = mock_manager.return_value.supabase
+        client.table.return_value.upsert.return_value.execute.return_value = MagicMock(data=[make_record()])
+
+        inserted = AnomalyDetectionScheduler()._insert_anomaly_records([make_record(), make_record()])
+
+        self.assertEqual(inserted, 1)
+        client.rpc.assert_not_called()
+
+    @patch('core.anomalies.api.publish_anomaly_event')
+    @patch('core.anomalies.api.AnomalyDetectionScheduler')
+    @patch('core.anomalies.api.SupabaseManager')
+    def test_update_status_is_a_single_write(self, mock_manager, _, __):
+        client = mock_manager.return_value.supabase
+        table = client.table.return_value
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value = \
+            MagicMock(data=[make_record(status="resolved", id="a-1")])
+        api_module._aggregates_cache[("org-1", "conn-1", 30)] = (float("inf"), {})
+
+        AnomalyAPI().update_anomaly_status("org-1", "user-1", "a-1", "resolved")
+
+        # No read-then-write race: the old status is never read by the application
+        table.select.assert_not_called()
+        client.rpc.assert_not_called()
+        self.assertEqual(table.update.call_args[0][0]["status"], "resolved")
+        self.assertNotIn(("org-1", "conn-1", 30), api_module._aggregates_cache)
+
+    @patch('core.anomalies.api.publish_anomaly_event')
+    @patch('core.anomalies.api.AnomalyDetectionScheduler')
+    @patch('core.anomalies.api.SupabaseManager')
+    def test_deleting_a_config_refreshes_dashboard_counts(self, mock_manager, _, __):
+        client = mock_manager.return_value.supabase
+        client.table.return_value.delete.return_value.eq.return_value.eq.return_value.execute.return_value = \
+            MagicMock(data=[{"id": "c1", "connection_id": "conn-1"}])
+        api_module._aggregates_cache[("org-1", "conn-1", 30)] = (float("inf"), {})
+        api_module._aggregates_cache[("org-1", "conn-2", 30)] = (float("inf"), {})
+
+        self.assertTrue(AnomalyAPI().delete_config("org-1", "user-1", "c1"))
+
+        self.assertNotIn(("org-1", "conn-1", 30), api_module._aggregates_cache)
+        self.assertIn(("org-1", "conn-2", 30), api_module._aggregates_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
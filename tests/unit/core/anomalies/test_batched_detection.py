@@ -0,0 +1,169 @@
+# test_batched_detection.py
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies.detector import AnomalyDetector
+from core.anomalies.scheduler import AnomalyDetectionScheduler
+
+
+def make_metrics(config, values):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "connection_id": config["connection_id"],
+        "metric_name": config["metric_name"],
+        "table_name": config["table_name"],
+        "column_name": config.get("column_name"),
+        "metric_value": value,
+        "timestamp": (start + timedelta(hours=i)).isoformat()
+    } for i, value in enumerate(values)]
+
+
+class TestBatchedDetection(unittest.TestCase):
+    def setUp(self):
+        base = [100.0, 101.0, 99.0, 100.0, 102.0, 98.0, 100.0, 101.0, 99.0, 100.0]
+        self.configs = [
+            {"id": "c1", "organization_id": "org-1", "connection_id": "conn-1", "table_name": "orders",
+             "column_name": None, "metric_name": "row_count", "detection_method": "zscore", "sensitivity": 1.0,
+             "config_params": {"window": 5}},
+            {"id": "c2", "organization_id": "org-1", "connection_id": "conn-1", "table_name": "orders",
+             "column_name": "amount", "metric_name": "null_percentage", "detection_method": "iqr",
+             "sensitivity": 1.0, "config_params": {}},
+            {"id": "c3", "organization_id": "org-1", "connection_id": "conn-2", "table_name": "users",
+             "column_name": None, "metric_name": "row_count", "detection_method": "zscore", "sensitivity": 2.0,
+             "config_params": {"window": 5}},
+            {"id": "c4", "organization_id": "org-1", "connection_id": "conn-2", "table_name": "events",
+             "column_name": None, "metric_name": "row_count", "detection_method": "zscore", "sensitivity": 1.0},
+        ]
+        self.metrics = {
+            "c1": make_metrics(self.configs[0], base + [500.0]),
+            "c2": make_metrics(self.configs[1], base[:8] + [0.0, 40.0]),
+            "c3": make_metrics(self.configs[2], base + [104.0, 96.0]),
+            "c4": make_metrics(self.configs[3], base[:3]),
+        }
+
+    def test_bulk_matches_single_config_detection(self):
+        detector = AnomalyDetector()
+        bulk = detector.detect_anomalies_bulk(self.configs, {k: list(v) for k, v in self.metrics.items()})
+
+        for config in self.configs:
+            single = detector.detect_anomalies(config, list(self.metrics[config["id"]]))
+            self.assertEqual([r["timestamp"] for r in bulk[config["id"]]], [r["timestamp"] for r in single])
+            for bulk_result, single_result in zip(bulk[config["id"]], single):
+                self.assertAlmostEqual(bulk_result["score"], single_result["score"])
+                self.assertEqual(bulk_result["severity"], single_result["severity"])
+
+        self.assertEqual(len(bulk["c1"]), 1)
+        self.assertEqual(bulk["c4"], [])
+
+    def make_scheduler(self, watermarks=None):
+        scheduler = AnomalyDetectionScheduler()
+        scheduler._create_run_record = MagicMock(return_value="run-1")
+        scheduler._complete_run = MagicMock()
+        scheduler._get_active_configs = MagicMock(return_value=self.configs)
+
+        self.tables = {}
+        scheduler.supabase.supabase.table.side_effect = lambda name: self.tables.setdefault(name, MagicMock())
+        # Every upserted record is new unless a test says otherwise
+        scheduler.supabase.supabase.table("anomaly_results").upsert.side_effect = \
+            lambda records, **kwargs: MagicMock(execute=MagicMock(return_value=MagicMock(data=records)))
+        scheduler.supabase.supabase.table("anomaly_detection_watermarks").select.return_value.in_.return_value \
+            .execute.return_value = MagicMock(data=[
+                {"config_id": config_id, "last_metric_at": timestamp}
+                for config_id, timestamp in (watermarks or {}).items()
+            ])
+        return scheduler
+
+    def run_batched(self, scheduler):
+        rows_by_connection = {}
+        for config in self.configs:
+            rows_by_connection.setdefault(config["connection_id"], []).extend(self.metrics[config["id"]])
+
+        with patch('core.analytics.historical_metrics.HistoricalMetricsTracker') as mock_tracker:
+            mock_tracker.return_value.get_metric_histories.side_effect = \
+                lambda organization_id, connection_id, metric_names, days: list(rows_by_connection[connection_id])
+            result = scheduler.schedule_detection_run("org-1", batched=True)
+
+        return result, mock_tracker.return_value.get_metric_histories.call_count
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    @patch('core.anomalies.scheduler.SupabaseManager')
+    def test_batched_run_uses_grouped_queries_and_one_insert(self, _, mock_publish):
+        scheduler = self.make_scheduler()
+        result, history_queries = self.run_batched(scheduler)
+
+        # One history query per connection and a single insert for all anomalies
+        self.assertEqual(history_queries, 2)
+        upsert = self.tables["anomaly_results"].upsert
+        upsert.assert_called_once()
+        inserted = upsert.call_args[0][0]
+        self.assertTrue(upsert.call_args[1]["ignore_duplicates"])
+
+        self.assertEqual(result["metrics_processed"], 3)
+        self.assertEqual(result["anomalies_detected"], len(inserted))
+        self.assertIn("c1", {record["config_id"] for record in inserted})
+        self.assertEqual(mock_publish.call_count, len({record["config_id"] for record in inserted}))
+        scheduler._complete_run.assert_called_once_with("run-1", "completed", 3, len(inserted))
+
+        # Watermarks advance to the latest evaluated point of each config
+        saved = {row["config_id"]: row["last_metric_at"]
+                 for row in self.tables["anomaly_detection_watermarks"].upsert.call_args[0][0]}
+        self.assertEqual(saved["c1"], self.metrics["c1"][-1]["timestamp"])
+        self.assertNotIn("c4", saved)
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    @patch('core.anomalies.scheduler.SupabaseManager')
+    def test_configs_without_new_points_are_skipped(self, _, mock_publish):
+        watermarks = {config_id: metrics[-1]["timestamp"] for config_id, metrics in self.metrics.items()}
+        # c1 has one point after its watermark: the 500.0 spike
+        watermarks["c1"] = self.metrics["c1"][-2]["timestamp"]
+
+        scheduler = self.make_scheduler(watermarks)
+        result, _ = self.run_batched(scheduler)
+
+        self.assertEqual(result["configs_skipped"], 3)
+        self.assertEqual(result["metrics_processed"], 1)
+        inserted = self.tables["anomaly_results"].upsert.call_args[0][0]
+        self.assertEqual([(r["config_id"], r["metric_value"]) for r in inserted], [("c1", 500.0)])
+
+        # Nothing new at all: no anomalies are written again
+        watermarks["c1"] = self.metrics["c1"][-1]["timestamp"]
+        scheduler = self.make_scheduler(watermarks)
+        result, _ = self.run_batched(scheduler)
+        self.assertEqual(result["configs_skipped"], 4)
+        self.tables["anomaly_results"].upsert.assert_not_called()
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    @patch('core.anomalies.scheduler.SupabaseManager')
+    def test_only_inserted_rows_are_reported(self, _, mock_publish):
+        scheduler = self.make_scheduler()
+        # The first anomaly was already recorded by an earlier run
+        scheduler.supabase.supabase.table("anomaly_results").upsert.side_effect = \
+            lambda records, **kwargs: MagicMock(execute=MagicMock(return_value=MagicMock(data=records[1:])))
+        result, _ = self.run_batched(scheduler)
+
+        inserted = self.tables["anomaly_results"].upsert.call_args[0][0]
+        self.assertGreater(len(inserted), 1)
+        self.assertEqual(result["anomalies_detected"], len(inserted) - 1)
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    @patch('core.anomalies.scheduler.SupabaseManager')
+    def test_failed_insert_keeps_watermarks(self, _, mock_publish):
+        scheduler = self.make_scheduler()
+        scheduler.supabase.supabase.table("anomaly_results").upsert.side_effect = Exception("timeout")
+        result, _ = self.run_batched(scheduler)
+
+        self.assertEqual(result["anomalies_detected"], 0)
+        mock_publish.assert_not_called()
+
+        # Every evaluated config had anomalies, so all of them are evaluated again next run
+        self.tables["anomaly_detection_watermarks"].upsert.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# test_benchmark.py
+import os
+import sys
+import unittest
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies.benchmark import generate_dataset, run_benchmark, score_detections, check_regressions
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generated_series_are_reproducible(self):
+        first = generate_dataset(2, 300, seed=5, anomaly_rate=0.02)
+        second = generate_dataset(2, 300, seed=5, anomaly_rate=0.02)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]["values"]), 300)
+        self.assertEqual(len(first[0]["anomalies"]), 6)
+        self.assertTrue(all(index >= 7 * 24 for index in first[0]["anomalies"]))
+
+    def test_score_detections(self):
+        scores = score_detections([{1, 2, 9}], [{"anomalies": [1, 2, 3, 4]}])
+
+        self.assertEqual((scores["true_positives"], scores["false_positives"], scores["false_negatives"]), (2, 1, 2))
+        self.assertEqual(scores["precision"], 0.6667)
+        self.assertEqual(scores["recall"], 0.5)
+
+    def test_paths_agree_and_regressions_are_reported(self):
+        dataset = generate_dataset(3, 400, seed=1, seasonality=None)
+        report = run_benchmark(dataset, methods=["zscore", "seasonal"])
+
+        paths = {(r["method"], r["path"]): r for r in report["results"]}
+        self.assertEqual(set(paths), {("zscore", "algorithm"), ("zscore", "detector"), ("zscore", "bulk"),
+                                      ("zscore", "online"), ("seasonal", "algorithm"), ("seasonal", "detector")})
+        self.assertEqual(paths[("zscore", "algorithm")]["recall"], paths[("zscore", "bulk")]["recall"])
+        self.assertGreater(paths[("zscore", "algorithm")]["recall"], 0.5)
+        self.assertGreater(paths[("zscore", "bulk")]["points_per_second"], 0)
+
+        self.assertEqual(check_regressions(report, report), [])
+        worse = {"results": [dict(r, recall=r["recall"] + 0.1) for r in report["results"]]}
+        self.assertEqual(len(check_regressions(report, worse)), len(report["results"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
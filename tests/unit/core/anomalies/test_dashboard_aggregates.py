@@ -0,0 +1,65 @@
+# test_dashboard_aggregates.py
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies import api as api_module
+from core.anomalies.api import AnomalyAPI
+
+
+class TestDashboardAggregates(unittest.TestCase):
+    def setUp(self):
+        api_module._aggregates_cache.clear()
+        self.aggregates = {
+            "severity": {"high": 2, "low": 1},
+            "status": {"open": 2, "resolved": 1},
+            "by_table": [{"table_name": "orders", "count": 3}],
+            "detected_today": 1,
+            "trends": [{"date": "2024-01-01", "total": 3, "high": 2, "medium": 0, "low": 1}]
+        }
+
+    @patch('core.anomalies.api.AnomalyDetectionScheduler')
+    @patch('core.anomalies.api.SupabaseManager')
+    def test_dashboard_loads_in_one_parameterized_call(self, mock_manager, _):
+        client = mock_manager.return_value.supabase
+        client.rpc.return_value.execute.return_value = MagicMock(data=self.aggregates)
+
+        api = AnomalyAPI()
+        summary = api.get_summary("org-1", "conn-1", 7)
+        trends = api._get_anomaly_trends("org-1", "conn-1", 7)
+
+        client.rpc.assert_called_once_with('get_anomaly_dashboard_aggregates', {
+            'p_organization_id': "org-1", 'p_connection_id': "conn-1", 'p_days': 7
+        })
+        self.assertEqual(summary["total_anomalies"], 3)
+        self.assertEqual(summary["high_severity"], 2)
+        self.assertEqual(summary["resolved"], 1)
+        self.assertEqual(summary["detected_today"], 1)
+        self.assertEqual(summary["by_table"], self.aggregates["by_table"])
+        self.assertEqual(trends, self.aggregates["trends"])
+
+        # A different window is a different cache entry, and invalidation forces a reload
+        api.get_summary("org-1", "conn-1", 30)
+        self.assertEqual(client.rpc.call_count, 2)
+        api_module.invalidate_dashboard_aggregates("org-1", "conn-1")
+        api.get_summary("org-1", "conn-1", 7)
+        self.assertEqual(client.rpc.call_count, 3)
+
+    @patch('core.anomalies.api.AnomalyDetectionScheduler')
+    @patch('core.anomalies.api.SupabaseManager')
+    def test_rpc_failure_returns_empty_summary(self, mock_manager, _):
+        mock_manager.return_value.supabase.rpc.side_effect = Exception("boom")
+
+        summary = AnomalyAPI().get_summary("org-1", "conn-1")
+
+        self.assertEqual(summary["total_anomalies"], 0)
+        self.assertEqual(summary["error"], "boom")
+        self.assertEqual(api_module._aggregates_cache, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# test_metric_planner.py
+import os
+import sys
+import sqlite3
+import unittest
+from unittest.mock import MagicMock
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies.metrics import MetricExtractionPlanner
+
+
+class SQLiteConnector:
+    """Runs queries against an in-memory table and records them"""
+
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE orders (id INTEGER, amount REAL, status TEXT)")
+        self.connection.executemany("INSERT INTO orders VALUES (?, ?, ?)", [
+            (1, 10.0, "new"), (2, 20.0, None), (3, None, "new"), (4, 40.0, "paid")
+        ])
+        self.queries = []
+
+    def execute_query(self, query):
+        self.queries.append(query)
+        return self.connection.execute(query).fetchall()
+
+
+class TestMetricExtractionPlanner(unittest.TestCase):
+    def setUp(self):
+        self.configs = [
+            {"table_name": "orders", "column_name": None, "metric_name": "row_count"},
+            {"table_name": "orders", "column_name": "amount", "metric_name": "null_percentage"},
+            {"table_name": "orders", "column_name": "status", "metric_name": "distinct_count"},
+            {"table_name": "orders", "column_name": "amount", "metric_name": "max_value"},
+            {"table_name": "orders", "column_name": "amount", "metric_name": "min_value"},
+            {"table_name": "orders", "column_name": "amount", "metric_name": "min_value"},
+            {"table_name": "orders", "column_name": "amount", "metric_name": "median"},
+            {"table_name": "users", "column_name": None, "metric_name": "row_count"},
+            {"table_name": "orders", "column_name": None, "metric_name": "null_percentage"},
+            {"table_name": "orders", "column_name": None, "metric_name": "custom_sql_metric"},
+        ]
+
+    def test_one_aggregate_query_per_table(self):
+        plans = {plan["table_name"]: plan for plan in MetricExtractionPlanner(self.configs).plan()}
+
+        self.assertEqual(set(plans), {"orders", "users"})
+        orders = plans["orders"]
+        self.assertEqual([m[1] for m in orders["aggregate_metrics"]],
+                         ["row_count", "null_percentage", "distinct_count", "max_value", "min_value"])
+        self.assertEqual([m[1] for m in orders["percentile_metrics"]], ["median"])
+        self.assertIn("PERCENTILE_CONT", orders["percentile_query"])
+        self.assertIsNone(plans["users"]["percentile_query"])
+
+    def test_collect_feeds_track_metrics_batch(self):
+        connector = SQLiteConnector()
+        configs = [config for config in self.configs if config["metric_name"] != "median"
+                   and config["table_name"] == "orders"]
+        tracker = MagicMock()
+        tracker.track_metrics_batch.return_value = True
+
+        tracked = MetricExtractionPlanner(configs).collect_and_track(connector, tracker, "org-1", "conn-1")
+
+        self.assertEqual(len(connector.queries), 1)
+        self.assertEqual(tracked, 5)
+        metrics = tracker.track_metrics_batch.call_args[1]["metrics"]
+        values = {(m["name"], m["column_name"]): m["value"] for m in metrics}
+        self.assertEqual(values, {
+            ("row_count", None): 4.0,
+            ("null_percentage", "amount"): 25.0,
+            ("distinct_count", "status"): 2.0,
+            ("max_value", "amount"): 40.0,
+            ("min_value", "amount"): 10.0,
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# test_online_detection.py
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies import online
+from core.anomalies.online import OnlineMetricState, OnlineAnomalyDetector, P2Quantile
+
+
+class TestOnlineMetricState(unittest.TestCase):
+    def test_running_statistics(self):
+        rng = np.random.default_rng(3)
+        values = rng.normal(50, 4, 2000)
+
+        state = OnlineMetricState()
+        quantile = P2Quantile(0.75)
+        for value in values:
+            state.update(float(value))
+            quantile.add(float(value))
+
+        self.assertAlmostEqual(state.mean, np.mean(values))
+        self.assertAlmostEqual(state.std, np.std(values))
+        self.assertAlmostEqual(quantile.value(), np.percentile(values, 75), delta=0.3)
+
+        # State survives a round trip through its persisted form
+        restored = OnlineMetricState(state.to_dict())
+        self.assertEqual(restored.to_dict(), state.to_dict())
+
+    def test_score_waits_for_min_data_points(self):
+        config = {"detection_method": "zscore", "sensitivity": 1.0, "min_data_points": 5}
+        state = OnlineMetricState()
+        for value in [10.0, 11.0, 9.0, 10.0]:
+            self.assertIsNone(state.score(config, value))
+            state.update(value)
+
+        state.update(10.0)
+        score, is_anomaly, threshold = state.score(config, 100.0)
+        self.assertTrue(is_anomaly)
+        self.assertEqual(threshold, 3.0)
+        self.assertFalse(state.score({**config, "detection_method": "iqr"}, 10.0)[1])
+
+
+class TestOnlineAnomalyDetector(unittest.TestCase):
+    def setUp(self):
+        online._config_cache.clear()
+        self.config = {
+            "id": "cfg-1", "organization_id": "org-1", "connection_id": "conn-1", "table_name": "orders",
+            "column_name": None, "metric_name": "row_count", "detection_method": "zscore",
+            "sensitivity": 1.0, "min_data_points": 5, "config_params": {"online": True}
+        }
+        self.tables = {}
+        self.client = MagicMock()
+        self.client.table.side_effect = lambda name: self.tables.setdefault(name, MagicMock())
+
+        history = [{"metric_value": v, "timestamp": f"2024-01-01T0{i}:00:00"}
+                   for i, v in enumerate([100.0, 102.0, 98.0, 101.0, 99.0, 100.0])]
+        self.client.table("anomaly_detection_configs").select.return_value.eq.return_value.eq.return_value \
+            .eq.return_value.execute.return_value = MagicMock(data=[self.config, {**self.config, "id": "cfg-2",
+                                                                                   "config_params": {}}])
+        self.client.table("anomaly_detection_state").select.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[])
+        self.client.rpc.return_value.execute.return_value = MagicMock(data=[])
+        query = self.client.table("historical_metrics").select.return_value
+        for method in ("eq", "lt", "order", "limit"):
+            getattr(query, method).return_value = query
+        query.execute.return_value = MagicMock(data=list(reversed(history)))
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    def test_observe_bootstraps_and_flags_at_ingestion(self, mock_publish):
+        detector = OnlineAnomalyDetector(self.client)
+        metrics = [
+            {"metric_name": "row_count", "table_name": "orders", "column_name": None,
+             "metric_value": 101.0, "timestamp": "2024-01-02T00:00:00"},
+            {"metric_name": "row_count", "table_name": "orders", "column_name": None,
+             "metric_value": 500.0, "timestamp": "2024-01-02T01:00:00"},
+            {"metric_name": "null_percentage", "table_name": "orders", "column_name": "id",
+             "metric_value": 3.0, "timestamp": "2024-01-02T01:00:00"},
+        ]
+
+        records = detector.observe("org-1", "conn-1", metrics)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["config_id"], "cfg-1")
+        self.assertEqual(records[0]["metric_value"], 500.0)
+        mock_publish.assert_called_once()
+
+        # Only the online config is tracked, and its new state is saved with one versioned write
+        self.client.rpc.assert_called_once()
+        name, params = self.client.rpc.call_args[0]
+        self.assertEqual(name, "save_anomaly_detection_states")
+        rows = params["p_states"]
+        self.assertEqual([row["config_id"] for row in rows], ["cfg-1"])
+        self.assertEqual(rows[0]["state"]["count"], 8)
+        self.assertEqual(rows[0]["last_timestamp"], "2024-01-02T01:00:00")
+        self.assertIsNone(rows[0]["version"])
+
+    def test_already_seen_points_are_skipped(self):
+        state = OnlineMetricState()
+        for value in [100.0] * 6:
+            state.update(value, timestamp="2024-01-02T00:00:00")
+        self.client.table("anomaly_detection_state").select.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{"config_id": "cfg-1", "state": state.to_dict(), "version": 4}])
+
+        records = OnlineAnomalyDetector(self.client).observe("org-1", "conn-1", [
+            {"metric_name": "row_count", "table_name": "orders", "column_name": None,
+             "metric_value": 900.0, "timestamp": "2024-01-02T00:00:00Z"}
+        ])
+
+        self.assertEqual(records, [])
+        row = self.client.rpc.call_args[0][1]["p_states"][0]
+        self.assertEqual(row["state"]["count"], 6)
+        self.assertEqual(row["version"], 4)
+
+    def test_timestamp_formats_are_compared_as_times(self):
+        state = OnlineMetricState()
+        for value in [100.0] * 6:
+            state.update(value, timestamp="2024-01-02T00:00:00.5+00:00")
+        self.client.table("anomaly_detection_state").select.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{"config_id": "cfg-1", "state": state.to_dict(), "version": 1}])
+
+        OnlineAnomalyDetector(self.client).observe("org-1", "conn-1", [
+            # Sorts before the stored timestamp as a string, but is later in time
+            {"metric_name": "row_count", "table_name": "orders", "column_name": None,
+             "metric_value": 100.0, "timestamp": "2024-01-02T00:00:01Z"}
+        ])
+
+        self.assertEqual(self.client.rpc.call_args[0][1]["p_states"][0]["state"]["count"], 7)
+
+    @patch('core.anomalies.scheduler.publish_anomaly_event')
+    def test_concurrent_state_change_is_reapplied(self, mock_publish):
+        stale, fresh = OnlineMetricState(), OnlineMetricState()
+        for value in [100.0, 102.0, 98.0, 101.0, 99.0, 100.0]:
+            stale.update(value, timestamp="2024-01-01T00:00:00")
+            fresh.update(value, timestamp="2024-01-01T00:00:00")
+        fresh.update(100.0, timestamp="2024-01-01T12:00:00")
+
+        self.client.table("anomaly_detection_state").select.return_value.in_.return_value.execute.side_effect = [
+            MagicMock(data=[{"config_id": "cfg-1", "state": stale.to_dict(), "version": 1}]),
+            MagicMock(data=[{"config_id": "cfg-1", "state": fresh.to_dict(), "version": 2}])
+        ]
+        self.client.rpc.return_value.execute.side_effect = [MagicMock(data=["cfg-1"]), MagicMock(data=[])]
+
+        records = OnlineAnomalyDetector(self.client).observe("org-1", "conn-1", [
+            {"metric_name": "row_count", "table_name": "orders", "column_name": None,
+             "metric_value": 500.0, "timestamp": "2024-01-02T00:00:00"}
+        ])
+
+        # The second write builds on the concurrent update instead of replacing it
+        saved = self.client.rpc.call_args[0][1]["p_states"][0]
+        self.assertEqual((saved["version"], saved["state"]["count"]), (2, 8))
+        self.assertEqual(len(records), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
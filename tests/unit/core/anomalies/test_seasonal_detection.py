@@ -0,0 +1,128 @@
+# test_seasonal_detection.py
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies import detector as detector_module
+from core.anomalies.algorithms import fit_seasonal_baseline, detect_seasonal_anomalies, detect_zscore_anomalies
+from core.anomalies import scheduler as scheduler_module
+from core.anomalies.detector import AnomalyDetector, SeasonalBaselineCache
+
+
+def weekly_series(weeks=6):
+    """Daily row counts that drop every Monday"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)  # A Monday
+    values, timestamps = [], []
+    for day in range(weeks * 7):
+        moment = start + timedelta(days=day)
+        values.append((200.0 if moment.weekday() == 0 else 1000.0) + (day % 3))
+        timestamps.append(moment.isoformat())
+    return values, timestamps
+
+
+class TestSeasonalDetection(unittest.TestCase):
+    def test_weekly_pattern_is_not_anomalous(self):
+        values, timestamps = weekly_series()
+
+        # Plain z-score flags nothing useful, but a seasonal profile explains Mondays
+        baseline = fit_seasonal_baseline(values, timestamps, "weekday")
+        self.assertLess(baseline["profile"][0], 300)
+        self.assertGreater(baseline["profile"][1], 900)
+        self.assertFalse(any(r[2] for r in detect_seasonal_anomalies(values, timestamps, baseline=baseline)))
+
+        # A Monday at a weekday level is flagged
+        values[-7] = 1000.0
+        flagged = [r[0] for r in detect_seasonal_anomalies(values, timestamps) if r[2]]
+        self.assertEqual(flagged, [len(values) - 7])
+        self.assertFalse(any(r[2] for r in detect_zscore_anomalies(values)))
+
+    def test_detector_formats_expected_values(self):
+        values, timestamps = weekly_series()
+        values[-1] = 5000.0
+        metrics = [{"metric_value": v, "timestamp": t} for v, t in zip(values, timestamps)]
+
+        detector = AnomalyDetector()
+        config = detector.validate_config({"detection_method": "seasonal"})
+        self.assertEqual(config["config_params"]["seasonality"], "weekday")
+        self.assertEqual(config["min_data_points"], 14)
+
+        results = detector.detect_anomalies(config, metrics)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["method"], "seasonal")
+        self.assertEqual(results[0]["severity"], "high")
+        self.assertGreater(results[0]["expected_value"], 900)
+
+    def test_baseline_cache_refits_only_when_needed(self):
+        values, timestamps = weekly_series()
+        cache = SeasonalBaselineCache()
+        config = {"id": "cfg-1", "updated_at": "v1", "config_params": {"seasonality": "weekday", "refit_points": 3}}
+
+        with patch.object(detector_module, 'fit_seasonal_baseline', wraps=fit_seasonal_baseline) as mock_fit:
+            cache.get_baseline(config, values[:-3], timestamps[:-3])
+            cache.get_baseline(config, values[:-1], timestamps[:-1])
+            self.assertEqual(mock_fit.call_count, 1)
+
+            # Enough new points arrived
+            cache.get_baseline(config, values, timestamps)
+            self.assertEqual(mock_fit.call_count, 2)
+
+            # The config changed
+            cache.get_baseline({**config, "updated_at": "v2"}, values, timestamps)
+            self.assertEqual(mock_fit.call_count, 3)
+
+    def test_flat_history_still_flags_spikes(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        timestamps = [(start + timedelta(days=day)).isoformat() for day in range(29)]
+        values = [100.0] * 28 + [100000.0]
+        config = {"id": "cfg-flat", "metric_name": "row_count", "detection_method": "seasonal",
+                  "sensitivity": 1.0, "min_data_points": 7, "config_params": {"seasonality": "weekday"}}
+        cache = SeasonalBaselineCache()
+
+        # A zero-scale baseline scores any deviation as infinitely unusual
+        baseline = cache.get_baseline(config, values[:-1], timestamps[:-1])
+        self.assertEqual(baseline["scale"], 0)
+        flagged = [r for r in detect_seasonal_anomalies(values, timestamps, baseline=baseline) if r[2]]
+        self.assertEqual([(r[0], r[1]) for r in flagged], [(28, float('inf'))])
+
+        # The deviating point also makes the cache refit instead of serving the flat baseline
+        with patch.object(detector_module, 'fit_seasonal_baseline', wraps=fit_seasonal_baseline) as mock_fit:
+            refit = cache.get_baseline(config, values, timestamps)
+        self.assertEqual(mock_fit.call_count, 1)
+        self.assertGreater(refit["scale"], 0)
+
+        with patch.object(detector_module, 'seasonal_baseline_cache', SeasonalBaselineCache()) as shared:
+            shared.get_baseline(config, values[:-1], timestamps[:-1])
+            results = AnomalyDetector().detect_series_anomalies(config, values, timestamps)
+        self.assertEqual([r["value"] for r in results], [100000.0])
+
+    def test_scheduler_caches_baselines_fitted_by_workers(self):
+        values, timestamps = weekly_series()
+        config = AnomalyDetector().validate_config({"detection_method": "seasonal"})
+        config.update({"id": "cfg-seasonal", "updated_at": "v1"})
+
+        with patch.object(scheduler_module, 'SupabaseManager'):
+            scheduler = scheduler_module.AnomalyDetectionScheduler(compute_workers=0)
+        detector_module.seasonal_baseline_cache.invalidate("cfg-seasonal")
+
+        with patch.object(detector_module, 'fit_seasonal_baseline', wraps=fit_seasonal_baseline) as mock_fit, \
+                patch.object(scheduler_module, 'detect_seasonal_series',
+                             wraps=detector_module.detect_seasonal_series) as mock_detect:
+            for _ in range(2):
+                scheduler._submit_detection(config, np.array(values), np.array(timestamps)).result()
+
+        # The first run's baseline came back from the worker and was handed to the second
+        self.assertEqual(mock_fit.call_count, 1)
+        self.assertIsNone(mock_detect.call_args_list[0][0][3])
+        self.assertIsNotNone(mock_detect.call_args_list[1][0][3])
+        self.assertIsNotNone(detector_module.seasonal_baseline_cache.lookup(config, timestamps))
+
+
+if __name__ == '__main__':
+    unittest.main()
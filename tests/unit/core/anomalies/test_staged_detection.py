@@ -0,0 +1,84 @@
+# test_staged_detection.py
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+# The anomaly modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.anomalies import scheduler as scheduler_module
+from core.anomalies.scheduler import AnomalyDetectionScheduler
+
+
+def make_metrics(values):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{"metric_value": value, "timestamp": (start + timedelta(hours=i)).isoformat()}
+            for i, value in enumerate(values)]
+
+
+class TestStagedDetection(unittest.TestCase):
+    def setUp(self):
+        base = [100.0, 101.0, 99.0, 100.0, 102.0, 98.0, 100.0, 101.0, 99.0, 100.0]
+        self.configs = [
+            {"id": f"c{i}", "organization_id": "org-1", "connection_id": "conn-1", "table_name": f"t{i}",
+             "column_name": None, "metric_name": "row_count", "detection_method": method, "sensitivity": 1.0,
+             "config_params": {"window": 5}}
+            for i, method in enumerate(["zscore", "iqr", "moving_average", "zscore"])
+        ]
+        self.metrics = {
+            "c0": make_metrics(base + [500.0]),
+            "c1": make_metrics(base + [0.0]),
+            "c2": make_metrics(base * 2 + [900.0]),
+            "c3": make_metrics(base[:3]),
+        }
+
+    def run_staged(self, compute_workers):
+        with patch.object(scheduler_module, 'SupabaseManager'):
+            scheduler = AnomalyDetectionScheduler(compute_workers=compute_workers)
+        scheduler._get_historical_metrics = lambda config: list(self.metrics[config["id"]])
+        scheduler._save_detection_results = MagicMock(
+            side_effect=lambda org, config, results: len([r for r in results if r["is_anomaly"]]))
+        scheduler._publish_anomaly_events = MagicMock()
+
+        new_watermarks = {}
+        totals = scheduler._process_configs_staged("org-1", self.configs, {}, new_watermarks)
+        saved = {call[0][1]["id"]: call[0][2] for call in scheduler._save_detection_results.call_args_list}
+        return totals, saved, new_watermarks
+
+    def test_process_pool_matches_inline_detection(self):
+        try:
+            pooled = self.run_staged(compute_workers=2)
+        finally:
+            scheduler_module.shutdown_compute_pool()
+        inline = self.run_staged(compute_workers=0)
+
+        self.assertEqual(pooled, inline)
+        (metrics_processed, anomalies_detected, skipped), saved, new_watermarks = inline
+        self.assertEqual(metrics_processed, 3)
+        self.assertEqual(skipped, 0)
+        self.assertGreaterEqual(anomalies_detected, 3)
+        self.assertNotIn("c3", saved)
+        self.assertEqual(new_watermarks["c2"], self.metrics["c2"][-1]["timestamp"])
+        self.assertIsInstance(saved["c0"][-1]["value"], float)
+
+    def test_watermark_waits_for_stored_results(self):
+        with patch.object(scheduler_module, 'SupabaseManager'):
+            scheduler = AnomalyDetectionScheduler(compute_workers=0)
+        scheduler._get_historical_metrics = lambda config: list(self.metrics[config["id"]])
+        scheduler._insert_anomaly_records = MagicMock(
+            side_effect=lambda records, batch_size, failed_config_ids: failed_config_ids.update(
+                record["config_id"] for record in records if record["config_id"] == "c0") or 0)
+        scheduler._publish_anomaly_events = MagicMock()
+
+        new_watermarks = {}
+        _, anomalies_detected, _ = scheduler._process_configs_staged("org-1", self.configs, {}, new_watermarks)
+
+        self.assertNotIn("c0", new_watermarks)
+        self.assertEqual(new_watermarks["c1"], self.metrics["c1"][-1]["timestamp"])
+        self.assertEqual(anomalies_detected, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# test_due_job_heap.py
+import os
+import sys
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+# The automation modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.automation import schedule_manager as schedule_module
+from core.automation.job_claims import SQLiteJobClaimer
+from core.automation.schedule_manager import DueJobHeap, ScheduleManager
+
+
+def make_job(job_id, seconds_from_now, connection_id="conn-1"):
+    next_run = datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now)
+    return {"id": job_id, "connection_id": connection_id, "automation_type": "metadata_refresh",
+            "schedule_type": "daily", "scheduled_time": "02:00", "timezone": "UTC",
+            "enabled": True, "next_run_at": next_run.isoformat()}
+
+
+class TestDueJobHeap(unittest.TestCase):
+    def test_pop_due_in_order_with_lazy_updates(self):
+        heap = DueJobHeap()
+        heap.load([make_job("a", -10), make_job("b", -20), make_job("c", 3600), {**make_job("d", -5), "enabled": False}])
+
+        # Moving a job into the future hides its stale entry
+        heap.upsert(make_job("a", 7200))
+        heap.remove("missing")
+
+        self.assertEqual([job["id"] for job in heap.pop_due()], ["b"])
+        self.assertEqual(heap.pop_due(), [])
+        self.assertAlmostEqual(heap.seconds_until_next(), 3600, delta=5)
+
+        heap.remove_connection("conn-1")
+        self.assertEqual(len(heap), 0)
+        self.assertIsNone(heap.seconds_until_next())
+
+    def test_wait_wakes_when_an_earlier_job_is_added(self):
+        heap = DueJobHeap()
+        heap.load([make_job("later", 3600)])
+
+        threading.Timer(0.05, heap.upsert, args=[make_job("soon", 0.1)]).start()
+        started = time.monotonic()
+        self.assertTrue(heap.wait(5))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([job["id"] for job in heap.pop_due()], ["soon"])
+
+
+class TestScheduleManagerHeap(unittest.TestCase):
+    def setUp(self):
+        schedule_module.due_job_heap = self.heap = DueJobHeap()
+        self.claimer = SQLiteJobClaimer()
+        self.manager = ScheduleManager(MagicMock(), claimer=self.claimer, worker_id="worker-1")
+        self.client = self.manager.supabase.supabase
+
+    def tearDown(self):
+        schedule_module.due_job_heap = DueJobHeap()
+
+    def test_schedule_changes_update_the_heap(self):
+        self.heap.load([make_job("old", -1)])
+
+        self.manager._update_scheduled_jobs("conn-1", {
+            "metadata_refresh": {"enabled": True, "schedule_type": "daily", "time": "02:00", "timezone": "UTC"},
+            "validation_automation": {"enabled": False}
+        })
+
+        self.assertEqual(len(self.heap), 1)
+        self.assertEqual(self.manager.take_due_jobs(), [])
+
+    def test_executed_job_moves_to_its_next_run(self):
+        job = make_job("job-1", -1)
+        self.client.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = \
+            MagicMock(data=[job])
+        self.client.table.return_value.select.return_value.eq.return_value.execute.return_value = \
+            MagicMock(data=[job])
+
+        self.claimer.add_job(job)
+
+        # First use loads the heap once from the database
+        self.assertEqual([j["id"] for j in self.manager.take_due_jobs()], ["job-1"])
+        self.assertEqual(self.manager.take_due_jobs(), [])
+
+        self.assertTrue(self.manager.mark_job_executed("job-1"))
+        self.assertEqual(len(self.heap), 1)
+        self.assertGreater(self.heap.seconds_until_next(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
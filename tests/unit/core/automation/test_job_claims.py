@@ -0,0 +1,64 @@
+# test_job_claims.py
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+# The automation modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.automation.job_claims import SQLiteJobClaimer
+
+
+class TestJobClaims(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        self.claimer = SQLiteJobClaimer()
+        for i in range(40):
+            self.claimer.add_job({"id": f"job-{i}", "connection_id": f"conn-{i % 10}",
+                                  "automation_type": "metadata_refresh" if i < 20 else "schema_change_detection",
+                                  "next_run_at": self.now - timedelta(minutes=i)})
+        self.claimer.add_job({"id": "future", "connection_id": "conn-1", "automation_type": "metadata_refresh",
+                              "next_run_at": self.now + timedelta(hours=1)})
+
+    def test_concurrent_claims_are_disjoint(self):
+        claims = {}
+
+        def claim(worker):
+            claims[worker] = [job["id"] for job in self.claimer.claim(worker, limit=7, now=self.now)]
+
+        threads = [threading.Thread(target=claim, args=(f"worker-{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [job_id for ids in claims.values() for job_id in ids]
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(set(claimed), {f"job-{i}" for i in range(40)})
+
+        # Leased jobs are skipped, the rest come oldest first
+        self.claimer.release("job-5", self.now - timedelta(hours=1))
+        later = self.claimer.claim("late", limit=5, now=self.now + timedelta(minutes=1))
+        self.assertEqual([job["id"] for job in later], ["job-5"])
+
+    def test_leases_expire_and_running_jobs_are_skipped(self):
+        self.claimer.add_running_job("running-1", "conn-3", "metadata_refresh")
+
+        claimed = {job["id"] for job in self.claimer.claim("worker-a", limit=100, now=self.now)}
+        self.assertNotIn("job-3", claimed)
+        self.assertNotIn("job-13", claimed)
+        self.assertEqual(len(claimed), 38)
+
+        # Nothing left while leases hold, everything unfinished is claimable after expiry
+        self.assertEqual(self.claimer.claim("worker-b", now=self.now + timedelta(minutes=1)), [])
+        self.claimer.release("job-0", self.now + timedelta(days=1))
+        reclaimed = self.claimer.claim("worker-b", limit=100, lease_seconds=60,
+                                       now=self.now + timedelta(minutes=10))
+        self.assertEqual(len(reclaimed), 37)
+        self.assertTrue(all(job["claimed_by"] == "worker-b" for job in reclaimed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+# test_pipeline.py
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# The automation modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.automation.pipeline import (AutomationPipeline, ConnectionPipelineSteps, PipelineContext, PipelineStep,
+                                      StepResult)
+
+
+class FakeConnector:
+    def __init__(self, schema, row_counts):
+        self.schema = schema
+        self.row_counts = row_counts
+        self.inspector = object()
+        self.calls = {"get_tables": 0, "get_columns": 0, "get_primary_keys": 0}
+
+    def connect(self):
+        pass
+
+    def get_tables(self):
+        self.calls["get_tables"] += 1
+        return list(self.schema)
+
+    def get_columns(self, table_name):
+        self.calls["get_columns"] += 1
+        return [{"name": name, "type": "BOOLEAN", "nullable": True} for name in self.schema[table_name]]
+
+    def get_primary_keys(self, table_name):
+        self.calls["get_primary_keys"] += 1
+        return [self.schema[table_name][0]]
+
+    def execute_query(self, query):
+        table_name = query.rsplit(" ", 1)[-1]
+        return [[self.row_counts[table_name]]]
+
+
+class FakeStorage:
+    """Keeps the latest stored metadata per type, shaped like MetadataStorageService.get_metadata"""
+
+    def __init__(self):
+        self.metadata = {}
+        self.stores = 0
+
+    def get_metadata(self, connection_id, metadata_type):
+        if metadata_type not in self.metadata:
+            return None
+        return {"metadata": self.metadata[metadata_type]}
+
+    def store_tables_metadata(self, connection_id, tables, verify_storage=True):
+        self.stores += 1
+        self.metadata["tables"] = {"tables": tables}
+        return True
+
+    def store_columns_metadata(self, connection_id, columns_by_table, verify_storage=True):
+        self.stores += 1
+        self.metadata["columns"] = {"columns_by_table": columns_by_table}
+        return True
+
+    def store_statistics_metadata(self, connection_id, stats_by_table, verify_storage=True):
+        self.stores += 1
+        self.metadata["statistics"] = {"statistics_by_table": {
+            table: {**stats, "row_count": float(stats["row_count"])} for table, stats in stats_by_table.items()}}
+        return True
+
+
+class TestAutomationPipeline(unittest.TestCase):
+    def test_steps_run_in_dependency_order(self):
+        order = []
+
+        def step(name, changed=True):
+            def run(context):
+                order.append(name)
+                return StepResult(changed=changed)
+            return run
+
+        pipeline = AutomationPipeline([
+            PipelineStep("validate", step("validate"), depends_on=["detect"]),
+            PipelineStep("detect", step("detect"), depends_on=["refresh"]),
+            PipelineStep("refresh", step("refresh"))
+        ])
+        results = pipeline.run(PipelineContext("conn-1"))
+
+        self.assertEqual(order, ["refresh", "detect", "validate"])
+        self.assertEqual(results["completed"], 3)
+
+    def test_unchanged_and_failed_upstream_skip_downstream(self):
+        def fail(context):
+            raise RuntimeError("warehouse unavailable")
+
+        pipeline = AutomationPipeline([
+            PipelineStep("quiet", lambda context: StepResult(changed=False)),
+            PipelineStep("after_quiet", lambda context: StepResult(), depends_on=["quiet"]),
+            PipelineStep("broken", fail),
+            PipelineStep("after_broken", lambda context: StepResult(), depends_on=["broken"])
+        ])
+        results = pipeline.run(PipelineContext("conn-1"))["steps"]
+
+        self.assertEqual(results["after_quiet"]["reason"], "no_upstream_changes")
+        self.assertEqual(results["broken"]["error"], "warehouse unavailable")
+        self.assertEqual(results["after_broken"]["reason"], "upstream_failed")
+
+    def test_invalid_graphs_are_rejected(self):
+        run = lambda context: StepResult()
+        with self.assertRaises(ValueError):
+            AutomationPipeline([PipelineStep("a", run, depends_on=["missing"])])
+        with self.assertRaises(ValueError):
+            AutomationPipeline([PipelineStep("a", run, depends_on=["b"]), PipelineStep("b", run, depends_on=["a"])])
+
+
+class TestConnectionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.schema = {"orders": ["id", "total"], "customers": ["id", "name"]}
+        self.row_counts = {"orders": 10, "customers": 3}
+        self.connector = FakeConnector(self.schema, self.row_counts)
+        self.storage = FakeStorage()
+        self.connector_factory = MagicMock()
+        self.connector_factory.create_connector.return_value = self.connector
+        self.supabase = MagicMock()
+        self.supabase.get_connection.return_value = {"id": "conn-1", "organization_id": "org-1"}
+        self.validator = MagicMock()
+        self.validator.run_automated_validations.return_value = {"failed_rules": 0}
+
+    def run_pipeline(self):
+        steps = ConnectionPipelineSteps(self.storage, self.connector_factory, self.supabase, self.validator)
+        context = PipelineContext("conn-1", "org-1", {"id": "conn-1"})
+        return steps.build().run(context)["steps"], context
+
+    def test_first_run_reads_warehouse_once_and_creates_baseline(self):
+        steps, context = self.run_pipeline()
+
+        self.assertEqual(self.connector.calls, {"get_tables": 1, "get_columns": 2, "get_primary_keys": 2})
+        self.assertEqual(steps["detect_schema_changes"]["summary"]["baseline_created"], True)
+        self.assertEqual(steps["run_validations"]["status"], "completed")
+        self.assertEqual(set(context.artifacts["schema_snapshot"]), {"orders", "customers"})
+        self.assertEqual(self.storage.metadata["columns"]["columns_by_table"]["orders"][0]["primary_key"], True)
+
+    def test_unchanged_connection_skips_detection_but_validates(self):
+        self.run_pipeline()
+        self.validator.reset_mock()
+
+        steps, _ = self.run_pipeline()
+
+        self.assertFalse(steps["refresh_metadata"]["changed"])
+        self.assertEqual(steps["detect_schema_changes"]["status"], "skipped")
+        # In-place updates leave schema and row counts unchanged, so validations still run
+        self.assertEqual(steps["run_validations"]["status"], "completed")
+        self.validator.run_automated_validations.assert_called_once_with("conn-1", "org-1")
+
+    def test_row_count_change_validates_without_schema_detection(self):
+        self.run_pipeline()
+        self.row_counts["orders"] = 11
+
+        steps, _ = self.run_pipeline()
+
+        self.assertEqual(steps["detect_schema_changes"]["status"], "skipped")
+        self.assertEqual(steps["run_validations"]["status"], "completed")
+
+    def test_schema_change_is_detected_from_snapshot(self):
+        self.run_pipeline()
+        self.schema["orders"].append("discount")
+        self.connector.calls = dict.fromkeys(self.connector.calls, 0)
+
+        steps, context = self.run_pipeline()
+
+        self.assertEqual(steps["detect_schema_changes"]["summary"]["changes_detected"], 1)
+        self.assertEqual(context.artifacts["schema_changes"][0]["type"], "column_added")
+        self.assertEqual(steps["run_validations"]["status"], "completed")
+        # Detection compared the refreshed snapshot instead of reading the schema again
+        self.assertEqual(self.connector.calls["get_tables"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# test_status_writer.py
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# The automation modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.automation.status_writer import AutomationStatusWriter
+
+
+def record_job_lifecycle(writer, job_id="job-1", run_id="run-1"):
+    """The bookkeeping writes the scheduler makes for one scheduled job"""
+    writer.update_scheduled_job("sched-1", {"next_run_at": "2026-10-19T02:00:00+00:00", "claimed_by": None})
+    writer.update_job(job_id, {"status": "running", "started_at": "2026-10-18T02:00:00+00:00"})
+    writer.create_run({"id": run_id, "job_id": job_id, "connection_id": "conn-1", "run_type": "metadata_refresh",
+                       "status": "running", "started_at": "2026-10-18T02:00:00+00:00"})
+    writer.update_job(job_id, {"status": "completed", "completed_at": "2026-10-18T02:05:00+00:00"})
+    writer.update_run(run_id, {"status": "completed", "results": {"tables": 3}})
+    writer.add_event({"event_type": "metadata_refreshed", "automation_type": "metadata_refresh",
+                      "connection_id": "conn-1", "organization_id": None, "event_data": {"job_id": job_id}})
+
+
+class TestAutomationStatusWriter(unittest.TestCase):
+    def setUp(self):
+        self.supabase = MagicMock()
+        self.client = self.supabase.supabase
+        self.writer = AutomationStatusWriter(self.supabase, flush_interval=60)
+
+    def tearDown(self):
+        self.writer.stop()
+
+    def test_job_writes_are_coalesced_into_one_batch(self):
+        self.writer.start()
+        record_job_lifecycle(self.writer)
+
+        self.assertEqual(self.client.rpc.call_count, 0)
+        self.assertTrue(self.writer.flush())
+
+        self.assertEqual(self.writer.stats["requests"], 1)
+        name, params = self.client.rpc.call_args[0]
+        self.assertEqual(name, "apply_automation_status_batch")
+        self.assertEqual(params["p_jobs"], [{"id": "job-1", "status": "completed",
+                                             "started_at": "2026-10-18T02:00:00+00:00",
+                                             "completed_at": "2026-10-18T02:05:00+00:00"}])
+        self.assertEqual(params["p_runs"][0]["status"], "completed")
+        self.assertEqual(params["p_runs"][0]["job_id"], "job-1")
+        self.assertEqual(len(params["p_scheduled_jobs"]), 1)
+        self.assertEqual(len(params["p_events"]), 1)
+        self.assertEqual(self.writer.pending_count(), 0)
+
+    def test_failed_flush_keeps_later_writes_on_top(self):
+        self.writer.start()
+        self.client.rpc.return_value.execute.side_effect = RuntimeError("network down")
+        self.client.table.side_effect = RuntimeError("network down")
+
+        self.writer.update_job("job-1", {"status": "running", "started_at": "t0"})
+        self.assertFalse(self.writer.flush())
+
+        # Written while the failed batch was waiting for its retry
+        self.writer.update_job("job-1", {"status": "completed"})
+        self.client.rpc.return_value.execute.side_effect = None
+        self.assertTrue(self.writer.flush())
+
+        params = self.client.rpc.call_args[0][1]
+        self.assertEqual(params["p_jobs"], [{"id": "job-1", "status": "completed", "started_at": "t0"}])
+        self.assertTrue(self.writer.get_stats()["batched_rpc"])
+
+    def test_table_fallback_without_batch_function(self):
+        self.writer.start()
+        self.client.rpc.return_value.execute.side_effect = Exception("function apply_automation_status_batch does not exist")
+        self.client.table.return_value.select.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{"id": "conn-1", "organization_id": "org-1"}])
+
+        record_job_lifecycle(self.writer)
+        self.assertTrue(self.writer.flush())
+        self.assertFalse(self.writer.get_stats()["batched_rpc"])
+
+        inserted_run = self.client.table.return_value.insert.call_args_list[0][0][0]
+        self.assertEqual(inserted_run[0]["status"], "completed")
+        inserted_events = self.client.table.return_value.insert.call_args_list[1][0][0]
+        self.assertEqual(inserted_events[0]["organization_id"], "org-1")
+
+        # The run now exists, so later writes to it are updates
+        self.writer.update_run("run-1", {"status": "failed"})
+        self.writer.flush()
+        self.client.table.return_value.update.assert_called_with({"status": "failed"})
+
+    def test_table_fallback_isolates_failed_rows(self):
+        self.writer.start()
+        self.client.rpc.return_value.execute.side_effect = Exception("canceling statement due to statement timeout")
+        tables = {name: MagicMock() for name in ("automation_jobs", "automation_runs",
+                                                  "automation_scheduled_jobs", "automation_events",
+                                                  "database_connections")}
+        self.client.table.side_effect = lambda name: tables[name]
+
+        def update_job(fields):
+            request = MagicMock()
+            request.eq.side_effect = lambda column, value: MagicMock(execute=MagicMock(
+                side_effect=Exception('invalid input syntax for type uuid: "bad-job"') if value == "bad-job" else None))
+            return request
+        tables["automation_jobs"].update.side_effect = update_job
+        # The batch call committed the run before its response was lost
+        tables["automation_runs"].insert.return_value.execute.side_effect = \
+            Exception('duplicate key value violates unique constraint "automation_runs_pkey" (23505)')
+
+        record_job_lifecycle(self.writer)
+        self.writer.update_job("bad-job", {"status": "running"})
+        self.assertFalse(self.writer.flush())
+
+        # Only the bad row is left; the existing run was updated instead of inserted
+        self.assertEqual(self.writer.pending_count(), 1)
+        tables["automation_runs"].update.assert_called_once()
+        self.assertEqual(tables["automation_events"].insert.call_count, 1)
+        # A failed call is not a missing function, so the batch RPC stays in use
+        self.assertTrue(self.writer.get_stats()["batched_rpc"])
+
+    def test_permanently_failing_rows_are_dropped(self):
+        writer = AutomationStatusWriter(self.supabase, flush_interval=60, max_attempts=3)
+        writer.start()
+        self.client.rpc.return_value.execute.side_effect = RuntimeError("row violates check constraint")
+        self.client.table.side_effect = RuntimeError("row violates check constraint")
+
+        writer.update_job("job-1", {"status": "bogus"})
+        writer.add_event({"event_type": "job_failed", "organization_id": "org-1", "event_data": {}})
+        for _ in range(3):
+            self.assertFalse(writer.flush())
+
+        self.assertEqual(writer.pending_count(), 0)
+        self.assertEqual(writer.get_stats()["rows_dropped"], 2)
+        self.assertTrue(writer.flush())
+        writer.stop()
+
+    def test_background_flush_and_stop(self):
+        writer = AutomationStatusWriter(self.supabase, flush_interval=0.05)
+        writer.start()
+        writer.update_job("job-1", {"status": "running"})
+
+        deadline = time.monotonic() + 5
+        while writer.pending_count():
+            self.assertLess(time.monotonic(), deadline, "buffered writes were never flushed")
+            time.sleep(0.01)
+
+        writer.update_job("job-2", {"status": "running"})
+        writer.stop()
+        self.assertEqual(writer.pending_count(), 0)
+        self.assertEqual(self.client.rpc.call_args[0][1]["p_jobs"], [{"id": "job-2", "status": "running"}])
+
+    def test_stopped_writer_writes_immediately(self):
+        self.writer.update_job("job-1", {"status": "failed"})
+
+        self.client.rpc.assert_called_once()
+        self.assertEqual(self.writer.pending_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# test_adaptive_refresh.py
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+# The metadata modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.metadata.adaptive_refresh import AdaptiveRefreshPlanner
+from core.metadata.change_analytics import MetadataChangeAnalytics
+from core.metadata.worker import MetadataTask, MetadataWorker, PriorityTaskQueue
+
+HOUR = 3600
+
+
+class FakeAnalytics(MetadataChangeAnalytics):
+    """Change analytics with canned change history per table"""
+
+    def __init__(self, history):
+        super().__init__()
+        self.history = history
+
+    def get_change_frequency(self, connection_id, object_type, object_name, time_period_days=30):
+        return self.history.get(object_name, {"frequency": "unknown", "data_points": 0})
+
+
+class TestAdaptiveRefreshPlanner(unittest.TestCase):
+    def setUp(self):
+        self.analytics = FakeAnalytics({
+            "events": {"frequency": "high", "data_points": 20, "avg_hours_between_changes": 2},
+            "countries": {"frequency": "low", "data_points": 20, "last_interval_hours": 96},
+            "orders": {"frequency": "medium", "data_points": 20, "avg_hours_between_changes": 30}
+        })
+        self.planner = AdaptiveRefreshPlanner(self.analytics)
+        self.now = 1_000_000.0
+
+    def test_intervals_follow_change_history_within_bounds(self):
+        self.planner.sync_tables("conn-1", ["events", "countries", "orders", "new_table"])
+        intervals = self.planner.mark_scheduled("conn-1", ["events", "countries", "orders", "new_table"], self.now)
+
+        # Hot tables go to the minimum, static ones double from their recorded interval up to weekly
+        self.assertEqual(intervals, {"events": 1, "countries": 168, "orders": 24, "new_table": 24})
+
+        self.assertEqual(self.planner.mark_scheduled("conn-1", ["countries"], self.now)["countries"], 168)
+
+    def test_due_tables_respect_per_table_intervals(self):
+        self.planner.sync_tables("conn-1", ["events", "countries"], last_refreshed=self.now - 25 * HOUR)
+        self.assertCountEqual(self.planner.due_tables("conn-1", self.now), ["events", "countries"])
+
+        self.planner.mark_scheduled("conn-1", ["events", "countries"], self.now)
+        self.assertEqual(self.planner.due_tables("conn-1", self.now + 30 * 60), [])
+        self.assertEqual(self.planner.due_tables("conn-1", self.now + 2 * HOUR), ["events"])
+        self.assertEqual(self.planner.due_tables("conn-1", self.now + 169 * HOUR), ["events", "countries"])
+
+    def test_recently_refreshed_and_removed_tables(self):
+        self.planner.sync_tables("conn-1", ["events", "countries"], last_refreshed=self.now - HOUR)
+        self.assertEqual(self.planner.due_tables("conn-1", self.now), [])
+
+        self.planner.sync_tables("conn-1", ["events"])
+        self.assertEqual(set(self.planner.get_schedule("conn-1")), {"events"})
+
+
+class FakeCollector:
+    def __init__(self, tables):
+        self.tables = tables
+        self.statistics_collected = []
+
+    def collect_table_list(self):
+        return list(self.tables)
+
+    def collect_table_metadata_sync(self, table_name):
+        columns = [{"name": name, "type": "INTEGER", "nullable": True} for name in self.tables[table_name]["columns"]]
+        return {"table_name": table_name, "columns": columns, "column_count": len(columns),
+                "primary_keys": ["id"], "row_count": self.tables[table_name]["rows"]}
+
+    def collect_table_statistics(self, table_name, columns=None, primary_keys=None):
+        self.statistics_collected.append(table_name)
+        return {"table_name": table_name, "row_count": self.tables[table_name]["rows"]}
+
+
+class TestRefreshTablesTask(unittest.TestCase):
+    def setUp(self):
+        fresh = datetime.now(timezone.utc).isoformat()
+        self.stored = stored = {
+            "tables": {"tables": [{"name": "events", "row_count": 10}, {"name": "countries", "row_count": 5},
+                                  {"name": "dropped"}]},
+            "columns": {"columns_by_table": {
+                "events": [{"name": "id", "type": "INTEGER", "nullable": True}],
+                "countries": [{"name": "id", "type": "INTEGER", "nullable": True}],
+                "dropped": [{"name": "id", "type": "INTEGER", "nullable": True}]
+            }},
+            "statistics": {"statistics_by_table": {
+                "events": {"row_count": 10, "collected_at": fresh},
+                "countries": {"row_count": 5, "collected_at": fresh},
+                "dropped": {"row_count": 1, "collected_at": fresh}
+            }}
+        }
+        self.storage = MagicMock()
+        self.storage.get_metadata.side_effect = lambda connection_id, kind: (
+            {"metadata": stored[kind]} if kind in stored else None)
+        self.worker = MetadataWorker(PriorityTaskQueue(), self.storage, None)
+        self.recorded = {}
+        self.worker._record_changes = lambda connection_id, object_type, name, changes, **kwargs: \
+            self.recorded.setdefault(name, (bool(changes), kwargs["refresh_interval_hours"]))
+
+    def test_changed_tables_are_recorded_and_merged(self):
+        collector = FakeCollector({
+            "events": {"columns": ["id"], "rows": 12},
+            "countries": {"columns": ["id"], "rows": 5},
+            "orders": {"columns": ["id", "total"], "rows": 3}
+        })
+        task = MetadataTask("refresh_tables", "conn-1", {"table_names": ["events", "countries"],
+                                                         "refresh_interval_hours": {"events": 1, "countries": 168}})
+
+        result = self.worker._refresh_tables(task, collector, "org-1")
+
+        self.assertEqual(result["changed_tables"], ["events"])
+        self.assertEqual(result["tables_removed"], 1)
+        self.assertEqual(self.recorded, {"events": (True, 1), "countries": (False, 168)})
+        self.assertEqual(collector.statistics_collected, ["events"])
+
+        stored_tables = self.storage.store_tables_metadata.call_args[0][1]
+        self.assertEqual({table["name"]: table.get("row_count") for table in stored_tables},
+                         {"events": 12, "countries": 5, "orders": None})
+        stored_columns = self.storage.store_columns_metadata.call_args[0][1]
+        self.assertNotIn("dropped", stored_columns)
+        self.assertTrue(stored_columns["events"][0]["primary_key"])
+        stored_statistics = self.storage.store_statistics_metadata.call_args[0][1]
+        self.assertEqual(set(stored_statistics), {"events", "countries"})
+
+    def test_stale_statistics_are_recollected_without_changes(self):
+        stale = (datetime.now(timezone.utc) - timedelta(hours=73)).isoformat()
+        self.stored["statistics"]["statistics_by_table"]["countries"]["collected_at"] = stale
+        collector = FakeCollector({"events": {"columns": ["id"], "rows": 10},
+                                   "countries": {"columns": ["id"], "rows": 5}})
+        task = MetadataTask("refresh_tables", "conn-1", {"table_names": ["events"]})
+
+        result = self.worker._refresh_tables(task, collector, "org-1")
+
+        self.assertEqual(result["changed_tables"], [])
+        self.assertEqual(collector.statistics_collected, ["countries"])
+        self.assertEqual(result["statistics_refreshed"], 1)
+        stored_statistics = self.storage.store_statistics_metadata.call_args[0][1]
+        self.assertNotEqual(stored_statistics["countries"].get("collected_at"), stale)
+
+    def test_removed_table_leaves_stored_statistics(self):
+        collector = FakeCollector({"events": {"columns": ["id"], "rows": 10},
+                                   "countries": {"columns": ["id"], "rows": 5}})
+        task = MetadataTask("refresh_tables", "conn-1", {"table_names": []})
+
+        result = self.worker._refresh_tables(task, collector, "org-1")
+
+        self.assertEqual(result["tables_removed"], 1)
+        self.assertEqual(collector.statistics_collected, [])
+        stored_statistics = self.storage.store_statistics_metadata.call_args[0][1]
+        self.assertEqual(set(stored_statistics), {"events", "countries"})
+
+
+if __name__ == '__main__':
+    unittest.main()
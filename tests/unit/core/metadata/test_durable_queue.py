@@ -0,0 +1,251 @@
+# test_durable_queue.py
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# The metadata modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.metadata.durable_queue import SQLiteTaskQueue
+from core.metadata.worker import MetadataTask, MetadataWorker, PriorityTaskQueue
+
+
+class TestSQLiteTaskQueue(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "queue.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_queue(self, **kwargs):
+        return SQLiteTaskQueue(self.path, poll_interval=0.05, **kwargs)
+
+    def test_priority_lanes_are_fifo(self):
+        queue = self.make_queue()
+        tasks = [MetadataTask("full_collection", f"conn-{i}", {"n": i}, priority)
+                 for i, priority in enumerate(["low", "medium", "high", "medium", "high"])]
+        for task in tasks:
+            queue.put(task)
+
+        stats = queue.get_stats()
+        self.assertEqual((stats["high"], stats["medium"], stats["low"], stats["total"]), (2, 2, 1, 5))
+
+        order = [queue.get(block=False).params["n"] for _ in tasks]
+        self.assertEqual(order, [2, 4, 1, 3, 0])
+        self.assertIsNone(queue.get(block=False))
+        self.assertEqual(queue.get_stats()["in_flight"], 5)
+
+    def test_tasks_survive_restart_and_leases_expire(self):
+        queue = self.make_queue(visibility_timeout=0.2)
+        queue.put(MetadataTask("full_collection", "conn-1", {"depth": "high"}, "high"))
+        queue.put(MetadataTask("full_collection", "conn-2", {}, "low"))
+        leased = queue.get(block=False)
+        self.assertEqual(leased.connection_id, "conn-1")
+
+        # A new process sees both tasks; the leased one only after its lease expires
+        restarted = self.make_queue(visibility_timeout=0.2)
+        self.assertEqual([task.connection_id for task in restarted.pending_tasks()], ["conn-1", "conn-2"])
+        self.assertEqual(restarted.get(block=False).connection_id, "conn-2")
+        self.assertIsNone(restarted.get(block=False))
+
+        redelivered = restarted.get(block=True, timeout=2)
+        self.assertEqual(redelivered.id, leased.id)
+        self.assertEqual(redelivered.params, {"depth": "high"})
+        self.assertEqual(redelivered.attempts, 2)
+
+        restarted.ack(redelivered)
+        self.assertEqual([task.connection_id for task in restarted.pending_tasks()], ["conn-2"])
+
+    def test_raise_priority_moves_queued_task_to_higher_lane(self):
+        queue = self.make_queue()
+        low = MetadataTask("full_collection", "conn-1", {}, "low")
+        queue.put(MetadataTask("full_collection", "conn-2", {}, "medium"))
+        queue.put(low)
+
+        self.assertTrue(queue.raise_priority(low.id, "high"))
+        self.assertFalse(queue.raise_priority(low.id, "medium"))
+        leased = queue.get(block=False)
+        self.assertEqual((leased.id, leased.priority), (low.id, "high"))
+        # Leased tasks are not moved
+        medium = queue.get(block=False)
+        self.assertFalse(queue.raise_priority(medium.id, "high"))
+
+    def test_retries_with_backoff_then_dead_letters(self):
+        queue = self.make_queue(max_attempts=3, backoff_base=0.05, backoff_max=1)
+        task = MetadataTask("full_collection", "conn-1")
+        queue.put(task)
+
+        delivered = queue.get(block=False)
+        self.assertTrue(queue.nack(delivered, "timeout"))
+
+        # Not visible again until the backoff has passed
+        self.assertIsNone(queue.get(block=False))
+        delivered = queue.get(block=True, timeout=2)
+        self.assertEqual(delivered.attempts, 2)
+        self.assertTrue(queue.nack(delivered, "timeout"))
+
+        delivered = queue.get(block=True, timeout=2)
+        self.assertEqual(delivered.attempts, 3)
+        self.assertFalse(queue.nack(delivered, "permission denied"))
+
+        self.assertIsNone(queue.get(block=True, timeout=0.2))
+        self.assertEqual(queue.get_stats()["dead"], 1)
+        self.assertEqual(queue.dead_letters()[0]["last_error"], "permission denied")
+
+        self.assertTrue(queue.requeue_dead(task.id))
+        self.assertEqual(queue.get(block=False).attempts, 1)
+
+    def test_retry_delay_grows_and_is_capped(self):
+        queue = self.make_queue(backoff_base=10, backoff_max=100)
+        self.assertTrue(8 <= queue.retry_delay(1) <= 12)
+        self.assertTrue(32 <= queue.retry_delay(3) <= 48)
+        self.assertTrue(80 <= queue.retry_delay(10) <= 120)
+
+    def test_blocked_get_wakes_on_put(self):
+        queue = self.make_queue()
+        queue.poll_interval = 10
+
+        def put_later():
+            time.sleep(0.1)
+            queue.put(MetadataTask("full_collection", "conn-1"))
+
+        thread = threading.Thread(target=put_later)
+        thread.start()
+        start = time.monotonic()
+        task = queue.get(block=True, timeout=5)
+        thread.join()
+
+        self.assertIsNotNone(task)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_worker_retries_then_completes_task(self):
+        queue = self.make_queue(backoff_base=0.01)
+        attempts = []
+
+        worker = MetadataWorker(queue, None, None, max_workers=2)
+
+        def process_task(task):
+            attempts.append(task.attempts)
+            if len(attempts) < 3:
+                raise RuntimeError("warehouse unavailable")
+            return {"tables": 1}
+
+        worker._process_task = process_task
+        task_id = worker.submit_task("full_collection", "conn-1")
+        future = worker.get_completion_future(task_id)
+        worker.start()
+        try:
+            entry = future.result(timeout=5)
+        finally:
+            worker.stop()
+
+        self.assertEqual(entry["task"]["status"], "completed")
+        self.assertEqual(attempts, [1, 2, 3])
+        self.assertEqual(worker.stats["tasks_retried"], 2)
+        self.assertEqual(queue.pending_tasks(), [])
+
+    def test_worker_keeps_lease_of_long_running_task(self):
+        queue = self.make_queue(visibility_timeout=0.3)
+        other_consumer = self.make_queue(visibility_timeout=0.3, worker_id="other-host:1")
+        attempts = []
+        stolen = []
+
+        worker = MetadataWorker(queue, None, None, max_workers=1)
+
+        def process_task(task):
+            attempts.append(task.attempts)
+            # Runs for several visibility timeouts; the lease must not expire meanwhile
+            deadline = time.monotonic() + 1.0
+            while time.monotonic() < deadline:
+                stolen.append(other_consumer.get(block=False))
+                time.sleep(0.05)
+            return {"tables": 1}
+
+        worker._process_task = process_task
+        task_id = worker.submit_task("full_collection", "conn-1")
+        future = worker.get_completion_future(task_id)
+        worker.start()
+        try:
+            entry = future.result(timeout=5)
+        finally:
+            worker.stop()
+
+        self.assertEqual(entry["task"]["status"], "completed")
+        self.assertEqual(attempts, [1])
+        self.assertEqual([task for task in stolen if task], [])
+        self.assertEqual(queue.pending_tasks(), [])
+
+    def test_extend_lease_fails_once_lease_is_lost(self):
+        queue = self.make_queue(visibility_timeout=0.05)
+        queue.put(MetadataTask("full_collection", "conn-1", {}, "high"))
+        task = queue.get(block=False)
+        self.assertTrue(queue.extend_lease(task))
+
+        time.sleep(0.1)
+        other_consumer = self.make_queue(worker_id="other-host:1")
+        self.assertEqual(other_consumer.get(block=False).id, task.id)
+        self.assertFalse(queue.extend_lease(task))
+
+
+class TestSingleFlightSubmit(unittest.TestCase):
+    def setUp(self):
+        self.queue = PriorityTaskQueue()
+        self.worker = MetadataWorker(self.queue, None, None, max_workers=1)
+
+    def test_duplicate_requests_attach_to_queued_task(self):
+        first = self.worker.submit_task("full_collection", "conn-1", {"table_limit": 50}, "low")
+        second = self.worker.submit_task("full_collection", "conn-1", {"refresh_types": ["tables"]}, "high")
+        table = self.worker.submit_task("table_metadata", "conn-1", {"table_name": "orders"})
+
+        self.assertEqual(second, first)
+        self.assertNotEqual(table, first)
+        self.assertEqual(self.worker.stats["tasks_coalesced"], 1)
+        self.assertEqual(self.queue.get_stats()["high"], 1)
+        self.assertEqual(self.queue.get(block=False).id, first)
+
+    def test_broader_request_is_not_coalesced(self):
+        first = self.worker.submit_task("full_collection", "conn-1", {"table_limit": 10})
+        wider = self.worker.submit_task("full_collection", "conn-1", {"table_limit": 100})
+        other_connection = self.worker.submit_task("full_collection", "conn-2", {"table_limit": 10})
+
+        self.assertEqual(len({first, wider, other_connection}), 3)
+        # The wider task covers later narrow requests
+        self.assertEqual(self.worker.submit_task("full_collection", "conn-1", {"table_limit": 75}), wider)
+
+    def test_running_task_is_joined_until_it_finishes(self):
+        started = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def process_task(task):
+            runs.append(task.id)
+            started.set()
+            release.wait(5)
+            return {"tables": 1}
+
+        self.worker._process_task = process_task
+        task_id = self.worker.submit_task("full_collection", "conn-1")
+        self.worker.start()
+        try:
+            self.assertTrue(started.wait(5))
+            self.assertEqual(self.worker.submit_task("full_collection", "conn-1", priority="high"), task_id)
+
+            future = self.worker.get_completion_future(task_id)
+            release.set()
+            future.result(timeout=5)
+
+            # Once finished, a new request starts a new task
+            self.assertNotEqual(self.worker.submit_task("full_collection", "conn-1"), task_id)
+        finally:
+            release.set()
+            self.worker.stop()
+
+        self.assertEqual(runs[0], task_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# test_task_completion.py
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+# The metadata and automation modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.metadata.manager import MetadataTaskManager, _DeadlineTimer
+from core.metadata.worker import MetadataWorker, PriorityTaskQueue
+
+
+def make_manager(process_task):
+    """Task manager with a running worker pool but no storage, Supabase or refresh loop"""
+    manager = MetadataTaskManager.__new__(MetadataTaskManager)
+    manager.worker = MetadataWorker(PriorityTaskQueue(), MagicMock(), MagicMock(), max_workers=3)
+    manager.worker._process_task = process_task
+    manager.deadlines = _DeadlineTimer()
+    manager.worker.start()
+    return manager
+
+
+class TestTaskCompletion(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+        def process_task(task):
+            self.release.wait(5)
+            if task.params.get("fail"):
+                raise ValueError("connection refused")
+            return {"tables": 3, "statistics": {}}
+
+        self.manager = make_manager(process_task)
+
+    def tearDown(self):
+        self.release.set()
+        self.manager.worker.stop()
+
+    def follow(self, task_id, timeout_minutes=None):
+        done = threading.Event()
+        calls = []
+
+        def callback(completion):
+            calls.append((completion, threading.current_thread().name))
+            done.set()
+
+        self.manager.on_task_complete(task_id, callback, timeout_minutes=timeout_minutes)
+        return done, calls
+
+    def test_callback_runs_when_task_completes(self):
+        task_id = self.manager.submit_collection_task("conn-1")
+        done, calls = self.follow(task_id)
+
+        # Registering does not block and nothing fires while the task runs
+        self.assertFalse(done.wait(0.1))
+        self.release.set()
+        self.assertTrue(done.wait(5))
+
+        completion, thread_name = calls[0]
+        self.assertTrue(completion["completed"])
+        self.assertTrue(completion["success"])
+        self.assertEqual(completion["result"], {"tables": 3, "statistics": {}})
+        self.assertTrue(thread_name.startswith("MetadataWorker-"))
+
+        # A task that already finished calls back immediately
+        done, calls = self.follow(task_id)
+        self.assertTrue(done.is_set())
+        self.assertTrue(calls[0][0]["success"])
+
+    def test_failed_task_reports_error(self):
+        self.release.set()
+        task_id = self.manager.submit_collection_task("conn-1", {"fail": True})
+        done, calls = self.follow(task_id)
+
+        self.assertTrue(done.wait(5))
+        self.assertTrue(calls[0][0]["completed"])
+        self.assertFalse(calls[0][0]["success"])
+        self.assertEqual(calls[0][0]["error"], "connection refused")
+
+    def test_timeout_fires_once(self):
+        task_id = self.manager.submit_collection_task("conn-1")
+        done, calls = self.follow(task_id, timeout_minutes=0.1 / 60)
+
+        self.assertTrue(done.wait(5))
+        self.assertFalse(calls[0][0]["completed"])
+        self.assertIn("timeout", calls[0][0]["error"])
+
+        # Completion after the timeout does not call back again
+        self.release.set()
+        self.manager.get_task_future(task_id).result(5)
+        self.assertEqual(len(calls), 1)
+
+    def test_many_tasks_without_waiting_threads(self):
+        task_ids = [self.manager.submit_collection_task(f"conn-{i}") for i in range(30)]
+        threads_before = threading.active_count()
+        followed = [self.follow(task_id, timeout_minutes=5) for task_id in task_ids]
+
+        # Following 30 pending tasks adds at most the shared deadline thread
+        self.assertLessEqual(threading.active_count(), threads_before + 1)
+        self.release.set()
+        for done, calls in followed:
+            self.assertTrue(done.wait(5))
+            self.assertTrue(calls[0][0]["success"])
+
+    def test_wait_for_task_completion_sync(self):
+        self.release.set()
+        task_id = self.manager.submit_collection_task("conn-1")
+
+        completion = self.manager.wait_for_task_completion_sync(task_id, timeout_minutes=1)
+        self.assertTrue(completion["success"])
+        self.assertEqual(completion["result"]["tables"], 3)
+
+        unknown = self.manager.wait_for_task_completion_sync("missing", timeout_minutes=1)
+        self.assertFalse(unknown["completed"])
+        self.assertEqual(unknown["error"], "Task not found")
+
+
+class TestChainedMetadataRefresh(unittest.TestCase):
+    @patch('core.automation.simplified_scheduler.publish_automation_event')
+    @patch('core.automation.simplified_scheduler.SupabaseManager')
+    def test_refresh_returns_before_task_and_chains_follow_up(self, _, mock_publish):
+        from core.automation.simplified_scheduler import SimplifiedAutomationScheduler
+
+        with patch.object(SimplifiedAutomationScheduler, '_initialize_metadata_integration'):
+            scheduler = SimplifiedAutomationScheduler()
+
+        callbacks = {}
+        scheduler.metadata_task_manager = MagicMock()
+        scheduler.metadata_task_manager.submit_collection_task.return_value = "task-1"
+        scheduler.metadata_task_manager.on_task_complete.side_effect = \
+            lambda task_id, callback, timeout_minutes: callbacks.setdefault(task_id, callback)
+        scheduler._create_automation_run = MagicMock(return_value="run-1")
+        scheduler._update_automation_run = MagicMock()
+        scheduler._update_job_status = MagicMock()
+        scheduler._verify_statistics_collection = MagicMock(return_value=True)
+
+        follow_up = scheduler._execute_job_with_timeout(
+            scheduler._execute_metadata_refresh, "job-1", "conn-1", {"scheduled": True}
+        )
+
+        # The executor thread is released while the metadata task is still pending
+        self.assertIsInstance(follow_up, Future)
+        self.assertFalse(follow_up.done())
+        self.assertIs(scheduler.active_jobs["job-1"], follow_up)
+        scheduler._verify_statistics_collection.assert_not_called()
+
+        callbacks["task-1"]({"completed": True, "success": True, "result": {"statistics": {}},
+                             "elapsed_seconds": 12})
+
+        self.assertTrue(follow_up.done())
+        self.assertNotIn("job-1", scheduler.active_jobs)
+        scheduler._verify_statistics_collection.assert_called_once_with("conn-1", {"statistics": {}})
+        self.assertEqual(scheduler._update_job_status.call_args[0][:2], ("job-1", "completed"))
+        scheduler._update_automation_run.assert_called_once()
+        mock_publish.assert_called_once()
+        scheduler.executor.shutdown()
+
+    @patch('core.automation.simplified_scheduler.publish_automation_event')
+    @patch('core.automation.simplified_scheduler.SupabaseManager')
+    def test_refresh_jobs_resume_from_pending_tasks(self, _, mock_publish):
+        from core.automation.simplified_scheduler import SimplifiedAutomationScheduler
+        from core.metadata.worker import MetadataTask
+
+        with patch.object(SimplifiedAutomationScheduler, '_initialize_metadata_integration'):
+            scheduler = SimplifiedAutomationScheduler()
+
+        recovered = MetadataTask("full_collection", "conn-1",
+                                 {"automation_job_id": "job-1", "automation_run_id": "run-1"})
+        manual = MetadataTask("full_collection", "conn-2", {})
+        callbacks = {}
+        scheduler.metadata_task_manager = MagicMock()
+        scheduler.metadata_task_manager.get_pending_tasks.return_value = [recovered, manual]
+        scheduler.metadata_task_manager.on_task_complete.side_effect = \
+            lambda task_id, callback, timeout_minutes=None: callbacks.setdefault(task_id, callback)
+        scheduler._update_automation_run = MagicMock()
+        scheduler._update_job_status = MagicMock()
+        scheduler._verify_statistics_collection = MagicMock(return_value=True)
+
+        self.assertEqual(scheduler._resume_metadata_refreshes(), 1)
+        self.assertEqual(list(callbacks), [recovered.id])
+        self.assertIn("job-1", scheduler.active_jobs)
+
+        callbacks[recovered.id]({"completed": True, "success": True, "result": {}, "elapsed_seconds": 5})
+        self.assertNotIn("job-1", scheduler.active_jobs)
+        self.assertEqual(scheduler._update_job_status.call_args[0][:2], ("job-1", "completed"))
+        scheduler._update_automation_run.assert_called_once()
+        self.assertEqual(scheduler._update_automation_run.call_args[0][:2], ("run-1", "completed"))
+        scheduler.executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
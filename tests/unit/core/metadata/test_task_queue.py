@@ -62,4 +62,70 @@ class TestPriorityTaskQueue(unittest.TestCase):
         self.assertEqual(task.priority, "high")
         self.assertTrue(elapsed >= 0.2)
 
-        thread.join()
\ No newline at end of file
+        thread.join()
+
+    def test_fifo_within_priority(self):
+        tasks = [MetadataTask("test", f"conn-{i}", {"n": i}, "medium") for i in range(5)]
+        for task in tasks:
+            self.queue.put(task)
+
+        self.assertEqual([self.queue.get(block=False).params["n"] for _ in tasks], [0, 1, 2, 3, 4])
+        self.assertIsNone(self.queue.get(block=False))
+
+    def test_aging_promotes_waiting_tasks(self):
+        queue = PriorityTaskQueue(aging_seconds=0.05)
+        queue.put(MetadataTask("test", "conn-1", {}, "low"))
+        time.sleep(0.15)
+        queue.put(MetadataTask("test", "conn-2", {}, "high"))
+
+        # The low task has waited longer than two priority levels are worth
+        self.assertEqual(queue.get(block=False).priority, "low")
+        self.assertEqual(queue.get(block=False).priority, "high")
+
+    def test_connections_share_workers(self):
+        busy = [MetadataTask("test", "busy", {"n": i}, "high") for i in range(3)]
+        for task in busy:
+            self.queue.put(task)
+        self.queue.put(MetadataTask("test", "quiet", {}, "medium"))
+
+        first = self.queue.get(block=False)
+        # busy already has a task running, so the other connection goes next
+        second = self.queue.get(block=False)
+        self.assertEqual((first.connection_id, second.connection_id), ("busy", "quiet"))
+
+        # With nothing else waiting, busy still uses idle workers
+        third = self.queue.get(block=False)
+        self.assertEqual(third.params["n"], 1)
+        self.assertEqual(self.queue.get_stats()["in_flight"], 3)
+
+        for task in (first, second, third):
+            self.queue.ack(task)
+        self.assertEqual(self.queue.get_stats()["in_flight"], 0)
+        self.assertEqual(self.queue.get(block=False).params["n"], 2)
+
+    def test_raise_priority_promotes_queued_task(self):
+        tasks = [MetadataTask("test", f"conn-{i}", {"n": i}, "low") for i in range(3)]
+        for task in tasks:
+            self.queue.put(task)
+        self.queue.put(self.medium_task)
+
+        self.assertTrue(self.queue.raise_priority(tasks[2].id, "high"))
+        self.assertFalse(self.queue.raise_priority(tasks[2].id, "medium"))
+        self.assertEqual(self.queue.get_stats()["high"], 1)
+
+        self.assertIs(self.queue.get(block=False), tasks[2])
+        self.assertIs(self.queue.get(block=False), self.medium_task)
+        self.assertEqual(self.queue.get(block=False).params["n"], 0)
+
+    def test_blocked_get_wakes_immediately(self):
+        received = []
+        consumer = threading.Thread(target=lambda: received.append((self.queue.get(block=True, timeout=5),
+                                                                    time.monotonic())))
+        consumer.start()
+        time.sleep(0.1)
+        put_at = time.monotonic()
+        self.queue.put(self.high_task)
+        consumer.join()
+
+        self.assertIs(received[0][0], self.high_task)
+        self.assertLess(received[0][1] - put_at, 0.05)
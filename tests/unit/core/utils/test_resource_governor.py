@@ -0,0 +1,142 @@
+# test_resource_governor.py
+import os
+import sys
+import threading
+import time
+import unittest
+
+# The utils modules import from the backend package root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../backend')))
+
+from core.utils.resource_governor import ResourceGovernor
+
+
+class TestResourceGovernor(unittest.TestCase):
+    def wait_for_waiters(self, governor, count):
+        deadline = time.monotonic() + 5
+        while governor.get_stats()["total_waiting"] < count:
+            self.assertLess(time.monotonic(), deadline, "waiters never queued")
+            time.sleep(0.005)
+
+    def queue_in_order(self, governor, requests, order):
+        """Start one thread per (connection, organization) request, each queued behind the previous"""
+        threads = []
+        for i, (connection_id, organization_id) in enumerate(requests):
+            def run(connection_id=connection_id, organization_id=organization_id):
+                with governor.slot(connection_id, organization_id, "test"):
+                    order.append(organization_id)
+
+            thread = threading.Thread(target=run)
+            thread.start()
+            threads.append(thread)
+            self.wait_for_waiters(governor, i + 1)
+        return threads
+
+    def test_connection_cap_limits_concurrency(self):
+        governor = ResourceGovernor(max_per_connection=2, max_total=10)
+        lock = threading.Lock()
+        running = {"now": 0, "peak": 0}
+
+        def query():
+            with governor.slot("conn-1", "org-1", "metadata"):
+                with lock:
+                    running["now"] += 1
+                    running["peak"] = max(running["peak"], running["now"])
+                time.sleep(0.02)
+                with lock:
+                    running["now"] -= 1
+
+        threads = [threading.Thread(target=query) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(running["peak"], 2)
+        stats = governor.get_stats()
+        self.assertEqual(stats["total_in_use"], 0)
+        self.assertEqual(stats["wait_metrics"]["subsystem:metadata"]["acquired"], 8)
+        self.assertGreater(stats["wait_metrics"]["subsystem:metadata"]["max_wait_seconds"], 0)
+
+    def test_noisy_organization_does_not_starve_others(self):
+        governor = ResourceGovernor(max_per_connection=5, max_total=1)
+        order = []
+
+        governor.acquire("blocker", "org-0")
+        requests = [(f"noisy-{i}", "noisy") for i in range(6)] + [("quiet-1", "quiet"), ("quiet-2", "quiet")]
+        threads = self.queue_in_order(governor, requests, order)
+        governor.release("blocker")
+        for thread in threads:
+            thread.join()
+
+        # The quiet organization's requests interleave with the noisy backlog instead of waiting behind it
+        self.assertEqual(order[:4], ["noisy", "quiet", "noisy", "quiet"])
+
+    def test_weights_share_contended_slots(self):
+        governor = ResourceGovernor(max_per_connection=5, max_total=1)
+        governor.set_organization_weight("gold", 2)
+        order = []
+
+        governor.acquire("blocker", "org-0")
+        requests = [(f"gold-{i}", "gold") for i in range(6)] + [(f"basic-{i}", "basic") for i in range(6)]
+        threads = self.queue_in_order(governor, requests, order)
+        governor.release("blocker")
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order[:6].count("gold"), 4)
+
+    def test_capped_connection_does_not_block_others(self):
+        governor = ResourceGovernor(max_per_connection=1, max_total=10)
+        governor.acquire("conn-1", "org-1")
+        order = []
+
+        threads = self.queue_in_order(governor, [("conn-1", "org-1")], order)
+        self.assertTrue(governor.acquire("conn-2", "org-1", timeout=1))
+        self.assertEqual(order, [])
+
+        governor.release("conn-2")
+        governor.release("conn-1")
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["org-1"])
+
+    def test_nested_acquire_and_timeout(self):
+        governor = ResourceGovernor(max_per_connection=1, max_total=10)
+
+        with governor.slot("conn-1", "org-1", "validation"):
+            # The same thread re-entering the connection does not deadlock
+            with governor.slot("conn-1", "org-1", "validation"):
+                self.assertEqual(governor.get_stats()["in_use"], {"conn-1": 1})
+
+            result = {}
+            thread = threading.Thread(
+                target=lambda: result.setdefault("acquired", governor.acquire("conn-1", "org-2", "anomaly",
+                                                                              timeout=0.05)))
+            thread.start()
+            thread.join()
+            self.assertFalse(result["acquired"])
+
+        stats = governor.get_stats()
+        self.assertEqual(stats["in_use"], {})
+        self.assertEqual(stats["total_waiting"], 0)
+        self.assertEqual(stats["wait_metrics"]["subsystem:anomaly"]["timeouts"], 1)
+
+        errors = []
+
+        def blocked_slot():
+            try:
+                with governor.slot("conn-1", "org-2", timeout=0.01):
+                    pass
+            except TimeoutError as e:
+                errors.append(e)
+
+        with governor.slot("conn-1", "org-1"):
+            thread = threading.Thread(target=blocked_slot)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# test_default_validations.py
+import unittest
+from unittest.mock import MagicMock, patch
+from backend.core.validations.default_validations import (
+    build_default_validations, load_table_schemas_from_metadata, add_default_validations_bulk
+)
+
+
+class TestDefaultValidationsFromMetadata(unittest.TestCase):
+    def setUp(self):
+        self.columns_metadata = {
+            "metadata": {
+                "columns_by_table": {
+                    "orders": [
+                        {"name": "id", "type": "INTEGER", "nullable": False},
+                        {"name": "amount", "type": "NUMERIC(10, 2)", "nullable": False},
+                        {"name": "email", "type": "VARCHAR(120)", "nullable": True}
+                    ],
+                    "customers": [
+                        {"name": "customer_id", "type": "INTEGER", "nullable": False, "primary_key": True}
+                    ]
+                }
+            },
+            "freshness": {"status": "fresh", "age_seconds": 600}
+        }
+        self.tables_metadata = {
+            "metadata": {"tables": [{"name": "orders", "primary_key": ["id"]}, {"name": "customers"}]}
+        }
+
+        self.storage_service = MagicMock()
+        self.storage_service.get_metadata.side_effect = lambda connection_id, metadata_type: {
+            "columns": self.columns_metadata,
+            "tables": self.tables_metadata
+        }.get(metadata_type)
+
+    def test_build_from_string_types(self):
+        validations = build_default_validations(
+            "orders", self.columns_metadata["metadata"]["columns_by_table"]["orders"], ["id"]
+        )
+        by_name = {v["name"]: v for v in validations}
+
+        self.assertIn("check_amount_not_null", by_name)
+        self.assertNotIn("check_id_not_null", by_name)
+        self.assertEqual(by_name["check_email_max_length"]["template_params"]["max_length"], 120)
+        self.assertEqual(by_name["check_amount_not_null"]["query_template"], "not_null")
+
+    def test_load_table_schemas(self):
+        schemas = load_table_schemas_from_metadata(self.storage_service, "conn-1", ["orders", "customers", "missing"])
+
+        self.assertEqual(set(schemas.keys()), {"orders", "customers"})
+        self.assertEqual(schemas["orders"]["primary_keys"], ["id"])
+        self.assertEqual(schemas["customers"]["primary_keys"], ["customer_id"])
+
+    def test_stale_metadata_is_ignored(self):
+        self.columns_metadata["freshness"] = {"status": "stale", "age_seconds": 7 * 86400}
+        self.assertEqual(load_table_schemas_from_metadata(self.storage_service, "conn-1"), {})
+
+    @patch('backend.core.validations.default_validations.get_default_validations')
+    def test_add_default_validations_bulk(self, mock_get_default_validations):
+        validation_manager = MagicMock()
+        validation_manager.get_existing_rule_names.return_value = {"orders": {"check_orders_not_empty"}}
+        validation_manager.add_rules_bulk.side_effect = \
+            lambda org, conn, rules_by_table: sum(len(rules) for rules in rules_by_table.values())
+
+        result = add_default_validations_bulk(
+            validation_manager, "org-1", "conn-1", storage_service=self.storage_service
+        )
+
+        # Generated entirely from stored metadata with one existence check and one bulk add
+        mock_get_default_validations.assert_not_called()
+        validation_manager.get_existing_rule_names.assert_called_once_with("org-1", "conn-1")
+        validation_manager.add_rules_bulk.assert_called_once()
+
+        self.assertEqual(result["skipped"], 1)
+        self.assertEqual(result["tables"]["orders"]["skipped"], 1)
+        self.assertEqual(result["live_tables"], 0)
+        self.assertGreater(result["added"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
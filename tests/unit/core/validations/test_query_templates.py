@@ -0,0 +1,130 @@
+# test_query_templates.py
+import unittest
+from sqlalchemy import create_engine
+from backend.core.validations.query_templates import (
+    render_query, resolve_rule_query, parse_count_query, plan_rule_batches, get_statement_cache,
+    canonicalize_query, find_overlapping_rules, template_update_fields
+)
+
+
+class TestQueryTemplates(unittest.TestCase):
+    def test_render_query(self):
+        query = render_query("not_null", {"table": "orders", "column": "id"})
+        self.assertEqual(query, "SELECT COUNT(*) FROM orders WHERE id IS NULL")
+
+        with self.assertRaises(ValueError):
+            render_query("unknown", {})
+
+    def test_resolve_rule_query_prefers_template(self):
+        rule = {
+            "query": "SELECT 1",
+            "query_template": "row_count",
+            "template_params": '{"table": "orders"}'
+        }
+        self.assertEqual(resolve_rule_query(rule), "SELECT COUNT(*) FROM orders")
+        self.assertEqual(resolve_rule_query({"query": "SELECT 1"}), "SELECT 1")
+
+    def test_template_update_fields(self):
+        stored = {"query_template": "not_null", "template_params": {"table": "orders", "column": "id"}}
+
+        # Unchanged or missing queries leave the template columns untouched
+        self.assertEqual(template_update_fields({"query": "SELECT COUNT(*) FROM orders WHERE id IS NULL"}, stored), {})
+        self.assertEqual(template_update_fields({"name": "renamed"}, stored), {})
+
+        # An edited query drops the template, even when the request echoes it back
+        edited = {"query": "SELECT COUNT(*) FROM orders WHERE id IS NULL AND amount > 0", **stored}
+        self.assertEqual(template_update_fields(edited, stored), {"query_template": None, "template_params": None})
+        self.assertEqual(template_update_fields(edited, None), {})
+
+    def test_parse_count_query(self):
+        self.assertEqual(parse_count_query("SELECT COUNT(*) FROM orders"), ("orders", None))
+        self.assertEqual(parse_count_query("select count(*) from s.orders where amount < 0;"),
+                         ("s.orders", "amount < 0"))
+        self.assertIsNone(parse_count_query("SELECT COUNT(*) FROM (SELECT id FROM orders) x"))
+        self.assertIsNone(parse_count_query("SELECT COUNT(*) FROM orders WHERE id IN (SELECT id FROM t)"))
+        self.assertIsNone(parse_count_query("SELECT AVG(amount) FROM orders"))
+
+    def test_plan_rule_batches(self):
+        rules = [
+            {"rule_name": "a", "query": "SELECT COUNT(*) FROM orders"},
+            {"rule_name": "b", "query": "SELECT COUNT(*) FROM orders WHERE amount < 0"},
+            {"rule_name": "c", "query": "SELECT COUNT(*) FROM customers WHERE email = ''"},
+            {"rule_name": "d", "query": "SELECT MAX(amount) FROM orders"},
+        ]
+        batches, singles = plan_rule_batches(rules)
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([r["rule_name"] for r in batches[0]["rules"]], ["a", "b"])
+        self.assertEqual(batches[0]["query"],
+                         "SELECT COUNT(*), COALESCE(SUM(CASE WHEN amount < 0 THEN 1 ELSE 0 END), 0) FROM orders")
+        self.assertEqual(sorted(r["rule_name"] for r in singles), ["c", "d"])
+
+    def test_statement_cache(self):
+        engine = create_engine("sqlite://")
+        cache = get_statement_cache(engine)
+        self.assertIs(cache, get_statement_cache(engine))
+
+        with engine.connect() as conn:
+            for _ in range(3):
+                self.assertEqual(cache.execute(conn, "SELECT 1").scalar(), 1)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_canonicalize_query(self):
+        self.assertEqual(
+            canonicalize_query("SELECT COUNT(*) FROM orders WHERE id IS NULL"),
+            canonicalize_query("select count( * )\n  from Orders -- null ids\n where ID is null;")
+        )
+        self.assertEqual(
+            canonicalize_query("SELECT COUNT(*) FROM (SELECT id FROM orders GROUP BY id HAVING COUNT(*) > 1) AS dups"),
+            canonicalize_query("SELECT COUNT(*) FROM (SELECT id FROM orders GROUP BY id HAVING COUNT(*) > 1) d")
+        )
+        # CAST target types are not aliases
+        self.assertNotEqual(
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE CAST(amount AS INTEGER) > 100"),
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE CAST(amount AS DATE) > 100")
+        )
+        self.assertNotEqual(
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE CAST(zip AS VARCHAR) = ''"),
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE CAST(zip AS CHAR) = ''")
+        )
+        # Operators after a closing parenthesis are not aliases
+        operator_pairs = [
+            ("SELECT COUNT(*) FROM t WHERE LOWER(email) ILIKE '%@x.com'",
+             "SELECT COUNT(*) FROM t WHERE LOWER(email) RLIKE '%@x.com'"),
+            ("SELECT COUNT(*) FROM t WHERE LOWER(email) REGEXP 'x'",
+             "SELECT COUNT(*) FROM t WHERE LOWER(email) SIMILAR 'x'"),
+            ("SELECT COUNT(*) FROM t WHERE ABS(x) DIV 2 = 1",
+             "SELECT COUNT(*) FROM t WHERE ABS(x) MOD 2 = 1"),
+            ("SELECT COUNT(*) FROM t WHERE LOWER(name) COLLATE nocase = 'a'",
+             "SELECT COUNT(*) FROM t WHERE LOWER(name) COLLATE binary = 'a'"),
+        ]
+        for first, second in operator_pairs:
+            self.assertNotEqual(canonicalize_query(first), canonicalize_query(second))
+        self.assertEqual(
+            canonicalize_query("SELECT COUNT(*) FROM (SELECT id FROM orders) o WHERE 1 = 1"),
+            canonicalize_query("SELECT COUNT(*) FROM (SELECT id FROM orders) AS x WHERE 1 = 1")
+        )
+        # String literals keep their case
+        self.assertNotEqual(
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE status = 'A'"),
+            canonicalize_query("SELECT COUNT(*) FROM t WHERE status = 'a'")
+        )
+
+    def test_find_overlapping_rules(self):
+        rules = [
+            {"id": "1", "rule_name": "a", "table_name": "orders", "query": "SELECT COUNT(*) FROM orders"},
+            {"id": "2", "rule_name": "b", "table_name": "orders", "query": "select count(*) from orders"},
+            {"id": "3", "rule_name": "c", "table_name": "orders", "query": "SELECT MAX(amount) FROM orders"},
+        ]
+        overlaps = find_overlapping_rules(rules)
+
+        self.assertEqual(len(overlaps), 1)
+        self.assertEqual(overlaps[0]["rule_ids"], ["1", "2"])
+        self.assertEqual(overlaps[0]["tables"], ["orders"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# test_run_registry.py
+import threading
+import time
+import unittest
+from backend.core.validations.run_registry import ValidationRunRegistry
+
+
+class TestValidationRunRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ValidationRunRegistry(retention_seconds=60)
+
+    def test_get_run_is_scoped_to_organization(self):
+        run = self.registry.create_run("org-1", "conn-1", "orders")
+        self.assertIs(self.registry.get_run(run.id, "org-1"), run)
+        self.assertIsNone(self.registry.get_run(run.id, "org-2"))
+        self.assertIsNone(self.registry.get_run("missing"))
+
+    def test_wait_for_results_wakes_on_new_result(self):
+        run = self.registry.create_run("org-1", "conn-1", "orders")
+
+        def add_result():
+            time.sleep(0.1)
+            run.add_result({"name": "check_orders_not_empty", "is_valid": True})
+
+        thread = threading.Thread(target=add_result)
+        thread.start()
+
+        results = run.wait_for_results(0, timeout=5)
+        self.assertEqual(len(results), 1)
+        thread.join()
+
+        # Finishing the run releases readers even without new results
+        run.finish(summary={"total": 1})
+        self.assertEqual(run.wait_for_results(1, timeout=5), [])
+
+        state = run.to_dict()
+        self.assertEqual(state["status"], "completed")
+        self.assertEqual(state["completed_count"], 1)
+        self.assertEqual(state["summary"], {"total": 1})
+
+    def test_finished_runs_are_pruned(self):
+        run = self.registry.create_run("org-1", "conn-1", "orders")
+        run.finish(error="boom")
+        run.completed_at -= 120
+
+        self.registry.create_run("org-1", "conn-1", "customers")
+        self.assertIsNone(self.registry.get_run(run.id))
+
+
+    def test_runs_execute_on_a_bounded_pool(self):
+        registry = ValidationRunRegistry(max_workers=1, max_queued=1)
+        release = threading.Event()
+        threads = []
+
+        def execute(run, table_name):
+            threads.append(threading.current_thread().name)
+            release.wait(5)
+            run.finish(summary={"table": table_name})
+
+        first = registry.start_run("org-1", "conn-1", "orders", execute, "orders")
+        second = registry.start_run("org-1", "conn-1", "customers", execute, "customers")
+        self.assertIsNone(registry.start_run("org-1", "conn-1", "events", execute, "events"))
+
+        release.set()
+        self.assertEqual(second.wait_for_results(0, timeout=5), [])
+        self.assertEqual(first.to_dict()["summary"], {"table": "orders"})
+        self.assertEqual(second.to_dict()["summary"], {"table": "customers"})
+        self.assertEqual(len(set(threads)), 1)
+
+        # Finished runs no longer count against the limit
+        self.assertIsNotNone(registry.start_run("org-1", "conn-1", "events", execute, "events"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+# test_validation_batching.py
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from backend.core.validations.query_templates import get_statement_cache
+from backend.core.validations.supabase_validation_manager import SupabaseValidationManager
+
+
+class TestConnectionValidationRun(unittest.TestCase):
+    def setUp(self):
+        # Create a small SQLite database to run the rules against
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE orders (id INTEGER, amount INTEGER)")
+        db.execute("CREATE TABLE customers (id INTEGER, email TEXT)")
+        db.executemany("INSERT INTO orders VALUES (?, ?)", [(1, 10), (2, -5)])
+        db.executemany("INSERT INTO customers VALUES (?, ?)", [(1, "a@b.com")])
+        db.commit()
+        db.close()
+        self.connection_string = f"sqlite:///{self.db_path}"
+
+        self.rules = [
+            {"id": "r1", "table_name": "orders", "rule_name": "check_orders_not_empty", "description": "",
+             "query": "SELECT COUNT(*) FROM orders", "operator": "greater_than", "expected_value": "0"},
+            {"id": "r2", "table_name": "orders", "rule_name": "check_amount_positive", "description": "",
+             "query": "SELECT COUNT(*) FROM orders WHERE amount < 0", "operator": "equals", "expected_value": "0"},
+            {"id": "r3", "table_name": "customers", "rule_name": "check_customers_not_empty", "description": "",
+             "query": "SELECT COUNT(*) FROM customers", "operator": "greater_than", "expected_value": "0"},
+            {"id": "r4", "table_name": "customers", "rule_name": "check_missing_column", "description": "",
+             "query": "SELECT COUNT(*) FROM customers WHERE missing IS NULL", "operator": "equals",
+             "expected_value": "0"},
+        ]
+
+        with patch('backend.core.validations.supabase_validation_manager.SupabaseManager'):
+            self.manager = SupabaseValidationManager()
+
+        self.table = MagicMock()
+        self.manager.supabase.supabase.table.return_value = self.table
+        self.table.select.return_value.eq.return_value.eq.return_value.eq.return_value.order.return_value \
+            .range.side_effect = lambda start, end: MagicMock(
+                execute=MagicMock(return_value=MagicMock(data=self.rules[start:end + 1])))
+        self.table.insert.side_effect = lambda records: MagicMock(execute=MagicMock(return_value=MagicMock(data=records)))
+        self.manager._publish_validation_failure_event = MagicMock()
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def test_rules_are_paged_past_the_row_limit(self):
+        rules = self.manager.get_rules_for_connection("org-1", "conn-1", page_size=3)
+
+        self.assertEqual([rule["id"] for rule in rules], ["r1", "r2", "r3", "r4"])
+
+    def test_existing_rule_names_are_paged(self):
+        self.table.select.return_value.eq.return_value.eq.return_value.order.return_value \
+            .range.side_effect = lambda start, end: MagicMock(
+                execute=MagicMock(return_value=MagicMock(data=self.rules[start:end + 1])))
+
+        names = self.manager.get_existing_rule_names("org-1", "conn-1", page_size=2)
+
+        self.assertEqual(names, {"orders": {"check_orders_not_empty", "check_amount_positive"},
+                                 "customers": {"check_customers_not_empty", "check_missing_column"}})
+
+    def test_group_rules_by_table(self):
+        grouped = SupabaseValidationManager.group_rules_by_table(self.rules)
+        self.assertEqual(list(grouped.keys()), ["orders", "customers"])
+        self.assertEqual([r["id"] for r in grouped["orders"]], ["r1", "r2"])
+
+    def test_execute_rules_for_connection(self):
+        results = self.manager.execute_rules_for_connection("org-1", self.connection_string, "conn-1")
+
+        self.assertEqual(set(results.keys()), {"orders", "customers"})
+
+        orders = {r["rule_name"]: r for r in results["orders"]}
+        self.assertTrue(orders["check_orders_not_empty"]["is_valid"])
+        self.assertFalse(orders["check_amount_positive"]["is_valid"])
+        self.assertEqual(orders["check_amount_positive"]["actual_value"], 1)
+
+        customers = {r["rule_name"]: r for r in results["customers"]}
+        self.assertIn("error", customers["check_missing_column"])
+
+        # Rules are loaded with one query and all results written in one insert
+        self.assertEqual(self.table.select.call_count, 1)
+        self.assertEqual(self.table.insert.call_count, 1)
+        stored = self.table.insert.call_args[0][0]
+        self.assertEqual({record["rule_id"] for record in stored}, {"r1", "r2", "r3"})
+        self.assertTrue(all(record["connection_id"] == "conn-1" for record in stored))
+
+        # Failed rules still publish their failure events
+        published = self.manager._publish_validation_failure_event.call_args_list
+        self.assertEqual([call.kwargs["rule_name"] for call in published], ["check_amount_positive"])
+
+    def test_table_run_holds_a_validation_slot(self):
+        orders_rules = self.rules[:2]
+        with patch.object(self.manager, 'get_rules', return_value=orders_rules), \
+                patch.object(self.manager, 'store_validation_result', return_value="result-1"), \
+                patch('backend.core.validations.supabase_validation_manager.resource_governor') as governor:
+            results = self.manager.execute_rules("org-1", self.connection_string, "orders", "conn-1")
+
+        self.assertEqual(len(results), 2)
+        governor.slot.assert_called_once_with("conn-1", "org-1", "validation")
+
+    def test_statement_cache_is_reused_across_runs(self):
+        from backend.core.validations import supabase_validation_manager as module
+
+        caches = []
+        with patch.object(module, 'get_statement_cache',
+                          side_effect=lambda engine: caches.append(get_statement_cache(engine)) or caches[-1]):
+            self.manager.execute_rules_for_connection("org-1", self.connection_string, "conn-1")
+            misses = caches[-1].get_stats()["misses"]
+            self.manager.execute_rules_for_connection("org-1", self.connection_string, "conn-1")
+
+        self.assertEqual(len({id(cache) for cache in caches}), 1)
+        stats = caches[-1].get_stats()
+        self.assertEqual(stats["misses"], misses)
+        self.assertGreater(stats["hits"], 0)
+
+    def test_duplicate_queries_run_once(self):
+        self.rules.append(
+            {"id": "r5", "table_name": "customers", "rule_name": "check_orders_nonempty_again", "description": "",
+             "query": "select count( * )\nfrom ORDERS;", "operator": "equals", "expected_value": "0"}
+        )
+
+        with patch.object(self.manager, '_execute_rule', wraps=self.manager._execute_rule) as mock_execute_rule:
+            results = self.manager.execute_rules_for_connection("org-1", self.connection_string, "conn-1")
+
+        executed = [call[0][1]["id"] for call in mock_execute_rule.call_args_list]
+        self.assertNotIn("r5", executed)
+
+        # The duplicate is reported under its own table and evaluated with its own operator
+        duplicate = {r["rule_name"]: r for r in results["customers"]}["check_orders_nonempty_again"]
+        self.assertEqual(duplicate["rule_id"], "r5")
+        self.assertEqual(duplicate["actual_value"], 2)
+        self.assertFalse(duplicate["is_valid"])
+
+    def test_bulk_store_serializes_decimals_and_dates(self):
+        stored = self.manager.store_validation_results_bulk("org-1", [
+            {"rule_id": "r1", "is_valid": True, "actual_value": Decimal("10.50")},
+            {"rule_id": "r2", "is_valid": True, "actual_value": datetime.date(2026, 1, 2)}
+        ], connection_id="conn-1")
+
+        self.assertEqual(stored, 2)
+        records = self.table.insert.call_args[0][0]
+        self.assertEqual([record["actual_value"] for record in records], ['"10.50"', '"2026-01-02"'])
+
+    def test_failed_chunk_falls_back_to_single_inserts(self):
+        def insert(records):
+            if isinstance(records, list) or records["rule_id"] == "bad":
+                return MagicMock(execute=MagicMock(side_effect=Exception("invalid input")))
+            return MagicMock(execute=MagicMock(return_value=MagicMock(data=[records])))
+
+        self.table.insert.side_effect = insert
+        stored = self.manager.store_validation_results_bulk("org-1", [
+            {"rule_id": "r1", "is_valid": True, "actual_value": 1},
+            {"rule_id": "bad", "is_valid": True, "actual_value": 2},
+            {"rule_id": "r3", "is_valid": False, "actual_value": 3}
+        ])
+
+        self.assertEqual(stored, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()